@@ -1,9 +1,10 @@
 import streamlit as st
-import pandas as pd
 from modules.utils.config_loader import cargar_config, horas_por_dia
-from modules.scheduler import programar
+from modules.utils.cache_planes import CachePlanes
 from modules.utils.persistence import PersistenceManager
-from modules.utils.data_processor import process_uploaded_dataframe
+from modules.utils.data_processor import leer_excel_ordenes, process_uploaded_dataframe
+from modules.utils.snapshot_ordenes import SnapshotOrdenes, clave_archivo
+from modules.planificacion_incremental import PlanificadorIncremental
 
 from modules.ui_components import (
     render_machine_speed_inputs,
@@ -23,7 +24,8 @@ from modules.ui_components import (
     render_delayed_orders_section,
     render_daily_schedule_view,
     render_create_machine,
-    render_galpon2_page
+    render_galpon2_page,
+    render_performance_section
 )
 
 from modules.utils.visualizations import render_gantt_chart
@@ -77,7 +79,8 @@ with st.sidebar:
     )
     
     if "persistence" not in st.session_state:
-        st.session_state.persistence = PersistenceManager()
+        # Los errores de la base se muestran en la UI (además del log)
+        st.session_state.persistence = PersistenceManager(notificar=lambda nivel, msg: getattr(st, nivel)(msg))
     pm = st.session_state.persistence
     
     # Initialize defaults
@@ -160,17 +163,38 @@ with st.sidebar:
     cfg["manual_overrides"] = st.session_state.manual_overrides
     # ----------------------------------
 
+@st.cache_resource
+def obtener_cache_planes():
+    return CachePlanes(max_entradas=8, directorio=".cache/planes")
+
+@st.cache_resource
+def obtener_snapshots_ordenes():
+    return SnapshotOrdenes(".cache/ordenes")
+
+def procesar_excel(file_bytes):
+    # Lectura en streaming, solo con las columnas que usa el planificador
+    df_raw = leer_excel_ordenes(file_bytes)
+    return process_uploaded_dataframe(df_raw)
+
 @st.cache_data(show_spinner="📥 Procesando archivo Excel...")
 def load_and_process_excel(file_bytes):
-    import io
-    df_raw = pd.read_excel(io.BytesIO(file_bytes))
-    return process_uploaded_dataframe(df_raw)
+    # Si el mismo archivo ya se procesó (otra sesión, antes de un reinicio), se lee el snapshot
+    return obtener_snapshots_ordenes().cargar_o_procesar(file_bytes, procesar_excel)
 
 archivo = st.file_uploader("📁 Subí el Excel de órdenes desde Access (.xlsx)", type=["xlsx"])
 
 if archivo is not None:
     # Load and apply transformations to DF
     df = load_and_process_excel(archivo.getvalue())
+    lectura = df.attrs.get("lectura")
+    snapshot = df.attrs.get("snapshot")
+    if lectura:
+        st.caption(
+            f"📥 {lectura['filas']} órdenes, {lectura['columnas']}/{lectura['columnas_hoja']} columnas "
+            f"leídas en {lectura['segundos']:.1f}s ({lectura['filas_por_seg']:.0f} filas/s)"
+        )
+    elif snapshot:
+        st.caption(f"📥 {len(df)} órdenes desde snapshot ({snapshot['formato']}) en {snapshot['segundos']:.2f}s")
 
     # ============================================================
     # Branch: Galpón 2 (Cartonaje) — planificación independiente
@@ -223,13 +247,38 @@ if archivo is not None:
     if "manual_assignments" in st.session_state:
         cfg_plan["manual_assignments"] = st.session_state.manual_assignments
 
-    @st.cache_data(show_spinner="🧠 Calculando planificación...")
-    def generar_planificacion(df_in, cfg_in, fecha_in, hora_in, _machine_hash=None):
-        return programar(df_in, cfg_in, start=fecha_in, start_time=hora_in)
+    # Re-planificación incremental: un planificador por archivo e inicio del plan. Cada
+    # rerun de la UI (prioridad, paro, horas extras, asignación...) re-planifica solo lo
+    # que invalida la edición sobre el plan anterior.
+    clave_planificador = (clave_archivo(archivo.getvalue()), fecha_inicio_plan, hora_inicio_plan)
+    if st.session_state.get("planificador_clave") != clave_planificador:
+        st.session_state.planificador = PlanificadorIncremental(df, start=fecha_inicio_plan, start_time=hora_inicio_plan)
+        st.session_state.planificador_clave = clave_planificador
+    planificador = st.session_state.planificador
+
+    # Caché por contenido de las entradas (órdenes, máquinas, calendario, overrides, inicio):
+    # detecta cambios dentro de manual_overrides y sobrevive a un reinicio (tier en disco).
+    # Solo si no hay un plan guardado para estas entradas se llama al planificador incremental.
+    # La caché se comparte entre sesiones: solo se guardan planes completos, nunca uno
+    # incremental (depende de la historia de ediciones de esta sesión).
+    forzar_completo = st.button(
+        "🔄 Re-planificar todo",
+        help="Descarta la re-planificación incremental y calcula el plan completo con la configuración actual."
+    )
+
+    def _replanificar(_df, cfg_run, **_):
+        if forzar_completo:
+            return planificador.planificar(cfg_run)
+        resultado = planificador.replanificar(cfg_run)
+        if planificador.ultimo_modo == "incremental":
+            st.caption(f"♻️ Re-planificación incremental: {planificador.liberadas} tareas re-planificadas")
+        return resultado
 
-    # Hash de máquinas activas para invalidar caché cuando cambian (incluyendo custom)
-    _maq_hash = tuple(sorted(cfg_plan["maquinas"]["Maquina"].tolist()))
-    schedule, carga_md, resumen_ot, detalle_maquina = generar_planificacion(df, cfg_plan, fecha_inicio_plan, hora_inicio_plan, _machine_hash=_maq_hash)
+    with st.spinner("🧠 Calculando planificación..."):
+        schedule, carga_md, resumen_ot, detalle_maquina = obtener_cache_planes().planificar(
+            df, cfg_plan, fecha_inicio_plan, hora_inicio_plan, planificador=_replanificar,
+            guardar_si=lambda: planificador.plan_completo
+        )
 
     st.session_state.last_schedule = schedule
 
@@ -250,6 +299,9 @@ if archivo is not None:
     # 12.5. Daily Schedule View (Calendar format)
     with st.expander("🗓️ Ver Calendario de Tareas", expanded=False):
         render_daily_schedule_view(schedule, cfg)
+
+    # 12.6. Rendimiento del planificador
+    render_performance_section(schedule)
     
     # Updates cfg in place (and saves to disk) 
 
@@ -0,0 +1,259 @@
+"""
+Benchmark del planificador (programar) sobre carteras sintéticas.
+
+Por cada escala (cantidad de OTs) genera una cartera con generador_planta
+contra la hoja de máquinas real, la planifica y mide:
+  - tareas expandidas (_expandir_tareas), filas planificadas y tareas que
+    quedaron sin agendar
+  - tiempo total de programar (el mejor de --repeticiones corridas)
+  - tiempo y llamadas de cada etapa: calendario, expansión de tareas,
+    overrides/bloqueos, armado de colas y _reservar_en_agenda (el resto es el
+    loop principal y las salidas)
+  - las etapas numeradas de programar, según su informe de rendimiento
+  - pico de memoria (tracemalloc, en una corrida aparte para no inflar los tiempos)
+
+Los resultados se comparan contra benchmarks/linea_base.json y el comando
+sale con código 1 si alguna escala empeora más que la tolerancia o deja más
+tareas sin agendar que la línea base (agendar más no es una regresión). No
+usa la base de datos.
+
+Uso:
+    python -m benchmarks.bench_scheduler                        # escalas de la línea base (1k, 5k, 20k)
+    python -m benchmarks.bench_scheduler --escalas 1000 5000 20000
+    python -m benchmarks.bench_scheduler --guardar              # regraba la línea base
+
+La línea base depende de la máquina: regrabarla al cambiar de equipo.
+
+El planificador no agenda toda la cartera, así que los tiempos corresponden
+a las filas planificadas y no a todas las tareas. Parte de lo que queda afuera
+es a propósito: Galpón 1 descarta las OTs de Cartonaje. El resto son tareas
+que la corrida termina sin agendar; las prioridades del Excel lo agravan,
+porque una priorizada que espera a sus predecesoras frena el relleno de huecos
+de su máquina. Por eso las carteras van por defecto sin prioridades
+(--tasa-prioridad las agrega) y sin_agendar se informa aparte.
+"""
+
+import argparse
+import copy
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import wraps
+from pathlib import Path
+
+import pandas as pd
+
+import modules.scheduler as scheduler
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from benchmarks.generador_planta import generar_ordenes
+
+
+LINEA_BASE = Path(__file__).with_name("linea_base.json")
+ESCALAS_DEFAULT = (1000, 5000, 20000)
+INICIO = date(2026, 3, 2)
+
+# Etapa -> funciones que programar llama por nombre desde modules.scheduler
+ETAPAS = {
+    "calendario": ("obtener_calendario", "construir_calendario"),
+    "expansion": ("_expandir_tareas",),
+    "overrides": ("aplicar_overrides", "aplicar_bloqueos"),
+    "colas": ("orden_impresora", "orden_troquelada", "orden_cortadora_bobina"),
+    "reservas": ("_reservar_en_agenda",),
+}
+
+
+@contextmanager
+def medir_etapas():
+    """
+    Envuelve las funciones de ETAPAS dentro de modules.scheduler mientras dura
+    el bloque. Entrega {etapa: {"segundos": s, "llamadas": n}}.
+    """
+    etapas = {nombre: {"segundos": 0.0, "llamadas": 0} for nombre in ETAPAS}
+    originales = {}
+
+    def envolver(funcion, acumulado):
+        @wraps(funcion)
+        def medida(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                acumulado["segundos"] += time.perf_counter() - t0
+                acumulado["llamadas"] += 1
+        return medida
+
+    for etapa, nombres in ETAPAS.items():
+        for nombre in nombres:
+            originales[nombre] = getattr(scheduler, nombre)
+            setattr(scheduler, nombre, envolver(originales[nombre], etapas[etapa]))
+    try:
+        yield etapas
+    finally:
+        for nombre, funcion in originales.items():
+            setattr(scheduler, nombre, funcion)
+
+
+def cfg_planta():
+    """cfg del Galpón 1 como lo arma la app sin historial."""
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [])
+    return cfg
+
+
+def medir(n, semilla=0, repeticiones=1, memoria=True, cfg=None, tasa_prioridad=0.0):
+    """Mide programar sobre una cartera sintética de `n` OTs."""
+    cfg = cfg if cfg is not None else cfg_planta()
+    ordenes = generar_ordenes(n, cfg["maquinas"], semilla=semilla, start=INICIO, tasa_prioridad=tasa_prioridad)
+    tareas = len(scheduler._expandir_tareas(ordenes.copy(), copy.deepcopy(cfg)))
+
+    mejor = None
+    for _ in range(max(1, repeticiones)):
+        cfg_corrida = copy.deepcopy(cfg)
+        with medir_etapas() as etapas:
+            t0 = time.perf_counter()
+            schedule = scheduler.programar(ordenes.copy(), cfg_corrida, start=INICIO)[0]
+            segundos = time.perf_counter() - t0
+        if mejor is None or segundos < mejor["segundos"]:
+            mejor = {"segundos": segundos, "etapas": etapas, "filas": len(schedule),
+                     "programar": schedule.attrs.get("rendimiento", {}).get("etapas", {})}
+
+    resultado = {
+        "ots": n,
+        "semilla": semilla,
+        "tasa_prioridad": tasa_prioridad,
+        "tareas": tareas,
+        "filas": mejor["filas"],
+        "sin_agendar": max(0, tareas - mejor["filas"]),
+        "segundos": round(mejor["segundos"], 3),
+        "etapas": {
+            nombre: {"segundos": round(e["segundos"], 3), "llamadas": e["llamadas"]}
+            for nombre, e in mejor["etapas"].items()
+        },
+    }
+    resultado["etapas"]["resto"] = {
+        "segundos": round(mejor["segundos"] - sum(e["segundos"] for e in mejor["etapas"].values()), 3),
+        "llamadas": 1,
+    }
+    # Etapas numeradas según el propio informe de programar (schedule.attrs["rendimiento"])
+    resultado["etapas_programar"] = {nombre: round(seg, 3) for nombre, seg in mejor["programar"].items()}
+
+    if memoria:
+        cfg_corrida = copy.deepcopy(cfg)
+        tracemalloc.start()
+        try:
+            scheduler.programar(ordenes.copy(), cfg_corrida, start=INICIO)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        resultado["memoria_pico_mb"] = round(pico / 2**20, 1)
+    return resultado
+
+
+def comparar(resultados, linea_base, tolerancia_tiempo=0.25, tolerancia_memoria=0.20):
+    """
+    Regresiones de `resultados` frente a la línea base (lista de textos; vacía
+    si no hay). Solo se comparan las escalas presentes en ambas y generadas
+    con la misma cartera (semilla y tasa de prioridades).
+    """
+    regresiones = []
+    base_escalas = linea_base.get("escalas", {})
+    for clave, actual in resultados.items():
+        base = base_escalas.get(clave)
+        if base is None or any(base.get(k) != actual.get(k) for k in ("semilla", "tasa_prioridad")):
+            continue
+        if "sin_agendar" in base and actual["sin_agendar"] > base["sin_agendar"]:
+            regresiones.append(
+                f"{clave} OTs: {actual['sin_agendar']} tareas sin agendar de {actual['tareas']} "
+                f"(línea base {base['sin_agendar']} de {base.get('tareas')})"
+            )
+        limite = base["segundos"] * (1 + tolerancia_tiempo)
+        if actual["segundos"] > limite:
+            regresiones.append(
+                f"{clave} OTs: {actual['segundos']:.2f}s > {limite:.2f}s "
+                f"(línea base {base['segundos']:.2f}s +{tolerancia_tiempo:.0%})"
+            )
+        if "memoria_pico_mb" in actual and "memoria_pico_mb" in base:
+            limite = base["memoria_pico_mb"] * (1 + tolerancia_memoria)
+            if actual["memoria_pico_mb"] > limite:
+                regresiones.append(
+                    f"{clave} OTs: {actual['memoria_pico_mb']:.1f} MB > {limite:.1f} MB "
+                    f"(línea base {base['memoria_pico_mb']:.1f} MB +{tolerancia_memoria:.0%})"
+                )
+    return regresiones
+
+
+def leer_linea_base(ruta=LINEA_BASE):
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return {}
+    return json.loads(ruta.read_text(encoding="utf-8"))
+
+
+def guardar_linea_base(resultados, ruta=LINEA_BASE):
+    datos = {
+        "entorno": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "maquina": platform.machine(),
+        },
+        "escalas": resultados,
+    }
+    Path(ruta).write_text(json.dumps(datos, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def _imprimir(resultado, base=None):
+    linea = (f"{resultado['ots']:>6} OTs  {resultado['filas']:>6} filas  "
+             f"{resultado['sin_agendar']:>6} sin agendar de {resultado['tareas']:>6}  {resultado['segundos']:8.2f}s")
+    if "memoria_pico_mb" in resultado:
+        linea += f"  {resultado['memoria_pico_mb']:8.1f} MB"
+    if base:
+        linea += f"  (base {base['segundos']:.2f}s"
+        linea += f", {base['memoria_pico_mb']:.1f} MB)" if "memoria_pico_mb" in base else ")"
+    print(linea)
+    for nombre, etapa in resultado["etapas"].items():
+        print(f"         {nombre:<12} {etapa['segundos']:8.3f}s  {etapa['llamadas']:>8} llamadas")
+    for nombre, segundos in resultado.get("etapas_programar", {}).items():
+        print(f"         · {nombre:<38} {segundos:8.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del planificador con carteras sintéticas.")
+    parser.add_argument("--escalas", type=int, nargs="+", help="Cantidades de OTs (default: las de la línea base)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--tasa-prioridad", type=float, default=0.0, help="Fracción de OTs con prioridad del Excel")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas por escala; se toma la más rápida")
+    parser.add_argument("--sin-memoria", action="store_true", help="No medir el pico de memoria")
+    parser.add_argument("--linea-base", default=str(LINEA_BASE))
+    parser.add_argument("--guardar", action="store_true", help="Grabar estos resultados como línea base")
+    parser.add_argument("--tolerancia-tiempo", type=float, default=0.25)
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    linea_base = leer_linea_base(args.linea_base)
+    escalas = args.escalas or [int(e) for e in linea_base.get("escalas", {})] or list(ESCALAS_DEFAULT)
+
+    cfg = cfg_planta()
+    resultados = {}
+    for n in escalas:
+        resultados[str(n)] = medir(n, args.semilla, args.repeticiones, not args.sin_memoria, cfg, args.tasa_prioridad)
+        _imprimir(resultados[str(n)], linea_base.get("escalas", {}).get(str(n)))
+
+    if args.guardar:
+        guardar_linea_base(resultados, args.linea_base)
+        print(f"Línea base guardada en {args.linea_base}")
+        return 0
+
+    regresiones = comparar(resultados, linea_base, args.tolerancia_tiempo, args.tolerancia_memoria)
+    for regresion in regresiones:
+        print(f"REGRESIÓN: {regresion}")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
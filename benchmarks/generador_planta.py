@@ -0,0 +1,159 @@
+"""
+Generador de carteras de órdenes sintéticas para los benchmarks.
+
+Arma un DataFrame con el formato que deja process_uploaded_dataframe (las
+columnas que leen _expandir_tareas y programar) a partir de la hoja de
+máquinas real: solo marca pendientes (_PEN_*) los procesos que tienen alguna
+máquina en cfg["maquinas"], y las troqueladoras/descartonadoras del Excel
+(TroqueladoraDdp, OpeDes1) salen de los mapas de IDs de tasks.py.
+
+La mezcla imita el export de Access: mayoría de offset sobre cartulina, flexo
+sobre micro, troquelados que comparten troquel entre OTs, pocas prioridades,
+algunas películas/troqueles que llegan en los próximos días y algo de materia
+prima todavía fuera de planta. Misma semilla => misma cartera.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+from modules.schedulers.tasks import TROQUELADORA_ID_MAP, DESCARTONADORA_ID_MAP
+
+
+CLIENTES = ["Arcor", "Flamenco", "Teppanyaki", "Nativos", "Bagley", "Georgalos",
+            "Mondelez", "Felfort", "Havanna", "Cartonaje Sur"]
+MATERIALES_OFFSET = ["Cartulina Duplex", "Cartulina Triplex", "Papel Obra"]
+MATERIALES_FLEXO = ["Microcorrugado E", "Microcorrugado B", "Carton Gris"]
+COLORES = ["C", "M", "Y", "K", "Pantone 185", "Pantone 300", "Pantone 021", "Oro", "Plata"]
+PLIEGOS = [(35, 50), (45, 64), (60, 80), (70, 100), (72, 102), (90, 102)]
+CANTIDADES = [300, 800, 1500, 2500, 4000, 8000, 12000, 20000]
+
+# Columna _PEN_* de cada proceso de la hoja de máquinas
+_PENDIENTE_POR_PROCESO = {
+    "guillotina": "_PEN_Guillotina",
+    "impresión flexo": "_PEN_ImpresionFlexo",
+    "impresión offset": "_PEN_ImpresionOffset",
+    "barnizado": "_PEN_Barnizado",
+    "stamping": "_PEN_Stamping",
+    "plastificado": "_PEN_Plastificado",
+    "encapado": "_PEN_Encapado",
+    "cuño": "_PEN_Cuño",
+    "opp": "_PEN_OPP",
+    "troquelado": "_PEN_Troquelado",
+    "descartonado": "_PEN_Descartonado",
+    "ventana": "_PEN_Ventana",
+    "pegado": "_PEN_Pegado",
+    "prensado": "_PEN_Prensado",
+}
+
+
+def _fecha(start, rng, desde, hasta):
+    return pd.Timestamp(start + timedelta(days=rng.randint(desde, hasta)))
+
+
+def generar_ordenes(n, maquinas=None, semilla=0, start=date(2026, 3, 2), tasa_prioridad=0.02):
+    """
+    Cartera sintética de `n` OTs.
+
+    maquinas:       cfg["maquinas"]; si se pasa, los procesos sin máquina quedan sin pendientes.
+    tasa_prioridad: fracción de OTs con prioridad del Excel en cada proceso (PrioriImp,
+                    PrioriTr, PrioriDesc, PrioVenDdp).
+    """
+    rng = random.Random(semilla)
+    if maquinas is not None:
+        procesos = set(maquinas["Proceso"].dropna().str.strip().str.lower())
+        con_bobina = "cortadora bobina" in procesos
+        habilitadas = {col for proc, col in _PENDIENTE_POR_PROCESO.items() if proc in procesos}
+    else:
+        con_bobina = True
+        habilitadas = set(_PENDIENTE_POR_PROCESO.values())
+
+    # ~1 troquel cada 4 OTs: los troquelados repiten troquel (setup menor)
+    troqueles = [f"T{rng.randint(1000, 9999)}" for _ in range(max(5, n // 4))]
+    articulos = max(10, n // 3)
+    ids_troq = list(TROQUELADORA_ID_MAP)
+    ids_desc = list(DESCARTONADORA_ID_MAP)
+
+    filas = []
+    for i in range(n):
+        cliente = rng.choice(CLIENTES)
+        flexo = rng.random() < 0.25
+        material = rng.choice(MATERIALES_FLEXO if flexo else MATERIALES_OFFSET)
+        imprime = rng.random() < 0.75
+        troquela = rng.random() < 0.85
+        anc, lar = rng.choice(PLIEGOS)
+        pelicula = imprime and rng.random() < 0.2
+        troquel_nuevo = troquela and rng.random() < 0.15
+
+        pen = {
+            "_PEN_Guillotina": rng.random() < 0.35,
+            "_PEN_ImpresionFlexo": imprime and flexo,
+            "_PEN_ImpresionOffset": imprime and not flexo,
+            "_PEN_Barnizado": imprime and rng.random() < 0.2,
+            "_PEN_Stamping": rng.random() < 0.04,
+            "_PEN_Plastificado": rng.random() < 0.03,
+            "_PEN_Encapado": rng.random() < 0.03,
+            "_PEN_Cuño": rng.random() < 0.01,
+            "_PEN_OPP": False,
+            "_PEN_Troquelado": troquela,
+            "_PEN_Descartonado": troquela and rng.random() < 0.6,
+            "_PEN_Ventana": rng.random() < 0.1,
+            "_PEN_Pegado": rng.random() < 0.35,
+            "_PEN_Prensado": False,
+        }
+        pen = {col: bool(v) and col in habilitadas for col, v in pen.items()}
+        # Las prioridades del Excel solo van en OTs sin nada que esperar
+        # (materia prima en planta, sin película ni troquel por llegar): el
+        # planificador frena el relleno de huecos mientras una priorizada espera
+        mp_fuera = rng.random() < 0.05
+        prio = 0.0 if (mp_fuera or pelicula or troquel_nuevo) else tasa_prioridad
+
+        fila = {
+            "CodigoProducto": 10000 + i,
+            "Subcodigo": rng.randint(1, 3),
+            "Cliente": cliente,
+            "Cliente-articulo": f"{cliente} art {rng.randint(1, articulos)}",
+            "FechaEntrega": _fecha(start, rng, -5, 40),
+            "MateriaPrima": material,
+            # True = la materia prima todavía no está en planta
+            "MateriaPrimaPlanta": mp_fuera,
+            "CodigoTroquel": rng.choice(troqueles) if troquela else "",
+            "Colores": "-".join(rng.sample(COLORES, rng.randint(1, 5))) if imprime else "",
+            "CantidadPliegos": float(rng.choice(CANTIDADES)),
+            "Poses": float(rng.choice([1, 2, 4, 6])),
+            "BocasTroquel": float(rng.choice([1, 2, 4, 6, 8])),
+            "PliAnc": float(anc),
+            "PliLar": float(lar),
+            "Urgente": rng.random() < 0.05,
+            "Grs./Nº": rng.choice([180, 230, 280, 350, 400]),
+            "CorteSNDdp": con_bobina and flexo and rng.random() < 0.3,
+            "_TroqAntes": troquela and rng.random() < 0.02,
+            "PeliculaArt": pelicula,
+            "FechaLlegadaChapas": _fecha(start, rng, 0, 6) if pelicula else pd.NaT,
+            "TroquelArt": troquel_nuevo,
+            "FechaLlegadaTroquel": _fecha(start, rng, 0, 8) if troquel_nuevo else pd.NaT,
+            "PrioriImp": rng.randint(1, 8) if imprime and rng.random() < prio else None,
+            "FechaImDdp": _fecha(start, rng, 0, 3) if imprime and rng.random() < 0.05 else pd.NaT,
+            "PrioriTr": None,
+            "FechaTroDdp": pd.NaT,
+            "TroqueladoraDdp": None,
+            "PrioriDesc": rng.randint(1, 5) if pen["_PEN_Descartonado"] and rng.random() < prio else None,
+            "OpeDes1": rng.choice(ids_desc) if pen["_PEN_Descartonado"] and rng.random() < 0.1 else None,
+            "PrioVenDdp": rng.randint(1, 5) if pen["_PEN_Ventana"] and rng.random() < prio else None,
+            # Sin PrioPegDdp: una pegadora priorizada esperando a sus predecesoras
+            # frena su máquina y deja todavía más tareas sin agendar
+            "PrioPegDdp": None,
+            "ProcesoDpd": rng.choice(["", "", "", "", "", "TID", "ITD"]),
+            "CantDesPlanDdp": 0,
+        } | pen
+
+        # Plan de troquelado del Excel: prioridad con fecha y troqueladora
+        if troquela and rng.random() < prio:
+            fila["PrioriTr"] = rng.randint(1, 8)
+            if rng.random() < 0.5:
+                fila["TroqueladoraDdp"] = rng.choice(ids_troq)
+                fila["FechaTroDdp"] = _fecha(start, rng, 0, 3)
+        filas.append(fila)
+
+    return pd.DataFrame(filas)
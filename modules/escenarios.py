@@ -0,0 +1,169 @@
+"""
+Escenarios "qué pasa si" sobre el plan.
+
+Corre `programar` sobre un cfg base más una lista de variantes (deltas) en
+procesos worker y devuelve una tabla comparativa de métricas del resumen_ot.
+
+Cada delta es un dict con cualquiera de estas claves:
+    nombre             → etiqueta del escenario (por defecto "Escenario N")
+    horas_extras       → {maquina: {fecha: horas}}, se suman/pisan sobre las del cfg
+    downtimes          → [{"maquina", "start", "end"}], se agregan a los del cfg
+    maquinas_activas   → lista de máquinas que quedan en cfg["maquinas"]
+    velocidades        → {maquina: pliegos/hora} (Capacidad_pliegos_hora)
+    ignore_constraints → bool, igual que el checkbox de la app
+
+Ej: [{"nombre": "Sábado Heidelberg", "horas_extras": {"Heidelberg": {date(2026, 3, 7): 6.0}}},
+     {"nombre": "Duyan parada martes", "downtimes": [{"maquina": "Duyan", "start": ..., "end": ...}]}]
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from modules.scheduler import programar
+from modules.planificacion_galpones import snapshot_cfg
+from modules.schedulers.agenda import _INICIO_JORNADA, _ALMUERZO
+from modules.utils.config_loader import obtener_calendario
+
+
+COLUMNAS_COMPARACION = [
+    "Escenario", "OTs", "OTsAtrasadas", "Atraso_h", "AtrasoMax_h", "HorasExtra",
+    "HorasExtraConfig", "FinPlan", "DifAtrasadas", "DifAtraso_h",
+]
+
+# Órdenes de la corrida en cada worker: se envían una vez al crear el pool
+# (initializer) y no una vez por escenario.
+_ORDENES = None
+
+
+def aplicar_delta(cfg, delta):
+    """Devuelve una copia del cfg con las variaciones del escenario aplicadas."""
+    cfg_esc = snapshot_cfg(cfg)
+
+    if delta.get("horas_extras"):
+        extras = {maq: dict(dias) for maq, dias in (cfg_esc.get("horas_extras") or {}).items()}
+        for maq, dias in delta["horas_extras"].items():
+            extras.setdefault(maq, {}).update(dias)
+        cfg_esc["horas_extras"] = extras
+
+    if delta.get("downtimes"):
+        cfg_esc["downtimes"] = list(cfg_esc.get("downtimes") or []) + list(delta["downtimes"])
+
+    if delta.get("maquinas_activas") is not None:
+        maquinas = cfg_esc["maquinas"]
+        cfg_esc["maquinas"] = maquinas[maquinas["Maquina"].isin(delta["maquinas_activas"])].copy()
+
+    for maquina, velocidad in (delta.get("velocidades") or {}).items():
+        mask = cfg_esc["maquinas"]["Maquina"] == maquina
+        if not mask.any():
+            raise ValueError(f"Escenario '{delta.get('nombre')}': la máquina '{maquina}' no existe")
+        cfg_esc["maquinas"].loc[mask, "Capacidad_pliegos_hora"] = float(velocidad)
+
+    if "ignore_constraints" in delta:
+        cfg_esc["ignore_constraints"] = bool(delta["ignore_constraints"])
+
+    return cfg_esc
+
+
+def _solape_h(inicio, fin, desde, hasta):
+    """Horas de cada tarea [inicio, fin] que caen dentro de [desde, hasta]."""
+    solape = (fin.clip(upper=hasta) - inicio.clip(lower=desde)).dt.total_seconds() / 3600.0
+    return float(solape.clip(lower=0).sum())
+
+
+def horas_extra_plan(schedule, cfg):
+    """
+    Horas del plan agendadas dentro de las horas extras del cfg.
+
+    Por máquina y día con horas extras, el turno se alarga después de la
+    jornada base (igual que la agenda): se cuenta lo agendado entre el fin de
+    la jornada base y el fin de turno, sin el almuerzo. En findes y feriados no
+    hay jornada base y todo el turno es extra.
+    """
+    extras = cfg.get("horas_extras") or {}
+    if schedule.empty or not extras:
+        return 0.0
+
+    calendario = obtener_calendario(cfg)
+    total = 0.0
+    for maquina, dias in extras.items():
+        if not isinstance(dias, dict):
+            continue
+        tareas = schedule[schedule["Maquina"] == maquina]
+        if tareas.empty:
+            continue
+        inicio, fin = pd.to_datetime(tareas["Inicio"]), pd.to_datetime(tareas["Fin"])
+        for fecha, horas in dias.items():
+            if not horas or horas <= 0:
+                continue
+            base = calendario.horas(fecha)  # sin máquina: jornada base, 0 en findes y feriados
+            entrada = datetime.combine(fecha, _INICIO_JORNADA)
+            desde = entrada + timedelta(hours=base + 0.5) if base else entrada
+            hasta = entrada + timedelta(hours=base + float(horas) + 0.5)
+            ini_alm, fin_alm = (datetime.combine(fecha, t) for t in _ALMUERZO)
+            total += _solape_h(inicio, fin, desde, hasta)
+            total -= _solape_h(inicio, fin, max(desde, ini_alm), min(hasta, fin_alm))
+    return round(total, 2)
+
+
+def metricas_plan(nombre, cfg, schedule, resumen_ot):
+    """Fila de la tabla comparativa para un plan ya calculado."""
+    extras_cfg = sum(h for dias in (cfg.get("horas_extras") or {}).values()
+                     if isinstance(dias, dict) for h in dias.values())
+    hay_resumen = not resumen_ot.empty
+    return {
+        "Escenario": nombre,
+        "OTs": int(resumen_ot["OT_id"].nunique()) if hay_resumen else 0,
+        "OTsAtrasadas": int(resumen_ot["EnRiesgo"].sum()) if hay_resumen else 0,
+        "Atraso_h": round(float(resumen_ot["Atraso_h"].sum()), 2) if hay_resumen else 0.0,
+        "AtrasoMax_h": round(float(resumen_ot["Atraso_h"].max()), 2) if hay_resumen else 0.0,
+        "HorasExtra": horas_extra_plan(schedule, cfg),
+        "HorasExtraConfig": round(float(extras_cfg), 2),
+        "FinPlan": schedule["Fin"].max() if not schedule.empty else pd.NaT,
+    }
+
+
+def _iniciar_worker(df_ordenes):
+    global _ORDENES
+    _ORDENES = df_ordenes
+
+
+def _correr_escenario(nombre, cfg, start, start_time, df_ordenes=None):
+    # programar agrega columnas a las órdenes: cada corrida trabaja sobre su copia
+    df = (_ORDENES if df_ordenes is None else df_ordenes).copy()
+    schedule, _, resumen_ot, _ = programar(df, cfg, start=start, start_time=start_time)
+    return metricas_plan(nombre, cfg, schedule, resumen_ot)
+
+
+def comparar_escenarios(df_ordenes, cfg, deltas, start=None, start_time=None,
+                        incluir_base=True, en_paralelo=True, max_workers=None):
+    """
+    Corre el plan base y cada escenario de `deltas` y devuelve la tabla
+    comparativa (una fila por escenario, en el orden recibido; el base primero).
+    DifAtrasadas / DifAtraso_h son la diferencia contra el base.
+    """
+    if start is None:
+        start = date.today()
+
+    escenarios = [("Base", snapshot_cfg(cfg))] if incluir_base else []
+    for i, delta in enumerate(deltas, start=1):
+        escenarios.append((delta.get("nombre") or f"Escenario {i}", aplicar_delta(cfg, delta)))
+
+    workers = min(len(escenarios), max_workers or os.cpu_count() or 1)
+    if not en_paralelo or workers < 2:
+        filas = [_correr_escenario(nombre, cfg_esc, start, start_time, df_ordenes) for nombre, cfg_esc in escenarios]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(df_ordenes,)) as ex:
+            futuros = [ex.submit(_correr_escenario, nombre, cfg_esc, start, start_time) for nombre, cfg_esc in escenarios]
+            filas = [f.result() for f in futuros]
+
+    tabla = pd.DataFrame(filas, columns=COLUMNAS_COMPARACION[:-2])
+    if incluir_base and not tabla.empty:
+        tabla["DifAtrasadas"] = tabla["OTsAtrasadas"] - tabla.loc[0, "OTsAtrasadas"]
+        tabla["DifAtraso_h"] = (tabla["Atraso_h"] - tabla.loc[0, "Atraso_h"]).round(2)
+    else:
+        tabla["DifAtrasadas"] = 0
+        tabla["DifAtraso_h"] = 0.0
+    return tabla
@@ -0,0 +1,268 @@
+"""
+Planificación por lotes, sin Streamlit (plan nocturno).
+
+Corre el mismo flujo que la app:
+  1. Lee el export de Access (o su snapshot, si ese archivo ya se procesó)
+  2. Carga config/Config_Priorizacion_Theiler.xlsx y, con --historial, lo
+     persistido en la base: overrides, asignaciones manuales y bloqueadas,
+     feriados, paros, horas extras, procesos pendientes, máquinas custom y
+     preferencias de troquel (igual que el checkbox "Usar historial")
+  3. Planifica Galpón 1 y Galpón 2 (planificar_galpones)
+  4. Escribe los exports de modules/utils/exporters.py
+  5. Con --guardar-historial, guarda el plan del G1 en schedule_history
+e informa el tiempo de cada etapa.
+
+Uso:
+    python -m modules.planificacion_batch ordenes.xlsx --salida planes/ \\
+        --fecha 2026-03-02 --hora 07:00 --historial --guardar-historial
+
+La base se toma de THEILER_DB_URL (o de .streamlit/secrets.toml, como la app).
+"""
+
+import argparse
+import sys
+import time as _time
+from contextlib import contextmanager
+from datetime import date, time
+from pathlib import Path
+
+from modules.galpon2.config_g2 import cargar_config_galpon2
+from modules.planificacion_galpones import PLANIFICADORES, planificar_galpones
+from modules.utils.config_loader import (
+    cargar_config, apply_custom_machines, maquinas_activas_por_defecto, IDS_DESCARTONADORAS_DEFAULT
+)
+from modules.utils.data_processor import leer_excel_ordenes, process_uploaded_dataframe
+from modules.utils.exporters import (
+    generar_excel_bytes, generar_excel_ot_bytes, generar_csv_maquina_str, generar_csv_ot_str
+)
+from modules.utils.snapshot_ordenes import SnapshotOrdenes
+
+
+CONFIG_DEFAULT = "config/Config_Priorizacion_Theiler.xlsx"
+
+
+def overrides_vacios():
+    """Estructura de st.session_state.manual_overrides cuando no hay nada cargado."""
+    return {
+        "blacklist_ots": set(),
+        "manual_priorities": {},
+        "outsourced_processes": set(),
+        "skipped_processes": set(),
+        "urgency_overrides": {},
+        "mp_overrides": {},
+        "forzar_inicio_overrides": {}
+    }
+
+
+class Cronometro:
+    """Tiempo de cada etapa de la corrida; imprime una línea al terminar cada una."""
+
+    def __init__(self, salida=sys.stdout):
+        self.etapas = []
+        self.salida = salida
+        self._t0 = _time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        t0 = _time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = _time.perf_counter() - t0
+            self.etapas.append((nombre, segundos))
+            if self.salida is not None:
+                print(f"[{segundos:8.2f}s] {nombre}", file=self.salida, flush=True)
+
+    @property
+    def total(self):
+        return _time.perf_counter() - self._t0
+
+    def resumen(self):
+        return {nombre: round(seg, 3) for nombre, seg in self.etapas} | {"total": round(self.total, 3)}
+
+
+# ----------------------------------------------------------------------
+# Etapas
+# ----------------------------------------------------------------------
+def procesar_excel(file_bytes):
+    return process_uploaded_dataframe(leer_excel_ordenes(file_bytes))
+
+
+def cargar_ordenes(ruta_excel, directorio_snapshots=".cache/ordenes"):
+    """Órdenes procesadas del export; directorio_snapshots=None re-parsea siempre."""
+    file_bytes = Path(ruta_excel).read_bytes()
+    if directorio_snapshots is None:
+        return procesar_excel(file_bytes)
+    return SnapshotOrdenes(directorio_snapshots).cargar_o_procesar(file_bytes, procesar_excel)
+
+
+def armar_cfg_g1(config_path=CONFIG_DEFAULT, pm=None):
+    """
+    cfg del Galpón 1 con los valores por defecto de la app; si `pm` está
+    conectado, con lo persistido en la base (mismo orden que app.py).
+    """
+    cfg = cargar_config(config_path)
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    cfg["locked_assignments"] = {}
+    cfg["manual_overrides"] = overrides_vacios()
+    custom_machines = []
+
+    if pm is not None and pm.connected:
+        cfg["locked_assignments"] = pm.get_locked_assignments()
+
+        db_overrides = pm.load_manual_overrides()
+        has_data = (db_overrides["blacklist_ots"] or
+                    db_overrides["manual_priorities"] or
+                    db_overrides["outsourced_processes"] or
+                    db_overrides["skipped_processes"] or
+                    db_overrides.get("manual_assignments"))
+        if has_data:
+            cfg["manual_overrides"] = db_overrides
+            if "manual_assignments" in db_overrides:
+                cfg["manual_assignments"] = db_overrides["manual_assignments"]
+
+        db_die_prefs = pm.load_die_preferences()
+        if db_die_prefs:
+            cfg["troquel_preferences"] = db_die_prefs
+
+        db_holidays = pm.load_holidays()
+        if db_holidays:
+            cfg["feriados"] = list(db_holidays)
+
+        cfg["downtimes"] = pm.load_downtimes() or []
+
+        # Igual que render_overtime_section: solo días con horas > 0
+        cfg["horas_extras"] = {
+            m: {d: h for d, h in dias.items() if h > 0}
+            for m, dias in (pm.load_overtime() or {}).items()
+            if dias and any(h > 0 for h in dias.values())
+        }
+
+        cfg["pending_processes"] = pm.load_pending_processes() or []
+        custom_machines = pm.load_custom_machines() or []
+
+    apply_custom_machines(cfg, custom_machines)
+    cfg["custom_ids"] = {
+        m: IDS_DESCARTONADORAS_DEFAULT.get(m.lower(), 0)
+        for m in sorted(cfg["maquinas"]["Maquina"].unique())
+        if "descartonad" in m.lower()
+    }
+
+    # Máquinas activas por defecto de la app
+    activas = maquinas_activas_por_defecto(cfg["maquinas"])
+    cfg["maquinas"] = cfg["maquinas"][cfg["maquinas"]["Maquina"].isin(activas)].copy()
+    return cfg
+
+
+def armar_cfg_g2(config_path=CONFIG_DEFAULT, cfg_g1=None):
+    """cfg del Galpón 2 (overrides propios vacíos); feriados del G1 si se pasa."""
+    cfg_g2 = cargar_config_galpon2(config_path)
+    cfg_g2["locked_assignments"] = {}
+    cfg_g2["manual_overrides"] = overrides_vacios()
+    if cfg_g1 is not None:
+        cfg_g2["feriados"] = cfg_g1["feriados"]
+    return cfg_g2
+
+
+def escribir_exports(resultado, carpeta, sufijo=""):
+    """Los mismos archivos que la sección de descargas de la app. Devuelve las rutas escritas."""
+    schedule, carga_md, resumen_ot, _ = resultado
+    if schedule.empty:
+        return []
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+
+    buf_excel = generar_excel_bytes(schedule, resumen_ot, carga_md)
+    buf_ot, df_ot_horiz = generar_excel_ot_bytes(schedule)
+    archivos = {
+        f"Plan_Produccion_Theiler{sufijo}.xlsx": buf_excel.getvalue(),
+        f"Plan_Produccion_Por_OT{sufijo}.xls": buf_ot.getvalue(),
+        f"Plan_Produccion_Theiler{sufijo}.csv": generar_csv_maquina_str(schedule).encode("utf-8-sig"),
+        f"Plan_Produccion_Por_OT{sufijo}.csv": generar_csv_ot_str(df_ot_horiz).encode("utf-8-sig"),
+    }
+    rutas = []
+    for nombre, contenido in archivos.items():
+        ruta = carpeta / nombre
+        ruta.write_bytes(contenido)
+        rutas.append(ruta)
+    return rutas
+
+
+def ejecutar(ruta_excel, salida, start=None, start_time=None, config_path=CONFIG_DEFAULT,
+             historial=False, guardar_historial=False, en_paralelo=True,
+             directorio_snapshots=".cache/ordenes", cronometro=None):
+    """
+    Corrida completa. Devuelve {"resultados": {"G1": ..., "G2": ...},
+    "archivos": [...], "tiempos": {etapa: segundos}}.
+    """
+    start = start or date.today()
+    start_time = start_time or time(7, 0)
+    crono = cronometro or Cronometro()
+
+    pm = None
+    if historial or guardar_historial:
+        with crono.etapa("Conexión a la base"):
+            from modules.utils.persistence import PersistenceManager
+            pm = PersistenceManager()
+        if not pm.connected:
+            print("Aviso: sin conexión a la base; se planifica sin historial.", file=sys.stderr)
+
+    with crono.etapa("Lectura de órdenes"):
+        df = cargar_ordenes(ruta_excel, directorio_snapshots)
+
+    with crono.etapa("Configuración"):
+        cfg_g1 = armar_cfg_g1(config_path, pm if historial else None)
+        cfg_g2 = armar_cfg_g2(config_path, cfg_g1)
+
+    with crono.etapa("Planificación G1 + G2"):
+        plantas = {"G1": (PLANIFICADORES["G1"], cfg_g1), "G2": (PLANIFICADORES["G2"], cfg_g2)}
+        resultados = planificar_galpones(df, plantas, start=start, start_time=start_time, en_paralelo=en_paralelo)
+
+    with crono.etapa("Exportación"):
+        archivos = escribir_exports(resultados["G1"], salida)
+        archivos += escribir_exports(resultados["G2"], salida, sufijo="_G2")
+
+    if guardar_historial and pm is not None and pm.connected:
+        with crono.etapa("Historial (schedule_history)"):
+            pm.save_schedule(resultados["G1"][0])
+
+    return {"resultados": resultados, "archivos": archivos, "tiempos": crono.resumen()}
+
+
+# ----------------------------------------------------------------------
+# Línea de comandos
+# ----------------------------------------------------------------------
+def _parsear_args(argv):
+    parser = argparse.ArgumentParser(description="Genera el plan de producción sin la interfaz web.")
+    parser.add_argument("excel", help="Export de órdenes de Access (.xlsx)")
+    parser.add_argument("--salida", default="planes", help="Carpeta de los exports (default: planes)")
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None, help="Inicio del plan AAAA-MM-DD (default: hoy)")
+    parser.add_argument("--hora", type=time.fromisoformat, default=time(7, 0), help="Hora de inicio HH:MM (default: 07:00)")
+    parser.add_argument("--config", default=CONFIG_DEFAULT, help="Excel de configuración")
+    parser.add_argument("--historial", action="store_true", help="Usar lo persistido en la base (overrides, feriados, paros...)")
+    parser.add_argument("--guardar-historial", action="store_true", help="Guardar el plan del G1 en schedule_history")
+    parser.add_argument("--serie", action="store_true", help="Planificar G1 y G2 en este proceso, uno tras otro")
+    parser.add_argument("--sin-snapshot", action="store_true", help="Re-parsear el Excel aunque haya snapshot")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parsear_args(argv)
+    crono = Cronometro()
+    resultado = ejecutar(
+        args.excel, args.salida, start=args.fecha, start_time=args.hora, config_path=args.config,
+        historial=args.historial, guardar_historial=args.guardar_historial, en_paralelo=not args.serie,
+        directorio_snapshots=None if args.sin_snapshot else ".cache/ordenes", cronometro=crono,
+    )
+
+    for nombre, (schedule, _, resumen_ot, _) in resultado["resultados"].items():
+        atrasadas = int(resumen_ot["EnRiesgo"].sum()) if not resumen_ot.empty else 0
+        print(f"{nombre}: {len(schedule)} tareas, {resumen_ot['OT_id'].nunique() if not resumen_ot.empty else 0} OTs, {atrasadas} atrasadas")
+    for ruta in resultado["archivos"]:
+        print(f"  -> {ruta}")
+    print(f"[{crono.total:8.2f}s] Total")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
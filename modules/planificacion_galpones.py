@@ -0,0 +1,130 @@
+"""
+Planificación conjunta de los galpones.
+
+Planifica el Galpón 1 y el Galpón 2 (y cualquier otra planta que se agregue)
+a partir del mismo Excel, cada uno en su propio proceso, y combina los
+resultados. El tiempo total es el del galpón más lento, no la suma.
+
+Uso:
+    plantas = {
+        "G1": (programar, cfg_g1),
+        "G2": (programar_galpon2, cargar_config_galpon2()),
+    }
+    resultados = planificar_galpones(df, plantas, start=fecha, start_time=hora)
+    combinado = combinar_planes(resultados)
+"""
+
+import copy
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from modules.scheduler import programar
+from modules.galpon2.scheduler_g2 import programar_galpon2
+
+
+# Planificador de cada galpón (funciones de módulo: se pueden mandar a otro proceso)
+PLANIFICADORES = {
+    "G1": programar,
+    "G2": programar_galpon2,
+}
+
+# Claves del cfg que son cachés de una corrida: el worker las reconstruye
+_CLAVES_CACHE = {"_calendario"}
+
+
+def snapshot_cfg(cfg):
+    """
+    Copia independiente y serializable del cfg para mandar a un worker.
+    Saca los cachés de corrida (el calendario memoizado guarda una lambda) y
+    falla acá, con el nombre de la clave, si algo más no se puede serializar.
+    """
+    snap = {}
+    for clave, valor in cfg.items():
+        if clave in _CLAVES_CACHE:
+            continue
+        snap[clave] = copy.deepcopy(valor)
+        try:
+            pickle.dumps(snap[clave])
+        except Exception as e:
+            raise TypeError(f"cfg['{clave}'] no se puede enviar a otro proceso: {e}") from e
+    return snap
+
+
+def _planificar(planificador, df_ordenes, cfg, start, start_time):
+    return planificador(df_ordenes, cfg, start=start, start_time=start_time)
+
+
+def planificar_galpones(df_ordenes, plantas, start=None, start_time=None,
+                        en_paralelo=True, max_workers=None):
+    """
+    Planifica cada planta sobre el mismo df de órdenes.
+
+    Parámetros:
+        plantas: {nombre: (planificador, cfg)}; planificador tiene la firma de
+                 `programar` (ver PLANIFICADORES)
+        en_paralelo: si es False (o hay una sola planta o un solo CPU) corre en este proceso
+
+    Retorna:
+        {nombre: (schedule, carga_md, resumen_ot, detalle_maquina)}, en el orden de `plantas`.
+        El cfg del llamador no se modifica: cada planta trabaja sobre un snapshot.
+    """
+    if start is None:
+        start = date.today()
+
+    trabajos = {nombre: (planificador, snapshot_cfg(cfg)) for nombre, (planificador, cfg) in plantas.items()}
+
+    workers = min(len(trabajos), max_workers or os.cpu_count() or 1)
+    if not en_paralelo or workers < 2:
+        return {
+            nombre: _planificar(planificador, df_ordenes, cfg, start, start_time)
+            for nombre, (planificador, cfg) in trabajos.items()
+        }
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futuros = {
+            nombre: ex.submit(_planificar, planificador, df_ordenes, cfg, start, start_time)
+            for nombre, (planificador, cfg) in trabajos.items()
+        }
+        return {nombre: fut.result() for nombre, fut in futuros.items()}
+
+
+def _concatenar(resultados, i):
+    partes = [res[i].assign(Galpon=nombre) for nombre, res in resultados.items() if not res[i].empty]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+def combinar_planes(resultados):
+    """
+    Une los resultados de planificar_galpones.
+
+    Retorna (schedule, carga_md, resumen_ot, detalle_maquina) con una columna
+    'Galpon'. En resumen_ot hay una fila por OT: fin y atraso del galpón que
+    termina último, 'Galpones' donde tiene tareas y 'CruzaGalpones' si es más de uno.
+    """
+    schedule = _concatenar(resultados, 0)
+    carga_md = _concatenar(resultados, 1)
+    detalle_maquina = _concatenar(resultados, 3)
+
+    por_galpon = _concatenar(resultados, 2)
+    if por_galpon.empty:
+        resumen_ot = pd.DataFrame(columns=["OT_id", "Fin_OT", "DueDate", "Atraso_h", "EnRiesgo", "Galpones", "CruzaGalpones"])
+    else:
+        resumen_ot = (
+            por_galpon.groupby("OT_id", sort=False)
+            .agg(
+                Fin_OT=("Fin_OT", "max"),
+                DueDate=("DueDate", "first"),
+                Atraso_h=("Atraso_h", "max"),
+                EnRiesgo=("EnRiesgo", "any"),
+                Galpones=("Galpon", lambda g: ", ".join(dict.fromkeys(g))),
+                CruzaGalpones=("Galpon", "nunique"),
+            )
+            .reset_index()
+        )
+        resumen_ot["CruzaGalpones"] = resumen_ot["CruzaGalpones"] > 1
+
+    return schedule, carga_md, resumen_ot, detalle_maquina
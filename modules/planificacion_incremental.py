@@ -0,0 +1,296 @@
+"""
+Re-planificación incremental.
+
+Guarda el último plan (y las entradas con que se calculó) y, ante una edición
+de la UI (prioridad manual, paro, horas extras, asignación manual, override
+de una tarea...), re-planifica solo lo que esa edición invalida:
+
+  1. Se detecta qué cambió entre el cfg anterior y el nuevo y, por cada cambio,
+     las máquinas afectadas y el primer instante afectado (inicio del paro,
+     día de las horas extras, momento en que la tarea editada ya podía correr).
+  2. Desde ese instante se liberan las tareas de las máquinas afectadas y, en
+     cascada, las tareas posteriores de sus OTs y las máquinas donde corren.
+  3. Todo lo demás (el prefijo comprometido y las máquinas no afectadas) pasa
+     congelado a `programar` (cfg["_plan_congelado"]), que solo vuelve a
+     encolar y simular las OTs liberadas (cfg["_ots_replanificadas"]).
+     Las tareas que el plan anterior no pudo ubicar y no son de esas OTs
+     siguen sin ubicar.
+
+Cambios que no se pueden acotar (máquinas activas, jornada, feriados, orden
+estándar, imagen de planta, etc.) hacen una planificación completa.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time
+
+import pandas as pd
+
+from modules.scheduler import programar
+from modules.schedulers.dependencias import normalizar_proceso
+from modules.planificacion_galpones import snapshot_cfg
+from modules.utils.config_loader import construir_calendario
+
+
+# Overrides por (OT, Proceso) que solo tocan esa tarea
+_OVERRIDES_POR_PROCESO = {
+    "urgency_overrides", "forzar_inicio_overrides", "mp_overrides", "pelicula_overrides",
+    "troquel_overrides", "fecha_chapas_overrides", "fecha_troquel_overrides",
+}
+# Overrides que son conjuntos de (OT, Proceso)
+_CONJUNTOS_POR_PROCESO = {"outsourced_processes", "skipped_processes"}
+
+# Claves del cfg que no son entradas del plan (cachés de corrida)
+_CLAVES_IGNORADAS = {"_calendario", "_procesos_terc_sin_cola", "_plan_congelado", "_ots_replanificadas"}
+
+_MAQUINAS_VIRTUALES = {"TERCERIZADO", "SALTADO", "POOL_DESCARTONADO"}
+
+
+def _iguales(a, b):
+    if isinstance(a, (pd.DataFrame, pd.Series)) or isinstance(b, (pd.DataFrame, pd.Series)):
+        return type(a) is type(b) and a.equals(b)
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def _diferencia_dict(viejo, nuevo):
+    """Claves agregadas, borradas o con distinto valor."""
+    viejo, nuevo = viejo or {}, nuevo or {}
+    return {k for k in set(viejo) | set(nuevo) if k not in viejo or k not in nuevo or not _iguales(viejo[k], nuevo[k])}
+
+
+class _Impacto:
+    """Tareas y máquinas que invalida una edición, con el primer instante afectado de cada máquina."""
+
+    def __init__(self):
+        self.maquinas = {}        # maquina -> primer instante afectado
+        self.filas = set()        # índices del schedule anterior tocados directamente
+
+    def marcar(self, maquina, instante):
+        if maquina not in self.maquinas or instante < self.maquinas[maquina]:
+            self.maquinas[maquina] = instante
+
+    @property
+    def vacio(self):
+        return not self.maquinas and not self.filas
+
+
+class PlanificadorIncremental:
+    """
+    Mantiene el último plan y re-planifica solo lo afectado por cada edición.
+
+    Uso:
+        planificador = PlanificadorIncremental(df, start=fecha, start_time=hora)
+        schedule, carga_md, resumen_ot, detalle_maquina = planificador.planificar(cfg)
+        ...  # el usuario edita cfg (prioridades, paros, asignaciones)
+        schedule, carga_md, resumen_ot, detalle_maquina = planificador.replanificar(cfg)
+
+    `ultimo_modo` indica cómo se resolvió la última llamada:
+    "completo", "incremental" o "sin_cambios". `plan_completo` dice si el plan
+    vigente salió de una planificación completa: uno incremental depende de la
+    historia de ediciones y no debe guardarse como el plan de sus entradas.
+
+    app.py guarda uno por archivo subido e inicio del plan en st.session_state
+    y llama a `replanificar` en cada rerun (detrás de CachePlanes, que solo
+    guarda los planes completos).
+    """
+
+    def __init__(self, df_ordenes, start=None, start_time=None):
+        # Copia propia: programar agrega columnas a las órdenes, cada corrida recibe otra copia
+        self.df_ordenes = df_ordenes.copy()
+        self.start = start or date.today()
+        self.start_time = start_time
+        self.cfg = None
+        self.resultado = None
+        self.ultimo_modo = None
+        self.plan_completo = False
+        self.liberadas = 0
+
+    # ------------------------------------------------------------------
+    def planificar(self, cfg):
+        """Planificación completa; queda como base de las próximas ediciones."""
+        self.cfg = snapshot_cfg(cfg)
+        self.resultado = programar(self.df_ordenes.copy(), snapshot_cfg(cfg), start=self.start, start_time=self.start_time)
+        self.ultimo_modo = "completo"
+        self.plan_completo = True
+        self.liberadas = len(self.resultado[0])
+        return self.resultado
+
+    def replanificar(self, cfg):
+        """Re-planifica a partir del plan anterior solo lo que invalidan los cambios de cfg."""
+        if self.resultado is None or self.resultado[0].empty:
+            return self.planificar(cfg)
+
+        schedule = self.resultado[0]
+        impacto = self._impacto(self.cfg, cfg, schedule)
+        if impacto is None:
+            return self.planificar(cfg)
+        if impacto.vacio:
+            self.ultimo_modo = "sin_cambios"
+            self.liberadas = 0
+            return self.resultado
+
+        liberadas = self._liberar(schedule, impacto)
+        congelado = schedule.loc[~schedule.index.isin(liberadas) & (schedule["Motivo"] != "En Curso (Planta)")]
+
+        cfg_inc = snapshot_cfg(cfg)
+        cfg_inc["_plan_congelado"] = congelado
+        cfg_inc["_ots_replanificadas"] = set(schedule.loc[list(liberadas), "OT_id"])
+        self.cfg = snapshot_cfg(cfg)
+        self.resultado = programar(self.df_ordenes.copy(), cfg_inc, start=self.start, start_time=self.start_time)
+        self.ultimo_modo = "incremental"
+        self.plan_completo = False
+        self.liberadas = len(liberadas)
+        return self.resultado
+
+    # ------------------------------------------------------------------
+    def _inicio_plan(self, cfg):
+        general = construir_calendario(cfg, start=self.start, start_time=self.start_time)["General"]
+        return datetime.combine(general["fecha"], general["hora"])
+
+    def _impacto(self, viejo, nuevo, schedule):
+        """Impacto de pasar de 'viejo' a 'nuevo', o None si hace falta planificar todo."""
+        impacto = _Impacto()
+        inicio_plan = self._inicio_plan(nuevo)
+
+        for clave in (set(viejo) | set(nuevo)) - _CLAVES_IGNORADAS:
+            a, b = viejo.get(clave), nuevo.get(clave)
+            if _iguales(a, b):
+                continue
+            if clave == "downtimes":
+                self._impacto_paros(a, b, nuevo, impacto)
+            elif clave == "horas_extras":
+                for maq in _diferencia_dict(a, b):
+                    for dia in _diferencia_dict((a or {}).get(maq), (b or {}).get(maq)):
+                        impacto.marcar(maq, datetime.combine(dia, time(7, 0)))
+            elif clave == "manual_assignments":
+                if not self._impacto_asignaciones(a, b, schedule, impacto, inicio_plan):
+                    return None
+            elif clave == "manual_overrides":
+                if not self._impacto_overrides(a or {}, b or {}, schedule, impacto, inicio_plan):
+                    return None
+            else:
+                return None
+        return impacto
+
+    def _impacto_paros(self, viejos, nuevos, cfg, impacto):
+        def claves(paros):
+            return {(str(p.get("maquina") or p.get("Maquina", "")).strip().lower(), p["start"], p["end"]) for p in paros or []}
+
+        nombres = {str(m).strip().lower(): m for m in cfg["maquinas"]["Maquina"]}
+        for maq, inicio, _ in claves(viejos) ^ claves(nuevos):
+            if maq in nombres:
+                impacto.marcar(nombres[maq], inicio)
+
+    def _impacto_asignaciones(self, viejas, nuevas, schedule, impacto, inicio_plan):
+        def por_ot(asignaciones):
+            return {str(ot): maq for maq, ots in (asignaciones or {}).items() for ot in ots or []}
+
+        antes, despues = por_ot(viejas), por_ot(nuevas)
+        for ot in _diferencia_dict(antes, despues):
+            destino = despues.get(ot)
+            destino_lower = str(destino or antes[ot]).lower()
+            if any(k in destino_lower for k in ["troq", "manual", "iberica", "duyan", "autom"]):
+                filtro = lambda p: "troquel" in p
+            elif "descartonad" in destino_lower:
+                filtro = lambda p: "descartonad" in p
+            else:
+                filtro = lambda p: True
+            listo = self._impacto_tareas(schedule, impacto, inicio_plan, ot, filtro)
+            if listo is None:
+                return False
+            if destino is not None:
+                impacto.marcar(destino, listo)
+        return True
+
+    def _impacto_overrides(self, viejos, nuevos, schedule, impacto, inicio_plan):
+        for familia in set(viejos) | set(nuevos):
+            a, b = viejos.get(familia), nuevos.get(familia)
+            if _iguales(a, b):
+                continue
+            if familia == "manual_priorities":
+                for ot, maq in _diferencia_dict(a, b):
+                    if self._impacto_tareas(schedule, impacto, inicio_plan, ot, maquina=maq) is None:
+                        return False
+            elif familia in _OVERRIDES_POR_PROCESO or familia in _CONJUNTOS_POR_PROCESO:
+                cambios = _diferencia_dict(a, b) if familia in _OVERRIDES_POR_PROCESO else set(a or ()) ^ set(b or ())
+                forzar = familia == "forzar_inicio_overrides"
+                for ot, proc in cambios:
+                    p_clean = normalizar_proceso(proc)
+                    if self._impacto_tareas(schedule, impacto, inicio_plan, ot, lambda p: p == p_clean, forzar) is None:
+                        return False
+            elif familia == "blacklist_ots":
+                for ot in set(a or ()) ^ set(b or ()):
+                    if self._impacto_tareas(schedule, impacto, inicio_plan, ot, forzar=True) is None:
+                        return False
+            else:
+                return False
+        return True
+
+    def _impacto_tareas(self, schedule, impacto, inicio_plan, ot, filtro=None, forzar=False, maquina=None):
+        """
+        Marca las tareas de la OT que toca una edición. Cada una afecta a su
+        máquina desde que ya podía correr: fin de sus procesos previos en el plan
+        anterior (o el inicio del plan si es ForzarInicio / blacklist).
+        Devuelve el primero de esos instantes, o None si la OT no tiene esas
+        tareas en el plan anterior.
+        """
+        de_ot = schedule[schedule["OT_id"].astype(str) == str(ot)]
+        filas = de_ot
+        if maquina is not None:
+            filas = de_ot[de_ot["Maquina"] == maquina]
+            if filas.empty:
+                filas = de_ot
+        elif filtro is not None:
+            filas = de_ot[[filtro(normalizar_proceso(p)) for p in de_ot["Proceso"]]]
+        if filas.empty:
+            return None
+
+        primero = None
+        for idx, fila in filas.iterrows():
+            previos = de_ot.loc[de_ot["Fin"] <= fila["Inicio"], "Fin"]
+            listo = inicio_plan if forzar or previos.empty else min(previos.max(), fila["Inicio"])
+            impacto.filas.add(idx)
+            impacto.marcar(fila["Maquina"], listo)
+            primero = listo if primero is None else min(primero, listo)
+        return primero
+
+    # ------------------------------------------------------------------
+    def _liberar(self, schedule, impacto):
+        """
+        Tareas a re-planificar. En cada máquina afectada se liberan las que
+        terminan después de su primer instante afectado; por cada tarea liberada
+        se liberan las posteriores de su OT, que a su vez afectan a sus máquinas
+        desde su inicio anterior. Se repite hasta que no cambia nada.
+        """
+        por_maquina = {}
+        for maq, g in schedule.sort_values("Fin").groupby("Maquina", sort=False):
+            por_maquina[maq] = (g["Fin"].tolist(), g.index.tolist())
+        por_ot = {ot: list(zip(g["Inicio"], g.index)) for ot, g in schedule.groupby("OT_id", sort=False)}
+        maquina_de, ot_de, inicio_de = schedule["Maquina"].to_dict(), schedule["OT_id"].to_dict(), schedule["Inicio"].to_dict()
+
+        desde = {}
+        liberadas = set()
+        afectadas = list(impacto.maquinas.items())
+        nuevas = list(impacto.filas)
+        while afectadas or nuevas:
+            for maq, instante in afectadas:
+                if maq in _MAQUINAS_VIRTUALES or maq not in por_maquina:
+                    continue
+                if maq in desde and desde[maq] <= instante:
+                    continue
+                desde[maq] = instante
+                fines, idxs = por_maquina[maq]
+                nuevas.extend(idxs[bisect_right(fines, instante):])
+            afectadas = []
+
+            siguientes = []
+            for idx in nuevas:
+                if idx in liberadas:
+                    continue
+                liberadas.add(idx)
+                afectadas.append((maquina_de[idx], inicio_de[idx]))
+                siguientes.extend(j for ini, j in por_ot[ot_de[idx]] if ini >= inicio_de[idx] and j not in liberadas)
+            nuevas = siguientes
+        return liberadas
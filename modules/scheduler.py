@@ -1,14 +1,21 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta, time, date
 from collections import defaultdict, deque
 
-from modules.schedulers.machines import validar_medidas_troquel, get_machine_process_order
+from modules.schedulers.machines import CompatibilidadTroquel, matriz_compatibilidad_troquel, get_machine_process_order
 from modules.schedulers.priorities import (
-    _clave_prioridad_maquina, _cola_impresora_flexo, _cola_impresora_offset, 
-    _cola_troquelada, _cola_cortadora_bobina, get_downstream_presence_score
+    _clave_prioridad_maquina, orden_impresora, orden_troquelada, orden_cortadora_bobina,
+    get_downstream_presence_score, prio_numerica, prioridad_robo_pool
 )
-from modules.schedulers.agenda import _reservar_en_agenda
-from modules.schedulers.tasks import _procesos_pendientes_de_orden, _expandir_tareas
+from modules.schedulers.agenda import _reservar_en_agenda, adelantar_agenda
+from modules.schedulers.overrides import aplicar_overrides, aplicar_bloqueos
+from modules.schedulers.eventos import MotorEventos, BusFinalizaciones
+from modules.schedulers.virtuales import ResolutorVirtuales, MAQUINAS_VIRTUALES
+from modules.schedulers.dependencias import RastreadorDependencias, normalizar_proceso
+from modules.schedulers.colas_indexadas import IndiceColas, ColaIndexada
+from modules.schedulers.tasks import _procesos_pendientes_de_orden, _expandir_tareas, TablaTareas
+from modules.schedulers.perfil import PerfilPlanificacion
 
 # Importaciones de tus módulos auxiliares
 from modules.utils.config_loader import (
@@ -16,6 +23,7 @@ from modules.utils.config_loader import (
     horas_por_dia, 
     proximo_dia_habil, 
     construir_calendario,
+    obtener_calendario,
     es_feriado,
     es_dia_habil,
     sumar_horas_habiles
@@ -73,8 +81,13 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     """
     Planifica respetando dependencias, orden de máquinas,
     balanceo de carga (Troquelado) y optimización de setups.
+
+    El informe de rendimiento de la corrida (tiempo por etapa y contadores por
+    máquina, ver PerfilPlanificacion) queda en schedule.attrs["rendimiento"].
     """
     if df_ordenes.empty: return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    perfil = PerfilPlanificacion()
+    perfil.marcar("Preparación")
 
     df_ordenes["OT_id"] = df_ordenes["CodigoProducto"].astype(str) + "-" + df_ordenes["Subcodigo"].astype(str)
 
@@ -98,10 +111,14 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # ---------------------------------------------------------------
 
 
+    # Calendario del plan (se reconstruye si cambiaron feriados/horas extras/paros)
+    perfil.marcar("Calendario")
+    obtener_calendario(cfg)
     agenda = construir_calendario(cfg, start=start, start_time=start_time)
     inicio_general = datetime.combine(agenda["General"]["fecha"], agenda["General"]["hora"])
 
     # 1. Expande OTs en tareas individuales
+    perfil.marcar("1. Expansión de tareas")
     tasks = _expandir_tareas(df_ordenes, cfg)
 
     if tasks.empty: return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
@@ -135,6 +152,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =======================================================
     # 1.1 PROCESAMIENTO IMAGEN DE PLANTA (PENDING PROCESSES)
     # =======================================================
+    perfil.marcar("1.1 Imagen de planta")
     
     # Listas para guardar lo ya agendado por imagen de planta
     completado = defaultdict(set)
@@ -249,63 +267,49 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                 pass
     # =======================================================
 
+    # =======================================================
+    # 1.2 PLAN CONGELADO (Re-planificación incremental)
+    # =======================================================
+    perfil.marcar("1.2 Plan congelado")
+    # Filas ya comprometidas de un plan anterior (ver planificacion_incremental):
+    # pasan tal cual al resultado, cuentan como procesos completados para sus
+    # sucesores y la agenda de cada máquina arranca después de su último bloque.
+    # Solo se vuelven a simular las OTs de "_ots_replanificadas".
+    procesos_congelados = []
+    if cfg.get("_ots_replanificadas") is not None:
+        tasks = tasks[tasks["OT_id"].isin(cfg["_ots_replanificadas"])]
+    congelado = cfg.get("_plan_congelado")
+    if congelado is not None and not congelado.empty:
+        ultimo_congelado = {}
+        for fila in congelado.drop(columns=["ID Maquina"], errors="ignore").to_dict("records"):
+            ot, proc, maq, fin = fila["OT_id"], fila["Proceso"], fila["Maquina"], fila["Fin"]
+            filas.append(fila)
+            procesos_congelados.append((ot, proc))
+            if fin_proceso[ot].get(proc) is None or fin > fin_proceso[ot][proc]:
+                fin_proceso[ot][proc] = fin
+            completado[ot].add(proc)
+            if maq in agenda and (maq not in ultimo_congelado or fin >= ultimo_congelado[maq]["Fin"]):
+                ultimo_congelado[maq] = fila
+
+        for maq, fila in ultimo_congelado.items():
+            if adelantar_agenda(agenda[maq], fila["Fin"], cfg):
+                ultimo_en_maquina[maq] = fila
+
+        claves_tareas = pd.MultiIndex.from_arrays([tasks["OT_id"], tasks["Proceso"]])
+        tasks = tasks[~claves_tareas.isin(procesos_congelados)]
+    # =======================================================
+
     flujo_estandar = [p.strip() for p in cfg.get("orden_std", [])] 
 
     def _orden_proceso(maquina):
         return get_machine_process_order(maquina, cfg)
 
     # --- FILTRO DE BLACKLIST ---
+    perfil.marcar("2. Overrides")
     if "manual_overrides" in cfg:
-        # 1. Apply Urgency Overrides
-        if "urgency_overrides" in cfg["manual_overrides"]:
-            urg_overrides = cfg["manual_overrides"]["urgency_overrides"]
-            for (ot_urg, proc_urg), is_urgent in urg_overrides.items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_urg)) & (tasks["Proceso"].astype(str) == str(proc_urg))
-                if mask.any():
-                    tasks.loc[mask, "Urgente"] = is_urgent
-
-        # 1a. Apply Forzar Inicio Overrides
-        if "forzar_inicio_overrides" in cfg["manual_overrides"]:
-            forzar_overrides = cfg["manual_overrides"]["forzar_inicio_overrides"]
-            if "ForzarInicio" not in tasks.columns:
-                tasks["ForzarInicio"] = False
-            for (ot_fz, proc_fz), is_forzar in forzar_overrides.items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_fz)) & (tasks["Proceso"].astype(str) == str(proc_fz))
-                if mask.any():
-                    tasks.loc[mask, "ForzarInicio"] = is_forzar
-
-        # 1b. Apply MP Overrides (MateriaPrimaPlanta)
-        if "mp_overrides" in cfg["manual_overrides"]:
-            mp_overrides = cfg["manual_overrides"]["mp_overrides"]
-            for (ot_mp, proc_mp), mp_val in mp_overrides.items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_mp)) & (tasks["Proceso"].astype(str) == str(proc_mp))
-                if mask.any():
-                    tasks.loc[mask, "MateriaPrimaPlanta"] = mp_val
-
-        # 1c. Apply Chapa/Troquel Overrides
-        if "pelicula_overrides" in cfg["manual_overrides"]:
-            for (ot_id, proc), val in cfg["manual_overrides"]["pelicula_overrides"].items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_id)) & (tasks["Proceso"].astype(str) == str(proc))
-                if mask.any():
-                    tasks.loc[mask, "PeliculaArt"] = val
-                    
-        if "troquel_overrides" in cfg["manual_overrides"]:
-            for (ot_id, proc), val in cfg["manual_overrides"]["troquel_overrides"].items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_id)) & (tasks["Proceso"].astype(str) == str(proc))
-                if mask.any():
-                    tasks.loc[mask, "TroquelArt"] = val
-                    
-        if "fecha_chapas_overrides" in cfg["manual_overrides"]:
-            for (ot_id, proc), val in cfg["manual_overrides"]["fecha_chapas_overrides"].items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_id)) & (tasks["Proceso"].astype(str) == str(proc))
-                if mask.any():
-                    tasks.loc[mask, "FechaLlegadaChapas"] = val
-                    
-        if "fecha_troquel_overrides" in cfg["manual_overrides"]:
-            for (ot_id, proc), val in cfg["manual_overrides"]["fecha_troquel_overrides"].items():
-                mask = (tasks["OT_id"].astype(str) == str(ot_id)) & (tasks["Proceso"].astype(str) == str(proc))
-                if mask.any():
-                    tasks.loc[mask, "FechaLlegadaTroquel"] = val
+        # 1. Urgencia, ForzarInicio, MP, chapa/troquel y fechas de llegada:
+        #    una pasada por familia sobre el índice (OT_id, Proceso)
+        aplicar_overrides(tasks, cfg["manual_overrides"])
 
         # 2. Apply Blacklist
         if "blacklist_ots" in cfg["manual_overrides"]:
@@ -327,27 +331,10 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =================================================================
     # 2.5 APLICAR HISTORIAL (Locked Assignments)
     # =================================================================
+    perfil.marcar("2.5 Bloqueos y asignaciones manuales")
     if "locked_assignments" in cfg and cfg["locked_assignments"]:
-        locks = cfg["locked_assignments"]
-        # locks is Dict {(ot, proc): maquina}
-        
-        # Optimize: Create a mapping column in tasks to match keys
-        # We need to match (OT_id, Proceso) against the keys in locks
-        
-        for (ot, proc), maq_locked in locks.items():
-            # Find task
-            # Check if machine exists in current config to avoid assigning disabled machines
-            if maq_locked not in maquinas and maq_locked not in ["TERCERIZADO", "SALTADO", "POOL_DESCARTONADO"]:
-                 continue
-
-            mask = (tasks["OT_id"].astype(str) == str(ot)) & (tasks["Proceso"].astype(str) == str(proc)) & ~(tasks["Maquina"].isin(["SALTADO", "TERCERIZADO"]))
-            
-            if mask.any():
-                tasks.loc[mask, "Maquina"] = maq_locked
-                # Mark as ManualAssignment so it is NOT re-optimized by Troquelado logic
-                if "ManualAssignment" not in tasks.columns:
-                    tasks["ManualAssignment"] = False
-                tasks.loc[mask, "ManualAssignment"] = True
+        # locks is Dict {(ot, proc): maquina}; se resuelve contra el índice (OT_id, Proceso)
+        aplicar_bloqueos(tasks, cfg["locked_assignments"], maquinas)
     
     # =================================================================
     # 2.9 APLICAR ASIGNACIONES MANUALES (Override)
@@ -398,6 +385,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =================================================================
     # 3. REASIGNACIÓN TROQUELADO (Solo asigna, NO reserva tiempo)
     # =================================================================
+    perfil.marcar("3. Reasignación troquelado")
     
     troq_cfg = cfg["maquinas"][cfg["maquinas"]["Proceso"].str.lower().str.contains("troquel")]
     
@@ -476,16 +464,17 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                 grupos.append((due_min, troq_key, g.index.tolist(), total_pliegos, max_anc, max_lar, min_anc, min_lar, bocas, es_urgente))
             grupos.sort() 
 
-            for _, troq_key, idxs, total_pliegos, max_anc, max_lar, min_anc, min_lar, bocas, es_urgente in grupos:
+            # Compatibilidad de medidas grupos x máquinas, de una vez: las automáticas
+            # (mínimos) miran el pliego más chico del grupo, las manuales (máximos) el más grande
+            medida = lambda v: float(v or 0)
+            es_auto = np.array([any(k in str(m).lower() for k in ("autom", "duyan", "iberica")) for m in pool_maquinas], dtype=bool)
+            entra_min = matriz_compatibilidad_troquel(pool_maquinas, [medida(g[6]) for g in grupos], [medida(g[7]) for g in grupos], cfg)
+            entra_max = matriz_compatibilidad_troquel(pool_maquinas, [medida(g[4]) for g in grupos], [medida(g[5]) for g in grupos], cfg)
+            entra = np.where(es_auto, entra_min, entra_max)
+
+            for n_grupo, (_, troq_key, idxs, total_pliegos, max_anc, max_lar, min_anc, min_lar, bocas, es_urgente) in enumerate(grupos):
                 candidatas = []
-                candidatos_tamano = []
-                for m in pool_maquinas:
-                    if "autom" in str(m).lower() or "duyan" in str(m).lower() or "iberica" in str(m).lower():
-                        if validar_medidas_troquel(m, min_anc, min_lar):
-                            candidatos_tamano.append(m)
-                    else:
-                        if validar_medidas_troquel(m, max_anc, max_lar):
-                            candidatos_tamano.append(m)
+                candidatos_tamano = [m for m, ok in zip(pool_maquinas, entra[n_grupo]) if ok]
                 
                 if not candidatos_tamano: continue
 
@@ -535,6 +524,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =====================================================================
     # 3.1 REASIGNACIÓN DESCARTONADO (Solo asigna, NO reserva tiempo)
     # =====================================================================
+    perfil.marcar("3.1 Pool descartonado")
 
     desc_cfg = cfg["maquinas"][cfg["maquinas"]["Proceso"].str.lower().str.contains("descartonado")]
     desc_maquinas = sorted(desc_cfg["Maquina"].tolist()) 
@@ -554,6 +544,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =====================================================================
     # 3.15 REASIGNACIÓN PRENSADO – GALPÓN 2 (Solo asigna, NO reserva tiempo)
     # =====================================================================
+    perfil.marcar("3.15 Prensado")
     # Las prensas que ya tienen asignación manual/locked (de scheduler_g2 via
     # _Prensa_Asignada) se respetan. Las demás se balancean por carga.
 
@@ -589,6 +580,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     # =================================================================
     # 3.2 BALANCEO DE CARGA GENÉRICO (Procesos con múltiples máquinas)
     # =================================================================
+    perfil.marcar("3.2 Balanceo genérico")
     # Para cualquier proceso que tenga >1 máquina activa (excepto Troquelado y
     # Descartonado que ya tienen su lógica propia), redistribuir las tareas
     # asignadas a la máquina "principal" entre todas las máquinas disponibles,
@@ -669,75 +661,43 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
             dur_est = cant / cap_proc[m_sel] if cap_proc[m_sel] > 0 else 0
             load_proc[m_sel] += dur_est
 
+    perfil.marcar("4. Armado de colas")
     colas = {}
     buffer_espera = {m: [] for m in maquinas} # Buffer para Francotirador
+    # Las colas llevan registros compactos (Tarea) respaldados por una tabla columnar
+    tabla_tareas = TablaTareas(tasks.columns)
     
+    # Prioridades numéricas de todas las tareas, convertidas una sola vez; las ramas
+    # de guillotina y unificada las combinan por máquina.
+    columnas_prio = {"_p_imp": "PrioriImp", "_p_tro": "PrioriTr", "_p_man": "ManualPriority",
+                     "_p_desc": "PrioriDesc", "_p_ven": "PrioVenDdp", "_p_peg": "PrioPegDdp"}
+    tasks_colas = tasks.assign(**{alias: prio_numerica(tasks, col) for alias, col in columnas_prio.items()})
+    por_maquina = dict(tuple(tasks_colas.groupby("Maquina", sort=False)))
+
     for m in maquinas:
-        q = tasks[tasks["Maquina"] == m].copy()
+        q = por_maquina.get(m)
         m_lower = m.lower()
         
-        if q.empty: colas[m] = deque()
-        elif ("troquel" in m_lower) or ("troq" in m_lower) or ("duyan" in m_lower) or ("manual" in m_lower): colas[m] = _cola_troquelada(q)
-        elif ("offset" in m_lower) or ("heidelberg" in m_lower): colas[m] = _cola_impresora_offset(q)
-        elif ("flexo" in m_lower) or ("impres" in m_lower): colas[m] = _cola_impresora_flexo(q)
-        elif "bobina" in m_lower: colas[m] = _cola_cortadora_bobina(q)
-        elif "guillotina" in m_lower:
-            # Guillotina Propaga Prioridad de Impresión Y Troquelado
-            # Toma la MEJOR prioridad entre ambas (la más prioritaria gana)
-            if "FechaImDdp" in q.columns:
-                q["_fecha_imp"] = pd.to_datetime(q["FechaImDdp"], errors="coerce").fillna(pd.Timestamp.max)
-            else:
-                q["_fecha_imp"] = pd.Timestamp.max
-            
-            if "PrioriImp" in q.columns:
-                q["_priori_imp_num"] = pd.to_numeric(q["PrioriImp"], errors="coerce").fillna(9999)
-            else:
-                q["_priori_imp_num"] = 9999
-
-            if "FechaTroDdp" in q.columns:
-                q["_fecha_tro"] = pd.to_datetime(q["FechaTroDdp"], errors="coerce").fillna(pd.Timestamp.max)
-            else:
-                q["_fecha_tro"] = pd.Timestamp.max
-            
-            if "PrioriTr" in q.columns:
-                q["_priori_tro_num"] = pd.to_numeric(q["PrioriTr"], errors="coerce").fillna(9999)
-            else:
-                q["_priori_tro_num"] = 9999
-
-            # Elegir la MEJOR prioridad entre humana (Manual), impresión y troquelado
-            q["_prio_humana"] = q[["ManualPriority", "_priori_imp_num", "_priori_tro_num"]].min(axis=1)
-            q["_mejor_fecha"] = q[["_fecha_imp", "_fecha_tro"]].min(axis=1)
-                
-            q.sort_values(by=["_prio_humana", "Urgente", "DueDate", "_orden_proceso", "CantidadPliegos"], 
-                          ascending=[True, False, True, True, False], inplace=True)
-            colas[m] = deque(q.to_dict("records"))
-
-        else: 
-            # Unified Prioridad for all other machines (including Excel priorities)
-            if "ManualPriority" not in q.columns: q["ManualPriority"] = 9999
-            
-            prio_imp = pd.to_numeric(q["PrioriImp"] if "PrioriImp" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            prio_tro = pd.to_numeric(q["PrioriTr"] if "PrioriTr" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            prio_man = pd.to_numeric(q["ManualPriority"] if "ManualPriority" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            prio_desc = pd.to_numeric(q["PrioriDesc"] if "PrioriDesc" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            prio_ven = pd.to_numeric(q["PrioVenDdp"] if "PrioVenDdp" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            prio_peg = pd.to_numeric(q["PrioPegDdp"] if "PrioPegDdp" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-            
+        if q is None or q.empty: colas[m] = deque()
+        elif ("troquel" in m_lower) or ("troq" in m_lower) or ("duyan" in m_lower) or ("manual" in m_lower): colas[m] = tabla_tareas.cola(orden_troquelada(q), m)
+        elif any(k in m_lower for k in ("offset", "heidelberg", "flexo", "impres")): colas[m] = tabla_tareas.cola(orden_impresora(q), m)
+        elif "bobina" in m_lower: colas[m] = tabla_tareas.cola(orden_cortadora_bobina(q), m)
+        else:
+            # Guillotina: la MEJOR prioridad entre humana (Manual), impresión y troquelado
+            if "guillotina" in m_lower: propias = ["_p_man", "_p_imp", "_p_tro"]
             # Para descartonadoras, la prioridad propia (PrioriDesc) domina
-            if "descartonad" in m.lower():
-                q["_prio_humana"] = pd.concat([prio_desc, prio_man], axis=1).min(axis=1)
+            elif "descartonad" in m_lower: propias = ["_p_desc", "_p_man"]
             # Para ventana, la prioridad propia (PrioVenDdp) domina
-            elif "ventana" in m.lower():
-                q["_prio_humana"] = pd.concat([prio_ven, prio_man], axis=1).min(axis=1)
+            elif "ventana" in m_lower: propias = ["_p_ven", "_p_man"]
             # Para pegadora, la prioridad propia (PrioPegDdp) domina
-            elif any(k in m.lower() for k in ["pegadora", "pegado"]):
-                q["_prio_humana"] = pd.concat([prio_peg, prio_man], axis=1).min(axis=1)
-            else:
-                q["_prio_humana"] = pd.concat([prio_imp, prio_tro, prio_man], axis=1).min(axis=1)
-            
-            q.sort_values(by=["_prio_humana", "Urgente", "DueDate", "_orden_proceso", "CantidadPliegos"], 
-                          ascending=[True, False, True, True, False], inplace=True)
-            colas[m] = deque(q.to_dict("records"))
+            elif any(k in m_lower for k in ["pegadora", "pegado"]): propias = ["_p_peg", "_p_man"]
+            # Unified Prioridad for all other machines (including Excel priorities)
+            else: propias = ["_p_imp", "_p_tro", "_p_man"]
+
+            q = q.assign(_prio_humana=q[propias].min(axis=1))
+            q = q.sort_values(by=["_prio_humana", "Urgente", "DueDate", "_orden_proceso", "CantidadPliegos"], 
+                              ascending=[True, False, True, True, False], kind="stable")
+            colas[m] = tabla_tareas.cola(q, m)
 
     # --- RASTREO OT ESPECÍFICA: mostrar en qué cola quedó ---
     
@@ -754,33 +714,29 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
             
         q_pool.sort_values(by=["_prio_desc_num", "ManualPriority", "Urgente", "DueDate", "_orden_proceso", "CantidadPliegos"], 
                            ascending=[True, True, False, True, True, False], inplace=True)
-        colas["POOL_DESCARTONADO"] = deque(q_pool.to_dict("records"))
+        colas["POOL_DESCARTONADO"] = tabla_tareas.cola(q_pool)
     else:
         colas["POOL_DESCARTONADO"] = deque()
 
+    # Tareas con prioridad propia (Excel o manual) de cada cola, mantenidas al sacar/robar tareas
+    prioritarias = {q_name: {t for t in q if t.prioritaria} for q_name, q in colas.items()}
+
     # =================================================================
     # 5. LÓGICA DE PLANIFICACIÓN (EL NÚCLEO)
     # =================================================================
+    perfil.marcar("5. Núcleo")
     
     pendientes_por_ot = defaultdict(set); [pendientes_por_ot[t["OT_id"]].add(t["Proceso"]) for _, t in tasks.iterrows()]
+    # Los procesos congelados siguen siendo predecesores (ya completados) de lo que se re-planifica
+    for ot, proc in procesos_congelados: pendientes_por_ot[ot].add(proc)
     
     # Pre-compute skipped process set for fast lookup in verificar_disponibilidad
     # This allows downstream processes (e.g. Descartonado) to bypass skipped dependencies
-    def _clean_for_skip(s):
-        if not s: return ""
-        s = str(s).lower().strip()
-        trans = str.maketrans("áéíóúüñ", "aeiouun")
-        s = s.translate(trans)
-        if "flexo" in s: return "impresion flexo"
-        if "offset" in s: return "impresion offset"
-        if "troquel" in s: return "troquelado"
-        return s
-        
     skipped_set = set()
     if not tasks.empty:
         mask_saltado = tasks["Maquina"] == "SALTADO"
         for _, row in tasks[mask_saltado].iterrows():
-            skipped_set.add((row["OT_id"], _clean_for_skip(row["Proceso"])))
+            skipped_set.add((row["OT_id"], normalizar_proceso(row["Proceso"])))
     
     # Pre-compute: OTs que tienen procesos tercerizados
     # Para no bloquear troqueladoras esperando dependencias tercerizadas (72h)
@@ -799,220 +755,116 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
     carga_reg = [] # filas se acumula, pero carga_reg es nuevo aqui
     # filas = [] <-- NO reiniciamos filas, ya trae los pendientes
     h_dia = horas_por_dia(cfg)
+    ignorar_restricciones = bool(cfg.get("ignore_constraints"))
 
     def quedan_tareas(): return any(len(q) > 0 for q in colas.values())
 
+    # Grafo de dependencias por OT: predecesores, saltados y llegada de insumos
+    # se resuelven una sola vez; cada fin de proceso actualiza los contadores.
+    dependencias = RastreadorDependencias(flujo_estandar, pendientes_por_ot, skipped_set, completado, fin_proceso, cfg)
+    for q in colas.values():
+        dependencias.preparar(q)
+
+    contadores = perfil.contadores
+
     def verificar_disponibilidad(t, maquina_contexto=None): 
         """
         Verifica si una tarea puede ejecutarse (dependencias listas).
         Devuelve (bool_runnable, datetime_disponible).
         NO MODIFICA LA AGENDA.
         """
-        def clean(s):
-            if not s: return ""
-            s = str(s).lower().strip()
-            trans = str.maketrans("áéíóúüñ", "aeiouun")
-            s = s.translate(trans)
-            # Alias Agresivos
-            if "flexo" in s: return "impresion flexo"
-            if "offset" in s: return "impresion offset"
-            if "troquel" in s: return "troquelado"
-            return s
-
-        proc_actual_clean = clean(t["Proceso"])
-        ot = t["OT_id"]
-        flujo_clean = [clean(p) for p in flujo_estandar]
-        
-        # --- LÓGICA VERSIÓN TEÓRICA (SIMULACIÓN) ---
-        # Si cfg.get("ignore_constraints") es True, esta función:
-        # 1. Ignorará la falta de stock de Materia Prima (verificado fuera de esta función, en el loop principal).
-        # 2. Ignorará la falta de fechas de llegada para Chapas (Pelicula) y Troqueles.
-        # Esto permite generar una planificación "ideal" basada solo en capacidad de máquina y tiempos de proceso.
-        
-        # --- FORZAR INICIO ---
-        if t.get("ForzarInicio", False):
-            return (True, None)
-
-        # --- REORDENAMIENTO DINAMICO (ProcesoDpd / TroqAntes) ---
-        dynamic_order_applied = False
-        
-        if t.get("ProcesoDpd") and str(t.get("ProcesoDpd")).strip():
-             order_str = str(t.get("ProcesoDpd")).upper().strip()
-             order_str = order_str.replace(" ", "").replace("-", "") # "TID"
-             
-
-             
-             # Map initials to potential internal names
-             # T -> troquelado
-             # I -> impresion flexo / impresion offset
-             # D -> descartonado
-             
-             ordered_nodes = []
-             for char in order_str:
-                 if char == "T": ordered_nodes.append("troquelado")
-                 elif char == "D": ordered_nodes.append("descartonado")
-                 elif char == "I": ordered_nodes.append("impres") # Partial match key
-            
-             # Identify what is actually in the flow
-             # and build the concrete list of nodes to swap
-             
-             # We want to find the indices of the *matching* nodes in the current flow
-             # and swap their contents to match `ordered_nodes` sequence.
-             
-             # 1. Find matches in current flow
-             flow_matches = [] # list of (index, node_name)
-             for i, p in enumerate(flujo_clean):
-                 # Check if p matches any of our ordered initials logic
-                 # But we need to know WHICH initial it matches to know the target order.
-                 
-                 # Optimization: specific checks
-                 matched_char = None
-                 if p == "troquelado" and "T" in order_str: matched_char = "T"
-                 elif p == "descartonado" and "D" in order_str: matched_char = "D"
-                 elif "impres" in p and "I" in order_str: matched_char = "I"
-                 
-                 if matched_char:
-                     flow_matches.append((i, p, matched_char))
-            
-             # If we found at least 2 items involved in the reordering
-             if len(flow_matches) >= 2:
-                  # Sort matches by current index (already sorted by enumeration)
-                  indices = [m[0] for m in flow_matches]
-                  
-                  # Determine the desired sequence of the FOUND nodes based on order_str
-                  # flow_matches has (index, node, char).
-                  # We want to re-arrange these nodes such that their chars follow order_str.
-                  
-                  # Filter order_str to only chars we found
-                  found_chars = set(m[2] for m in flow_matches)
-                  relevant_order = [c for c in order_str if c in found_chars]
-                  
-                  new_sequence = []
-                  # Better: list of nodes for each char
-                  pool_list = {c: [] for c in found_chars}
-                  for m in flow_matches:
-                      pool_list[m[2]].append(m[1])
-                      
-
-
-                  for char in relevant_order:
-                      if pool_list.get(char):
-                          # Append ALL nodes that match this char
-                          # Preserving their relative original order (since we iterated flow)
-                          new_sequence.extend(pool_list[char])
-                          pool_list[char] = [] # Clear so we don't duplicate if char repeats in order string
-
-                  
-                  # Now replace in flujo_clean at the specific indices
-                  for original_idx, new_node in zip(indices, new_sequence):
-                      flujo_clean[original_idx] = new_node
-                      
-                  dynamic_order_applied = True
-                  
-
-
-
-        if not dynamic_order_applied and t.get("_TroqAntes"):
-             # ... (existing logic) ...
-             # We can keep this block collapsed/referenced if we don't change it, 
-             # but to be safe I'm just leaving it as valid python path if needed, 
-             # but here I am just inserting logs AFTER the dynamic block.
-             if "troquelado" in flujo_clean:
-                 # Identificar donde está la impresion
-                 # ... (Implementation detail omitted for brevity in thought, but must retain logically) ...
-                 # Actually I am not touching the _TroqAntes block in this tool call significantly 
-                 # except to ensure flow is valid.
-                 pass
-
-        # --- VALIDATION LOGIC ---
-        if proc_actual_clean not in flujo_clean: 
-            return (True, None)
-            
-        idx = flujo_clean.index(proc_actual_clean)
-        pendientes_clean = {clean(p) for p in pendientes_por_ot[ot]}
-        
-
-
-        prev_procs_names = []
-        for p_clean in flujo_clean[:idx]:
-            if p_clean in pendientes_clean:
-                # If this process is skipped (SALTADO), treat as instantly completed
-                if (ot, p_clean) in skipped_set:
-                    continue
-                
-                completados_clean = {clean(c) for c in completado[ot]}
-                
-                if p_clean not in completados_clean:
-                    # --- MEJORA: En lugar de bloquear la tarea completamente,
-                    # estimamos cuándo terminará el proceso previo.
-                    # Esto permite que la tarea entre como "candidata futura"
-                    # y se respete su prioridad manual al programar huecos.
-                    
-                    return (False, None) # Proceso previo no completado -> bloqueado
-                else: 
-                     # Si está completado, necesitamos su nombre Raw para buscar fecha fin.
-                     raw_match = next((c for c in completado[ot] if clean(c) == p_clean), None)
-                     if raw_match:
-                        prev_procs_names.append(raw_match)
-
-            else:
-                 pass # Not pending, so ignored
-        
-
-
-        if not prev_procs_names: 
-            return (True, None)
-
-        completados_clean = {clean(c) for c in completado[ot]}
-        for p in prev_procs_names:
-            if clean(p) not in completados_clean:
-                return (False, None) # Falta un proceso previo
-        
-        # Calcular cuándo estará lista la última dependencia
-        last_end = max((fin_proceso[ot].get(p) for p in prev_procs_names if fin_proceso[ot].get(p)), default=None)
-        
-        # --- NUEVO: RESTRICCION POR LLEGADA DE INSUMOS (CHAPAS / TROQUEL) ---
-        arrival_date = None
-        
-        # 1. Impresión (Offset/Flexo) depende de fecha llegada chapas (PeliculaArt)
-        if "impres" in proc_actual_clean:
-            # Si "ignoramos restricciones", asumimos que NO REQUIERE (Force False)
-            requires_pelicula = es_si(t.get("PeliculaArt"))
-            if cfg.get("ignore_constraints"):
-                requires_pelicula = False
-            
-            if requires_pelicula:
-                fecha_chapas = t.get("FechaLlegadaChapas")
-                if pd.notna(fecha_chapas):
-                    # Asumimos disponibilidad al inicio de ese día (00:00) o a las 7:00?
-                    # Mejor las 07:00 para alinear con jornada
-                    arrival_date = datetime.combine(fecha_chapas.date(), time(7,0))
-
-        # 2. Troquelado depende de fecha llegada troquel (TroquelArt)
-        elif "troquel" in proc_actual_clean:
-             requires_troquel = es_si(t.get("TroquelArt"))
-             if cfg.get("ignore_constraints"):
-                 requires_troquel = False
-
-             if requires_troquel:
-                fecha_troquel = t.get("FechaLlegadaTroquel")
-                if pd.notna(fecha_troquel):
-                    arrival_date = datetime.combine(fecha_troquel.date(), time(7,0))
-        
-        # Fusionar restricciones: la fecha efectiva es el MAX(dependencia, llegada_insumo)
-        
-        final_runnable = True
-        final_avail = None
-        
-        if last_end and arrival_date:
-            final_avail = max(last_end, arrival_date)
-        elif arrival_date:
-            final_avail = arrival_date
-        else:
-            final_avail = last_end
-            
-            
-        return (final_runnable, final_avail)
+        # Si cfg.get("ignore_constraints") es True se ignora la llegada de Chapas y Troqueles
+        # (la Materia Prima se verifica fuera de esta función, en el loop principal).
+        contadores[maquina_contexto]["disponibilidad"] += 1
+        return dependencias.disponibilidad(t)
+
+    # Las máquinas virtuales (TERCERIZADO, SALTADO) no entran al loop: sus tareas
+    # se agendan apenas quedan ejecutables, propagando cada fin registrado.
+    virtuales = ResolutorVirtuales(colas, verificar_disponibilidad, inicio_general, lambda *a: _agendar_virtual(*a))
+    for m in MAQUINAS_VIRTUALES:
+        colas.pop(m, None)
+    maquinas_reales = [m for m in maquinas if m not in MAQUINAS_VIRTUALES]
+
+    # Cada fin de proceso se publica a las colas de las tareas sucesoras: sus
+    # lectoras se despiertan a la hora exacta en que la sucesora queda disponible.
+    bus = BusFinalizaciones(dependencias)
+    for q_name, q in colas.items():
+        bus.suscribir(q_name, q)
+
+    def registrar_fin(ot, proceso, fin):
+        fin_proceso[ot][proceso] = fin
+        completado[ot].add(proceso)
+        afectadas = bus.publicar(ot, proceso, fin)
+        indice_colas.actualizar(afectadas)
+        virtuales.resolver(afectadas)
+
+    def _agendar_virtual(t_virt, maquina, start_virt, end_virt, duration_virt):
+        filas.append({k: t_virt.get(k) for k in ["OT_id", "CodigoProducto", "Subcodigo", "CantidadPliegos", "CantidadPliegosNetos",
+                                                "Bocas", "Poses", "Cliente", "Cliente-articulo", "Proceso", "Maquina", "DueDate", "PliAnc", "PliLar", 
+                                                "Urgente", "ManualPriority", "IsOutsourced", "IsSkipped", "ForzarInicio", "Colores", "CodigoTroquel", "MateriaPrimaPlanta", "PrioriImp", "ProcesoDpd", "PeliculaArt", "TroquelArt", "FechaLlegadaChapas", "FechaLlegadaTroquel", "PrioriTr", "FechaTroDdp", "TroqueladoraDdp"]} |
+                        {"Setup_min": 0.0, "Proceso_h": duration_virt,
+                        "Inicio": start_virt, "Fin": end_virt, "Duracion_h": duration_virt, 
+                        "Motivo": "Outsourced/Skipped", "Maquina": maquina})
+        ultimo_en_maquina[maquina] = t_virt
+        contadores[maquina]["agendadas"] += 1
+        registrar_fin(t_virt["OT_id"], t_virt["Proceso"], end_virt)
+
+    # Colas indexadas (listas / futuras / bloqueadas) para las máquinas que no son de
+    # preparación: el PASO 1 las consulta en vez de recorrerlas cuando no hay prioridades.
+    # Las colas de las que se roba (troqueladoras, descartonadoras y el POOL) se indexan
+    # siempre: el PASO 2 las lee por vistas de robo.
+    indice_colas = IndiceColas(verificar_disponibilidad, ignorar_restricciones)
+    fuentes_robo = set(manuales) | set(auto_names) | {q for q in colas if "descartonad" in q.lower()}
+    for m in list(colas):
+        m_lower = m.lower()
+        if m not in fuentes_robo and (m not in maquinas_reales or "guillotin" in m_lower or "bobina" in m_lower or "corte" in m_lower):
+            continue
+        colas[m] = indice_colas.cola(colas[m], m)
+
+    # Vistas de robo por (ladrona, cola de origen, caso): las tareas que la ladrona puede
+    # tomar de esa cola, con los mismos filtros que el recorrido original (ver PASO 2).
+    # Se crean la primera vez que la ladrona las consulta. Las medidas salen de la
+    # matriz de compatibilidad tareas x troqueladoras, armada una vez por planificación.
+    def _es_troquelado_libre(t):
+        return not t.get("ManualAssignment") and t["Proceso"].strip() == "Troquelado"
+
+    compat_troquel = CompatibilidadTroquel(
+        [t.ancho for t in tabla_tareas.tareas], [t.largo for t in tabla_tareas.tareas], manuales + auto_names, cfg)
+
+    def _filtro_robo(ladron, caso):
+        medidas = lambda t: compat_troquel.admite(t.id, ladron)
+        if caso == "A":     # automática roba a manuales: tiradas grandes
+            return lambda t: _es_troquelado_libre(t) and t.cantidad >= 3000 and medidas(t) and t.mp_ok
+        if caso == "B":     # manual roba a automáticas: tiradas chicas
+            return lambda t: _es_troquelado_libre(t) and t.cantidad <= 2500 and medidas(t) and not t.mp_no
+        if caso == "C":     # manual roba a vecina manual
+            return lambda t: _es_troquelado_libre(t) and medidas(t) and not t.mp_no
+        if caso == "Z":     # manual roba a manuales (incluida la propia)
+            return lambda t: _es_troquelado_libre(t) and medidas(t) and t.mp_ok
+        if caso == "D":     # descartonadora roba a vecina
+            return lambda t: not t.get("ManualAssignment") and "descartonad" in t["Proceso"].lower() and t.mp_ok
+        return lambda t: t.mp_ok or ignorar_restricciones   # POOL
+
+    vistas_robo = {}
+
+    def _vista_robo(ladron, fuente, caso):
+        clave = (ladron, fuente, caso)
+        if clave not in vistas_robo:
+            ordenes = ()
+            if caso == "POOL":
+                ordenes = (prioridad_robo_pool, lambda t: prioridad_robo_pool(t, degradar_urgentes=True))
+            vistas_robo[clave] = colas[fuente].vista(_filtro_robo(ladron, caso), ordenes)
+        return vistas_robo[clave]
+
+    def _robar_de(ladron, fuentes, caso, reloj):
+        """Primera tarea lista (en orden de cola) que `ladron` puede robar de `fuentes`, en ese orden."""
+        for fuente in fuentes:
+            if not colas.get(fuente):
+                continue
+            t = _vista_robo(ladron, fuente, caso).primera(reloj)
+            if t is not None:
+                return t, fuente
+        return None, None
 
     def _prioridad_dinamica(m):
         # ORDEN DE SIMULACION:
@@ -1020,67 +872,61 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
         # 2. Hora
         # 3. Prioridad especial (Automatica antes para llenar huecos si empatan)
         prio_tipo = 0 if "autom" in m.lower() else 1
-        
-        # Virtual Machines don't have agenda, so we give them high priority (run whenever)
-        if m in ["TERCERIZADO", "SALTADO"]:
-            return (datetime.min, 0, m)
-            
         current_dt = datetime.combine(agenda[m]["fecha"], agenda[m]["hora"])
         return (current_dt, prio_tipo, m)
 
+    # --- MOTOR DE EVENTOS ---
+    # Quién lee cada cola: si la cola cambia, esas máquinas se despiertan.
+    # Dueña siempre; descartonadoras leen el POOL y a sus vecinas; troqueladoras
+    # roban entre sí; las de preparación miran las colas de impresión (agrupamiento).
+    es_troq_ladron = lambda m: m in auto_names or any(x in m for x in manuales)
+    desc_lectoras = [m for m in maquinas_reales if "descartonad" in m.lower()]
+    prep_lectoras = [m for m in maquinas_reales if any(k in m.lower() for k in ("guillotin", "bobina", "corte"))]
+    lectores = {}
+    for q_name in colas:
+        qn = q_name.lower()
+        lect = {q_name} if q_name in maquinas_reales else set()
+        if "descartonad" in qn:
+            lect.update(desc_lectoras)
+        if q_name in auto_names or q_name in manuales:
+            lect.update(m for m in maquinas_reales if es_troq_ladron(m))
+        if any(k in qn for k in ("flexo", "bhs", "offset", "heidelberg", "kba")):
+            lect.update(prep_lectoras)
+        lectores[q_name] = lect
+
+    def _huella(m):
+        a = agenda.get(m) or {}
+        return (a.get("fecha"), a.get("hora"), a.get("resto_horas"), len(colas.get(m, ())), id(ultimo_en_maquina.get(m)))
+
+    def _tras_intento(m, huella_antes, largos_antes):
+        if _huella(m) != huella_antes:
+            motor.activar(m)
+        for q_name, largo in largos_antes.items():
+            if len(colas[q_name]) != largo:
+                for m_lect in lectores[q_name]:
+                    motor.despertar(m_lect)
+        # Una tarea solo sale de su cola al agendarse o al ser robada por una máquina
+        # que la agenda en el mismo intento: la cola suscripta al inicio es la suya.
+        for q_name, hora in bus.entregar().items():
+            for m_lect in lectores[q_name]:
+                motor.notificar(m_lect, hora)
+
+    motor = MotorEventos(maquinas_reales, _prioridad_dinamica)
+
+    # Virtuales sin predecesores pendientes (y las cadenas que liberan). Los avisos
+    # del bus se descartan: todas las máquinas arrancan en el heap del motor.
+    virtuales.resolver()
+    bus.entregar()
+
     progreso = True
     while quedan_tareas() and progreso:
         progreso = False
-        
-        # Mezclar máquinas
-        maquinas_shuffled = list(maquinas)
+        motor.nueva_pasada()
 
-        sim_order = sorted(maquinas_shuffled, key=_prioridad_dinamica)
-
-        for maquina in sim_order:
-            # --- VIRTUAL MACHINE EXECUTION (Infinite Capacity) ---
-            if maquina in ["TERCERIZADO", "SALTADO"]:
-                if not colas.get(maquina): continue
-                
-                # Consume ALL ready tasks
-                queue_snapshot = list(colas[maquina]) # Copy to iterate
-                for t_virt in queue_snapshot:
-                    runnable, available_at = verificar_disponibilidad(t_virt, maquina)
-                    if runnable:
-                        # Determine Start Time (Max of Dependency Availability or Plan Start)
-                        start_virt = max(available_at, inicio_general) if available_at else inicio_general
-                        
-                        # Determine Duration
-                        duration_virt = 0.0
-                        if maquina == "TERCERIZADO":
-                             # Usamos 72 hs por defecto para procesos tercerizados
-                             duration_virt = 72.0
-                             if t_virt.get("Proceso", "").strip().lower() == "descartonado":
-                                 duration_virt = 0.0 # El descartonado va incluido en las 72hs del troquelado
-                        
-                        end_virt = start_virt + timedelta(hours=duration_virt)
-                        
-                        # Register Result
-                        filas.append({k: t_virt.get(k) for k in ["OT_id", "CodigoProducto", "Subcodigo", "CantidadPliegos", "CantidadPliegosNetos",
-                                                                "Bocas", "Poses", "Cliente", "Cliente-articulo", "Proceso", "Maquina", "DueDate", "PliAnc", "PliLar", 
-                                                                "Urgente", "ManualPriority", "IsOutsourced", "IsSkipped", "ForzarInicio", "Colores", "CodigoTroquel", "MateriaPrimaPlanta", "PrioriImp", "ProcesoDpd", "PeliculaArt", "TroquelArt", "FechaLlegadaChapas", "FechaLlegadaTroquel", "PrioriTr", "FechaTroDdp", "TroqueladoraDdp"]} |
-                                        {"Setup_min": 0.0, "Proceso_h": duration_virt,
-                                        "Inicio": start_virt, "Fin": end_virt, "Duracion_h": duration_virt, 
-                                        "Motivo": "Outsourced/Skipped", "Maquina": maquina})
-                        
-                        # Update Global State
-                        ot_id = t_virt["OT_id"]
-                        proc = t_virt["Proceso"]
-                        fin_proceso[ot_id][proc] = end_virt
-                        completado[ot_id].add(proc)
-                        ultimo_en_maquina[maquina] = t_virt
-                        
-                        # Remove from queue
-                        colas[maquina].remove(t_virt)
-                        progreso = True # We made progress
-                
-                continue # Skip standard logic for virtual machines
-            # -----------------------------------------------------
+        for maquina in iter(motor.siguiente, None):
+            contadores[maquina]["intentos"] += 1
+            huella_antes = _huella(maquina)
+            largos_antes = {q_name: len(q) for q_name, q in colas.items()}
 
             if not colas.get(maquina):  
                 # --- SISTEMA DE RESCATE (CRÍTICO) ---
@@ -1126,7 +972,6 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                 current_agenda_dt = datetime.combine(agenda[maquina]["fecha"], agenda[maquina]["hora"])
                 
                 ultima_tarea = ultimo_en_maquina.get(maquina)
-                is_troq_machine = "troq" in maquina.lower() or "duyan" in maquina.lower() or "manual" in maquina.lower()
                 
                 # VARS FOR GROUPING PRIORITY
                 is_prep_machine = "guillotin" in maquina.lower() or "bobina" in maquina.lower() or "corte" in maquina.lower()
@@ -1138,253 +983,164 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                 
                 # URGENT DEADLINE PARA GAP FILLING
                 urgent_deadline_dt = None
-                tiene_prio_en_cola = False  # Hay alguna tarea 1-8 en la cola propia (runnable o no)
+                tiene_prio_en_cola = bool(prioritarias[maquina])  # Hay alguna tarea 1-8 en la cola propia (runnable o no)
                 
-                # --- PRE-SCAN: Detectar tareas con prioridad Excel esperando dependencias ---
-                # Si hay alguna tarea con PrioriImp o PrioriTr válida que no está lista aún,
-                # establecemos urgent_deadline_dt para impedir que gap-fillers sin prioridad la adelanten.
-                for t_prescan in colas[maquina]:
-                    try:
-                        prescan_prio_excel_imp = float(t_prescan.get("PrioriImp", 9999))
-                        if pd.isna(prescan_prio_excel_imp): prescan_prio_excel_imp = 9999
-                    except (ValueError, TypeError):
-                        prescan_prio_excel_imp = 9999
-
-                    try:
-                        prescan_prio_excel_tro = float(t_prescan.get("PrioriTr", 9999))
-                        if pd.isna(prescan_prio_excel_tro): prescan_prio_excel_tro = 9999
-                    except (ValueError, TypeError):
-                        prescan_prio_excel_tro = 9999
-
-                    prescan_prio_man = int(t_prescan.get("ManualPriority", 9999))
-                    try:
-                        prescan_prio_desc = float(t_prescan.get("PrioriDesc", 9999))
-                        if pd.isna(prescan_prio_desc): prescan_prio_desc = 9999
-                    except (ValueError, TypeError):
-                        prescan_prio_desc = 9999
-                    
-                    if prescan_prio_excel_imp < 9999 or prescan_prio_excel_tro < 9999 or prescan_prio_man < 9000 or prescan_prio_desc < 9999:
-                        # Hay una tarea de prioridad en esta cola (sin importar si está lista)
-                        tiene_prio_en_cola = True
-                        prescan_runnable, prescan_avail = verificar_disponibilidad(t_prescan, maquina)
-                        if prescan_runnable:
-                            if prescan_avail and prescan_avail > current_agenda_dt:
-                                # Tarea priorizada que estará lista en el futuro
-                                if urgent_deadline_dt is None or prescan_avail < urgent_deadline_dt:
-                                    urgent_deadline_dt = prescan_avail
-                            else:
-                                # Tarea priorizada lista AHORA → el SUPER OVERRIDE la tomará
-                                # Seguimos buscando por si hay OTRA priorizada más adelante esperando
-                                continue
-                        else:
-                            # No-runnable pero con prioridad: bloqueamos gap-filling igual
-                            urgent_deadline_dt = urgent_deadline_dt or current_agenda_dt
+                # --- COLA INDEXADA (sin prioridades en cola y sin scoring de preparación) ---
+                # Las listas/futuras/bloqueadas ya están separadas: se obtiene lo mismo que
+                # el recorrido de abajo (primera lista en orden de cola, futura más próxima,
+                # setup menor que vale la pena esperar) sin visitar toda la cola.
+                TOLERANCIA = timedelta(minutes=90)
+                cola_maquina = colas[maquina]
+                if isinstance(cola_maquina, ColaIndexada) and not is_prep_machine and not tiene_prio_en_cola and not cola_maquina.con_prioridad:
+                    examinadas, idx_cand, mejor_candidato_futuro, mejor_candidato_setup, has_unrunnable_tasks = \
+                        cola_maquina.buscar_candidata(current_agenda_dt, ultima_tarea, TOLERANCIA)
+                    i = examinadas - 1
+                else:
+                    # --- TAREAS PRIORIZADAS ESPERANDO (antes PRE-SCAN de toda la cola) ---
+                    # Si alguna tarea con prioridad (Excel o manual) de esta cola no está lista aún,
+                    # bloqueamos el gap-filling para que los rellenos sin prioridad no la adelanten.
+                    # Las priorizadas listas AHORA las toma el SUPER OVERRIDE.
+                    for t_prio in prioritarias[maquina]:
+                        prio_runnable, prio_avail = verificar_disponibilidad(t_prio, maquina)
+                        if not prio_runnable or (prio_avail and prio_avail > current_agenda_dt):
+                            urgent_deadline_dt = prio_avail or current_agenda_dt
+                            break
                 
-                for i, t_cand in enumerate(colas[maquina]):
-                    if is_prep_machine and i >= scan_limit: 
-                        break # Stop scanning for prep machines to avoid perf hit
+                    i = -1
+                    for i, t_cand in enumerate(colas[maquina]):
+                        if is_prep_machine and i >= scan_limit: 
+                            break # Stop scanning for prep machines to avoid perf hit
+
+                        # OVERRIDE: Si ignoramos restricciones, asumimos MP OK siempre
+                        # Manual Priority Override for Material Constraints ("No hay discusión")
+                        if not (t_cand.mp_ok or ignorar_restricciones or t_cand.prio_man < 9000):
+                            continue
 
-                    mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                    mp_ok = mp in ("false", "0", "no", "falso", "") or not t_cand.get("MateriaPrimaPlanta")
-                    
-                    # OVERRIDE: Si ignoramos restricciones, asumimos MP OK siempre
-                    if cfg.get("ignore_constraints"):
-                        mp_ok = True
-                    
-                    # Manual Priority Override for Material Constraints ("No hay discusión")
-                    prio_man_check = int(t_cand.get("ManualPriority", 9999))
-                    if prio_man_check < 9000:
-                        mp_ok = True
-                    
-                    if not mp_ok:
-                        continue
+                        # --- PRIORIDAD EFECTIVA PARA ESTA MÁQUINA ---
+                        # Resuelta al armar la cola (ver clase_prioridad_maquina / prioridad_efectiva):
+                        # Troqueladora: PrioriTr, Descartonadora: PrioriDesc, Ventana: PrioVenDdp,
+                        # Pegadora: PrioPegDdp, Prep: PrioriImp, Resto: ManualPriority
+                        prio_man = t_cand.prio_man
+                        prio_efectiva_maquina = t_cand.prio_efectiva
+                        tiene_prioridad = t_cand.tiene_prioridad
 
-                    # --- DEFINICIÓN DE PRIORIDAD (MANUAL O EXCEL) ---
-                    prio_man = int(t_cand.get("ManualPriority", 9999))
-                    # Verificar la prioridad de Impresión (PrioriImp)
-                    try:
-                        prio_excel_imp = float(t_cand.get("PrioriImp", 9999))
-                        if pd.isna(prio_excel_imp): prio_excel_imp = 9999
-                    except (ValueError, TypeError):
-                        prio_excel_imp = 9999
-                    # Verificar la prioridad de Troquelado (PrioriTr)
-                    try:
-                        prio_excel_tro = float(t_cand.get("PrioriTr", 9999))
-                        if pd.isna(prio_excel_tro): prio_excel_tro = 9999
-                    except (ValueError, TypeError):
-                        prio_excel_tro = 9999
-                    
-                    try:
-                        prio_excel_desc = float(t_cand.get("PrioriDesc", 9999))
-                        if pd.isna(prio_excel_desc): prio_excel_desc = 9999
-                    except (ValueError, TypeError):
-                        prio_excel_desc = 9999
-                    
-                    try:
-                        prio_excel_ven = float(t_cand.get("PrioVenDdp", 9999))
-                        if pd.isna(prio_excel_ven): prio_excel_ven = 9999
-                    except (ValueError, TypeError):
-                        prio_excel_ven = 9999
+                        runnable, available_at = verificar_disponibilidad(t_cand, maquina)
                     
-                    try:
-                        prio_excel_peg = float(t_cand.get("PrioPegDdp", 9999))
-                        if pd.isna(prio_excel_peg): prio_excel_peg = 9999
-                    except (ValueError, TypeError):
-                        prio_excel_peg = 9999
-
-                    tiene_prioridad = (prio_man < 9000 or prio_excel_imp < 9999 or prio_excel_tro < 9999 or 
-                                      prio_excel_desc < 9999 or prio_excel_ven < 9999 or prio_excel_peg < 9999)
-
-                    # --- PRIORIDAD EFECTIVA PARA ESTA MÁQUINA ---
-                    # Troqueladora: solo PrioriTr
-                    # Descartonadora: solo PrioriDesc
-                    # Ventana: solo PrioVenDdp
-                    # Pegadora: solo PrioPegDdp
-                    # Imprenta/Prep: solo PrioriImp
-                    # Resto: ManualPriority
-                    if is_troq_machine:
-                        prio_efectiva_maquina = min(prio_man, prio_excel_tro)
-                        # tiene_prioridad ya está calculado arriba, OK
-                    elif "descartonad" in maquina.lower():
-                        prio_efectiva_maquina = min(prio_man, prio_excel_desc)
-                        # Para descartonadoras, SOLO PrioriDesc (y ManualPriority) definen prioridad
-                        # PrioriTr/PrioriImp de otros procesos no deben influir aquí
-                        tiene_prioridad = prio_man < 9000 or prio_excel_desc < 9999
-                    elif "ventana" in maquina.lower():
-                        prio_efectiva_maquina = min(prio_man, prio_excel_ven)
-                        # Para ventana, SOLO PrioVenDdp (y ManualPriority) definen prioridad
-                        tiene_prioridad = prio_man < 9000 or prio_excel_ven < 9999
-                    elif any(k in maquina.lower() for k in ["pegadora", "pegado"]):
-                        prio_efectiva_maquina = min(prio_man, prio_excel_peg)
-                        # Para pegadoras, SOLO PrioPegDdp (y ManualPriority) definen prioridad
-                        tiene_prioridad = prio_man < 9000 or prio_excel_peg < 9999
-                    elif is_prep_machine:
-                        prio_efectiva_maquina = min(prio_man, prio_excel_imp)
-                    else:
-                        prio_efectiva_maquina = prio_man
-
-                    runnable, available_at = verificar_disponibilidad(t_cand, maquina)
+                        if not runnable: 
+                            has_unrunnable_tasks = True
+                            if tiene_prioridad:
+                                if mejor_candidato_prio_ready is None or prio_efectiva_maquina < mejor_candidato_prio_ready[1]:
+                                    mejor_candidato_prio_ready = None
+                                break
+                            continue
                     
-                    if not runnable: 
-                        has_unrunnable_tasks = True
                         if tiene_prioridad:
-                            if mejor_candidato_prio_ready is None or prio_efectiva_maquina < mejor_candidato_prio_ready[1]:
-                                mejor_candidato_prio_ready = None
-                            break
-                        continue
-                    
-                    if tiene_prioridad:
-                        # Check start constraints
-                        is_ready_now = not available_at or available_at <= current_agenda_dt
-                        if is_ready_now:
-                            mejor_candidato_futuro = None
-                            mejor_candidato_setup = None # Disable setup gap filling
+                            # Check start constraints
+                            is_ready_now = not available_at or available_at <= current_agenda_dt
+                            if is_ready_now:
+                                mejor_candidato_futuro = None
+                                mejor_candidato_setup = None # Disable setup gap filling
                             
-                            current_prio_score = prio_efectiva_maquina
+                                current_prio_score = prio_efectiva_maquina
                                 
-                            if mejor_candidato_prio_ready is None:
-                                mejor_candidato_prio_ready = (i, current_prio_score)
-                            else:
-                                if current_prio_score < mejor_candidato_prio_ready[1]:
+                                if mejor_candidato_prio_ready is None:
                                     mejor_candidato_prio_ready = (i, current_prio_score)
-                                elif current_prio_score == mejor_candidato_prio_ready[1]:
-                                    t_curr_due = t_cand.get("DueDate")
-                                    t_best_due = colas[maquina][mejor_candidato_prio_ready[0]].get("DueDate")
-                                    if pd.notna(t_curr_due) and pd.notna(t_best_due) and t_curr_due < t_best_due:
+                                else:
+                                    if current_prio_score < mejor_candidato_prio_ready[1]:
                                         mejor_candidato_prio_ready = (i, current_prio_score)
+                                    elif current_prio_score == mejor_candidato_prio_ready[1]:
+                                        t_curr_due = t_cand.get("DueDate")
+                                        t_best_due = colas[maquina][mejor_candidato_prio_ready[0]].get("DueDate")
+                                        if pd.notna(t_curr_due) and pd.notna(t_best_due) and t_curr_due < t_best_due:
+                                            mejor_candidato_prio_ready = (i, current_prio_score)
                             
-                            # No break here, continue searching entire queue for better priority
-                            continue
-                        else:
-                            # If not ready IS runnable, keep it as future candidate.
-                            if mejor_candidato_futuro is None:
-                                mejor_candidato_futuro = (i, available_at)
-                            elif available_at < mejor_candidato_futuro[1]:
-                                mejor_candidato_futuro = (i, available_at)
+                                # No break here, continue searching entire queue for better priority
+                                continue
+                            else:
+                                # If not ready IS runnable, keep it as future candidate.
+                                if mejor_candidato_futuro is None:
+                                    mejor_candidato_futuro = (i, available_at)
+                                elif available_at < mejor_candidato_futuro[1]:
+                                    mejor_candidato_futuro = (i, available_at)
                                 
-                            # Fijar límite de tiempo para gap-filling (Urgent Deadline)
-                            # Si hay una tarea priorizada esperando, bloqueamos cualquier relleno de hueco.
-                            if urgent_deadline_dt is None or available_at < urgent_deadline_dt:
-                                urgent_deadline_dt = available_at
+                                # Fijar límite de tiempo para gap-filling (Urgent Deadline)
+                                # Si hay una tarea priorizada esperando, bloqueamos cualquier relleno de hueco.
+                                if urgent_deadline_dt is None or available_at < urgent_deadline_dt:
+                                    urgent_deadline_dt = available_at
                             
-                            # --- MEJORA RAJATABLA (TODAS LAS MÁQUINAS) ---
-                            # El usuario exigió que no haya gap-filling si hay una tarea 
-                            # con prioridad manual o de excel esperando. La máquina esperará ociosa.
-                            break
+                                # --- MEJORA RAJATABLA (TODAS LAS MÁQUINAS) ---
+                                # El usuario exigió que no haya gap-filling si hay una tarea 
+                                # con prioridad manual o de excel esperando. La máquina esperará ociosa.
+                                break
 
-                    es_setup = False
-                    if ultima_tarea:
-                        es_setup = usa_setup_menor(ultima_tarea, t_cand, t_cand.get("Proceso", ""))
+                        es_setup = False
+                        if ultima_tarea:
+                            es_setup = usa_setup_menor(ultima_tarea, t_cand, t_cand.get("Proceso", ""))
                          
-                    # --- RESTRICCIÓN DE SALTO POR SETUP (TROQUELADO) ---
-                    # Si es una máquina de preparación (ej: Troquelado) y la tarea no es urgente/prioritaria,
-                    # no permitimos que un "es_setup = True" haga saltar la tarea desde muy atrás en la cola
-                    # porque rompe el orden lógico de los grupos (ej: mete una orden de 1000 en el medio de un hueco).
-                    if es_setup and is_prep_machine:
-                        prio_man_setup = int(t_cand.get("ManualPriority", 9999))
-                        if prio_man_setup >= 9000 and i > 5:
-                            # Si está a más de 5 posiciones de distancia, ignoramos la ventaja del setup
-                            # para que respete su turno/grupo original.
-                            es_setup = False
-
-                    if "barniz" in maquina.lower() and i < 5:
-                         log_debug(f"Cand[{i}]: {t_cand.get('Cliente')} (Due: {t_cand.get('DueDate')}) - Avail: {available_at} - SetupMenor: {es_setup}")
-
-                    # Si está lista YA (o antes), la tomamos...
-                    is_ready_now = not available_at or available_at <= current_agenda_dt
+                        # --- RESTRICCIÓN DE SALTO POR SETUP (TROQUELADO) ---
+                        # Si es una máquina de preparación (ej: Troquelado) y la tarea no es urgente/prioritaria,
+                        # no permitimos que un "es_setup = True" haga saltar la tarea desde muy atrás en la cola
+                        # porque rompe el orden lógico de los grupos (ej: mete una orden de 1000 en el medio de un hueco).
+                        if es_setup and is_prep_machine:
+                            if prio_man >= 9000 and i > 5:
+                                # Si está a más de 5 posiciones de distancia, ignoramos la ventaja del setup
+                                # para que respete su turno/grupo original.
+                                es_setup = False
+
+                        # Si está lista YA (o antes), la tomamos...
+                        is_ready_now = not available_at or available_at <= current_agenda_dt
                     
-                    if is_ready_now:
-                        # --- NUEVA RESTRICCIÓN DE GAP FILLING ---
-                        # Si hay una tarea prioritaria esperando en el futuro, bloqueamos 
-                        # absolutamente el gap filling para respetar el orden de cola.
-                        fits_gap = True
-                        if urgent_deadline_dt is not None:
-                            fits_gap = False
+                        if is_ready_now:
+                            # --- NUEVA RESTRICCIÓN DE GAP FILLING ---
+                            # Si hay una tarea prioritaria esperando en el futuro, bloqueamos 
+                            # absolutamente el gap filling para respetar el orden de cola.
+                            fits_gap = True
+                            if urgent_deadline_dt is not None:
+                                fits_gap = False
                         
-                        if not fits_gap:
-                            continue
+                            if not fits_gap:
+                                continue
                         
-                        if is_prep_machine:
-                            score = get_downstream_presence_score(t_cand, colas, None, maquina, last_tasks_map=ultimo_en_maquina)
+                            if is_prep_machine:
+                                score = get_downstream_presence_score(t_cand, colas, None, maquina, last_tasks_map=ultimo_en_maquina)
                             
-                            if es_setup:
-                                 score += 10 # Bonus by setup for tie-breaking ready tasks
+                                if es_setup:
+                                     score += 10 # Bonus by setup for tie-breaking ready tasks
                                  
-                            # Decision Rule: Strictly better score wins
-                            if score > best_group_score:
-                                best_group_score = score
-                                best_group_idx = i
+                                # Decision Rule: Strictly better score wins
+                                if score > best_group_score:
+                                    best_group_score = score
+                                    best_group_idx = i
                                 
-                            # If score is very high, maybe break? For now, scan full window.
-                        else:
-                            # STANDARD FIFO Logic (Gap Filling)
-                            idx_cand = i
-                            mejor_candidato_futuro = None
-                            break
+                                # If score is very high, maybe break? For now, scan full window.
+                            else:
+                                # STANDARD FIFO Logic (Gap Filling)
+                                idx_cand = i
+                                mejor_candidato_futuro = None
+                                break
                     
-                    else:
-                        # Si no está lista ya, pero es runnable, la guardamos como opción futura
-                        if mejor_candidato_futuro is None:
-                            mejor_candidato_futuro = (i, available_at)
                         else:
-                            if available_at < mejor_candidato_futuro[1]:
+                            # Si no está lista ya, pero es runnable, la guardamos como opción futura
+                            if mejor_candidato_futuro is None:
                                 mejor_candidato_futuro = (i, available_at)
+                            else:
+                                if available_at < mejor_candidato_futuro[1]:
+                                    mejor_candidato_futuro = (i, available_at)
                             
-                    # -- LÓGICA FRANCOTIRADOR (SMART WAIT) --
-                    if es_setup:
-                         if mejor_candidato_setup is None:
-                             mejor_candidato_setup = (i, available_at)
-                             if "barniz" in maquina.lower(): log_debug(f"MARKING SETUP CANDIDATE: IDX {i}")
-                         else:
-                             # Safe Comparison: None means "Active Now" (Earlier than any future date)
-                             curr_dt = available_at if available_at else datetime.min
-                             best_dt = mejor_candidato_setup[1] if mejor_candidato_setup[1] else datetime.min
-                             
-                             if curr_dt < best_dt:
+                        # -- LÓGICA FRANCOTIRADOR (SMART WAIT) --
+                        if es_setup:
+                             if mejor_candidato_setup is None:
                                  mejor_candidato_setup = (i, available_at)
-                                 if "barniz" in maquina.lower(): log_debug(f"UPDATING SETUP CANDIDATE: IDX {i}")
+                             else:
+                                 # Safe Comparison: None means "Active Now" (Earlier than any future date)
+                                 curr_dt = available_at if available_at else datetime.min
+                                 best_dt = mejor_candidato_setup[1] if mejor_candidato_setup[1] else datetime.min
+                             
+                                 if curr_dt < best_dt:
+                                     mejor_candidato_setup = (i, available_at)
 
                 # END SEARCH LOOP
+                contadores[maquina]["candidatas"] += i + 1
                 
                 # Assign the best prioritized task if we found one
                 if mejor_candidato_prio_ready is not None:
@@ -1397,28 +1153,14 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                 
                 
                 # --- APPLY SMART WAIT / FRANCOTIRADOR LOGIC ---
-                TOLERANCIA = timedelta(minutes=90)
                 final_decision = None # (idx, dt)
 
-                if "barniz" in maquina.lower(): 
-                    log_debug(f"End Loop. IdxCand: {idx_cand}. BestFut: {mejor_candidato_futuro}. BestSetup: {mejor_candidato_setup}")
-
                 # 1. Si ya tenemos uno listo (idx_cand != -1), checkeamos si vale la pena ESPERAR por setup
                 #    PERO SOLO SI NO ES UNA PRIORIDAD MANUAL O EXCEL
                 is_manual_override = False
                 if idx_cand != -1:
                     t_sel = colas[maquina][idx_cand]
-                    
-                    p_man_chk = int(t_sel.get("ManualPriority", 9999))
-                    try: p_imp_chk = float(t_sel.get("PrioriImp", 9999))
-                    except (ValueError, TypeError): p_imp_chk = 9999
-                    try: p_tr_chk = float(t_sel.get("PrioriTr", 9999))
-                    except (ValueError, TypeError): p_tr_chk = 9999
-                    
-                    if pd.isna(p_imp_chk): p_imp_chk = 9999
-                    if pd.isna(p_tr_chk): p_tr_chk = 9999
-
-                    if p_man_chk < 9000 or p_imp_chk < 9999 or p_tr_chk < 9999:
+                    if t_sel.prio_man < 9000 or t_sel.prio_imp < 9999 or t_sel.prio_tro < 9999:
                         is_manual_override = True
 
                 if idx_cand != -1 and mejor_candidato_setup and not is_manual_override:
@@ -1427,17 +1169,14 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                          wait_time = mejor_candidato_setup[1] - current_agenda_dt
                          
                      if wait_time <= TOLERANCIA:
-                         if "barniz" in maquina.lower(): log_debug(f"FRANCOTIRADOR: Esperando {wait_time} por cand {mejor_candidato_setup[0]} (Setup)")
                          idx_cand = -1
                          final_decision = mejor_candidato_setup
                 
                 # 2. Si no tenemos uno listo...
                 elif idx_cand == -1:
                     if mejor_candidato_setup:
-                        if "barniz" in maquina.lower(): log_debug(f"No ready task. Picking Setup Candidate {mejor_candidato_setup[0]} future.")
                         final_decision = mejor_candidato_setup
                     elif mejor_candidato_futuro:
-                        if "barniz" in maquina.lower(): log_debug(f"No ready/setup task. Picking Normal Future {mejor_candidato_futuro[0]}.")
                         final_decision = mejor_candidato_futuro
 
                 # Si no encontramos ninguna lista YA, pero hay futuras, tomamos la mejor futura
@@ -1447,13 +1186,17 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
 
 
                     if future_dt:
-                        # Si hay tareas esperando dependencias, no podemos dormir eternamente
-                        if has_unrunnable_tasks:
-                            max_sleep_dt = current_agenda_dt + timedelta(hours=2)
-                            if future_dt > max_sleep_dt:
-                                future_dt = max_sleep_dt
-                                idx_cand = -1 # No ejecutar la tarea futura todavía, solo avanzar el reloj
-                                
+                        # Si hay tareas esperando dependencias, el reloj no salta a future_dt:
+                        # la máquina duerme con ese despertador y el motor la devuelve cuando el
+                        # recorrido en orden de reloj llega ahí, o antes si el bus avisa el fin
+                        # de un predecesor (entonces se re-evalúa con la sucesora disponible).
+                        if has_unrunnable_tasks and future_dt > current_agenda_dt:
+                            despertador = motor.despertador_vencido()
+                            if despertador is None or future_dt > despertador:
+                                contadores[maquina]["esperas"] += 1
+                                motor.dormir(maquina, future_dt)
+                                break
+
                         # AVANZAR EL RELOJ DE LA MÁQUINA (Solo aquí, cuando decidimos esperar)
                         # Lógica de salto de tiempo (respetando días hábiles)
                         fecha_destino = future_dt.date()
@@ -1466,15 +1209,11 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                         # Solo avanzamos si el destino es futuro (debería serlo por lógica anterior)
                         dest_dt = datetime.combine(fecha_destino, hora_destino)
                         if dest_dt > current_agenda_dt:
+                            contadores[maquina]["avances_reloj"] += 1
                             agenda[maquina]["fecha"] = fecha_destino
                             agenda[maquina]["hora"] = hora_destino
                             h_usadas = (hora_destino.hour - 7) + (hora_destino.minute / 60.0)
                             agenda[maquina]["resto_horas"] = max(0, h_dia - h_usadas)
-                            
-                        # Si decidimos solo avanzar el reloj para revisar de nuevo, rompemos el ciclo
-                        if idx_cand == -1:
-                            tareas_agendadas = True
-                            break
 
                 
                 # ==========================================================
@@ -1491,7 +1230,6 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                         # Si realmente estoy vacío y sin buffer, ahí sí salgo a robar
                         tarea_encontrada = None
                         fuente_maquina = None
-                        idx_robado = -1
 
                         # ------------------------------------------------------
                         # NUEVO: Robo desde el POOL (Prioridad Máxima para Descartonadoras)
@@ -1504,98 +1242,16 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                             if tiene_prio_en_cola:
                                 pass  # Espera: no roba del POOL cuando hay prio propias pendientes
                             else:
-                                best_pool_idx = -1
-                                best_pool_future = None # (idx, available_at)
-                                best_has_successor = False # Flag for priority
-                                best_is_urgent = False
                                 current_agenda_dt = datetime.combine(agenda[maquina]["fecha"], agenda[maquina]["hora"])
                                 maq_has_imminent_downtime = has_imminent_downtime(maquina, current_agenda_dt, cfg)
 
-                                for i, t_cand in enumerate(colas["POOL_DESCARTONADO"]):
-                                    # Validar MP
-                                    mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                    mp_ok = mp in ("false", "0", "no", "falso", "") or not t_cand.get("MateriaPrimaPlanta")
-                                    
-                                    if cfg.get("ignore_constraints"):
-                                        mp_ok = True
-
-                                    if not mp_ok: continue
-                                    
-                                    runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                    
-                                    if not runnable: continue
-
-                                    # Check for successors (Pegado, Ventana, etc.)
-                                    has_successor = False
-                                    for k, v in t_cand.items():
-                                        if k.startswith("_PEN_") and str(v).lower() == "si":
-                                            proc_pend = k.replace("_PEN_", "").lower()
-                                            if "descartonado" not in proc_pend and "impres" not in proc_pend and "troquel" not in proc_pend:
-                                                has_successor = True
-                                                break
-                                    
-                                    # Si está lista YA
-                                    if not available_at or available_at <= current_agenda_dt:
-                                        # 0. PrioriDesc o ManualPriority (menor es mejor)
-                                        # 1. Urgente sobre no-urgente si misma prioridad
-                                        # 2. Con sucesor sobre sin sucesor si mismo todo
-                                        try:
-                                            prio_desc_cand = float(t_cand.get("PrioriDesc", 9999) or 9999)
-                                            if pd.isna(prio_desc_cand): prio_desc_cand = 9999
-                                        except (ValueError, TypeError):
-                                            prio_desc_cand = 9999
-                                        current_prio = min(int(t_cand.get("ManualPriority", 9999)), int(prio_desc_cand))
-                                        is_urgent = es_si(t_cand.get("Urgente"))
-                                        
-                                        if is_urgent and maq_has_imminent_downtime:
-                                             current_prio += 5000
-                                             is_urgent = False
-                                        
-                                        if best_pool_idx == -1:
-                                            best_pool_idx = i
-                                            best_has_successor = has_successor
-                                            best_is_urgent = is_urgent
-                                            best_prio = current_prio
-                                        else:
-                                            if current_prio < best_prio:
-                                                best_pool_idx = i
-                                                best_has_successor = has_successor
-                                                best_is_urgent = is_urgent
-                                                best_prio = current_prio
-                                            elif current_prio > best_prio:
-                                                pass
-                                            else:
-                                                if is_urgent and not best_is_urgent:
-                                                    best_pool_idx = i
-                                                    best_has_successor = has_successor
-                                                    best_is_urgent = True
-                                                    best_prio = current_prio
-                                                elif not is_urgent and best_is_urgent:
-                                                    pass
-                                                else:
-                                                    if has_successor and not best_has_successor:
-                                                        best_pool_idx = i
-                                                        best_has_successor = True
-                                                        best_is_urgent = is_urgent
-                                                        best_prio = current_prio
-                                        continue
-                                    
-                                    # Si es futura
-                                    if best_pool_future is None:
-                                        best_pool_future = (i, available_at)
-                                    else:
-                                        if available_at < best_pool_future[1]:
-                                            best_pool_future = (i, available_at)
-                                
-                                # Decisión final del POOL
-                                idx_robado = -1
-                                if best_pool_idx != -1:
-                                    idx_robado = best_pool_idx
-                                elif best_pool_future:
-                                    idx_robado = best_pool_future[0]
-                                
-                                if idx_robado != -1:
-                                    tarea_encontrada = colas["POOL_DESCARTONADO"][idx_robado]
+                                # Lista YA con menor (PrioriDesc o ManualPriority, no urgente, sin sucesor)
+                                # (con paro inminente las urgentes van al final); si no hay, la futura
+                                # que antes queda disponible. A igualdad, la primera del POOL.
+                                vista_pool = _vista_robo(maquina, "POOL_DESCARTONADO", "POOL")
+                                t_pool = vista_pool.primera(current_agenda_dt, 1 if maq_has_imminent_downtime else 0) or vista_pool.futura()
+                                if t_pool is not None:
+                                    tarea_encontrada = t_pool
                                     fuente_maquina = "POOL_DESCARTONADO"
                         
                         if tarea_encontrada:
@@ -1607,29 +1263,9 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                             # NO robar si la máquina tiene prioridades propias esperando
                             if tiene_prio_en_cola:
                                 break
-                            # Targets: Manuales + Iberica
-                            targets_robo = manuales 
-                            for m_target in targets_robo:
-                                if not colas.get(m_target): continue
-                                for i, t_cand in enumerate(colas[m_target]):
-                                    if t_cand.get("ManualAssignment"): continue
-                                    if t_cand["Proceso"].strip() != "Troquelado": continue
-
-                                    cant = float(t_cand.get("CantidadPliegos", 0) or 0)
-                                    if cant < 3000: continue
-                                    
-                                    # Validar medidas para Auto (Min 38x38)
-                                    anc = float(t_cand.get("PliAnc", 0) or 0); lar = float(t_cand.get("PliLar", 0) or 0)
-                                    if not validar_medidas_troquel(maquina, anc, lar): continue
-
-                                    mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                    mp_ok = mp in ("false", "0", "no", "falso", "") or not t_cand.get("MateriaPrimaPlanta")
-                                    if not mp_ok: continue
-                                    
-                                    runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                    if runnable and (not available_at or available_at <= current_agenda_dt):
-                                        tarea_encontrada = t_cand; fuente_maquina = m_target; idx_robado = i; break
-                                if tarea_encontrada: break
+                            # Targets: Manuales + Iberica. Solo tiradas >= 3000, medidas válidas
+                            # para la automática (mín. 38x38) y materia prima en planta.
+                            tarea_encontrada, fuente_maquina = _robar_de(maquina, manuales, "A", current_agenda_dt)
 
                         # B y C: Manual roba a Auto o Manual o Iberica
                         elif any(m in maquina for m in manuales):
@@ -1637,54 +1273,15 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                             if tiene_prio_en_cola:
                                 break
                             # B: Robar a Automáticas
-                            if auto_names:
-                                for a_maq in auto_names:
-                                    if a_maq == maquina: continue # Por si acaso
-                                    if not colas.get(a_maq): continue
-                                    
-                                    for i, t_cand in enumerate(colas[a_maq]):
-                                        if t_cand.get("ManualAssignment"): continue
-                                        if t_cand["Proceso"].strip() != "Troquelado": continue
-                                        
-                                        # REGLA: Manual solo roba si cantidad <= 3000 (o 2500 según config)
-                                        cant = float(t_cand.get("CantidadPliegos", 0) or 0)
-                                        if cant > 2500: continue 
-
-                                        # Validar medidas para ESTA manual
-                                        anc = float(t_cand.get("PliAnc", 0) or 0); lar = float(t_cand.get("PliLar", 0) or 0)
-                                        if not validar_medidas_troquel(maquina, anc, lar): continue
-                                        
-                                        mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                        no_hay_mp = mp in ("false", "0", "no", "falso")
-                                        if no_hay_mp: continue
-                                        
-                                        runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                        if runnable and (not available_at or available_at <= current_agenda_dt):
-                                            tarea_encontrada = t_cand; fuente_maquina = a_maq; idx_robado = i; break
-                                    if tarea_encontrada: break
+                            # REGLA: Manual solo roba si cantidad <= 3000 (o 2500 según config),
+                            # con medidas válidas para ESTA manual
+                            tarea_encontrada, fuente_maquina = _robar_de(
+                                maquina, [a_maq for a_maq in auto_names if a_maq != maquina], "B", current_agenda_dt)
                             
                             # C: Robar a Vecina Manual
                             if not tarea_encontrada:
-                                # Targets: Otras Manuales
                                 vecinas = [m for m in manuales if m != maquina]
-                                for vecina in vecinas:
-                                    if not colas.get(vecina): continue
-                                    for i, t_cand in enumerate(colas[vecina]):
-                                        if t_cand.get("ManualAssignment"): continue
-                                        if t_cand["Proceso"].strip() != "Troquelado": continue
-                                        
-                                        # Validar medidas para ESTA manual
-                                        anc = float(t_cand.get("PliAnc", 0) or 0); lar = float(t_cand.get("PliLar", 0) or 0)
-                                        if not validar_medidas_troquel(maquina, anc, lar): continue
-
-                                        mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                        no_hay_mp = mp in ("false", "0", "no", "falso")
-                                        if no_hay_mp: continue
-                                        
-                                        runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                        if runnable and (not available_at or available_at <= current_agenda_dt):
-                                            tarea_encontrada = t_cand; fuente_maquina = vecina; idx_robado = i; break
-                                    if tarea_encontrada: break
+                                tarea_encontrada, fuente_maquina = _robar_de(maquina, vecinas, "C", current_agenda_dt)
 
                         # # Z: Iberica roba a Auto o Manual
                         # elif any(m in maquina for m in iberica):
@@ -1710,23 +1307,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                             
                             # Z.2: Robar a Manuales
                             if not tarea_encontrada:
-                                for m_manual in manuales:
-                                    if not colas.get(m_manual): continue
-                                    for i, t_cand in enumerate(colas[m_manual]):
-                                        if t_cand.get("ManualAssignment"): continue
-                                        if t_cand["Proceso"].strip() != "Troquelado": continue
-                                    
-                                        anc = float(t_cand.get("PliAnc", 0) or 0); lar = float(t_cand.get("PliLar", 0) or 0)
-                                        if not validar_medidas_troquel(maquina, anc, lar): continue
-
-                                        mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                        mp_ok = mp in ("false", "0", "no", "falso", "") or not t_cand.get("MateriaPrimaPlanta")
-                                        if not mp_ok: continue
-                                        
-                                        runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                        if runnable and (not available_at or available_at <= current_agenda_dt):
-                                            tarea_encontrada = t_cand; fuente_maquina = m_manual; idx_robado = i; break
-                                    if tarea_encontrada: break
+                                tarea_encontrada, fuente_maquina = _robar_de(maquina, manuales, "Z", current_agenda_dt)
 
                         # D: Robo entre Descartonadoras
                         # Tampoco roban si son las restringidas
@@ -1734,28 +1315,20 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                             # NO robar si la máquina tiene prioridades propias esperando
                             if not tiene_prio_en_cola:
                                 vecinas_desc = [m for m in colas.keys() if "descartonad" in m.lower() and m != maquina]
-                                for vecina in vecinas_desc:
-                                    if not colas.get(vecina): continue
-                                    for i, t_cand in enumerate(colas[vecina]):
-                                        if t_cand.get("ManualAssignment"): continue
-                                        if "descartonad" not in t_cand["Proceso"].lower(): continue
-                                        mp = str(t_cand.get("MateriaPrimaPlanta")).strip().lower()
-                                        mp_ok = mp in ("false", "0", "no", "falso", "") or not t_cand.get("MateriaPrimaPlanta")
-                                        if not mp_ok: continue
-                                        
-                                        runnable, available_at = verificar_disponibilidad(t_cand, maquina)
-                                        if runnable and (not available_at or available_at <= current_agenda_dt):
-                                            tarea_encontrada = t_cand; fuente_maquina = vecina; idx_robado = i; break
-                                    if tarea_encontrada: break
+                                tarea_encontrada, fuente_maquina = _robar_de(maquina, vecinas_desc, "D", current_agenda_dt)
 
                         # Ejecutar Robo
                         if tarea_encontrada:
-                            tarea_para_mover = colas[fuente_maquina][idx_robado]
-                            del colas[fuente_maquina][idx_robado]
-                            tarea_para_mover["Maquina"] = maquina 
+                            tarea_para_mover = tarea_encontrada
+                            colas[fuente_maquina].remove(tarea_para_mover)
+                            prioritarias[fuente_maquina].discard(tarea_para_mover)
+                            tarea_para_mover.asignar_maquina(maquina)
                             colas[maquina].appendleft(tarea_para_mover)
+                            if tarea_para_mover.prioritaria:
+                                prioritarias[maquina].add(tarea_para_mover)
                             idx_cand = 0
                             tarea_robada = True
+                            contadores[maquina]["robos"] += 1
                         else:
                             break
 
@@ -1770,6 +1343,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                     if not tarea_robada and idx_cand > 0:
                         t_final = colas[maquina][idx_cand]
                         del colas[maquina][idx_cand]
+                        prioritarias[maquina].discard(t_final)
                         se_ejecuta_ya = True
                     
                     # CASO 2: NORMAL (Tope de Cola o Robado)
@@ -1780,6 +1354,7 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                         t_candidata = colas[maquina][0]
                         if se_ejecuta_ya:
                             t_final = colas[maquina].popleft()
+                            prioritarias[maquina].discard(t_final)
                     
                     #========================================
                     # PASO 4: EJECUCIÓN FINAL
@@ -1849,9 +1424,9 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                                          {"Setup_min": round(setup_min, 2), "Proceso_h": round(proc_h, 3),
                                           "Inicio": inicio, "Fin": fin, "Duracion_h": round(total_h, 3), "Motivo": motivo})
 
-                            fin_proceso[t["OT_id"]][proceso_nombre] = fin
-                            completado[t["OT_id"]].add(proceso_nombre)
+                            registrar_fin(t["OT_id"], proceso_nombre, fin)
                             ultimo_en_maquina[maquina] = t
+                            contadores[maquina]["agendadas"] += 1
                             progreso = True; tareas_agendadas = True
                             tasks_scheduled_count += 1
 
@@ -1885,10 +1460,10 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                                      {"Setup_min": round(setup_min, 2), "Proceso_h": round(proc_h, 3),
                                       "Inicio": inicio_real, "Fin": fin_real, "Duracion_h": round(total_h, 3), "Motivo": motivo})
 
-                        fin_proceso[t["OT_id"]][proceso_nombre] = fin_real
-                        completado[t["OT_id"]].add(proceso_nombre)
+                        registrar_fin(t["OT_id"], proceso_nombre, fin_real)
                         
                         ultimo_en_maquina[maquina] = t
+                        contadores[maquina]["agendadas"] += 1
                         progreso = True
                         tareas_agendadas = True
                         tasks_scheduled_count += 1
@@ -1896,12 +1471,14 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
                         if tarea_robada:
                             break # Salir del while de tareas_agendadas para reevaluar la cola
 
+            _tras_intento(maquina, huella_antes, largos_antes)
             if tasks_scheduled_count > 0:
                 break # Yield GLOBAL para todas las máquinas (resincronizar relojes)
 
     # =================================================================
     # 6. SALIDAS 
     # =================================================================
+    perfil.marcar("6. Salidas")
 
     schedule = pd.DataFrame(filas)
     if not schedule.empty:
@@ -2003,5 +1580,6 @@ def programar(df_ordenes, cfg, start=date.today(), start_time=None, debug=False)
             .apply(lambda x: x.reset_index(drop=True))
             .reset_index(level=0)
         )
-            
+
+    schedule.attrs["rendimiento"] = perfil.reporte()
     return schedule, carga_md, resumen_ot, detalle_maquina
@@ -1,6 +1,112 @@
+from bisect import bisect_left, bisect_right, insort_right
 from datetime import datetime, timedelta, time
-from modules.utils import config_loader as hours_module
-from modules.utils.config_loader import proximo_dia_habil
+from modules.utils.config_loader import obtener_calendario
+
+_INICIO_JORNADA = time(7, 0)
+_ALMUERZO = (time(13, 30), time(14, 0))
+
+
+class _Paros:
+    """
+    Lista de paros ordenada por inicio (orden estable, como el sort original)
+    con el máximo acumulado de los fines, para responder en O(log n):
+      - el primer paro (en orden) que contiene un instante
+      - el primer inicio de paro dentro de un rango
+    """
+    __slots__ = ("inicios", "fines", "_max_fin")
+
+    def __init__(self, paros):
+        self.inicios = [p[0] for p in paros]
+        self.fines = [p[1] for p in paros]
+        self._max_fin = []
+        for fin in self.fines:
+            self._max_fin.append(fin if not self._max_fin or fin > self._max_fin[-1] else self._max_fin[-1])
+
+    def fin_si_contiene(self, instante):
+        """Fin del primer paro con inicio <= instante < fin, o None."""
+        hasta = bisect_right(self.inicios, instante)
+        j = bisect_right(self._max_fin, instante)
+        return self.fines[j] if j < hasta else None
+
+    def proximo_inicio(self, desde, hasta):
+        """Primer inicio de paro en [desde, hasta), o None."""
+        j = bisect_left(self.inicios, desde)
+        if j < len(self.inicios) and self.inicios[j] < hasta:
+            return self.inicios[j]
+        return None
+
+    def fin_si_empieza(self, instante):
+        """Fin del primer paro que empieza exactamente en 'instante', o None."""
+        j = bisect_left(self.inicios, instante)
+        if j < len(self.inicios) and self.inicios[j] == instante:
+            return self.fines[j]
+        return None
+
+
+class CalendarioMaquina:
+    """
+    Índice del calendario de una máquina durante una corrida del scheduler.
+
+    Se apoya en el Calendario del plan (horas por día, días hábiles y paros
+    ya ordenados de la máquina). Por día se cachean además el fin de turno
+    (07:00 + horas + 30' de almuerzo) y los paros activos del día (paros +
+    almuerzo 13:30-14:00), así cada paso de la reserva es una búsqueda
+    binaria en vez de recorrer y reordenar la lista de paros.
+    """
+
+    def __init__(self, nombre, cfg):
+        self.nombre = nombre
+        self.cfg = cfg
+        self.calendario = obtener_calendario(cfg)
+        self._paros_lista = self.calendario.paros(nombre)
+        self.paros = _Paros(self._paros_lista)
+        self._dias = {}
+
+    def dia(self, fecha):
+        """(horas del día, fin de turno, paros activos del día) para 'fecha'."""
+        info = self._dias.get(fecha)
+        if info is None:
+            h_dia = self.calendario.horas(fecha, self.nombre)
+            fin_turno = datetime.combine(fecha, _INICIO_JORNADA) + timedelta(hours=h_dia + 0.5)
+            paros_dia = list(self._paros_lista)
+            almuerzo = (datetime.combine(fecha, _ALMUERZO[0]), datetime.combine(fecha, _ALMUERZO[1]))
+            insort_right(paros_dia, almuerzo, key=lambda x: x[0])
+            info = self._dias[fecha] = (h_dia, fin_turno, _Paros(paros_dia))
+        return info
+
+    def proximo_habil(self, fecha):
+        """Primer día hábil de la máquina a partir de 'fecha' (inclusive)."""
+        return self.calendario.proximo_habil(fecha, self.nombre)
+
+
+def _calendario(agenda_m, nombre_maquina, cfg):
+    """Calendario cacheado en la propia agenda de la máquina (vive lo que dura la corrida)."""
+    cal = agenda_m.get("_calendario")
+    if cal is None or cal.cfg is not cfg or cal.nombre != nombre_maquina:
+        cal = agenda_m["_calendario"] = CalendarioMaquina(nombre_maquina, cfg)
+    return cal
+
+
+def adelantar_agenda(agenda_m, instante, cfg):
+    """
+    Mueve la agenda de la máquina hasta 'instante' (ej. fin de un bloque ya
+    comprometido) si está más adelante que su hora actual. El resto del día
+    son las horas productivas que quedan hasta el fin de turno, sin almuerzo.
+    Devuelve True si la movió.
+    """
+    if instante <= datetime.combine(agenda_m["fecha"], agenda_m["hora"]):
+        return False
+    cal = _calendario(agenda_m, agenda_m.get("nombre"), cfg)
+    fecha = instante.date()
+    h_dia, fin_turno, _ = cal.dia(fecha)
+    ini_alm, fin_alm = (datetime.combine(fecha, t) for t in _ALMUERZO)
+    libre = (fin_turno - instante).total_seconds() / 3600.0
+    almuerzo = (min(fin_alm, fin_turno) - max(ini_alm, instante)).total_seconds() / 3600.0
+    agenda_m["fecha"] = fecha
+    agenda_m["hora"] = instante.time()
+    agenda_m["resto_horas"] = min(h_dia, max(0.0, libre - max(0.0, almuerzo)))
+    return True
+
 
 def _reservar_en_agenda(agenda_m, horas_necesarias, cfg):
     """
@@ -11,9 +117,6 @@ def _reservar_en_agenda(agenda_m, horas_necesarias, cfg):
     fecha = agenda_m["fecha"]
     hora_actual = datetime.combine(fecha, agenda_m["hora"])
     resto = agenda_m["resto_horas"]
-    
-    # h_dia ahora es dinamico dentro del loop
-    # h_dia = horas_por_dia(cfg) 
 
     bloques = []
     h = horas_necesarias
@@ -23,109 +126,73 @@ def _reservar_en_agenda(agenda_m, horas_necesarias, cfg):
         or agenda_m.get("Maquina")
         or agenda_m.get("maquina")
     )
-
-    # Obtener todos los paros relevantes de la máquina
-    paros_maquina = [
-        (p["start"], p["end"])
-        for p in cfg.get("downtimes", [])
-        if str(p.get("maquina") or p.get("Maquina", ""))
-            .strip()
-            .lower()
-            == str(nombre_maquina).strip().lower()
-    ]
-    paros_maquina.sort(key=lambda x: x[0])
+    cal = _calendario(agenda_m, nombre_maquina, cfg)
 
     while h > 1e-9:
-        # 1. Calcular duración del día dinámicamente POR MÁQUINA
-        h_dia_hoy = hours_module.get_horas_totales_dia(fecha, cfg, maquina=nombre_maquina)
-        
+        # 1. Duración del día y fin de turno POR MÁQUINA (cacheados)
+        h_dia_hoy, fin_turno, paros_activos = cal.dia(fecha)
+
         # Si hoy no hay horas (ej. feriado sin extras), saltar al próximo
         if h_dia_hoy <= 0:
-            fecha = proximo_dia_habil(fecha + timedelta(days=1), cfg, maquina=nombre_maquina)
-            hora_actual = datetime.combine(fecha, time(7, 0))
+            fecha = cal.proximo_habil(fecha + timedelta(days=1))
+            hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
             # Recalcular resto para el nuevo día
-            resto = hours_module.get_horas_totales_dia(fecha, cfg, maquina=nombre_maquina)
+            resto = cal.dia(fecha)[0]
             continue
 
         # Si llegamos a un nuevo día, el resto debe ser el total de ese día
-        if hora_actual.time() == time(7, 0):
-             resto = h_dia_hoy
-
-        # PAUSA FIJA DE ALMUERZO (13:30 → 14:00) para el día actual
-        almuerzo_inicio = datetime.combine(fecha, time(13, 30))
-        almuerzo_fin = datetime.combine(fecha, time(14, 0))
-        
-        # Combinar paros configurados con el almuerzo del día
-        paros_activos = paros_maquina + [(almuerzo_inicio, almuerzo_fin)]
-        paros_activos.sort(key=lambda x: x[0])
+        if hora_actual.time() == _INICIO_JORNADA:
+            resto = h_dia_hoy
 
         # Si no queda resto de día → avanzar al siguiente día hábil
         if resto <= 1e-9:
-            fecha = proximo_dia_habil(fecha + timedelta(days=1), cfg, maquina=nombre_maquina)
-            hora_actual = datetime.combine(fecha, time(7, 0))
-            # resto se actualizará en la siguiente iteración
+            fecha = cal.proximo_habil(fecha + timedelta(days=1))
+            hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
             continue
 
-        # Si estamos dentro de un paro → avanzar al final del paro
-        dentro_paro = False
-        for inicio, fin in paros_activos:
-            if inicio <= hora_actual < fin:
-                hora_actual = fin
-                dentro_paro = True
-                break
-        
-        if dentro_paro:
+        # Si estamos dentro de un paro (o del almuerzo) → avanzar al final del paro
+        fin_paro = paros_activos.fin_si_contiene(hora_actual)
+        if fin_paro is not None:
+            hora_actual = fin_paro
             continue
 
-        # CALCULO DE FIN DE TURNO DINÁMICO
-        inicio_jornada = datetime.combine(fecha, time(7, 0))
-        duracion_bruta_h = h_dia_hoy + 0.5 # Sumamos la media hora de almuerzo
-        fin_turno = inicio_jornada + timedelta(hours=duracion_bruta_h)
-        
+        paso = timedelta(hours=min(h, resto))
+        if paso.total_seconds() / 3600.0 <= 1e-5:
+            if h <= resto:
+                # Lo que falta reservar es despreciable
+                break
+            if hora_actual >= datetime.combine(fecha, _INICIO_JORNADA):
+                # El resto del día es despreciable: ningún bloque entra hoy
+                # (equivale a avanzar de a 1 minuto hasta el fin de turno).
+                fecha = cal.proximo_habil(fecha + timedelta(days=1))
+                hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
+                continue
+
         limite_fin_dia = min(
             fin_turno,
             hora_actual + timedelta(hours=h, minutes=1) # +1 min buffer
         )
 
-        # Buscar el próximo paro que interfiera
-        proximo_paro = None
-        for inicio, fin in paros_activos:
-            if inicio >= hora_actual and inicio < limite_fin_dia:
-                proximo_paro = inicio
-                break
-
-        # Determinar fin del bloque a reservar
-        if proximo_paro:
-            fin_bloque = min(
-                proximo_paro,
-                hora_actual + timedelta(hours=min(h, resto))
-            )
-        else:
-            fin_bloque = min(
-                limite_fin_dia,
-                hora_actual + timedelta(hours=min(h, resto))
-            )
+        # Próximo paro que interfiera y fin del bloque a reservar
+        proximo_paro = paros_activos.proximo_inicio(hora_actual, limite_fin_dia)
+        fin_bloque = min(proximo_paro or limite_fin_dia, hora_actual + paso)
 
         # Validar bloqueo por redondeo (loop infinito protection)
         if fin_bloque <= hora_actual:
-             if proximo_paro and proximo_paro > hora_actual:
-                  hora_actual = proximo_paro
-             else:
-                  fecha = proximo_dia_habil(fecha + timedelta(days=1), cfg, maquina=nombre_maquina)
-                  hora_actual = datetime.combine(fecha, time(7, 0))
-             continue
+            fecha = cal.proximo_habil(fecha + timedelta(days=1))
+            hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
+            continue
 
         # Duración efectiva del bloque
         duracion_h = (fin_bloque - hora_actual).total_seconds() / 3600.0
 
-        if duracion_h <= 1e-5: 
-             if hora_actual >= fin_turno:
-                fecha = proximo_dia_habil(fecha + timedelta(days=1), cfg, maquina=nombre_maquina)
-                hora_actual = datetime.combine(fecha, time(7, 0))
-                continue
-             else:
-                 hora_actual += timedelta(minutes=1)
-                 continue
+        if duracion_h <= 1e-5:
+            if hora_actual >= fin_turno:
+                fecha = cal.proximo_habil(fecha + timedelta(days=1))
+                hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
+            else:
+                hora_actual += timedelta(minutes=1)
+            continue
 
         # Registrar bloque válido
         bloques.append((hora_actual, fin_bloque))
@@ -134,21 +201,18 @@ def _reservar_en_agenda(agenda_m, horas_necesarias, cfg):
         hora_actual = fin_bloque
         resto -= duracion_h
         h -= duracion_h
-        
+
         if resto < 0: resto = 0
 
         # Si terminamos justo en el inicio de un paro → saltarlo
-        for inicio, fin in paros_maquina:
-            if abs((hora_actual - inicio).total_seconds()) < 1e-6:
-                hora_actual = fin
-                break
+        fin_paro = cal.paros.fin_si_empieza(hora_actual)
+        if fin_paro is not None:
+            hora_actual = fin_paro
 
         # Fin del turno → siguiente día hábil
         if hora_actual >= fin_turno:
-            fecha = proximo_dia_habil(
-                hora_actual.date() + timedelta(days=1), cfg, maquina=nombre_maquina
-            )
-            hora_actual = datetime.combine(fecha, time(7, 0))
+            fecha = cal.proximo_habil(hora_actual.date() + timedelta(days=1))
+            hora_actual = datetime.combine(fecha, _INICIO_JORNADA)
 
     # Guardar estado final de agenda
     agenda_m["fecha"] = hora_actual.date()
@@ -0,0 +1,359 @@
+import heapq
+from bisect import insort, bisect_left
+from collections import Counter, defaultdict, deque
+
+from modules.utils.tiempos_y_setup import usa_setup_menor, claves_setup_menor
+
+
+class _Clasificacion:
+    """
+    Posiciones de una cola clasificadas por disponibilidad frente a un reloj:
+      - listas:     ejecutables ya; heap por (orden, posición)
+      - futuras:    ejecutables más adelante; ordenadas por (disponible, posición)
+      - bloqueadas: esperando predecesores
+
+    `ordenes` son funciones tarea -> clave: cada una mantiene su propio heap de
+    listas (`primera_lista(n)`). Sin ordenes, las listas van por posición.
+    """
+
+    def __init__(self, ordenes=()):
+        self._ordenes = ordenes
+        self._heaps = [[] for _ in range(max(1, len(ordenes)))]
+        self._claves = {}           # posición -> claves de orden
+        self.disponible = {}        # posición -> datetime disponible (listas y futuras)
+        self.en_listas = set()
+        self.futuras = []           # [(disponible, posición)] ordenada
+        self.bloqueadas = set()
+        self.reloj = None
+
+    def __contains__(self, pos):
+        return pos in self._claves
+
+    def agregar(self, pos, t, runnable, disponible):
+        self._claves[pos] = [f(t) for f in self._ordenes] or [pos]
+        if not runnable:
+            self.bloqueadas.add(pos)
+            return
+        self.disponible[pos] = disponible
+        if disponible is None or (self.reloj is not None and disponible <= self.reloj):
+            self._a_listas(pos)
+        else:
+            insort(self.futuras, (disponible, pos))
+
+    def _a_listas(self, pos):
+        self.en_listas.add(pos)
+        for heap, clave in zip(self._heaps, self._claves[pos]):
+            heapq.heappush(heap, (clave, pos))
+
+    def quitar(self, pos):
+        if self._claves.pop(pos, None) is None:
+            return
+        if pos in self.bloqueadas:
+            self.bloqueadas.discard(pos)
+            return
+        disponible = self.disponible.pop(pos, None)
+        if pos in self.en_listas:
+            self.en_listas.discard(pos)     # los heaps se limpian al consultar
+        else:
+            i = bisect_left(self.futuras, (disponible, pos))
+            if i < len(self.futuras) and self.futuras[i] == (disponible, pos):
+                del self.futuras[i]
+
+    def reclasificar(self, pos, t, runnable, disponible):
+        if pos in self._claves:
+            self.quitar(pos)
+            self.agregar(pos, t, runnable, disponible)
+
+    def mover_reloj(self, reloj):
+        if self.reloj is not None and reloj < self.reloj:
+            # El reloj retrocedió: las listas que ya no lo están vuelven a futuras
+            for pos in [p for p in self.en_listas if self.disponible[p] is not None and self.disponible[p] > reloj]:
+                self.en_listas.discard(pos)
+                insort(self.futuras, (self.disponible[pos], pos))
+        self.reloj = reloj
+        promovidas = 0
+        while promovidas < len(self.futuras) and self.futuras[promovidas][0] <= reloj:
+            self._a_listas(self.futuras[promovidas][1])
+            promovidas += 1
+        if promovidas:
+            del self.futuras[:promovidas]
+
+    def primera_lista(self, orden=0):
+        heap = self._heaps[orden]
+        while heap and heap[0][1] not in self.en_listas:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else None
+
+
+class VistaRobo:
+    """
+    Tareas de una cola que otra máquina puede robar (`filtro`), clasificadas
+    contra el reloj de la máquina que roba. La cola de origen la mantiene al
+    día en cada mutación y cada vez que cambia la disponibilidad de una tarea.
+
+    `primera(reloj)` es la primera tarea lista en orden de cola (o en el orden
+    `ordenes[n]` si se pide), `futura()` la ejecutable que antes queda disponible.
+    """
+
+    def __init__(self, cola, filtro, ordenes=()):
+        self._cola = cola
+        self.filtro = filtro
+        self._clasif = _Clasificacion(ordenes)
+
+    def primera(self, reloj, orden=0):
+        self._clasif.mover_reloj(reloj)
+        pos = self._clasif.primera_lista(orden)
+        return self._cola._tareas[pos] if pos is not None else None
+
+    def futura(self):
+        if not self._clasif.futuras:
+            return None
+        return self._cola._tareas[self._clasif.futuras[0][1]]
+
+
+class ColaIndexada(deque):
+    """
+    Cola de una máquina (deque de Tarea, en el orden de los builders) con
+    índices para resolver el PASO 1 sin recorrerla entera.
+
+    Cada tarea admitida (materia prima en planta o prioridad manual) está en
+    uno de tres índices según su disponibilidad frente al reloj de la máquina:
+      - listas:     ejecutables ya; heap por posición en la cola
+      - futuras:    ejecutables más adelante; ordenadas por (disponible, posición)
+      - bloqueadas: esperando predecesores
+
+    Además agrupa las tareas por familia de setup (claves_setup_menor: troquel,
+    cliente+colores, cliente+tamaño, tipo+material de pegado, materia prima)
+    para encontrar la candidata de setup menor con un lookup.
+
+    La posición es una clave creciente en el orden de la deque: las tareas que
+    entran por delante (robos, buffer) toman claves menores a todas. Las
+    mutaciones de deque que usa el núcleo (popleft, appendleft, extendleft,
+    remove, del, append, pop, clear) mantienen los índices; quitar una tarea
+    de los índices es por clave (handle), sin recorrer.
+
+    Las tareas cambian de índice cuando el reloj avanza (`buscar_candidata`) o
+    cuando termina un predecesor (`IndiceColas.actualizar`).
+
+    Las máquinas que roban de esta cola lo hacen por vistas (`vista`): cada
+    una ve, con su propio reloj, las tareas que pasan su filtro.
+    """
+
+    def __init__(self, tareas=(), indice=None, maquina=None):
+        super().__init__()
+        self._indice = indice
+        self.maquina = maquina
+        self._clave = {}            # id(tarea) -> posición
+        self._tareas = {}           # posición -> tarea
+        self._clasif = _Clasificacion()     # tareas admitidas, contra el reloj de la máquina
+        self._vistas = []
+        self._familias = defaultdict(set)   # (proceso, clave de setup) -> {posición}
+        self._claves_setup = {}             # posición -> [(proceso, clave de setup)]
+        self._procesos = Counter()          # proceso -> tareas en cola
+        self._frente = 0
+        self._fondo = -1
+        # Tareas admitidas con prioridad efectiva en esta máquina: con alguna
+        # el núcleo usa el recorrido completo (bloqueos por prioridad)
+        self.con_prioridad = 0
+        self.extend(tareas)
+
+    # --- Mutaciones de deque -------------------------------------------------
+    def append(self, t):
+        super().append(t)
+        self._fondo += 1
+        self._agregar(t, self._fondo)
+
+    def extend(self, tareas):
+        for t in tareas:
+            self.append(t)
+
+    def appendleft(self, t):
+        super().appendleft(t)
+        self._frente -= 1
+        self._agregar(t, self._frente)
+
+    def extendleft(self, tareas):
+        for t in tareas:
+            self.appendleft(t)
+
+    def popleft(self):
+        t = super().popleft()
+        self._quitar(t)
+        return t
+
+    def pop(self):
+        t = super().pop()
+        self._quitar(t)
+        return t
+
+    def remove(self, t):
+        super().remove(t)
+        self._quitar(t)
+
+    def __delitem__(self, i):
+        t = self[i]
+        super().__delitem__(i)
+        self._quitar(t)
+
+    def clear(self):
+        for t in list(self):
+            self._quitar(t)
+        super().clear()
+
+    # --- Índices --------------------------------------------------------------
+    def _admitida(self, t):
+        return t.mp_ok or t.prio_man < 9000 or (self._indice is not None and self._indice.ignorar_mp)
+
+    def _disponibilidad(self, t):
+        return self._indice.disponibilidad(t, self.maquina) if self._indice is not None else (True, None)
+
+    def _agregar(self, t, clave):
+        self._clave[id(t)] = clave
+        self._tareas[clave] = t
+        if self._indice is not None:
+            self._indice._ubicacion[id(t)] = self
+        admitida = self._admitida(t)
+        vistas = [v for v in self._vistas if v.filtro(t)]
+        if not admitida and not vistas:
+            return
+        runnable, disponible = self._disponibilidad(t)
+        for v in vistas:
+            v._clasif.agregar(clave, t, runnable, disponible)
+        if not admitida:
+            return
+        if t.tiene_prioridad:
+            self.con_prioridad += 1
+        proceso = t.get("Proceso", "")
+        self._procesos[proceso] += 1
+        familias = self._claves_setup[clave] = [(proceso, k) for k in claves_setup_menor(t, proceso)]
+        for familia in familias:
+            self._familias[familia].add(clave)
+        self._clasif.agregar(clave, t, runnable, disponible)
+
+    def _quitar(self, t):
+        clave = self._clave.pop(id(t), None)
+        if clave is None:
+            return
+        del self._tareas[clave]
+        if self._indice is not None and self._indice._ubicacion.get(id(t)) is self:
+            del self._indice._ubicacion[id(t)]
+        for v in self._vistas:
+            v._clasif.quitar(clave)
+        if clave not in self._clasif:
+            return
+        if t.tiene_prioridad:
+            self.con_prioridad -= 1
+        proceso = t.get("Proceso", "")
+        self._procesos[proceso] -= 1
+        if not self._procesos[proceso]:
+            del self._procesos[proceso]
+        for familia in self._claves_setup.pop(clave):
+            grupo = self._familias[familia]
+            grupo.discard(clave)
+            if not grupo:
+                del self._familias[familia]
+        self._clasif.quitar(clave)
+
+    def reclasificar(self, t):
+        """La disponibilidad de `t` cambió (terminó un predecesor)."""
+        clave = self._clave.get(id(t))
+        if clave is None:
+            return
+        indices = [c for c in (self._clasif, *(v._clasif for v in self._vistas)) if clave in c]
+        if not indices:
+            return
+        runnable, disponible = self._disponibilidad(t)
+        for c in indices:
+            c.reclasificar(clave, t, runnable, disponible)
+
+    def vista(self, filtro, ordenes=()):
+        """Vista de robo sobre las tareas de la cola que pasan `filtro` (ver VistaRobo)."""
+        v = VistaRobo(self, filtro, ordenes)
+        self._vistas.append(v)
+        for t in deque.__iter__(self):
+            if filtro(t):
+                runnable, disponible = self._disponibilidad(t)
+                v._clasif.agregar(self._clave[id(t)], t, runnable, disponible)
+        return v
+
+    def _afines(self, ultima):
+        """Posiciones que comparten alguna familia de setup con `ultima`."""
+        afines = set()
+        for proceso in self._procesos:
+            for k in claves_setup_menor(ultima, proceso, previa=True):
+                afines.update(self._familias.get((proceso, k), ()))
+        return afines
+
+    # --- Consulta del PASO 1 --------------------------------------------------
+    def buscar_candidata(self, reloj, ultima=None, tolerancia=None):
+        """
+        Resultado del recorrido de PASO 1 (cola sin prioridades, máquina que no
+        es de preparación) sin recorrer la cola:
+          - la primera tarea lista en orden de cola (FIFO del gap filling)
+          - la futura que antes queda disponible (a igual hora, la primera en cola)
+          - la de setup menor con `ultima` que antes queda disponible; si hay
+            una lista, solo entre las anteriores a ella y dentro de `tolerancia`
+            (fuera de ese margen el núcleo no la espera)
+
+        Devuelve (examinadas, idx_lista, futura, setup, hay_bloqueadas) con
+        idx_lista = -1 si no hay lista y futura/setup = (idx, disponible) o None.
+        """
+        clasif = self._clasif
+        clasif.mover_reloj(reloj)
+        lista = clasif.primera_lista()
+        examinadas = 1 if lista is not None else 0
+
+        setup = None
+        if ultima is not None:
+            limite = reloj + tolerancia if lista is not None and tolerancia is not None else None
+            mejor = None
+            for clave in self._afines(ultima):
+                disponible = clasif.disponible.get(clave)
+                if disponible is None or clave in clasif.en_listas:
+                    continue        # bloqueada o lista: solo cuentan las futuras
+                if lista is not None and clave > lista:
+                    continue
+                if limite is not None and disponible > limite:
+                    continue
+                if mejor is not None and (disponible, clave) >= mejor:
+                    continue
+                examinadas += 1
+                t = self._tareas[clave]
+                if usa_setup_menor(ultima, t, t.get("Proceso", "")):
+                    mejor = (disponible, clave)
+            if mejor is not None:
+                setup = (self.index(self._tareas[mejor[1]]), mejor[0])
+
+        if lista is not None:
+            return examinadas, self.index(self._tareas[lista]), None, setup, bool(clasif.bloqueadas)
+
+        futura = None
+        if clasif.futuras:
+            disponible, clave = clasif.futuras[0]
+            futura = (self.index(self._tareas[clave]), disponible)
+            examinadas += 1
+        return examinadas, -1, futura, setup, bool(clasif.bloqueadas)
+
+
+class IndiceColas:
+    """
+    Colas indexadas de una corrida de `programar`.
+
+    Sabe en qué cola está cada tarea para que un fin de proceso
+    (`RastreadorDependencias.registrar_fin`) reclasifique solo a sus sucesoras.
+    """
+
+    def __init__(self, disponibilidad, ignorar_mp=False):
+        # disponibilidad(tarea, maquina) -> (runnable, disponible), como verificar_disponibilidad
+        self.disponibilidad = disponibilidad
+        self.ignorar_mp = ignorar_mp
+        self._ubicacion = {}        # id(tarea) -> ColaIndexada
+
+    def cola(self, tareas, maquina=None):
+        return ColaIndexada(tareas, self, maquina)
+
+    def actualizar(self, tareas):
+        for t in tareas:
+            cola = self._ubicacion.get(id(t))
+            if cola is not None:
+                cola.reclasificar(t)
@@ -0,0 +1,207 @@
+import pandas as pd
+from datetime import datetime, time
+from collections import defaultdict
+from modules.utils.config_loader import es_si
+
+_TRANS_ACENTOS = str.maketrans("áéíóúüñ", "aeiouun")
+
+
+def normalizar_proceso(s):
+    """Nombre de proceso en minúsculas, sin acentos y con alias agresivos (flexo/offset/troquel)."""
+    if not s: return ""
+    s = str(s).lower().strip().translate(_TRANS_ACENTOS)
+    if "flexo" in s: return "impresion flexo"
+    if "offset" in s: return "impresion offset"
+    if "troquel" in s: return "troquelado"
+    return s
+
+
+def reordenar_flujo(flujo_clean, proceso_dpd):
+    """
+    Aplica el reordenamiento dinámico de ProcesoDpd (ej: "TID") sobre el flujo estándar
+    normalizado. T -> troquelado, I -> impresión (flexo/offset), D -> descartonado.
+    Los nodos involucrados intercambian posiciones; el resto del flujo queda igual.
+    """
+    flujo = list(flujo_clean)
+    if not proceso_dpd or not str(proceso_dpd).strip():
+        return flujo
+
+    order_str = str(proceso_dpd).upper().strip().replace(" ", "").replace("-", "")
+
+    flow_matches = []  # (index, node_name, char)
+    for i, p in enumerate(flujo):
+        matched_char = None
+        if p == "troquelado" and "T" in order_str: matched_char = "T"
+        elif p == "descartonado" and "D" in order_str: matched_char = "D"
+        elif "impres" in p and "I" in order_str: matched_char = "I"
+        if matched_char:
+            flow_matches.append((i, p, matched_char))
+
+    if len(flow_matches) < 2:
+        return flujo
+
+    indices = [m[0] for m in flow_matches]
+    found_chars = set(m[2] for m in flow_matches)
+    relevant_order = [c for c in order_str if c in found_chars]
+
+    pool_list = {c: [] for c in found_chars}
+    for m in flow_matches:
+        pool_list[m[2]].append(m[1])
+
+    new_sequence = []
+    for char in relevant_order:
+        if pool_list.get(char):
+            # Todos los nodos de esa letra, en su orden original
+            new_sequence.extend(pool_list[char])
+            pool_list[char] = []
+
+    for original_idx, new_node in zip(indices, new_sequence):
+        flujo[original_idx] = new_node
+    return flujo
+
+
+class _Nodo:
+    """Proceso de una OT con sus predecesores pendientes (ya sin saltados) y las tareas que lo ejecutan."""
+    __slots__ = ("ot", "previos", "faltan", "fin", "tareas")
+
+    def __init__(self, ot, previos):
+        self.ot = ot
+        self.previos = previos
+        self.faltan = len(previos)
+        self.fin = None
+        self.tareas = []
+
+
+class RastreadorDependencias:
+    """
+    Grafo de dependencias por OT resuelto una sola vez.
+
+    Para cada tarea se calcula al inicio: su lista ordenada de predecesores
+    (flujo estándar + ProcesoDpd, descontando saltados y no pendientes) y la
+    llegada de chapas/troquel. Cada vez que el scheduler completa un proceso
+    llama a `registrar_fin`, que descuenta el contador de los nodos que lo
+    esperan y actualiza su fin máximo. `disponibilidad` queda en O(1).
+
+    Devuelve lo mismo que la antigua `verificar_disponibilidad`:
+      - ForzarInicio o proceso fuera del flujo -> (True, None)
+      - Falta algún predecesor -> (False, None)
+      - Sin predecesores -> (True, None) (la llegada de insumos no aplica)
+      - Si no -> (True, max(fin último predecesor, llegada de insumos))
+    """
+
+    def __init__(self, flujo_estandar, pendientes_por_ot, skipped_set, completado, fin_proceso, cfg):
+        self._flujo = [normalizar_proceso(p) for p in flujo_estandar]
+        self._pendientes = pendientes_por_ot
+        self._skipped = skipped_set
+        self._fin_proceso = fin_proceso
+        self._ignorar_insumos = bool(cfg.get("ignore_constraints"))
+
+        self._flujos = {}                       # ProcesoDpd -> flujo normalizado
+        self._pend_clean = {}                   # OT -> procesos pendientes normalizados
+        self._nodos = {}                        # (OT, proceso, ProcesoDpd) -> _Nodo
+        self._esperan = defaultdict(list)       # (OT, predecesor) -> [_Nodo]
+        self._tareas = {}                       # id(tarea) -> (tarea, forzar, nodo, llegada)
+
+        # Nombre original del proceso completado (para leer fin_proceso)
+        self._hechos = defaultdict(dict)
+        for ot, procs in completado.items():
+            for raw in procs:
+                self._hechos[ot][normalizar_proceso(raw)] = raw
+
+    def preparar(self, tareas):
+        """Resuelve de antemano la información estática de un lote de tareas."""
+        for t in tareas:
+            self._info(t)
+
+    def _info(self, t):
+        info = self._tareas.get(id(t))
+        if info is not None:
+            return info
+
+        ot = t["OT_id"]
+        proc_clean = normalizar_proceso(t["Proceso"])
+        dpd = t.get("ProcesoDpd")
+        clave_dpd = str(dpd) if dpd and str(dpd).strip() else ""
+
+        nodo = self._nodo(ot, proc_clean, clave_dpd)
+        info = (t, bool(t.get("ForzarInicio", False)), nodo, self._llegada_insumos(t, proc_clean))
+        self._tareas[id(t)] = info
+        if nodo is not None:
+            nodo.tareas.append(t)
+        return info
+
+    def _nodo(self, ot, proc_clean, clave_dpd):
+        clave = (ot, proc_clean, clave_dpd)
+        if clave in self._nodos:
+            return self._nodos[clave]
+
+        flujo = self._flujos.get(clave_dpd)
+        if flujo is None:
+            flujo = self._flujos[clave_dpd] = reordenar_flujo(self._flujo, clave_dpd)
+
+        nodo = None
+        if proc_clean in flujo:
+            pend = self._pend_clean.get(ot)
+            if pend is None:
+                pend = self._pend_clean[ot] = {normalizar_proceso(p) for p in self._pendientes[ot]}
+            idx = flujo.index(proc_clean)
+            previos = []
+            for p in flujo[:idx]:
+                if p in pend and (ot, p) not in self._skipped and p not in previos:
+                    previos.append(p)
+            nodo = _Nodo(ot, previos)
+            for p in previos:
+                self._esperan[(ot, p)].append(nodo)
+            self._recalcular(nodo)
+
+        self._nodos[clave] = nodo
+        return nodo
+
+    def _recalcular(self, nodo):
+        hechos = self._hechos[nodo.ot]
+        nodo.faltan = sum(1 for p in nodo.previos if p not in hechos)
+        if nodo.faltan == 0 and nodo.previos:
+            fines = self._fin_proceso[nodo.ot]
+            nodo.fin = max((fines.get(hechos[p]) for p in nodo.previos if fines.get(hechos[p])), default=None)
+
+    def _llegada_insumos(self, t, proc_clean):
+        """Impresión espera las chapas (PeliculaArt) y Troquelado el troquel (TroquelArt), a las 07:00."""
+        if self._ignorar_insumos:
+            return None
+        if "impres" in proc_clean:
+            requiere, fecha = es_si(t.get("PeliculaArt")), t.get("FechaLlegadaChapas")
+        elif "troquel" in proc_clean:
+            requiere, fecha = es_si(t.get("TroquelArt")), t.get("FechaLlegadaTroquel")
+        else:
+            return None
+        if requiere and pd.notna(fecha):
+            return datetime.combine(fecha.date(), time(7, 0))
+        return None
+
+    def registrar_fin(self, ot, proceso):
+        """
+        Avisa que (ot, proceso) quedó completado; fin_proceso ya debe estar actualizado.
+        Devuelve las tareas cuya disponibilidad pudo cambiar (las que esperan ese proceso).
+        """
+        p_clean = normalizar_proceso(proceso)
+        self._hechos[ot][p_clean] = proceso
+        afectadas = []
+        for nodo in self._esperan.get((ot, p_clean), ()):
+            self._recalcular(nodo)
+            afectadas.extend(nodo.tareas)
+        return afectadas
+
+    def disponibilidad(self, t):
+        """Devuelve (bool_runnable, datetime_disponible) de la tarea. NO MODIFICA LA AGENDA."""
+        _, forzar, nodo, llegada = self._info(t)
+        if forzar or nodo is None:
+            return (True, None)
+        if nodo.faltan:
+            return (False, None)
+        if not nodo.previos:
+            return (True, None)
+        if nodo.fin and llegada:
+            return (True, max(nodo.fin, llegada))
+        if llegada:
+            return (True, llegada)
+        return (True, nodo.fin)
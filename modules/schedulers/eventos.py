@@ -0,0 +1,172 @@
+import heapq
+
+
+class MotorEventos:
+    """
+    Cola de eventos del núcleo de `programar`.
+
+    Reemplaza el "ordenar todas las máquinas en cada pasada" por un heap cuya
+    clave es el próximo despertar de cada máquina: (reloj de agenda, desempate,
+    nombre). Conserva la semántica de pasadas del loop original: en cada pasada
+    las máquinas se intentan en orden de reloj y la pasada termina cuando una
+    máquina agenda una tarea (yield global).
+
+    Una máquina que se intentó sin cambiar nada queda DORMIDA: no se vuelve a
+    intentar hasta que algo que ella lee cambie (su cola, una cola que puede
+    robar, o el fin de un predecesor de alguna de sus tareas). Así cada
+    decisión cuesta O(log máquinas) en lugar de re-evaluar la planta completa.
+
+    Una máquina con tareas esperando predecesores no adelanta su reloj para
+    revisar más tarde: `dormir(maquina, hasta)` la deja en el heap con clave
+    `hasta` (despertador). Vuelve cuando el recorrido en orden de reloj llega
+    a esa hora, o antes si `notificar` le avisa un fin de proceso más temprano.
+    """
+
+    def __init__(self, maquinas, clave):
+        # clave(maquina) -> tupla comparable (reloj, desempate, nombre)
+        self._clave = clave
+        self._heap = []
+        self._en_heap = {}          # maquina -> clave vigente (las demás entradas del heap se descartan)
+        self._despertadores = {}    # maquina -> datetime hasta el que duerme
+        self._vencido = None
+        self._intentadas = set()
+        self._activas = set()
+        self._posicion = None
+        for m in maquinas:
+            self._encolar(m)
+
+    def _clave_de(self, maquina):
+        clave = self._clave(maquina)
+        hasta = self._despertadores.get(maquina)
+        if hasta is not None and hasta > clave[0]:
+            return (hasta, *clave[1:])
+        return clave
+
+    def _encolar(self, maquina):
+        clave = self._clave_de(maquina)
+        heapq.heappush(self._heap, (clave, maquina))
+        self._en_heap[maquina] = clave
+
+    def siguiente(self):
+        """Devuelve la próxima máquina de la pasada, o None si la pasada terminó."""
+        while self._heap:
+            clave, maquina = heapq.heappop(self._heap)
+            if self._en_heap.get(maquina) != clave:
+                continue    # entrada reemplazada por otra clave
+            del self._en_heap[maquina]
+            self._posicion = clave
+            self._intentadas.add(maquina)
+            self._vencido = self._despertadores.pop(maquina, None)
+            return maquina
+        return None
+
+    def despertador_vencido(self):
+        """Despertador con el que salió la última máquina de `siguiente` (None si no dormía)."""
+        return self._vencido
+
+    def activar(self, maquina):
+        """La máquina cambió su propio estado: se reintenta en la próxima pasada."""
+        self._activas.add(maquina)
+
+    def despertar(self, maquina):
+        """
+        Algo que la máquina lee cambió. Si en el orden de la pasada actual todavía
+        no le tocaba, entra ahora; si ya le tocó, se reintenta en la próxima.
+        Si dormía, se cancela su despertador.
+        """
+        self._despertadores.pop(maquina, None)
+        self._reprogramar(maquina)
+
+    def notificar(self, maquina, hora):
+        """
+        Terminó un predecesor de una tarea que la máquina lee y esa tarea queda
+        disponible a `hora`. Si dormía, el despertador se adelanta a `hora`;
+        si no, es un `despertar`.
+        """
+        hasta = self._despertadores.get(maquina)
+        if hasta is not None:
+            if hora is None:
+                del self._despertadores[maquina]
+            elif hora < hasta:
+                self._despertadores[maquina] = hora
+        self._reprogramar(maquina)
+
+    def dormir(self, maquina, hasta):
+        """La máquina espera hasta `hasta` sin mover su reloj (ver docstring de la clase)."""
+        self._despertadores[maquina] = hasta
+        self._activas.discard(maquina)
+        self._encolar(maquina)
+
+    def _reprogramar(self, maquina):
+        clave = self._clave_de(maquina)
+        if maquina in self._en_heap:
+            if self._en_heap[maquina] == clave:
+                return
+            if self._posicion is None or clave >= self._posicion:
+                heapq.heappush(self._heap, (clave, maquina))
+                self._en_heap[maquina] = clave
+                return
+            del self._en_heap[maquina]
+            self._activas.add(maquina)
+            return
+        if maquina in self._intentadas:
+            self._activas.add(maquina)
+            return
+        if self._posicion is not None and clave < self._posicion:
+            self._activas.add(maquina)
+            return
+        heapq.heappush(self._heap, (clave, maquina))
+        self._en_heap[maquina] = clave
+
+    def nueva_pasada(self):
+        """Cierra la pasada: vuelven al heap solo las máquinas activas o despertadas."""
+        self._posicion = None
+        for m in self._activas:
+            if m not in self._en_heap:
+                self._encolar(m)
+        self._intentadas = set()
+        self._activas = set()
+
+
+class BusFinalizaciones:
+    """
+    Avisos de fin de proceso del núcleo de `programar`.
+
+    Cada fin que registra el núcleo se publica como (OT_id, Proceso, Fin): el
+    RastreadorDependencias devuelve las tareas que lo esperaban y el aviso va
+    solo a las colas de esas sucesoras, con la hora a la que cada una queda
+    disponible (si ya no le falta ningún predecesor). El núcleo entrega los
+    avisos al motor después de cada intento (`MotorEventos.notificar`).
+    """
+
+    def __init__(self, dependencias):
+        self._dependencias = dependencias
+        self._cola = {}             # id(tarea) -> cola donde espera
+        self._avisos = {}           # cola -> hora de disponibilidad más temprana avisada
+
+    def suscribir(self, cola, tareas):
+        for t in tareas:
+            self._cola[id(t)] = cola
+
+    def publicar(self, ot, proceso, fin):
+        """Registra el fin en el rastreador y devuelve las tareas cuya disponibilidad pudo cambiar."""
+        afectadas = self._dependencias.registrar_fin(ot, proceso)
+        for t in afectadas:
+            cola = self._cola.get(id(t))
+            if cola is None:
+                continue
+            runnable, disponible = self._dependencias.disponibilidad(t)
+            if not runnable:
+                continue
+            hora = disponible or fin
+            if cola not in self._avisos:
+                self._avisos[cola] = hora
+            else:
+                previa = self._avisos[cola]
+                self._avisos[cola] = None if previa is None or hora is None else min(previa, hora)
+        return afectadas
+
+    def entregar(self):
+        """Avisos pendientes {cola: hora} desde la última entrega."""
+        avisos, self._avisos = self._avisos, {}
+        return avisos
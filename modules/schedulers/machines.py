@@ -1,11 +1,14 @@
+import numpy as np
 import pandas as pd
 
-def elegir_maquina(proceso, orden, cfg, plan_actual=None):
+def elegir_maquina(proceso, orden, cfg, plan_actual=None, candidatos=None):
     proc_lower = proceso.lower().strip()
     # Filtro basico por nombre de proceso
     # spliteamos para tomar "Impresión" de "Impresión Flexo" o "Troquelado" de "Troquelado"
-    candidatos_df = cfg["maquinas"][cfg["maquinas"]["Proceso"].str.lower().str.contains(proc_lower.split()[0])]
-    candidatos = candidatos_df["Maquina"].tolist()
+    # (quien expande muchas tareas puede pasar las candidatas ya filtradas)
+    if candidatos is None:
+        candidatos_df = cfg["maquinas"][cfg["maquinas"]["Proceso"].str.lower().str.contains(proc_lower.split()[0])]
+        candidatos = candidatos_df["Maquina"].tolist()
     
     if not candidatos:
         return None
@@ -55,23 +58,19 @@ def elegir_maquina(proceso, orden, cfg, plan_actual=None):
     # Default fallback
     return candidatos[0]
 
-def validar_medidas_troquel(maquina, anc, lar, cfg=None):
-    """Valida si un pliego entra en la máquina de troquelado.
+def limites_troquel(maquina, cfg=None):
+    """Límites de pliego de una máquina de troquelado, comparando lado menor con lado menor
+    y lado mayor con lado mayor (el pliego puede rotarse).
 
+    Devuelve (min_menor, min_mayor, max_menor, max_mayor), con -inf/inf donde no hay
+    límite, o None si la máquina no tiene restricciones de medidas.
     Si cfg está disponible y la máquina tiene columnas PliMaxAnc/PliMaxLar/PliMinAnc/PliMinLar
     definidas (ej. máquinas custom creadas desde la UI), se usan esos valores.
     De lo contrario, se utiliza la lógica hardcodeada por nombre de máquina.
     """
     # Normalizar nombre
     m = str(maquina).lower().strip()
-    # Dimensiones de la tarea (CON ROTACIÓN)
-    # Se compara el lado mayor del pliego con el lado mayor de la máquina
-    # y el lado menor del pliego con el lado menor de la máquina.
-    w_orig = float(anc or 0)
-    l_orig = float(lar or 0)
-    
-    pliego_min = min(w_orig, l_orig)
-    pliego_max = max(w_orig, l_orig)
+    sin_min, sin_max = (-np.inf, -np.inf), (np.inf, np.inf)
 
     # --- DYNAMIC LOOKUP: custom machines from the UI ---
     if cfg is not None and "maquinas" in cfg:
@@ -87,54 +86,103 @@ def validar_medidas_troquel(maquina, anc, lar, cfg=None):
             has_min = pli_min_anc is not None and pli_min_lar is not None and (pli_min_anc > 0 or pli_min_lar > 0)
 
             if has_max or has_min:
-                ok = True
+                minimos, maximos = sin_min, sin_max
                 if has_max:
-                    mq_max_val = max(float(pli_max_anc), float(pli_max_lar))
-                    mq_min_val = min(float(pli_max_anc), float(pli_max_lar))
                     # El pliego debe CABER: pliego_max <= machine_max y pliego_min <= machine_min
-                    ok = ok and pliego_max <= mq_max_val and pliego_min <= mq_min_val
+                    maximos = (min(float(pli_max_anc), float(pli_max_lar)), max(float(pli_max_anc), float(pli_max_lar)))
                 if has_min:
-                    mq_min_req_max = max(float(pli_min_anc), float(pli_min_lar))
-                    mq_min_req_min = min(float(pli_min_anc), float(pli_min_lar))
                     # El pliego debe superar el mínimo
-                    ok = ok and pliego_max >= mq_min_req_max and pliego_min >= mq_min_req_min
-                return ok
+                    minimos = (min(float(pli_min_anc), float(pli_min_lar)), max(float(pli_min_anc), float(pli_min_lar)))
+                return (*minimos, *maximos)
 
     # --- HARDCODED LOGIC (original machines) ---
     if "autom" in m or "duyan" in m:
         # Min 38x38 (Ambos lados deben ser >= 38)
         # Como es minimo, ambos lados deben superar 38, asi que da igual la rotación si min(pliego) >= 38
-        mq_min, mq_max = 36, 40
-        return pliego_min >= mq_min and pliego_max >= mq_max
+        return (36, 40, *sin_max)
     
     # Manuales: Maximos definidos (Ancho y Largo)
     
     # Manual 1 (Troq Nº 2 Ema): Max 80 x 105
     if "manual 1" in m or "manual1" in m or "ema" in m:
-            # Maquina: 80x105 -> Min: 80, Max: 105
-            mq_min, mq_max = 80, 105
-            return pliego_min <= mq_min and pliego_max <= mq_max
+        return (*sin_min, 80, 105)
     
     # Manual 2 (Troq Nº 1 Gus): Max 66 x 90
-    # Maquina: 66x90 -> Min: 66, Max: 90
     if "manual 2" in m or "manual2" in m or "gus" in m:
-            mq_min, mq_max = 66, 90
-            return pliego_min <= mq_min and pliego_max <= mq_max
+        return (*sin_min, 66, 90)
         
     # Manual 3: Max 70 x 100
-    # Maquina: 70x100 -> Min: 70, Max: 100
     if "manual 3" in m or "manual3" in m:
-            mq_min, mq_max = 70, 100
-            return pliego_min <= mq_min and pliego_max <= mq_max
+        return (*sin_min, 70, 100)
     
     # Iberica: Max 70 x 100
     #          Min 35 x 50
     # Maquina: 70x100 -> Min: 86, Max: 110
     if "iberica" in m:
-        mq_min, mq_max, mq_min2, mq_max2 = 86, 110, 35, 50
-        return (pliego_min <= mq_min and pliego_max <= mq_max) and (pliego_min >= mq_min2 and pliego_max >= mq_max2)
+        return (35, 50, 86, 110)
     
-    return True # Por defecto si no matchea nombre
+    return None # Por defecto si no matchea nombre
+
+
+def validar_medidas_troquel(maquina, anc, lar, cfg=None):
+    """Valida si un pliego entra en la máquina de troquelado (ver `limites_troquel`)."""
+    limites = limites_troquel(maquina, cfg)
+    if limites is None:
+        return True
+    # Dimensiones de la tarea (CON ROTACIÓN)
+    w_orig = float(anc or 0)
+    l_orig = float(lar or 0)
+    pliego_min = min(w_orig, l_orig)
+    pliego_max = max(w_orig, l_orig)
+    min_menor, min_mayor, max_menor, max_mayor = limites
+    return min_menor <= pliego_min <= max_menor and min_mayor <= pliego_max <= max_mayor
+
+
+def matriz_compatibilidad_troquel(maquinas, anchos, largos, cfg=None):
+    """
+    Matriz booleana (pliegos x máquinas): [i, j] es validar_medidas_troquel(maquinas[j],
+    anchos[i], largos[i], cfg), calculada de una vez con NumPy.
+    """
+    anc = np.asarray(anchos, dtype=float)
+    lar = np.asarray(largos, dtype=float)
+    menor = np.minimum(anc, lar)[:, None]
+    mayor = np.maximum(anc, lar)[:, None]
+    limites = [limites_troquel(m, cfg) for m in maquinas]
+    sin_limites = np.array([l is None for l in limites], dtype=bool)
+    lim = np.array([l if l is not None else (-np.inf, -np.inf, np.inf, np.inf) for l in limites], dtype=float).reshape(-1, 4)
+    ok = (lim[:, 0] <= menor) & (menor <= lim[:, 2]) & (lim[:, 1] <= mayor) & (mayor <= lim[:, 3])
+    return ok | sin_limites
+
+
+class CompatibilidadTroquel:
+    """
+    Compatibilidad de medidas tareas x troqueladoras de una planificación.
+
+    Se arma una vez con las medidas de todas las tareas (`anchos[i]`, `largos[i]`
+    de la tarea con id i) y las troqueladoras conocidas; la asignación y los
+    robos consultan `admite(i, maquina)` en lugar de re-derivar los límites de
+    la máquina en cada llamada. Una máquina que no estaba agrega su columna
+    la primera vez que se consulta.
+    """
+
+    def __init__(self, anchos, largos, maquinas=(), cfg=None):
+        self._anchos = np.asarray(anchos, dtype=float)
+        self._largos = np.asarray(largos, dtype=float)
+        self._cfg = cfg
+        self.maquinas = list(dict.fromkeys(maquinas))
+        self._columna = {m: j for j, m in enumerate(self.maquinas)}
+        self.matriz = matriz_compatibilidad_troquel(self.maquinas, self._anchos, self._largos, cfg)
+
+    def _agregar_maquina(self, maquina):
+        columna = matriz_compatibilidad_troquel([maquina], self._anchos, self._largos, self._cfg)
+        self.matriz = np.hstack([self.matriz, columna])
+        self._columna[maquina] = len(self.maquinas)
+        self.maquinas.append(maquina)
+
+    def admite(self, i, maquina):
+        if maquina not in self._columna:
+            self._agregar_maquina(maquina)
+        return bool(self.matriz[i, self._columna[maquina]])
 
 
 def get_machine_process_order(maquina, cfg):
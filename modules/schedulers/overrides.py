@@ -0,0 +1,118 @@
+import pandas as pd
+
+# Familias de cfg["manual_overrides"] que pisan una columna de tasks, en el
+# orden en que se aplican.
+OVERRIDES_POR_COLUMNA = [
+    ("urgency_overrides", "Urgente"),
+    ("forzar_inicio_overrides", "ForzarInicio"),
+    ("mp_overrides", "MateriaPrimaPlanta"),            # MateriaPrimaPlanta
+    ("pelicula_overrides", "PeliculaArt"),             # Chapa
+    ("troquel_overrides", "TroquelArt"),
+    ("fecha_chapas_overrides", "FechaLlegadaChapas"),
+    ("fecha_troquel_overrides", "FechaLlegadaTroquel"),
+]
+
+_MAQUINAS_VIRTUALES = ("SALTADO", "TERCERIZADO")
+
+
+class IndiceTareas:
+    """
+    Índice (OT_id, Proceso) -> posición en tasks, con las claves ya pasadas a
+    str (como comparaban las máscaras de antes). Resuelve de una vez todas las
+    claves de una familia de overrides.
+    """
+
+    def __init__(self, tasks):
+        ots = tasks["OT_id"].astype(str).tolist()
+        procesos = tasks["Proceso"].astype(str).tolist()
+        self._indice = pd.MultiIndex.from_arrays([ots, procesos])
+        self._mapa = None
+        if not self._indice.is_unique:
+            # (OT, Proceso) repetidos: todas las posiciones de cada clave
+            self._mapa = {}
+            for i, clave in enumerate(zip(ots, procesos)):
+                self._mapa.setdefault(clave, []).append(i)
+
+    def posiciones(self, claves):
+        """Lista de (clave, [posiciones]) para cada clave (str, str) que existe en tasks."""
+        if not claves:
+            return []
+        if self._mapa is not None:
+            return [(c, self._mapa[c]) for c in claves if c in self._mapa]
+        pos = self._indice.get_indexer(pd.MultiIndex.from_tuples(claves))
+        return [(c, [p]) for c, p in zip(claves, pos.tolist()) if p >= 0]
+
+
+def _asignar(tasks, columna, asignaciones):
+    """
+    Escribe {posición: valor} en la columna. Se agrupa por valor y cada grupo es
+    un único `loc` con el valor escalar, igual que la asignación fila a fila.
+    """
+    grupos = {}
+    for p, v in asignaciones.items():
+        try:
+            grupos.setdefault((type(v), v), (v, []))[1].append(p)
+        except TypeError:  # valor no hasheable: se asigna solo
+            tasks.loc[tasks.index[[p]], columna] = v
+    for v, pos in grupos.values():
+        tasks.loc[tasks.index[pos], columna] = v
+
+
+def aplicar_overrides(tasks, overrides):
+    """
+    Aplica las familias de OVERRIDES_POR_COLUMNA sobre tasks (in place).
+    Cada familia se resuelve contra el índice (OT_id, Proceso) en una sola
+    búsqueda; si dos entradas caen en la misma tarea gana la última.
+    """
+    indice = None
+    for familia, columna in OVERRIDES_POR_COLUMNA:
+        if familia not in overrides:
+            continue
+        if familia == "forzar_inicio_overrides" and "ForzarInicio" not in tasks.columns:
+            tasks["ForzarInicio"] = False
+
+        valores = {}
+        for (ot, proc), val in overrides[familia].items():
+            valores[(str(ot), str(proc))] = val
+        if not valores:
+            continue
+
+        indice = indice or IndiceTareas(tasks)
+        asignaciones = {}
+        for clave, pos in indice.posiciones(list(valores)):
+            for p in pos:
+                asignaciones[p] = valores[clave]
+        _asignar(tasks, columna, asignaciones)
+
+
+def aplicar_bloqueos(tasks, locks, maquinas):
+    """
+    Aplica locked_assignments {(ot, proc): maquina} (historial) sobre tasks (in place).
+    Se ignoran máquinas que ya no están en la config y tareas que quedaron en
+    SALTADO/TERCERIZADO; las tareas bloqueadas quedan con ManualAssignment=True
+    para que no las reoptimice la lógica de troquelado.
+    """
+    validas = set(maquinas) | set(_MAQUINAS_VIRTUALES) | {"POOL_DESCARTONADO"}
+    entradas = []
+    for (ot, proc), maq_locked in locks.items():
+        if maq_locked in validas:
+            entradas.append(((str(ot), str(proc)), maq_locked))
+    if not entradas:
+        return
+
+    indice = IndiceTareas(tasks)
+    pos_por_clave = dict(indice.posiciones(list(dict.fromkeys(c for c, _ in entradas))))
+    maq_actual = tasks["Maquina"].tolist()
+    asignaciones = {}
+    for clave, maq_locked in entradas:
+        for p in pos_por_clave.get(clave, ()):
+            # En orden: un lock previo a SALTADO/TERCERIZADO bloquea a los siguientes
+            if asignaciones.get(p, maq_actual[p]) in _MAQUINAS_VIRTUALES:
+                continue
+            asignaciones[p] = maq_locked
+
+    if asignaciones:
+        _asignar(tasks, "Maquina", asignaciones)
+        if "ManualAssignment" not in tasks.columns:
+            tasks["ManualAssignment"] = False
+        _asignar(tasks, "ManualAssignment", dict.fromkeys(asignaciones, True))
@@ -0,0 +1,91 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class PerfilPlanificacion:
+    """
+    Tiempos por etapa y contadores por máquina de una corrida de `programar`.
+
+    Las etapas numeradas de `programar` son bloques largos al nivel de la
+    función, así que se cronometran por vueltas: `marcar(nombre)` cierra la
+    etapa en curso y abre la siguiente. `etapa(nombre)` (context manager) mide
+    un bloque puntual dentro de otra etapa y suma a la misma entrada si se repite.
+
+    Contadores por máquina (se incrementan en el loop principal):
+        intentos       veces que el motor de eventos le dio turno
+        candidatas     tareas recorridas (o consultadas en la cola indexada) al buscar candidata (PASO 1)
+        disponibilidad llamadas a verificar_disponibilidad
+        robos          tareas tomadas de otra cola o del POOL (PASO 2)
+        avances_reloj  saltos del reloj de agenda hasta una tarea futura
+        esperas        veces que durmió con despertador (tareas esperando predecesores)
+        agendadas      tareas agendadas
+
+    TERCERIZADO y SALTADO no pasan por el motor (ResolutorVirtuales): solo
+    suman disponibilidad y agendadas.
+    """
+
+    CONTADORES = ("intentos", "candidatas", "disponibilidad", "robos", "avances_reloj", "esperas", "agendadas")
+
+    def __init__(self):
+        self.etapas = {}
+        self.contadores = defaultdict(Counter)
+        self._t0 = time.perf_counter()
+        self._actual = None
+        self._desde = self._t0
+
+    def marcar(self, nombre):
+        """Cierra la etapa en curso (si hay) y arranca `nombre`."""
+        ahora = time.perf_counter()
+        if self._actual is not None:
+            self.etapas[self._actual] = self.etapas.get(self._actual, 0.0) + ahora - self._desde
+        self._actual = nombre
+        self._desde = ahora
+
+    @contextmanager
+    def etapa(self, nombre):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] = self.etapas.get(nombre, 0.0) + time.perf_counter() - t0
+
+    def cerrar(self):
+        self.marcar(None)
+
+    def reporte(self):
+        """
+        {"total_s": s, "etapas": {nombre: s}, "maquinas": {maquina: {contador: n}}}
+        (solo tipos básicos: se puede pickle-ar y pasar a JSON).
+        """
+        if self._actual is not None:
+            self.cerrar()
+        return {
+            "total_s": round(time.perf_counter() - self._t0, 4),
+            "etapas": {nombre: round(s, 4) for nombre, s in self.etapas.items()},
+            "maquinas": {
+                maquina: {c: int(cont.get(c, 0)) for c in self.CONTADORES}
+                for maquina, cont in sorted(self.contadores.items())
+            },
+        }
+
+
+def tabla_etapas(reporte):
+    """DataFrame Etapa / Segundos / % del total, en orden de ejecución."""
+    if not reporte:
+        return pd.DataFrame(columns=["Etapa", "Segundos", "% del total"])
+    total = reporte["total_s"] or 1.0
+    df = pd.DataFrame(list(reporte["etapas"].items()), columns=["Etapa", "Segundos"])
+    df["% del total"] = (100 * df["Segundos"] / total).round(1)
+    return df
+
+
+def tabla_maquinas(reporte):
+    """DataFrame con una fila por máquina y una columna por contador."""
+    if not reporte or not reporte["maquinas"]:
+        return pd.DataFrame(columns=["Maquina", *PerfilPlanificacion.CONTADORES])
+    df = pd.DataFrame.from_dict(reporte["maquinas"], orient="index")
+    df.index.name = "Maquina"
+    return df.reset_index().sort_values("candidatas", ascending=False, ignore_index=True)
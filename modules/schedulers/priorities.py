@@ -14,6 +14,42 @@ def _clave_prioridad_maquina(proceso: str, orden: pd.Series):
     if proceso == "Ventana": return (troquel,)
     return tuple()
 
+def clase_prioridad_maquina(maquina: str):
+    """
+    Qué prioridad Excel manda en una máquina (además de ManualPriority):
+    troqueladoras -> PrioriTr, descartonadoras -> PrioriDesc, ventana -> PrioVenDdp,
+    pegadoras -> PrioPegDdp, preparación (guillotina/bobina/corte) -> PrioriImp.
+    """
+    m = maquina.lower()
+    if "troq" in m or "duyan" in m or "manual" in m: return "troquelado"
+    if "descartonad" in m: return "descartonado"
+    if "ventana" in m: return "ventana"
+    if "pegadora" in m or "pegado" in m: return "pegado"
+    if "guillotin" in m or "bobina" in m or "corte" in m: return "preparacion"
+    return "otra"
+
+def prioridad_efectiva(tarea, clase: str):
+    """
+    (prio_efectiva, tiene_prioridad) de una tarea en una máquina de la clase dada.
+    Descartonado/Ventana/Pegado solo se consideran priorizadas por su propia
+    prioridad Excel (o la manual); el resto por cualquiera de ellas.
+    """
+    prio_man = tarea.prio_man
+    if clase == "descartonado":
+        return min(prio_man, tarea.prio_desc), prio_man < 9000 or tarea.prio_desc < 9999
+    if clase == "ventana":
+        return min(prio_man, tarea.prio_ven), prio_man < 9000 or tarea.prio_ven < 9999
+    if clase == "pegado":
+        return min(prio_man, tarea.prio_peg), prio_man < 9000 or tarea.prio_peg < 9999
+
+    tiene_prioridad = (prio_man < 9000 or tarea.prio_imp < 9999 or tarea.prio_tro < 9999 or
+                       tarea.prio_desc < 9999 or tarea.prio_ven < 9999 or tarea.prio_peg < 9999)
+    if clase == "troquelado":
+        return min(prio_man, tarea.prio_tro), tiene_prioridad
+    if clase == "preparacion":
+        return min(prio_man, tarea.prio_imp), tiene_prioridad
+    return prio_man, tiene_prioridad
+
 def _cola_impresora_flexo(q):
     # Ahora usamos la misma lógica que Offset para respetar prioridades de Excel
     return _cola_impresora_universal(q)
@@ -22,37 +58,66 @@ def _cola_impresora_offset(q):
     return _cola_impresora_universal(q)
 
 def _cola_impresora_universal(q):
-    if q.empty: return deque()
+    return _registros(orden_impresora(q))
+
+def _cola_troquelada(q):
+    return _registros(orden_troquelada(q))
+
+def _cola_cortadora_bobina(q):
+    return _registros(orden_cortadora_bobina(q))
+
+def _registros(orden):
+    """Deque de registros (dict) en el orden de la cola, como la arman los builders."""
+    return deque(orden.to_dict("records"))
+
+def prio_numerica(q, col, default=9999):
+    """Columna de prioridad como número (vacío/texto -> default); si falta, constante."""
+    if col in q.columns:
+        return pd.to_numeric(q[col], errors="coerce").fillna(default)
+    return pd.Series(default, index=q.index)
+
+
+def _fecha_o_max(q, col):
+    """Columna de fecha (vacía/inválida -> Timestamp.max); si falta, constante."""
+    if col in q.columns:
+        return pd.to_datetime(q[col], errors="coerce").fillna(pd.Timestamp.max)
+    return pd.Series(pd.Timestamp.max, index=q.index)
+
+
+def _como_bool(col):
+    """Veracidad de cada valor como la toma Series.any() (vacíos -> False)."""
+    return col.fillna(False).astype(bool)
+
+
+def _ordenar_por_grupos(q, claves_grupo, claves_tarea, ascendente_tarea):
+    """
+    Orden de "agrupar, ordenar cada grupo por `claves_tarea`, ordenar
+    los grupos por su tupla `claves_grupo` y concatenar", en un solo sort.
+    Devuelve `q` ordenado.
+
+    `claves_grupo` son columnas constantes dentro de cada grupo (agregados con
+    transform) y deben identificarlo; el sort es estable, así que a igualdad de
+    claves se conserva el orden original como en el sort de cada grupo.
+    """
+    columnas = claves_grupo + claves_tarea
+    ascendente = [True] * len(claves_grupo) + ascendente_tarea
+    return q.sort_values(columnas, ascending=ascendente, kind="stable")
+
+
+def orden_impresora(q):
+    """Cola de impresoras (flexo y offset): grupos CMYK, Pantone y Barnizado."""
+    if q.empty: return q
     q = q.copy()
 
     # Ensure ManualPriority exists
     if "ManualPriority" not in q.columns: q["ManualPriority"] = 9999
     q["ManualPriority"] = q["ManualPriority"].fillna(9999).astype(int)
 
-    # --- PRIORIDAD EXCEL COMPUESTA (FechaImDdp + PrioriImp) ---
-    # El sistema externo asigna prioridades POR DÍA (1,2,3... resetea cada día).
-    # "Prioridad 1 del 10/03" es más urgente que "Prioridad 1 del 11/03".
-    # Combinamos fecha + número en una única clave de ordenamiento.
-    if "FechaImDdp" in q.columns:
-        q["_fecha_imp"] = pd.to_datetime(q["FechaImDdp"], errors="coerce")
-    else:
-        q["_fecha_imp"] = pd.NaT
-    
-    if "PrioriImp" in q.columns:
-        q["_priori_imp_num"] = pd.to_numeric(q["PrioriImp"], errors="coerce").fillna(9999)
-    else:
-        q["_priori_imp_num"] = 9999
-    
-    # Fecha nula → al final
-    q["_fecha_imp"] = q["_fecha_imp"].fillna(pd.Timestamp.max)
-    
+    q["_priori_imp_num"] = prio_numerica(q, "PrioriImp")
+
     # 0.5 UNIFICACION DE PRIORIDADES (Manual + Excel)
     # Para que Priority 8 de Excel le gane a Manual 10 (misma escala)
-    prio_imp = pd.to_numeric(q["PrioriImp"] if "PrioriImp" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    prio_tro = pd.to_numeric(q["PrioriTr"] if "PrioriTr" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    prio_man = pd.to_numeric(q["ManualPriority"] if "ManualPriority" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    
-    q["_prio_humana"] = pd.concat([prio_imp, prio_tro, prio_man], axis=1).min(axis=1)
+    q["_prio_humana"] = pd.concat([q["_priori_imp_num"], prio_numerica(q, "PrioriTr"), prio_numerica(q, "ManualPriority")], axis=1).min(axis=1)
 
     # 1. LIMPIEZA DE DATOS
     # ------------------------------------------------------------
@@ -74,80 +139,43 @@ def _cola_impresora_universal(q):
     q["DueDate"] = pd.to_datetime(q["DueDate"], dayfirst=True, errors="coerce")
     q["DueDate"] = q["DueDate"].fillna(pd.Timestamp.max)
 
-    # 2. SEPARAR POR TIPO DE PROCESO
-    # Prioridad: (0=Impresion CMYK/Pantone, 1=Barnizado)
-    # Esto asegura que todas las impresiones (mismo DueDate) se hagan antes de pasar a Barnizado.
-    
+    # 2. GRUPOS
+    # ------------------------------------------------------------
+    # Impresión (tipo 0) antes que Barnizado (tipo 1): todas las impresiones
+    # (mismo DueDate) se hacen antes de pasar a Barnizado.
+    #   CMYK    -> CLIENTE + TROQUEL + PRIORIDAD UNIFICADA
+    #   PANTONE -> CLIENTE + COLOR + PRIORIDAD UNIFICADA
+    #   BARNIZ  -> CLIENTE + PRIORIDAD UNIFICADA
     mask_barniz = q["_proceso_norm"].str.contains("barniz", na=False)
-    
-    q_barniz = q[mask_barniz]
-    q_impresion = q[~mask_barniz] # CMYK y Pantone aqui
-    
-    grupos_todos = []
+    mask_pantone = ~mask_barniz & q["_color_key"].str.upper().str.contains(r'[^CMYK]', na=False)
+    mask_cmyk = ~mask_barniz & ~mask_pantone
 
-    # 3. GRUPO IMPRESION (Prioridad 0)
-    # ------------------------------------------------------------
-    # Dentro de impresion, mantenemos la distincion CMYK vs Pantone si se quiere,
-    # o simplificamos. Por ahora, distinguimos para respetar agrupamiento de Troquel vs Color.
-    
-    if not q_impresion.empty:
-        colores_upper = q_impresion["_color_key"].str.upper()
-        mask_pantone = colores_upper.str.contains(r'[^CMYK]', na=False)
-        
-        q_cmyk = q_impresion[~mask_pantone]
-        q_pantone = q_impresion[mask_pantone]
-        
-        # 3.1 CMYK -> Agrupar por CLIENTE + TROQUEL + PRIORIDAD UNIFICADA
-        for keys, g in q_cmyk.groupby(["_cliente_key", "_troq_key", "_prio_humana"], dropna=False):
-            min_prio = g["_prio_humana"].min()
-            due_min = g["DueDate"].min()
-            es_urgente = g["Urgente"].apply(es_si).any()
-            fecha_imp_min = g["_fecha_imp"].min()
-            priori_imp_min = g["_priori_imp_num"].min() # Added for consistency
-            
-            g_sorted = g.sort_values(["_prio_humana", "Urgente", "DueDate", "CantidadPliegos"], 
-                                     ascending=[True, False, True, False])
-            # Tupla estandar: (PrioHumana, PrioExcel, no_urgente, DueDate, tipo_proc, key1, key2, records)
-            grupos_todos.append((min_prio, priori_imp_min, not es_urgente, due_min, 0, keys[0], keys[1], g_sorted.to_dict("records")))
-
-        # 3.2 PANTONE -> Agrupar por CLIENTE + COLOR + PRIORIDAD UNIFICADA
-        for keys, g in q_pantone.groupby(["_cliente_key", "_color_key", "_prio_humana"], dropna=False):
-            min_prio = g["_prio_humana"].min()
-            due_min = g["DueDate"].min()
-            es_urgente = g["Urgente"].apply(es_si).any()
-            fecha_imp_min = g["_fecha_imp"].min()
-            priori_imp_min = g["_priori_imp_num"].min()
-
-            g_sorted = g.sort_values(["ManualPriority", "_priori_imp_num", "Urgente", "DueDate", "CantidadPliegos"], 
-                                     ascending=[True, True, False, True, False])
-            # Tupla: (ManualPrio, PrioExcel, no_urgente, DueDate, tipo_proc, key1, key2, records)
-            grupos_todos.append((min_prio, priori_imp_min, not es_urgente, due_min, 0, keys[0], keys[1], g_sorted.to_dict("records")))
-
-    # 4. GRUPO BARNIZADO (Prioridad 1)
-    # ------------------------------------------------------------
-    if not q_barniz.empty:
-        # Agrupar por CLIENTE + PRIORIDAD UNIFICADA
-        for keys, g in q_barniz.groupby(["_cliente_key", "_prio_humana"], dropna=False):
-            cliente = keys[0]
-            min_prio = g["_prio_humana"].min()
-            due_min = g["DueDate"].min()
-            es_urgente = g["Urgente"].apply(es_si).any()
-            fecha_imp_min = g["_fecha_imp"].min()
-            priori_imp_min = g["_priori_imp_num"].min()
-
-            g_sorted = g.sort_values(["ManualPriority", "_priori_imp_num", "Urgente", "DueDate", "CantidadPliegos"], 
-                                     ascending=[True, True, False, True, False])
-            # Tupla: (ManualPrio, PrioExcel, no_urgente, DueDate, tipo_proc, key1, key2, records)
-            grupos_todos.append((min_prio, priori_imp_min, not es_urgente, due_min, 1, cliente, "barniz", g_sorted.to_dict("records")))
-
-    # 5. ORDENAMIENTO FINAL
-    # ------------------------------------------------------------
-    grupos_todos.sort()
+    q["_tipo_proc"] = mask_barniz.astype(int)
+    q["_clave2"] = q["_troq_key"].where(mask_cmyk, q["_color_key"]).where(~mask_barniz, "barniz")
 
-    return deque([item for *_, recs in grupos_todos for item in recs])
+    q["_urgente_si"] = q["Urgente"].apply(es_si)
+    grupos = q.groupby([mask_pantone, "_tipo_proc", "_cliente_key", "_clave2", "_prio_humana"], dropna=False)
+    q["_g_priori_imp"] = grupos["_priori_imp_num"].transform("min")
+    q["_g_no_urgente"] = ~grupos["_urgente_si"].transform("any")
+    q["_g_due"] = grupos["DueDate"].transform("min")
+
+    # Dentro del grupo: CMYK por Urgente/DueDate/Cantidad (la prioridad unificada es la del grupo),
+    # Pantone y Barniz además por ManualPriority y PrioriImp
+    q["_t_manual"] = q["ManualPriority"].where(~mask_cmyk, 0)
+    q["_t_priori_imp"] = q["_priori_imp_num"].where(~mask_cmyk, 0)
+
+    # 3. ORDENAMIENTO FINAL
+    # ------------------------------------------------------------
+    # Tupla de grupo: (PrioHumana, PrioExcel, no_urgente, DueDate, tipo_proc, cliente, troquel/color)
+    return _ordenar_por_grupos(
+        q,
+        ["_prio_humana", "_g_priori_imp", "_g_no_urgente", "_g_due", "_tipo_proc", "_cliente_key", "_clave2"],
+        ["_t_manual", "_t_priori_imp", "Urgente", "DueDate", "CantidadPliegos"], [True, True, False, True, False],
+    )
 
-def _cola_troquelada(q): 
-    if q.empty: return deque()
+def orden_troquelada(q):
+    """Cola de troqueladoras: grupos por troquel y prioridad unificada."""
+    if q.empty: return q
     q = q.copy()
 
     if "ManualPriority" not in q.columns: q["ManualPriority"] = 9999
@@ -155,109 +183,85 @@ def _cola_troquelada(q):
 
     # --- PRIORIDAD EXCEL COMPUESTA (FechaTroDdp + PrioriTr) ---
     # Mismo patrón que impresión: prioridades POR DÍA, reseteando cada día.
-    if "FechaTroDdp" in q.columns:
-        q["_fecha_tro"] = pd.to_datetime(q["FechaTroDdp"], errors="coerce").fillna(pd.Timestamp.max)
-    else:
-        q["_fecha_tro"] = pd.Timestamp.max
-    
-    if "PrioriTr" in q.columns:
-        q["_priori_tro_num"] = pd.to_numeric(q["PrioriTr"], errors="coerce").fillna(9999)
-    else:
-        q["_priori_tro_num"] = 9999
+    q["_fecha_tro"] = _fecha_o_max(q, "FechaTroDdp")
 
     # Prioridad Unificada
-    prio_tro = pd.to_numeric(q["PrioriTr"] if "PrioriTr" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    prio_man = pd.to_numeric(q["ManualPriority"] if "ManualPriority" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    
-    q["_prio_humana"] = pd.concat([prio_tro, prio_man], axis=1).min(axis=1)
+    q["_prio_humana"] = pd.concat([prio_numerica(q, "PrioriTr"), prio_numerica(q, "ManualPriority")], axis=1).min(axis=1)
 
     q["_troq_key"] = q.get("CodigoTroquel", "").fillna("").astype(str).str.strip().str.lower()
-    grupos = []
-    for keys, g in q.groupby(["_troq_key", "_prio_humana"], dropna=False):
-        troq = keys[0]
-        min_prio = g["_prio_humana"].min()
-        fecha_tro_min = g["_fecha_tro"].min()
-        priori_tro_min = g["_priori_tro_num"].min()
-        due_min = pd.to_datetime(g["DueDate"], errors="coerce").min() or pd.Timestamp.max
-        es_urgente = g.get("Urgente", pd.Series([False]*len(g))).any()
-        
-        g_sorted = g.sort_values(["_prio_humana", "Urgente", "DueDate", "CantidadPliegos"], 
-                                 ascending=[True, False, True, False])
-        
-        grupos.append((min_prio, not es_urgente, fecha_tro_min, due_min, troq, g_sorted.to_dict("records")))
-    
-    grupos.sort()
-    return deque([item for *_, recs in grupos for item in recs])
 
+    q["_urgente_bool"] = _como_bool(q["Urgente"])
+    q["_due_dt"] = pd.to_datetime(q["DueDate"], errors="coerce")
 
-def _cola_cortadora_bobina(q):
+    # Grupo: TROQUEL + PRIORIDAD UNIFICADA
+    grupos = q.groupby(["_troq_key", "_prio_humana"], dropna=False)
+    q["_g_no_urgente"] = ~grupos["_urgente_bool"].transform("any")
+    q["_g_fecha_tro"] = grupos["_fecha_tro"].transform("min")
+    q["_g_due"] = grupos["_due_dt"].transform("min").fillna(pd.Timestamp.max)
+
+    # Tupla de grupo: (PrioHumana, no_urgente, FechaTroDdp, DueDate, troquel)
+    return _ordenar_por_grupos(
+        q,
+        ["_prio_humana", "_g_no_urgente", "_g_fecha_tro", "_g_due", "_troq_key"],
+        ["Urgente", "DueDate", "CantidadPliegos"], [False, True, False],
+    )
+
+
+def orden_cortadora_bobina(q):
     """
-    Agrupa por:
+    Cola de la cortadora de bobinas. Agrupa por:
     1. Materia Prima
     2. Medida (Ancho y Largo)
     3. Gramaje (Grs./Nº)
     Dentro del grupo ordena por Prioridades de Excel, Urgente y DueDate.
     """
-    if q.empty: return deque()
+    if q.empty: return q
     q = q.copy()
     
     # Ensure ManualPriority exists
     if "ManualPriority" not in q.columns: q["ManualPriority"] = 9999
     q["ManualPriority"] = q["ManualPriority"].fillna(9999).astype(int)
 
-    # Propagar prioridad de impresión Y troquelado
-    if "FechaImDdp" in q.columns:
-        q["_fecha_imp"] = pd.to_datetime(q["FechaImDdp"], errors="coerce").fillna(pd.Timestamp.max)
-    else:
-        q["_fecha_imp"] = pd.Timestamp.max
-    
-    if "PrioriImp" in q.columns:
-        q["_priori_imp_num"] = pd.to_numeric(q["PrioriImp"], errors="coerce").fillna(9999)
-    else:
-        q["_priori_imp_num"] = 9999
-
-    if "FechaTroDdp" in q.columns:
-        q["_fecha_tro"] = pd.to_datetime(q["FechaTroDdp"], errors="coerce").fillna(pd.Timestamp.max)
-    else:
-        q["_fecha_tro"] = pd.Timestamp.max
-    
-    if "PrioriTr" in q.columns:
-        q["_priori_tro_num"] = pd.to_numeric(q["PrioriTr"], errors="coerce").fillna(9999)
-    else:
-        q["_priori_tro_num"] = 9999
-
     # Elegir la MEJOR prioridad entre impresión, troquelado y Manual
-    q["_mejor_fecha"] = q[["_fecha_imp", "_fecha_tro"]].min(axis=1)
-    
-    prio_imp = pd.to_numeric(q["PrioriImp"] if "PrioriImp" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    prio_tro = pd.to_numeric(q["PrioriTr"] if "PrioriTr" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    prio_man = pd.to_numeric(q["ManualPriority"] if "ManualPriority" in q.columns else pd.Series([9999]*len(q), index=q.index), errors="coerce").fillna(9999)
-    
-    q["_prio_humana"] = pd.concat([prio_imp, prio_tro, prio_man], axis=1).min(axis=1)
+    q["_prio_humana"] = pd.concat([prio_numerica(q, "PrioriImp"), prio_numerica(q, "PrioriTr"), prio_numerica(q, "ManualPriority")], axis=1).min(axis=1)
 
     # Normalización de claves
     q["_mp_key"] = q.get("MateriaPrima", "").fillna("").astype(str).str.strip().str.lower()
     q["_pli_key"] = q.get("PliAnc", 0).astype(str) + "x" + q.get("PliLar", 0).astype(str)
     q["_gram_key"] = q.get("Gramaje", 0).astype(str)
 
-    grupos = []
-    for keys, g in q.groupby(["_mp_key", "_pli_key", "_gram_key", "_prio_humana"], dropna=False):
-        mp, medida, gramaje = keys[0], keys[1], keys[2]
-        min_prio = g["_prio_humana"].min()
-        fecha_mejor_min = g["_mejor_fecha"].min()
-        due_min = pd.to_datetime(g["DueDate"], errors="coerce").min() or pd.Timestamp.max
-        es_urgente = g.get("Urgente", pd.Series([False]*len(g))).any()
-        
-        g_sorted = g.sort_values(["_prio_humana", "Urgente", "DueDate", "CantidadPliegos"], 
-                                 ascending=[True, False, True, False])
-        
-        # Guardamos el grupo. 
-        grupos.append((min_prio, not es_urgente, due_min, mp, medida, gramaje, g_sorted.to_dict("records")))
+    q["_urgente_bool"] = _como_bool(q["Urgente"])
+    q["_due_dt"] = pd.to_datetime(q["DueDate"], errors="coerce")
 
-        
-    grupos.sort()
-    
-    return deque([item for *_, recs in grupos for item in recs])
+    grupos = q.groupby(["_mp_key", "_pli_key", "_gram_key", "_prio_humana"], dropna=False)
+    q["_g_no_urgente"] = ~grupos["_urgente_bool"].transform("any")
+    q["_g_due"] = grupos["_due_dt"].transform("min").fillna(pd.Timestamp.max)
+
+    # Tupla de grupo: (PrioHumana, no_urgente, DueDate, materia prima, medida, gramaje)
+    return _ordenar_por_grupos(
+        q,
+        ["_prio_humana", "_g_no_urgente", "_g_due", "_mp_key", "_pli_key", "_gram_key"],
+        ["Urgente", "DueDate", "CantidadPliegos"], [False, True, False],
+    )
+
+def prioridad_robo_pool(tarea, degradar_urgentes=False):
+    """
+    Orden en que una descartonadora toma tareas listas del POOL (menor primero):
+    (PrioriDesc o ManualPriority, no urgente, sin sucesor). Si la máquina tiene
+    un paro inminente (`degradar_urgentes`) las urgentes pasan al final (+5000)
+    y dejan de contar como urgentes.
+    """
+    try:
+        prio_desc = float(tarea.get("PrioriDesc", 9999) or 9999)
+        if pd.isna(prio_desc): prio_desc = 9999
+    except (ValueError, TypeError):
+        prio_desc = 9999
+    prio = min(tarea.prio_man, int(prio_desc))
+    urgente = es_si(tarea.get("Urgente"))
+    if urgente and degradar_urgentes:
+        prio += 5000
+        urgente = False
+    return (prio, not urgente, not tarea.tiene_sucesor)
 
 def get_downstream_presence_score(task, colas, maquinas_info, maquina_actual, last_tasks_map=None):
     """
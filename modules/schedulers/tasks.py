@@ -1,8 +1,9 @@
 import pandas as pd
 import numpy as np
+from collections import deque
 from modules.utils.config_loader import es_si 
 from .machines import elegir_maquina
-from .priorities import _clave_prioridad_maquina
+from .priorities import _clave_prioridad_maquina, clase_prioridad_maquina, prioridad_efectiva
 
 # Default set of processes that are outsourced with no queue (72h fixed)
 # Stored here to avoid circular imports with scheduler.py
@@ -101,9 +102,210 @@ def _procesos_pendientes_de_orden(orden: pd.Series, orden_std=None, ignore_const
     
     return pendientes_limpios
 
+# Flags de procesos pendientes, en el orden en que se evalúan en
+# _procesos_pendientes_de_orden: (proceso, columna, bloqueo por falta de fechas)
+#   "pelicula": impresión y posteriores se bloquean si falta la llegada de chapas
+#   "ambos":    troquelado y posteriores también si falta la llegada del troquel
+_FLAGS_PENDIENTES = [
+    ("Cortadora Bobina", "CorteSNDdp", None),
+    ("Guillotina", "_PEN_Guillotina", None),
+    ("Impresión Flexo", "_PEN_ImpresionFlexo", "pelicula"),
+    ("Impresión Offset", "_PEN_ImpresionOffset", "pelicula"),
+    ("Barnizado", "_PEN_Barnizado", "pelicula"),
+    ("Stamping", "_PEN_Stamping", "pelicula"),
+    ("Plastificado", "_PEN_Plastificado", "pelicula"),
+    ("Encapado", "_PEN_Encapado", "pelicula"),
+    ("Cuño", "_PEN_Cuño", "pelicula"),
+    ("Troquelado", "_PEN_Troquelado", "ambos"),
+    ("Descartonado", "_PEN_Descartonado", "ambos"),
+    ("Ventana", "_PEN_Ventana", "ambos"),
+    ("Pegado", "_PEN_Pegado", "ambos"),
+    ("Prensado", "_PEN_Prensado", None),
+]
+
+
+class _ColumnasOrdenes:
+    """
+    Acceso por columna a las órdenes con la misma semántica que `row.get` sobre
+    `df.iterrows()`: los valores salen de `df.values` (los mismos objetos que
+    ve iterrows) y una columna inexistente devuelve el default en cada fila.
+    """
+
+    def __init__(self, df):
+        self.n = len(df)
+        self._valores = df.values
+        self._pos = {c: j for j, c in enumerate(df.columns)}
+        self._cache = {}
+
+    def __contains__(self, nombre):
+        return nombre in self._pos
+
+    def get(self, nombre, default=None):
+        j = self._pos.get(nombre)
+        if j is None:
+            return [default] * self.n
+        col = self._cache.get(j)
+        if col is None:
+            col = self._cache[j] = self._valores[:, j].tolist()
+        return col
+
+    def fila(self, i):
+        """Dict de la orden i (para los helpers que reciben la fila completa)."""
+        return dict(zip(self._pos, self._valores[i].tolist()))
+
+
+def _es_si_col(valores):
+    """es_si elemento a elemento, memoizado por (tipo, valor): las columnas Si/No repiten mucho."""
+    cache = {}
+    res = np.empty(len(valores), dtype=bool)
+    for i, x in enumerate(valores):
+        try:
+            clave = (type(x), x)
+            v = cache.get(clave)
+            if v is None:
+                v = cache[clave] = es_si(x)
+        except TypeError:  # no hasheable
+            v = es_si(x)
+        res[i] = v
+    return res
+
+
+def _pendientes_largo(cols, orden_std=None, ignore_constraints=False):
+    """
+    Versión por columnas de _procesos_pendientes_de_orden para todas las órdenes
+    a la vez, en formato largo: devuelve (posición de la orden, proceso) por cada
+    proceso pendiente, en el mismo orden que la función fila a fila.
+    """
+    flujo = orden_std or [
+        "Cortadora Bobina", "Guillotina", "Impresión Flexo", "Impresión Offset", "Barnizado",
+        "OPP", "Stamping", "Plastificado", "Encapado", "Cuño","Troquelado", 
+        "Descartonado", "Ventana", "Pegado", "Prensado"
+    ]
+    flujo = [p.strip() for p in flujo]
+    orden_idx = {p: i for i, p in enumerate(flujo)}
+
+    # Bloqueos por falta de fechas (se ignoran con ignore_constraints)
+    bloq_pelicula = np.zeros(cols.n, dtype=bool)
+    bloq_troquel = np.zeros(cols.n, dtype=bool)
+    if not ignore_constraints:
+        for bloq, flag, fecha in ((bloq_pelicula, "PeliculaArt", "FechaLlegadaChapas"),
+                                  (bloq_troquel, "TroquelArt", "FechaLlegadaTroquel")):
+            falta = np.fromiter((pd.isna(f) or str(f).strip() == "" for f in cols.get(fecha)), dtype=bool, count=cols.n)
+            bloq |= _es_si_col(cols.get(flag)) & falta
+
+    # Matriz de flags con las columnas ya en el orden del flujo (sort estable)
+    flags = sorted(_FLAGS_PENDIENTES, key=lambda f: orden_idx.get(f[0], 999))
+    procesos = [f[0] for f in flags]
+    matriz = np.zeros((cols.n, len(flags)), dtype=bool)
+    for k, (proceso, columna, bloqueo) in enumerate(flags):
+        if proceso == "Prensado":
+            matriz[:, k] = [x is True or x == True for x in cols.get(columna)]
+            continue
+        pendiente = _es_si_col(cols.get(columna))
+        if bloqueo:
+            pendiente &= ~bloq_pelicula
+        if bloqueo == "ambos":
+            pendiente &= ~bloq_troquel
+        matriz[:, k] = pendiente
+
+    # Reordenamiento por '_TroqAntes': Troquelado antes de la primera Impresión
+    clave = np.broadcast_to(np.arange(len(flags), dtype=float), matriz.shape).copy()
+    k_troq = procesos.index("Troquelado")
+    k_imp = [k for k, p in enumerate(procesos) if "Impresi" in p]
+    troq_antes = _es_si_col(cols.get("_TroqAntes"))
+    if troq_antes.any() and k_imp:
+        tiene_imp = matriz[:, k_imp].any(axis=1)
+        primera_imp = np.where(matriz[:, k_imp], np.array(k_imp), len(flags)).min(axis=1)
+        mover = troq_antes & matriz[:, k_troq] & tiene_imp & (k_troq > primera_imp)
+        clave[mover, k_troq] = primera_imp[mover] - 0.5
+
+    # Formato largo: una fila por (orden, proceso pendiente)
+    filas, ks = np.nonzero(matriz)
+    orden = np.lexsort((clave[filas, ks], filas))
+    return filas[orden], [procesos[k] for k in ks[orden]]
+
+
+class _ResolutorMaquinas:
+    """
+    Tablas de búsqueda sobre cfg["maquinas"] para resolver la máquina de cada
+    tarea sin recorrer el DataFrame: candidatas por proceso, filas por nombre
+    normalizado y máquinas custom (_IsCustom) por proceso.
+    """
+
+    def __init__(self, cfg):
+        from modules.utils.config_loader import normalize_machine_name
+        self.cfg = cfg
+        self._normalizar = normalize_machine_name
+        maq_df = cfg["maquinas"]
+        nombres = maq_df["Maquina"].tolist()
+        procesos = maq_df["Proceso"].tolist()
+
+        self._nombres_procesos = list(zip(nombres, procesos))
+        self._por_nombre_norm = None
+
+        self._con_custom = "_IsCustom" in maq_df.columns
+        customs = maq_df["_IsCustom"].tolist() if self._con_custom else [None] * len(nombres)
+        self._filas_custom = [(c == True, str(p).strip().lower()) for c, p in zip(customs, procesos)]
+        self._es_custom = {}
+        for m_raw, c in zip(nombres, customs):
+            self._es_custom.setdefault(m_raw, bool(c) is True)
+        self._custom_proc = {}
+        if self._con_custom:
+            proc_norm = maq_df["Proceso"].str.lower().str.strip()
+            for m_raw, c, p in zip(nombres, customs, proc_norm.tolist()):
+                if c == True and isinstance(p, str):
+                    self._custom_proc.setdefault(p, m_raw)
+
+        self._candidatos = {}
+        self._custom_contiene = {}
+
+    def candidatos(self, proceso):
+        """Máquinas candidatas del proceso (mismo filtro que elegir_maquina)."""
+        palabra = proceso.lower().strip().split()[0]
+        cand = self._candidatos.get(palabra)
+        if cand is None:
+            maq_df = self.cfg["maquinas"]
+            cand = self._candidatos[palabra] = maq_df[maq_df["Proceso"].str.lower().str.contains(palabra)]["Maquina"].tolist()
+        return cand
+
+    def desde_prioridad(self, maquinas_prio, str_proc):
+        """Primera máquina de las prioridades manuales de la OT que hace este proceso."""
+        if self._por_nombre_norm is None:
+            self._por_nombre_norm = {}
+            for m_raw, m_proc in self._nombres_procesos:
+                self._por_nombre_norm.setdefault(self._normalizar(m_raw), []).append((m_raw, m_proc))
+        proc_l = str_proc.lower()
+        for prio_maq in maquinas_prio:
+            for m_raw, maq_proceso in self._por_nombre_norm.get(self._normalizar(prio_maq), ()):
+                if proc_l in maq_proceso.lower() or maq_proceso.lower() in proc_l:
+                    return m_raw
+        return None
+
+    def proceso_tiene_custom(self, proc_lower):
+        """Hay alguna máquina custom cuyo proceso contiene 'proc_lower'."""
+        if not self._con_custom:
+            return False
+        r = self._custom_contiene.get(proc_lower)
+        if r is None:
+            r = self._custom_contiene[proc_lower] = any(c and proc_lower in p for c, p in self._filas_custom)
+        return r
+
+    def es_custom(self, maquina):
+        return self._con_custom and self._es_custom.get(maquina, False)
+
+    def custom_para(self, proc_lower):
+        """Primera máquina custom del proceso exacto (None si no hay)."""
+        return self._custom_proc.get(proc_lower)
+
+
 def _expandir_tareas(df: pd.DataFrame, cfg):
-    """Expande OTs en tareas individuales (una fila por proceso pendiente)."""
-    tareas = []
+    """
+    Expande OTs en tareas individuales (una fila por proceso pendiente).
+
+    Los flags _PEN_* se evalúan por columna y se pasan a formato largo (una
+    fila por orden y proceso); la máquina de cada tarea se resuelve con tablas
+    precalculadas (_ResolutorMaquinas) en vez de recorrer cfg["maquinas"].
+    """
     orden_std_limpio = [p.strip() for p in cfg.get("orden_std", [])]
 
     # --- MANUAL OVERRIDES ---
@@ -112,263 +314,218 @@ def _expandir_tareas(df: pd.DataFrame, cfg):
     priorities = overrides.get("manual_priorities", {})
     outsourced = overrides.get("outsourced_processes", set())
     skipped = overrides.get("skipped_processes", set())
-
-    for idx, row in df.iterrows():
-        ot = f"{row['CodigoProducto']}-{row['Subcodigo']}"
-        
-        # 1. Blacklist Check
-        if ot in blacklist:
-            continue
-            
-        pendientes = _procesos_pendientes_de_orden(row, orden_std_limpio, ignore_constraints=cfg.get("ignore_constraints", False))
-
-        if not pendientes:
-            continue
-
-        for proceso in pendientes:
-            # --- Check if Manual Priority specifies a machine ---
-            # If user set priority for (OT, SpecificMachine), use that machine instead of auto-assignment
-            str_ot = str(ot)
-            str_proc = str(proceso)
-            
-            # Look for any priority entry for this OT
-            maquina_from_priority = None
-            from modules.utils.config_loader import normalize_machine_name
-            for (prio_ot, prio_maq), prio_val in priorities.items():
-                if prio_ot == str_ot:
-                    # Check if this machine handles this process (prio_maq is normalized to avoid º vs ° issues)
-                    for _, row_m in cfg["maquinas"].iterrows():
-                        m_raw = row_m["Maquina"]
-                        if normalize_machine_name(m_raw) == normalize_machine_name(prio_maq):
-                            maq_proceso = row_m["Proceso"]
-                            if str_proc.lower() in maq_proceso.lower() or maq_proceso.lower() in str_proc.lower():
-                                maquina_from_priority = m_raw
-                                break
-                    if maquina_from_priority:
-                        break
-            
-            # Use priority machine if found, otherwise auto-assign
-            if maquina_from_priority:
-                maquina = maquina_from_priority
-                has_manual_prio_machine = True
-            else:
-                # --- ASIGNACIÓN POR TROQUELADORA DEL EXCEL (TroqueladoraDdp) ---
-                # Solo forzar máquina del Excel si tiene FECHA y PRIORIDAD asignadas
-                if "troquel" in proceso.lower():
-                    troq_id = row.get("TroqueladoraDdp")
-                    fecha_tro = row.get("FechaTroDdp")
-                    priori_tro = row.get("PrioriTr")
-                    tiene_plan_completo = (pd.notna(troq_id) and pd.notna(fecha_tro) and pd.notna(priori_tro))
-                    
-                    if tiene_plan_completo:
-                        troq_id_int = int(float(troq_id))
-                        if troq_id_int in TROQUELADORA_ID_MAP:
-                            maquina = TROQUELADORA_ID_MAP[troq_id_int]
-                            has_manual_prio_machine = True  # Excel plan overrides locked_assignments
-                        else:
-                            maquina = elegir_maquina(proceso, row, cfg, None)
-                            has_manual_prio_machine = False
-                    else:
-                        maquina = elegir_maquina(proceso, row, cfg, None)
-                        has_manual_prio_machine = False
-                else:
-                    maquina = elegir_maquina(proceso, row, cfg, None)
-                    has_manual_prio_machine = False
-
-                # --- ASIGNACIÓN POR DESCARTONADORA DEL EXCEL (OpeDes1) ---
-                # Si la orden tiene OpeDes1 asignada, va a esa máquina específica
-                # (PrioriDesc es opcional; si la tiene, se usa para ordenar la cola)
-                if "descartonad" in proceso.lower():
-                    desc_id = row.get("OpeDes1")
-                    tiene_maq_desc = pd.notna(desc_id) and str(desc_id).strip() not in ("", "nan")
-                    
-                    if tiene_maq_desc:
-                        try:
-                            desc_id_int = int(float(desc_id))
-                            if desc_id_int in DESCARTONADORA_ID_MAP:
-                                maquina = DESCARTONADORA_ID_MAP[desc_id_int]
-                                has_manual_prio_machine = True
-                        except (ValueError, TypeError):
-                            pass
-
-            
-            # --- Check Outsourced/Skipped/Priority ---
-            str_maq = str(maquina)
-            key_proc = (str_ot, str_proc)
-            
-            is_outsourced = key_proc in outsourced
-            is_skipped = key_proc in skipped
-            
-            # Override Machine Name if Outsourced/Skipped to allow special handling
-            if is_skipped:
-                maquina = "SALTADO"
-            elif is_outsourced:
-                # Si el proceso tiene una máquina CUSTOM (_IsCustom=True), NO lo mandamos
-                # a TERCERIZADO. Las máquinas del Excel para procesos como Encapado/Stamping
-                # son solo de referencia; solo una máquina creada desde la UI convierte
-                # el proceso en interno con cola.
-                proc_lower_chk = str_proc.strip().lower()
-                maquinas_df = cfg["maquinas"]
-                custom_col = maquinas_df.get("_IsCustom", None)
-                if custom_col is not None:
-                    proc_tiene_custom = any(
-                        (row_m["_IsCustom"] == True) and
-                        (proc_lower_chk in str(row_m["Proceso"]).strip().lower())
-                        for _, row_m in maquinas_df.iterrows()
-                    )
-                else:
-                    proc_tiene_custom = False
-
-                if proc_tiene_custom:
-                    pass  # Tiene máquina custom → mantener la asignación automática
+    locked_assignments = cfg.get("locked_assignments", {})
+
+    from modules.utils.config_loader import normalize_machine_name
+    # Prioridades manuales: máquinas por OT (en orden) y valor por (OT, máquina normalizada)
+    prio_maquinas_ot = {}
+    prio_norm = {}
+    for (p_ot, p_maq), p_val in priorities.items():
+        prio_maquinas_ot.setdefault(p_ot, []).append(p_maq)
+        prio_norm.setdefault((str(p_ot), normalize_machine_name(p_maq)), p_val)
+    ots_con_prio = {ot for ot, _ in prio_norm}
+
+    cols = _ColumnasOrdenes(df)
+    ots = [f"{c}-{s}" for c, s in zip(cols.get("CodigoProducto"), cols.get("Subcodigo"))]
+    pos_tareas, procesos = _pendientes_largo(cols, orden_std_limpio, ignore_constraints=cfg.get("ignore_constraints", False))
+
+    # 1. Blacklist Check
+    if blacklist:
+        keep = [i for i, pos in enumerate(pos_tareas) if ots[pos] not in blacklist]
+        pos_tareas, procesos = pos_tareas[keep], [procesos[i] for i in keep]
+
+    resolutor = _ResolutorMaquinas(cfg)
+    filas = {}  # dict por orden, solo para los helpers que reciben la fila
+
+    # Columnas que se leen por tarea
+    troq_ids, fechas_tro, prioris_tr = cols.get("TroqueladoraDdp"), cols.get("FechaTroDdp"), cols.get("PrioriTr")
+    desc_ids = cols.get("OpeDes1")
+    cant_prod_col = cols.get("CantidadProductos") if "CantidadProductos" in cols else cols.get("CantidadPliegos", 0)
+    poses_col, pliegos_col, cant_desc_col = cols.get("Poses", 1), cols.get("CantidadPliegos"), cols.get("CantDesPlanDdp", 0)
+    bocas_col = cols.get("BocasTroquel") if "BocasTroquel" in cols else cols.get("Boca1_ddp", 1)
+    hay_pliegos = "CantidadPliegos" in cols
+
+    t_maquina, t_group, t_pliegos, t_bocas, t_poses = [], [], [], [], []
+    t_prio, t_outs, t_skip, t_manual, t_locked = [], [], [], [], []
+
+    for pos, proceso in zip(pos_tareas.tolist(), procesos):
+        ot = ots[pos]
+        fila = filas.get(pos)
+        if fila is None:
+            fila = filas[pos] = cols.fila(pos)
+
+        # --- Check if Manual Priority specifies a machine ---
+        # If user set priority for (OT, SpecificMachine), use that machine instead of auto-assignment
+        str_ot = str(ot)
+        str_proc = str(proceso)
+        maquina_from_priority = None
+        if str_ot in prio_maquinas_ot:
+            maquina_from_priority = resolutor.desde_prioridad(prio_maquinas_ot[str_ot], str_proc)
+
+        # Use priority machine if found, otherwise auto-assign
+        if maquina_from_priority:
+            maquina = maquina_from_priority
+            has_manual_prio_machine = True
+        else:
+            maquina = None
+            has_manual_prio_machine = False
+            # --- ASIGNACIÓN POR TROQUELADORA DEL EXCEL (TroqueladoraDdp) ---
+            # Solo forzar máquina del Excel si tiene FECHA y PRIORIDAD asignadas
+            if "troquel" in proceso.lower():
+                troq_id = troq_ids[pos]
+                if pd.notna(troq_id) and pd.notna(fechas_tro[pos]) and pd.notna(prioris_tr[pos]):
+                    troq_id_int = int(float(troq_id))
+                    if troq_id_int in TROQUELADORA_ID_MAP:
+                        maquina = TROQUELADORA_ID_MAP[troq_id_int]
+                        has_manual_prio_machine = True  # Excel plan overrides locked_assignments
+            if not has_manual_prio_machine:
+                maquina = elegir_maquina(proceso, fila, cfg, None, candidatos=resolutor.candidatos(proceso))
+
+            # --- ASIGNACIÓN POR DESCARTONADORA DEL EXCEL (OpeDes1) ---
+            # (PrioriDesc es opcional; si la tiene, se usa para ordenar la cola)
+            if "descartonad" in proceso.lower():
+                desc_id = desc_ids[pos]
+                if pd.notna(desc_id) and str(desc_id).strip() not in ("", "nan"):
+                    try:
+                        desc_id_int = int(float(desc_id))
+                        if desc_id_int in DESCARTONADORA_ID_MAP:
+                            maquina = DESCARTONADORA_ID_MAP[desc_id_int]
+                            has_manual_prio_machine = True
+                    except (ValueError, TypeError):
+                        pass
+
+        # --- Check Outsourced/Skipped/Priority ---
+        str_maq = str(maquina)
+        key_proc = (str_ot, str_proc)
+        is_outsourced = key_proc in outsourced
+        is_skipped = key_proc in skipped
+
+        # Override Machine Name if Outsourced/Skipped to allow special handling
+        if is_skipped:
+            maquina = "SALTADO"
+        elif is_outsourced:
+            # Con máquina CUSTOM (_IsCustom=True) el proceso queda interno con cola;
+            # las máquinas del Excel para Encapado/Stamping son solo de referencia.
+            if not resolutor.proceso_tiene_custom(str_proc.strip().lower()):
+                maquina = "TERCERIZADO"
+
+        # GUARD: Procesos tercerizados por defecto (encapado/stamping/etc.):
+        #   - Si hay máquina CUSTOM → asignar esa en lugar del placeholder del Excel
+        #   - Si NO hay máquina custom → TERCERIZADO (72h, sin cola)
+        if maquina not in ("SALTADO", "TERCERIZADO"):
+            proc_lower_guard = str_proc.strip().lower()
+            if proc_lower_guard in _default_terc() and not resolutor.es_custom(maquina):
+                maquina_custom = resolutor.custom_para(proc_lower_guard)
+                if maquina_custom is not None:
+                    # El balanceo de carga (paso 3.2 del scheduler) redistribuye entre customs
+                    maquina = maquina_custom
                 else:
                     maquina = "TERCERIZADO"
+                    is_outsourced = True
+
+        # Manual Priority: solo si la tarea queda interna. Se busca con la máquina
+        # asignada (antes de los overrides) y, si no está, por nombre normalizado.
+        manual_prio = 9999
+        if not (is_outsourced or is_skipped):
+            manual_prio = priorities.get((str_ot, str_maq), 9999)
+            if manual_prio == 9999 and str_ot in ots_con_prio:
+                manual_prio = prio_norm.get((str_ot, normalize_machine_name(str_maq)), 9999)
+
+        # --- PERSISTENCE LOCKING LOGIC ---
+        # Si la tarea quedó fijada en la corrida anterior, se fuerza (salvo prioridad manual explícita)
+        lock_key = (str_ot, str_proc)
+        is_locked = lock_key in locked_assignments
+        if is_locked and not has_manual_prio_machine:
+            maquina = locked_assignments[lock_key]
+
+        # Cálculo de pliegos
+        cant_prod = float(cant_prod_col[pos] or 0)
+        poses = float(poses_col[pos] or 1)
+        bocas = float(bocas_col[pos] or 1)
+        proc_l = proceso.lower()
+        if proc_l.startswith("impres") or proc_l.startswith("barniz"):
+            # Impresión: usa poses
+            pliegos = cant_prod / poses if poses > 0 else cant_prod
+        elif "troquel" in proc_l or "cortadora bobina" in proc_l:
+            # TROQUELADO y CORTADORA BOBINA: SIEMPRE dividir cantidad por bocas
+            pliegos = cant_prod / bocas if bocas > 0 else cant_prod
+        elif "descarton" in proc_l:
+            # DESCARTONADO: usa la cantidad planificada de descartonado, no la genérica
+            cant_desc = float(cant_desc_col[pos] or 0)
+            pliegos = cant_desc if cant_desc > 0 else float(pliegos_col[pos] if hay_pliegos else cant_prod)
+        else:
+            # Procesos restantes
+            pliegos = float(pliegos_col[pos] if hay_pliegos else cant_prod)
+
+        t_maquina.append(maquina)
+        t_group.append(_clave_prioridad_maquina(proceso, fila))
+        t_pliegos.append(pliegos)
+        t_bocas.append(bocas)
+        t_poses.append(poses)
+        t_prio.append(manual_prio)
+        t_outs.append(is_outsourced)
+        t_skip.append(is_skipped)
+        t_manual.append(is_locked or has_manual_prio_machine)
+        t_locked.append(is_locked)
+
+    if len(pos_tareas) == 0:
+        tasks = pd.DataFrame([])
+    else:
+        pos_lista = pos_tareas.tolist()
+
+        def por_tarea(valores):
+            return [valores[pos] for pos in pos_lista]
+
+        def col_orden(nombre, default=None):
+            return por_tarea(cols.get(nombre, default))
+
+        cod_troquel = [a or b or c or "" for a, b, c in zip(cols.get("CodigoTroquel"), cols.get("CodTroTapa"), cols.get("CodTroCuerpo"))]
+        mp_planta = cols.get("MateriaPrimaPlanta") if "MateriaPrimaPlanta" in cols else cols.get("MPPlanta")
+        columnas = {
+            "idx": por_tarea(df.index.tolist()), "OT_id": por_tarea(ots),
+            "CodigoProducto": col_orden("CodigoProducto"), "Subcodigo": col_orden("Subcodigo"),
+            "Cliente": col_orden("Cliente"), "Cliente-articulo": col_orden("Cliente-articulo", ""),
+            "Proceso": procesos, "Maquina": t_maquina,
+            "DueDate": col_orden("FechaEntrega"), "GroupKey": t_group,
+            "MateriaPrimaPlanta": por_tarea(mp_planta),
+            "MateriaPrima": col_orden("MateriaPrima", ""), # Fix for priorities.py
+            "CodigoTroquel": por_tarea(cod_troquel),
+            "Colores": col_orden("Colores", ""),
+            "CantidadPliegos": t_pliegos,
+            "CantidadPliegosNetos": col_orden("CantidadPliegos"),
+            "Bocas": t_bocas, "Poses": t_poses,
+            "TroquelArt": col_orden("TroquelArt", ""),
+            "PeliculaArt": col_orden("PeliculaArt", ""),
+            "FechaLlegadaChapas": col_orden("FechaLlegadaChapas"), # Fecha disponiblidad Impresión
+            "FechaLlegadaTroquel": col_orden("FechaLlegadaTroquel"), # Fecha disponiblidad Troquel
+            "PliAnc": col_orden("PliAnc", 0),
+            "PliLar": col_orden("PliLar", 0),
+            "Gramaje": col_orden("Grs./Nº", 0), # Campo para agrupamiento Bobina
+            "Urgente": por_tarea(_es_si_col(cols.get("Urgente", False)).tolist()), # Bandera de urgencia
+            "_TroqAntes": por_tarea(_es_si_col(cols.get("_TroqAntes", False)).tolist()),
+            "_PEN_ImpresionFlexo": col_orden("_PEN_ImpresionFlexo"),
+            "_PEN_ImpresionOffset": col_orden("_PEN_ImpresionOffset"),
+            "ProcesoDpd": col_orden("ProcesoDpd", ""), # ProcesoDpd para reordenamiento dinámico
+            "PrioriImp": col_orden("PrioriImp", ""), # Prioridad desde Excel (Impresión)
+            "FechaImDdp": col_orden("FechaImDdp"),    # Fecha asociada a la prioridad Excel (Impresión)
+            "PrioriTr": col_orden("PrioriTr", ""),     # Prioridad desde Excel (Troquelado)
+            "FechaTroDdp": col_orden("FechaTroDdp"),   # Fecha asociada a la prioridad Excel (Troquelado)
+            "TroqueladoraDdp": col_orden("TroqueladoraDdp"),  # ID de troqueladora del Excel
+            "PrioriDesc": col_orden("PrioriDesc", ""),  # Prioridad desde Excel (Descartonado)
+            "OpeDes1": col_orden("OpeDes1", ""),         # ID de descartonadora del Excel
+            "PrioVenDdp": col_orden("PrioVenDdp", ""),   # Prioridad desde Excel (Ventana)
+            "PrioPegDdp": col_orden("PrioPegDdp", ""),   # Prioridad desde Excel (Pegado)
+
+            # Manual Override Params
+            "ManualPriority": t_prio,
+            "IsOutsourced": t_outs,
+            "IsSkipped": t_skip,
+            "ManualAssignment": t_manual, # Force stickiness if locked or explicitly prioritized
+            "HistoryLocked": t_locked # For UI/Debugging
+        }
+        # Filas como tuplas: misma inferencia de tipos que la lista de dicts de antes
+        tasks = pd.DataFrame(list(zip(*columnas.values())), columns=list(columnas))
 
-            # -------------------------------------------------------
-            # GUARD: Procesos tercierizados por defecto
-            # Si el proceso es del conjunto default (encapado/stamping/etc.):
-            #   - Si hay máquina CUSTOM → asignar esa en lugar del placeholder del Excel
-            #   - Si NO hay máquina custom → TERCERIZADO (72h, sin cola)
-            # -------------------------------------------------------
-            if maquina not in ("SALTADO", "TERCERIZADO"):
-                proc_lower_guard = str_proc.strip().lower()
-                if proc_lower_guard in _default_terc():
-                    maq_df_g = cfg["maquinas"]
-
-                    # Ver si la máquina actual ya es custom (raro pero posible)
-                    maq_row_g = maq_df_g[maq_df_g["Maquina"] == maquina]
-                    is_currently_custom = (
-                        not maq_row_g.empty
-                        and "_IsCustom" in maq_row_g.columns
-                        and bool(maq_row_g["_IsCustom"].iloc[0]) is True
-                    )
-
-                    if not is_currently_custom:
-                        # Buscar si existe alguna máquina custom para este proceso
-                        if "_IsCustom" in maq_df_g.columns:
-                            custom_para_proc = maq_df_g[
-                                (maq_df_g["_IsCustom"] == True) &
-                                (maq_df_g["Proceso"].str.lower().str.strip() == proc_lower_guard)
-                            ]
-                        else:
-                            custom_para_proc = maq_df_g.iloc[0:0]  # vacío
-
-                        if not custom_para_proc.empty:
-                            # Usar la primera máquina custom disponible para este proceso.
-                            # El balanceo de carga (paso 3.2 del scheduler) redistribuirá
-                            # entre todas las customs si hay más de una.
-                            maquina = custom_para_proc.iloc[0]["Maquina"]
-                        else:
-                            # Sin máquina custom → TERCERIZADO
-                            maquina = "TERCERIZADO"
-                            is_outsourced = True
-
-
-
-            # Manual Priority (check with ORIGINAL machine name or new one? Original makes sense for user input)
-            # User selected "Imp. Offset 1" in UI. If we change it to TERCERIZADO, we lose that key.
-            # But priority only matters if it stays internal. 
-            # If Internal, check priority.
-            manual_prio = 9999
-            if not (is_outsourced or is_skipped):
-                # Check for (OT, Machine)
-                # We use the assigned machine 'maquina'
-                # Note: 'elegir_maquina' might return generic; need to match what User sees (Specific Machine).
-                # Need to use normalized name for lookup because Priority Keys are normalized
-                # but 'maquina' variable might come from:
-                # 1. 'maquina_from_priority' (Normalized, if priorities loaded correctly)
-                # 2. 'elegir_maquina' (Normalized, from Config)
-                # 3. 'locked_assignments' (Potentially UN-NORMALIZED if from old history)
-                
-                
-                key_prio = (str_ot, str_maq)
-                manual_prio = priorities.get(key_prio, 9999)
-                
-                # Fallback if case mismatch or normalization mismatch:
-                if manual_prio == 9999:
-                    str_maq_norm = normalize_machine_name(str_maq)
-                    for (p_ot, p_maq), p_val in priorities.items():
-                        if str(p_ot) == str_ot and normalize_machine_name(p_maq) == str_maq_norm:
-                            manual_prio = p_val
-                            break
-
-            # --- PERSISTENCE LOCKING LOGIC ---
-            # If this task was scheduled for "Today" in the previous run, FORCE it.
-            # We assume cfg["locked_assignments"] contains {(str_ot, str_proc): str_machine}
-            locked_assignments = cfg.get("locked_assignments", {})
-            lock_key = (str_ot, str_proc)
-            
-            if lock_key in locked_assignments:
-                locked_machine = locked_assignments[lock_key]
-                # Force assignment only if not explicitly prioritized manually
-                if not has_manual_prio_machine:
-                    maquina = locked_machine
-                pass 
-
-
-            # Cálculo de pliegos
-            cant_prod = float(row.get("CantidadProductos", row.get("CantidadPliegos", 0)) or 0)
-            poses = float(row.get("Poses", 1) or 1)
-            bocas = float(row.get("BocasTroquel", row.get("Boca1_ddp", 1)) or 1)
-            if proceso.lower().startswith("impres")or proceso.lower().startswith("barniz"):
-                # Impresión: usa poses
-                pliegos = cant_prod / poses if poses > 0 else cant_prod
-
-            elif "troquel" in proceso.lower() or "cortadora bobina" in proceso.lower():
-                # TROQUELADO y CORTADORA BOBINA: SIEMPRE dividir cantidad por bocas
-                pliegos = cant_prod / bocas if bocas > 0 else cant_prod
-            elif "descarton" in proceso.lower():
-                # DESCARTONADO: usa la cantidad planificada de descartonado, no la genérica
-                cant_desc = float(row.get("CantDesPlanDdp", 0) or 0)
-                pliegos = cant_desc if cant_desc > 0 else float(row.get("CantidadPliegos", cant_prod))
-            else:
-                # Procesos restantes
-                pliegos = float(row.get("CantidadPliegos", cant_prod))
-
-
-            tareas.append({
-                "idx": idx, "OT_id": ot, "CodigoProducto": row["CodigoProducto"], "Subcodigo": row["Subcodigo"],
-                "Cliente": row["Cliente"], "Cliente-articulo": row.get("Cliente-articulo", ""),
-                "Proceso": proceso, "Maquina": maquina,
-                "DueDate": row["FechaEntrega"], "GroupKey": _clave_prioridad_maquina(proceso, row),
-                "MateriaPrimaPlanta": row.get("MateriaPrimaPlanta", row.get("MPPlanta")),
-                "MateriaPrima": row.get("MateriaPrima", ""), # Fix for priorities.py
-                "CodigoTroquel": row.get("CodigoTroquel") or row.get("CodTroTapa") or row.get("CodTroCuerpo") or "",
-                "Colores": row.get("Colores", ""), 
-                "CantidadPliegos": pliegos,
-                "CantidadPliegosNetos": row.get("CantidadPliegos"), 
-                "Bocas": bocas, "Poses": poses,
-                "TroquelArt": row.get("TroquelArt", ""),
-                "PeliculaArt": row.get("PeliculaArt", ""),
-                "FechaLlegadaChapas": row.get("FechaLlegadaChapas"), # Fecha disponiblidad Impresión
-                "FechaLlegadaTroquel": row.get("FechaLlegadaTroquel"), # Fecha disponiblidad Troquel
-                "PliAnc": row.get("PliAnc", 0),
-                "PliLar": row.get("PliLar", 0),
-                "Gramaje": row.get("Grs./Nº", 0), # Nuevo campo para agrupamiento Bobina
-                "Urgente": es_si(row.get("Urgente", False)), # Nueva bandera de urgencia
-                "_TroqAntes": es_si(row.get("_TroqAntes", False)), # <--- NUEVO FLAG
-                "_PEN_ImpresionFlexo": row.get("_PEN_ImpresionFlexo"),
-                "_PEN_ImpresionOffset": row.get("_PEN_ImpresionOffset"),
-                "ProcesoDpd": row.get("ProcesoDpd", ""), # ProcesoDpd para reordenamiento dinámico
-                "PrioriImp": row.get("PrioriImp", ""), # Prioridad desde Excel (Impresión)
-                "FechaImDdp": row.get("FechaImDdp"),    # Fecha asociada a la prioridad Excel (Impresión)
-                "PrioriTr": row.get("PrioriTr", ""),     # Prioridad desde Excel (Troquelado)
-                "FechaTroDdp": row.get("FechaTroDdp"),   # Fecha asociada a la prioridad Excel (Troquelado)
-                "TroqueladoraDdp": row.get("TroqueladoraDdp"),  # ID de troqueladora del Excel
-                "PrioriDesc": row.get("PrioriDesc", ""),  # Prioridad desde Excel (Descartonado)
-                "OpeDes1": row.get("OpeDes1", ""),         # ID de descartonadora del Excel
-                "PrioVenDdp": row.get("PrioVenDdp", ""),   # Prioridad desde Excel (Ventana)
-                "PrioPegDdp": row.get("PrioPegDdp", ""),   # Prioridad desde Excel (Pegado)
-                
-                # Manual Override Params
-                "ManualPriority": manual_prio,
-                "IsOutsourced": is_outsourced,
-                "IsSkipped": is_skipped,
-                "ManualAssignment": (lock_key in locked_assignments) or has_manual_prio_machine, # Force stickiness if locked or explicitly prioritized
-                "HistoryLocked": (lock_key in locked_assignments) # For UI/Debugging
-            })  
-
-    tasks = pd.DataFrame(tareas)
     tasks.drop_duplicates(subset=["OT_id", "Proceso"], inplace=True)
     
     if not tasks.empty:
@@ -379,3 +536,185 @@ def _expandir_tareas(df: pd.DataFrame, cfg):
             tasks.sort_values(["OT_id", "_orden_proceso"], inplace=True)
 
     return tasks
+
+
+# ---------------------------------------------------------------
+# REGISTRO COMPACTO DE TAREAS (para las colas del scheduler)
+# ---------------------------------------------------------------
+_FALTA = object()
+
+
+def _prio_num(v):
+    """Prioridad Excel como número; vacío/NaN/texto -> 9999."""
+    try:
+        x = float(v)
+        return 9999 if pd.isna(x) else x
+    except (ValueError, TypeError):
+        return 9999
+
+
+# Prioridades Excel en el orden de Tarea.prio_imp, prio_tro, prio_desc, prio_ven, prio_peg
+_COLUMNAS_PRIO = ("PrioriImp", "PrioriTr", "PrioriDesc", "PrioVenDdp", "PrioPegDdp")
+
+
+def _pendiente_sucesor(clave, valor):
+    """_PEN_* marcado "si" de un proceso posterior al descartonado (Pegado, Ventana, etc.)."""
+    if not clave.startswith("_PEN_") or str(valor).lower() != "si":
+        return False
+    proc_pend = clave.replace("_PEN_", "").lower()
+    return "descartonado" not in proc_pend and "impres" not in proc_pend and "troquel" not in proc_pend
+
+
+def _float_o_cero(v):
+    try:
+        return float(v or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class Tarea:
+    """
+    Tarea en cola. Los datos viven por columnas en la TablaTareas (el registro
+    solo guarda su id); lo que el loop de planificación consulta en cada pasada
+    queda ya convertido a número/bool en atributos.
+
+    Se comporta como el dict de antes (`get`, `[]`, `in`, `items`) para que los
+    helpers que reciben tareas (setup, agrupamiento, salidas) sigan funcionando.
+    """
+    __slots__ = ("id", "_tabla", "prio_man", "prio_imp", "prio_tro", "prio_desc", "prio_ven", "prio_peg",
+                 "prioritaria", "prio_efectiva", "tiene_prioridad",
+                 "mp_ok", "mp_no", "cantidad", "ancho", "largo", "tiene_sucesor")
+
+    def get(self, clave, default=None):
+        col = self._tabla.columnas.get(clave)
+        if col is None:
+            return default
+        v = col[self.id]
+        return default if v is _FALTA else v
+
+    def __getitem__(self, clave):
+        v = self.get(clave, _FALTA)
+        if v is _FALTA:
+            raise KeyError(clave)
+        return v
+
+    def __setitem__(self, clave, valor):
+        col = self._tabla.columnas.get(clave)
+        if col is None:
+            col = self._tabla.columnas[clave] = [_FALTA] * len(self._tabla.tareas)
+        col[self.id] = valor
+
+    def __contains__(self, clave):
+        return self.get(clave, _FALTA) is not _FALTA
+
+    def items(self):
+        for clave, col in self._tabla.columnas.items():
+            if col[self.id] is not _FALTA:
+                yield clave, col[self.id]
+
+    def asignar_maquina(self, maquina):
+        """Asigna la tarea a una máquina y fija su prioridad efectiva para esa máquina."""
+        self["Maquina"] = maquina
+        self.prio_efectiva, self.tiene_prioridad = prioridad_efectiva(self, clase_prioridad_maquina(maquina))
+
+    def __repr__(self):
+        return f"Tarea({self.id}, {self.get('OT_id')}, {self.get('Proceso')}, {self.get('Maquina')})"
+
+
+class TablaTareas:
+    """
+    Almacén columnar de las tareas de una planificación (una lista por columna).
+
+    Se construye una sola vez a partir de las colas ya ordenadas: `cola(q)`
+    recibe el DataFrame ordenado de un builder de prioridad (orden_*) o sus
+    registros y devuelve la deque de Tarea equivalente. Desde un DataFrame se
+    carga por columnas, sin pasar por un dict por fila. Solo se guardan las
+    columnas de `tasks`; las columnas auxiliares que agregan los builders para
+    ordenar se descartan.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = {c: [] for c in columnas}
+        self.tareas = []
+
+    def agregar(self, registro):
+        t = Tarea()
+        t.id = len(self.tareas)
+        t._tabla = self
+        for clave, col in self.columnas.items():
+            col.append(registro.get(clave, _FALTA))
+
+        self._completar(
+            t, registro.get("ManualPriority", 9999),
+            [registro.get(c, 9999) for c in _COLUMNAS_PRIO],
+            registro.get("MateriaPrimaPlanta"),
+            [registro.get(c, 0) for c in ("CantidadPliegos", "PliAnc", "PliLar")],
+            any(_pendiente_sucesor(k, v) for k, v in registro.items()),
+        )
+        self.tareas.append(t)
+        return t
+
+    @staticmethod
+    def _completar(t, manual, prios, mp_raw, medidas, tiene_sucesor):
+        """Atributos que el loop de planificación consulta, ya convertidos a número/bool."""
+        t.prio_man = int(manual)
+        t.prio_imp, t.prio_tro, t.prio_desc, t.prio_ven, t.prio_peg = (_prio_num(v) for v in prios)
+        # Con prioridad propia en cola (bloquea gap-filling y robos mientras espera)
+        t.prioritaria = t.prio_imp < 9999 or t.prio_tro < 9999 or t.prio_man < 9000 or t.prio_desc < 9999
+        t.prio_efectiva, t.tiene_prioridad = t.prio_man, False
+
+        # Materia prima en planta: mp_ok = no falta; mp_no = marcada explícitamente como "no"
+        mp = str(mp_raw).strip().lower()
+        t.mp_ok = mp in ("false", "0", "no", "falso", "") or not mp_raw
+        t.mp_no = mp in ("false", "0", "no", "falso")
+
+        t.cantidad, t.ancho, t.largo = (_float_o_cero(v) for v in medidas)
+        # Sucesores después del descartonado (Pegado, Ventana, etc.)
+        t.tiene_sucesor = tiene_sucesor
+
+    def agregar_df(self, df):
+        """
+        Igual que `agregar` fila por fila, pero carga el DataFrame por columnas
+        (sin pasar por to_dict("records")). Devuelve las Tarea en el orden de `df`.
+        """
+        n = len(df)
+        inicio = len(self.tareas)
+        for clave, col in self.columnas.items():
+            col.extend(df[clave].tolist() if clave in df.columns else [_FALTA] * n)
+
+        def columna(clave, default):
+            return df[clave].tolist() if clave in df.columns else [default] * n
+
+        sucesor = [False] * n
+        for clave in df.columns:
+            if isinstance(clave, str) and clave.startswith("_PEN_"):
+                sucesor = [s or _pendiente_sucesor(clave, v) for s, v in zip(sucesor, df[clave].tolist())]
+
+        filas = zip(
+            columna("ManualPriority", 9999),
+            zip(*(columna(c, 9999) for c in _COLUMNAS_PRIO)),
+            columna("MateriaPrimaPlanta", None),
+            zip(*(columna(c, 0) for c in ("CantidadPliegos", "PliAnc", "PliLar"))),
+            sucesor,
+        )
+        nuevas = []
+        for i, (manual, prios, mp_raw, medidas, tiene_sucesor) in enumerate(filas):
+            t = Tarea()
+            t.id = inicio + i
+            t._tabla = self
+            self._completar(t, manual, prios, mp_raw, medidas, tiene_sucesor)
+            nuevas.append(t)
+        self.tareas.extend(nuevas)
+        return nuevas
+
+    def cola(self, registros, maquina=None):
+        """Deque de Tarea para la cola de `maquina` (si se indica, con su prioridad efectiva ya resuelta)."""
+        if isinstance(registros, pd.DataFrame):
+            cola = deque(self.agregar_df(registros))
+        else:
+            cola = deque(self.agregar(r) for r in registros)
+        if maquina is not None:
+            clase = clase_prioridad_maquina(maquina)
+            for t in cola:
+                t.prio_efectiva, t.tiene_prioridad = prioridad_efectiva(t, clase)
+        return cola
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+MAQUINAS_VIRTUALES = ("TERCERIZADO", "SALTADO")
+
+# Usamos 72 hs por defecto para procesos tercerizados
+HORAS_TERCERIZADO = 72.0
+
+
+def duracion_virtual_h(t, maquina):
+    """Duración fija de una tarea virtual: 72 hs tercerizada (0 el descartonado, va incluido en las del troquelado), 0 saltada."""
+    if maquina != "TERCERIZADO":
+        return 0.0
+    if t.get("Proceso", "").strip().lower() == "descartonado":
+        return 0.0
+    return HORAS_TERCERIZADO
+
+
+class ResolutorVirtuales:
+    """
+    Tareas de las máquinas virtuales (TERCERIZADO, SALTADO) de una corrida de `programar`.
+
+    Tienen capacidad infinita y duración fija, así que no compiten en el loop
+    de máquinas: cada una se agenda apenas queda ejecutable, con
+    Inicio = max(disponibilidad, inicio del plan) y Fin = Inicio + duración.
+    `resolver()` agenda las ejecutables al arrancar el núcleo; después el
+    núcleo le pasa a `resolver(tareas)` las sucesoras de cada fin registrado
+    (RastreadorDependencias.registrar_fin), de modo que las cadenas de
+    virtuales se propagan en el mismo fin.
+
+    `agendar(tarea, maquina, inicio, fin, duracion_h)` registra el resultado
+    (fila del plan y fin del proceso, que vuelve a llamar a `resolver`).
+    """
+
+    def __init__(self, colas, disponibilidad, inicio_plan, agendar):
+        # disponibilidad(tarea, maquina) -> (runnable, disponible), como verificar_disponibilidad
+        self._disponibilidad = disponibilidad
+        self._inicio = inicio_plan
+        self._agendar = agendar
+        self._pendientes = {}       # id(tarea) -> (maquina, tarea), en orden de cola
+        for m in MAQUINAS_VIRTUALES:
+            for t in colas.get(m, ()):
+                self._pendientes[id(t)] = (m, t)
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def resolver(self, tareas=None):
+        """Agenda las tareas virtuales ejecutables entre `tareas` (todas las pendientes si es None)."""
+        if tareas is None:
+            candidatas = list(self._pendientes.values())
+        else:
+            candidatas = [self._pendientes[id(t)] for t in tareas if id(t) in self._pendientes]
+        for maquina, t in candidatas:
+            if id(t) not in self._pendientes:
+                continue    # ya agendada por una cadena anterior
+            runnable, disponible = self._disponibilidad(t, maquina)
+            if not runnable:
+                continue
+            del self._pendientes[id(t)]
+            inicio = max(disponible, self._inicio) if disponible else self._inicio
+            duracion = duracion_virtual_h(t, maquina)
+            self._agendar(t, maquina, inicio, inicio + timedelta(hours=duracion), duracion)
@@ -16,3 +16,4 @@ from .render_daily_details_section import render_daily_details_section
 from .render_daily_schedule_view import render_daily_schedule_view
 from .render_create_machine import render_create_machine
 from .render_galpon2_page import render_galpon2_page
+from .render_performance_section import render_performance_section
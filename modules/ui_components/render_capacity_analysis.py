@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 from datetime import date, datetime, timedelta
 import plotly.express as px
-from modules.utils.config_loader import horas_por_dia, get_horas_totales_dia
+from modules.utils.config_loader import horas_por_dia, obtener_calendario
 
 def render_capacity_analysis(schedule, cfg, fecha_inicio_plan, resumen_ot, carga_md):
     """
@@ -49,10 +49,12 @@ def render_capacity_analysis(schedule, cfg, fecha_inicio_plan, resumen_ot, carga
             # Identificar maquinas relevantes
             maquinas_viz = schedule_viz["Maquina"].unique()
             
-            # Llenar mapa de capacidad
+            # Llenar mapa de capacidad (un slice del calendario por máquina)
+            calendario = obtener_calendario(cfg)
             for maq in maquinas_viz:
-                for d in dias_rango:
-                    capacity_map[(maq, d.date())] = get_horas_totales_dia(d.date(), cfg, maquina=maq)
+                horas_maq = calendario.horas_rango(dias_rango[0], dias_rango[-1], maquina=maq)
+                for d, hrs in zip(dias_rango, horas_maq):
+                    capacity_map[(maq, d.date())] = float(hrs)
 
             data_bottleneck = []
 
@@ -319,21 +321,16 @@ def render_capacity_analysis(schedule, cfg, fecha_inicio_plan, resumen_ot, carga
             all_machines = sorted(schedule["Maquina"].dropna().unique())
             maquinas_todas = [m for m in all_machines if not es_maquina_tercerizada(m)]
             
-            # Calcular días hábiles en el rango para capacidad
-            dias_en_rango = pd.date_range(start=c_start.date(), end=c_end.date())
-            
             # --- NOTA: LIMIT_HOURS (Estimación) ELIMINADA ---
             # Ahora usamos 'cap_total' (Capacidad Real Calculada) como límite para cada máquina.
             # Esto permite que funcione perfecto para Día, Semana, Mes o Todo.
 
+            calendario = obtener_calendario(cfg)
             for maq in maquinas_todas:
                 # A. Capacidad Disponible
-                cap_total = 0.0
-                dias_habiles = 0
-                for d in dias_en_rango:
-                    hrs = get_horas_totales_dia(d.date(), cfg, maquina=maq)
-                    cap_total += hrs
-                    if hrs > 0: dias_habiles += 1
+                horas_maq = calendario.horas_rango(c_start.date(), c_end.date(), maquina=maq)
+                cap_total = float(horas_maq.sum())
+                dias_habiles = int((horas_maq > 0).sum())
                 
                 # B. Carga DUE (Vencimiento)
                 load_due = schedule_due[schedule_due["Maquina"] == maq]["Duracion_h"].sum()
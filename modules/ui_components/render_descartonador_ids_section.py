@@ -1,16 +1,12 @@
 import streamlit as st
+from modules.utils.config_loader import IDS_DESCARTONADORAS_DEFAULT
 
 def render_descartonador_ids_section(cfg):
     """Renders input fields to override Descartonador (or other) IDs."""
     st.subheader("🆔 Configurar IDs de Descartonadoras")
     
     # Default/Hardcoded values to start with (prevent empty starts)
-    defaults = {
-        "descartonadora 1": 40,
-        "descartonadora 2": 194,
-        "descartonadora 3": 247957750,
-        "descartonadora 4": 0 # Unknown default
-    }
+    defaults = IDS_DESCARTONADORAS_DEFAULT
     
     maquinas = sorted(cfg["maquinas"]["Maquina"].unique().tolist())
     descartonadoras = [m for m in maquinas if "descartonad" in m.lower()]
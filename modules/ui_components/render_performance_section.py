@@ -0,0 +1,25 @@
+import streamlit as st
+
+from modules.schedulers.perfil import tabla_etapas, tabla_maquinas
+
+
+def render_performance_section(schedule):
+    """
+    Muestra el informe de rendimiento de programar (schedule.attrs["rendimiento"]):
+    tiempo por etapa y contadores por máquina.
+    """
+    reporte = schedule.attrs.get("rendimiento") if schedule is not None else None
+
+    with st.expander("⏱️ Rendimiento", expanded=False):
+        if not reporte:
+            st.info("No hay informe de rendimiento para este plan.")
+            return
+
+        st.caption(
+            f"Planificación en {reporte['total_s']:.2f}s "
+            "(si el plan salió de la caché, son los tiempos de la corrida que lo generó)"
+        )
+        st.markdown("**Tiempo por etapa**")
+        st.dataframe(tabla_etapas(reporte), use_container_width=True, hide_index=True)
+        st.markdown("**Contadores por máquina**")
+        st.dataframe(tabla_maquinas(reporte), use_container_width=True, hide_index=True)
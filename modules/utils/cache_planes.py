@@ -0,0 +1,227 @@
+"""
+Caché de planes por contenido.
+
+La clave de un plan es un digest de sus entradas canonizadas: órdenes (hash
+por fila), cfg completo (máquinas, jornada, feriados, horas extras, paros,
+overrides, asignaciones...) e inicio del plan. Dos corridas con el mismo
+contenido dan la misma clave aunque los objetos sean otros, y cualquier cambio
+adentro de un dict o set anidado (ej. cfg["manual_overrides"]) da otra.
+
+Los planes se guardan en memoria con desalojo LRU y, opcionalmente, en disco
+(un pickle por clave) para que un reinicio del servidor no obligue a
+re-planificar. La clave incluye una huella del código del planificador: si
+cambia el código, las entradas viejas del disco dejan de usarse.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from datetime import date, datetime, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.scheduler import programar
+
+
+# Claves del cfg que son cachés de corrida, no entradas del plan
+_CLAVES_IGNORADAS = {"_calendario", "_procesos_terc_sin_cola"}
+
+_RAIZ_MODULOS = Path(__file__).resolve().parents[1]
+_huella_codigo = None
+
+
+def huella_codigo():
+    """Digest de los .py de `modules` (se calcula una vez por proceso)."""
+    global _huella_codigo
+    if _huella_codigo is None:
+        h = hashlib.blake2b(digest_size=16)
+        for ruta in sorted(_RAIZ_MODULOS.rglob("*.py")):
+            h.update(str(ruta.relative_to(_RAIZ_MODULOS)).encode())
+            h.update(ruta.read_bytes())
+        _huella_codigo = h.hexdigest()
+    return _huella_codigo
+
+
+def _digest_df(df):
+    try:
+        filas = pd.util.hash_pandas_object(df, index=True).values
+    except TypeError:
+        # Celdas no hasheables (listas, dicts): se hashea su texto
+        filas = pd.util.hash_pandas_object(df.astype(str), index=True).values
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(t) for t in df.dtypes]).encode())
+    h.update(filas.tobytes())
+    return h.digest()
+
+
+def _canonico(valor, h):
+    """Vuelca en `h` una representación estable de `valor`."""
+    if isinstance(valor, pd.DataFrame):
+        h.update(b"D")
+        h.update(_digest_df(valor))
+    elif isinstance(valor, pd.Series):
+        h.update(b"S")
+        h.update(_digest_df(valor.to_frame()))
+    elif isinstance(valor, dict):
+        # Orden de inserción irrelevante: se ordenan los digests de cada par
+        h.update(b"{")
+        for par in sorted(_digest((k, v)) for k, v in valor.items()):
+            h.update(par)
+        h.update(b"}")
+    elif isinstance(valor, (set, frozenset)):
+        h.update(b"<")
+        for elem in sorted(_digest(v) for v in valor):
+            h.update(elem)
+        h.update(b">")
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"[" if isinstance(valor, list) else b"(")
+        for v in valor:
+            _canonico(v, h)
+            h.update(b",")
+        h.update(b"]")
+    elif isinstance(valor, (datetime, date, time, pd.Timestamp)):
+        # Timestamp y datetime con el mismo instante son la misma entrada
+        h.update(b"T" + valor.isoformat().encode())
+    elif isinstance(valor, np.generic):
+        _canonico(valor.item(), h)
+    else:
+        h.update(type(valor).__name__.encode() + b":" + repr(valor).encode())
+
+
+def _digest(valor):
+    h = hashlib.blake2b(digest_size=16)
+    _canonico(valor, h)
+    return h.digest()
+
+
+def clave_plan(df_ordenes, cfg, start, start_time=None):
+    """Clave (hex) del plan para estas entradas."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(huella_codigo().encode())
+    h.update(_digest_df(df_ordenes))
+    _canonico({k: v for k, v in cfg.items() if k not in _CLAVES_IGNORADAS}, h)
+    _canonico((start, start_time), h)
+    return h.hexdigest()
+
+
+class CachePlanes:
+    """
+    Planes calculados, por clave de contenido.
+
+    Uso:
+        cache = CachePlanes(max_entradas=8, directorio=".cache/planes")
+        schedule, carga_md, resumen_ot, detalle_maquina = cache.planificar(df, cfg, start, start_time)
+
+    max_entradas: planes en memoria (LRU).
+    directorio:   si se indica, también se guardan en disco (hasta max_en_disco,
+                  se borran los de uso más viejo).
+    """
+
+    def __init__(self, max_entradas=8, directorio=None, max_en_disco=64):
+        self.max_entradas = max_entradas
+        self.directorio = Path(directorio) if directorio else None
+        self.max_en_disco = max_en_disco
+        self._memoria = OrderedDict()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if self.directorio:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self):
+        return len(self._memoria)
+
+    def __contains__(self, clave):
+        return clave in self._memoria or (self.directorio is not None and self._ruta(clave).exists())
+
+    def _ruta(self, clave):
+        return self.directorio / f"{clave}.pkl"
+
+    # ------------------------------------------------------------------
+    def obtener(self, clave):
+        """Plan guardado para la clave, o None."""
+        if clave in self._memoria:
+            self._memoria.move_to_end(clave)
+            self.aciertos += 1
+            return self._memoria[clave]
+
+        resultado = self._leer_disco(clave)
+        if resultado is None:
+            self.fallos += 1
+            return None
+        self.aciertos_disco += 1
+        self._en_memoria(clave, resultado)
+        return resultado
+
+    def guardar(self, clave, resultado):
+        self._en_memoria(clave, resultado)
+        self._escribir_disco(clave, resultado)
+
+    def planificar(self, df_ordenes, cfg, start, start_time=None, planificador=programar, guardar_si=None):
+        """
+        Devuelve el plan cacheado o lo calcula con `planificador` y lo guarda.
+        Los DataFrames se devuelven copiados: editarlos no altera la caché.
+        El planificador recibe una copia de las órdenes (programar les agrega
+        columnas), así la clave sigue valiendo para el df del llamador.
+        guardar_si: callable sin argumentos que se evalúa después de correr el
+        planificador; si devuelve False el plan no se guarda (ej. un plan
+        incremental, que no es el de estas entradas para otra sesión).
+        """
+        clave = clave_plan(df_ordenes, cfg, start, start_time)
+        resultado = self.obtener(clave)
+        if resultado is None:
+            resultado = planificador(df_ordenes.copy(), cfg, start=start, start_time=start_time)
+            if guardar_si is None or guardar_si():
+                self.guardar(clave, resultado)
+        return tuple(r.copy() if isinstance(r, pd.DataFrame) else r for r in resultado)
+
+    def limpiar(self, disco=False):
+        self._memoria.clear()
+        if disco and self.directorio:
+            for ruta in self.directorio.glob("*.pkl"):
+                ruta.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    def _en_memoria(self, clave, resultado):
+        self._memoria[clave] = resultado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _leer_disco(self, clave):
+        if self.directorio is None:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                resultado = pickle.load(f)
+            os.utime(ruta)  # marca de uso para el desalojo en disco
+            return resultado
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Archivo truncado o de otra versión de pandas: se descarta
+            ruta.unlink(missing_ok=True)
+            return None
+
+    def _escribir_disco(self, clave, resultado):
+        if self.directorio is None:
+            return
+        # Escritura atómica: otro proceso nunca lee un pickle a medias
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._ruta(clave))
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            return
+
+        archivos = sorted(self.directorio.glob("*.pkl"), key=lambda r: r.stat().st_mtime)
+        for ruta in archivos[:max(0, len(archivos) - self.max_en_disco)]:
+            ruta.unlink(missing_ok=True)
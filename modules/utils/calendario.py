@@ -0,0 +1,174 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+# Margen con el que se arma (o extiende) el horizonte de días del calendario
+_MARGEN_ATRAS = 30
+_MARGEN_ADELANTE = 400
+
+
+def _a_fecha(d):
+    """date/datetime/Timestamp -> date (igual que los helpers de config_loader)."""
+    return d.date() if isinstance(d, datetime) else d
+
+
+class Calendario:
+    """
+    Calendario de días hábiles de un plan, armado una sola vez por configuración.
+
+    Sobre un horizonte de días (que se extiende solo si se consulta una fecha
+    fuera de rango) guarda arrays de NumPy con:
+      - día hábil general (no finde, no feriado) y horas base del día
+      - por máquina: horas totales (base + horas extras), día hábil (las horas
+        extras > 0 habilitan findes y feriados) y el índice del próximo día
+        hábil, para resolver `proximo_dia_habil` sin iterar.
+    También guarda los paros (downtimes) de cada máquina ya ordenados.
+
+    Reproduce exactamente a es_feriado / es_dia_habil / get_horas_totales_dia /
+    proximo_dia_habil de config_loader, que ahora delegan en esta clase.
+    No se construye a mano: usar `config_loader.obtener_calendario(cfg)`, que
+    lo invalida cuando cambian feriados, horas extras, paros o la jornada.
+    """
+
+    def __init__(self, cfg, firma, horas_base):
+        self.firma = firma
+        self.fuentes = ()                # [(objeto del cfg, tamaño)]: chequeo rápido de vigencia
+        self._feriados = cfg.get("feriados") or ()
+        self._extras = cfg.get("horas_extras") or {}
+        self._downtimes = cfg.get("downtimes") or []
+        self._horas_base = horas_base    # callable: se evalúa solo si hace falta (necesita 'jornada')
+        self._h_base = None
+
+        self._inicio = None              # date del índice 0
+        self._n = 0
+        self._habil_base = None          # bool[n]
+        self._por_maquina = {}           # maquina -> (habil[n], proximo[n])
+        self._horas_maquina = {}         # maquina -> horas[n] (requiere 'jornada')
+        self._paros = {}                 # nombre normalizado -> [(start, end)] ordenados
+
+    # ------------------------------------------------------------------
+    # Horizonte
+    # ------------------------------------------------------------------
+    def _cubrir(self, desde, hasta=None):
+        """Asegura que el horizonte incluya [desde, hasta]."""
+        hasta = hasta or desde
+        if self._inicio is not None and self._inicio <= desde and (hasta - self._inicio).days < self._n:
+            return
+        inicio = desde - timedelta(days=_MARGEN_ATRAS)
+        fin = hasta + timedelta(days=_MARGEN_ADELANTE)
+        if self._inicio is not None:
+            inicio = min(inicio, self._inicio)
+            fin = max(fin, self._inicio + timedelta(days=self._n - 1))
+
+        self._inicio = inicio
+        self._n = (fin - inicio).days + 1
+        self._fechas = [inicio + timedelta(days=i) for i in range(self._n)]
+        dias_semana = (np.arange(self._n) + inicio.weekday()) % 7
+        feriados = np.fromiter((d in self._feriados for d in self._fechas), dtype=bool, count=self._n)
+        self._habil_base = (dias_semana < 5) & ~feriados
+        self._por_maquina = {}
+        self._horas_maquina = {}
+
+    def _indice(self, fecha):
+        self._cubrir(fecha)
+        return (fecha - self._inicio).days
+
+    def _extra(self, maquina):
+        """Horas extras de la máquina por día (None si no tiene)."""
+        extras_maquina = self._extras.get(maquina) if maquina else None
+        if not extras_maquina or not isinstance(extras_maquina, dict):
+            return None
+        return np.array([extras_maquina.get(d, 0.0) for d in self._fechas], dtype=float)
+
+    def _habiles(self, maquina):
+        """Arrays (hábil, próximo hábil) de una máquina (None = calendario general)."""
+        arrays = self._por_maquina.get(maquina)
+        if arrays is not None:
+            return arrays
+
+        habil = self._habil_base
+        extra = self._extra(maquina)
+        if extra is not None:
+            habil = habil | (extra > 0)
+
+        # proximo[i] = primer índice j >= i hábil (n si no hay ninguno en el horizonte)
+        idx = np.where(habil, np.arange(self._n), self._n)
+        proximo = np.minimum.accumulate(idx[::-1])[::-1]
+
+        arrays = self._por_maquina[maquina] = (habil, proximo)
+        return arrays
+
+    def _horas(self, maquina):
+        """Horas totales por día de una máquina: base en días hábiles normales + extras."""
+        horas = self._horas_maquina.get(maquina)
+        if horas is not None:
+            return horas
+
+        horas = np.zeros(self._n)
+        if self._habil_base.any():
+            horas[self._habil_base] = self._base()
+        extra = self._extra(maquina)
+        if extra is not None:
+            horas = horas + extra
+
+        self._horas_maquina[maquina] = horas
+        return horas
+
+    def _base(self):
+        if self._h_base is None:
+            self._h_base = self._horas_base()
+        return self._h_base
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def es_feriado(self, d):
+        return _a_fecha(d) in self._feriados
+
+    def es_habil(self, d, maquina=None):
+        i = self._indice(_a_fecha(d))
+        return bool(self._habiles(maquina)[0][i])
+
+    def horas(self, d, maquina=None):
+        """Horas totales del día: base (si es hábil normal) + horas extras de la máquina."""
+        i = self._indice(_a_fecha(d))
+        return float(self._horas(maquina)[i])
+
+    def horas_rango(self, desde, hasta, maquina=None):
+        """Array con las horas de cada día de [desde, hasta] (inclusive)."""
+        desde, hasta = _a_fecha(desde), _a_fecha(hasta)
+        if hasta < desde:
+            return np.zeros(0)
+        self._cubrir(desde, hasta)
+        i = (desde - self._inicio).days
+        return self._horas(maquina)[i:i + (hasta - desde).days + 1].copy()
+
+    def dias_hasta_habil(self, d, maquina=None):
+        """Cantidad de días desde 'd' hasta el primer día hábil (0 si 'd' ya lo es)."""
+        fecha = _a_fecha(d)
+        i = self._indice(fecha)
+        j = int(self._habiles(maquina)[1][i])
+        while j >= self._n:
+            # Ningún hábil hasta el final del horizonte: extenderlo y reintentar
+            self._cubrir(fecha, self._inicio + timedelta(days=self._n - 1 + _MARGEN_ADELANTE))
+            i = self._indice(fecha)
+            j = int(self._habiles(maquina)[1][i])
+        return j - i
+
+    def proximo_habil(self, d, maquina=None):
+        """Primer día hábil desde 'd' inclusive (conserva el tipo de 'd')."""
+        dias = self.dias_hasta_habil(d, maquina)
+        return d + timedelta(days=dias) if dias else d
+
+    def paros(self, maquina):
+        """Paros programados de la máquina, ordenados por inicio."""
+        nombre = str(maquina).strip().lower()
+        paros = self._paros.get(nombre)
+        if paros is None:
+            paros = [
+                (p["start"], p["end"])
+                for p in self._downtimes
+                if str(p.get("maquina") or p.get("Maquina", "")).strip().lower() == nombre
+            ]
+            paros.sort(key=lambda x: x[0])
+            self._paros[nombre] = paros
+        return paros
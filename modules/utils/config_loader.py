@@ -3,6 +3,7 @@ from datetime import date, datetime, time, timedelta
 import numpy as np
 import json
 import os
+from .calendario import Calendario
 
 def es_si(x):
     """Interpreta distintos formatos como 'sí' o verdadero."""
@@ -137,6 +138,56 @@ def apply_custom_machines(cfg, custom_machines_list):
     cfg["maquinas"] = pd.concat([cfg["maquinas"], new_df], ignore_index=True)
 
 
+# Procesos cuyas máquinas del Excel son meros placeholders (outsourced por defecto)
+_PROCESOS_TERC_DEFAULT = {"encapado", "stamping", "plastificado", "cuño"}
+
+# Máquinas que no se planifican salvo que se elijan a mano
+MAQUINAS_EXCLUIDAS_DEFAULT = {"Manual 3", "Descartonadora 3", "Iberica", "Descartonadora 4"}
+
+# IDs de las descartonadoras para la exportación (editables en la app)
+IDS_DESCARTONADORAS_DEFAULT = {
+    "descartonadora 1": 40,
+    "descartonadora 2": 194,
+    "descartonadora 3": 247957750,
+    "descartonadora 4": 0 # Unknown default
+}
+
+def maquinas_activas_por_defecto(maquinas_df):
+    """
+    Máquinas que se planifican si nadie elige otras: todas menos las excluidas
+    y los placeholders tercerizados que ya tienen una máquina custom de su proceso.
+    """
+    maquinas_todas = sorted(maquinas_df["Maquina"].unique().tolist())
+
+    # Procesos que ya tienen al menos una máquina CUSTOM (_IsCustom=True)
+    if "_IsCustom" in maquinas_df.columns:
+        procs_con_custom = set(
+            maquinas_df.loc[maquinas_df["_IsCustom"] == True, "Proceso"]
+            .dropna().str.strip().str.lower().unique()
+        )
+    else:
+        procs_con_custom = set()
+
+    def _es_placeholder_reemplazado(nombre_maq):
+        """True si la máquina es un placeholder outsourced con custom disponible."""
+        fila = maquinas_df[maquinas_df["Maquina"] == nombre_maq]
+        if fila.empty:
+            return False
+        proc = str(fila["Proceso"].iloc[0]).strip().lower()
+        es_placeholder = proc in _PROCESOS_TERC_DEFAULT
+        es_no_custom = not (
+            "_IsCustom" in fila.columns and bool(fila["_IsCustom"].iloc[0]) is True
+        )
+        return es_placeholder and es_no_custom and (proc in procs_con_custom)
+
+    return [
+        m for m in maquinas_todas
+        if m not in MAQUINAS_EXCLUIDAS_DEFAULT
+        and not any(excl in m for excl in MAQUINAS_EXCLUIDAS_DEFAULT)
+        and not _es_placeholder_reemplazado(m)
+    ]
+
+
 # Machine name aliases for priority mapping
 ALIAS_MAP = {
     "Manual 2": "Troq Nº 1 Gus",
@@ -177,71 +228,87 @@ def horas_por_dia(cfg):
     extra = float(j.loc[j["Parametro"]=="Horas_extra_por_dia","Valor"].iloc[0]) if (j["Parametro"]=="Horas_extra_por_dia").any() else 0.0
     return base + extra
 
+def _firma_extras(extras):
+    """Contenido de las horas extras {maquina: {fecha: horas}} (ignora entradas que no son por máquina)."""
+    return tuple(sorted(
+        (str(m), tuple(sorted((str(k), v) for k, v in dias.items())))
+        for m, dias in (extras or {}).items() if isinstance(dias, dict)
+    ))
+
+def _firma_calendario(cfg):
+    """Contenido del que depende el calendario: jornada, feriados, horas extras y paros."""
+    jornada = cfg.get("jornada")
+    return (
+        tuple(map(tuple, jornada[["Parametro", "Valor"]].values.tolist())) if jornada is not None else None,
+        frozenset(cfg.get("feriados") or ()),
+        _firma_extras(cfg.get("horas_extras")),
+        tuple(
+            (str(p.get("maquina") or p.get("Maquina", "")), p.get("start"), p.get("end"))
+            for p in cfg.get("downtimes") or []
+        ),
+    )
+
+_FUENTES_CALENDARIO = ("jornada", "feriados", "horas_extras", "downtimes")
+
+def _fuentes_calendario(cfg):
+    """Objetos del cfg de los que sale el calendario, con su tamaño."""
+    fuentes = []
+    for clave in _FUENTES_CALENDARIO:
+        v = cfg.get(clave)
+        fuentes.append((v, len(v) if v is not None else 0))
+    return fuentes
+
+def obtener_calendario(cfg):
+    """
+    Devuelve el Calendario del plan guardado en cfg["_calendario"].
+    Se reconstruye si cambió el contenido de jornada, feriados, horas extras
+    o paros (llamar una vez al empezar cada plan / vista).
+    """
+    firma = _firma_calendario(cfg)
+    cal = cfg.get("_calendario")
+    if cal is None or cal.firma != firma:
+        cal = Calendario(cfg, firma, lambda: horas_por_dia(cfg))
+        cfg["_calendario"] = cal
+    cal.fuentes = _fuentes_calendario(cfg)
+    return cal
+
+def _calendario(cfg):
+    """
+    Calendario cacheado. Por consulta se verifica que las fuentes sean los
+    mismos objetos y del mismo tamaño, y el contenido de las horas extras (la
+    UI edita en el lugar las horas de cada máquina); si no, se revalida todo.
+    """
+    cal = cfg.get("_calendario")
+    if cal is not None:
+        for (obj, largo), clave in zip(cal.fuentes, _FUENTES_CALENDARIO):
+            v = cfg.get(clave)
+            if v is not obj or (v is not None and len(v) != largo):
+                break
+        else:
+            if _firma_extras(cfg.get("horas_extras")) == cal.firma[2]:
+                return cal
+    return obtener_calendario(cfg)
+
 def es_feriado(d, cfg):
     # d puede ser un objeto 'date' o 'datetime'
-    fecha_obj = d.date() if isinstance(d, datetime) else d
-    
-    # Ahora comparamos un objeto 'date' con un set de 'date'
-    if fecha_obj in cfg["feriados"]:
-        # print("Es feriado:", fecha_obj) 
-        return True
-    return False
+    return _calendario(cfg).es_feriado(d)
 
 def es_dia_habil(d, cfg, maquina=None):
-    # 'd' debe ser un objeto date o datetime
-    fecha_obj = d.date() if isinstance(d, datetime) else d
-    
-    # 0. Chequeo de HORAS EXTRAS (Prioridad Suprema)
-    # Si el usuario definió horas extras para este día, ES HÁBIL, sin importar si es finde o feriado.
-    horas_extras_general = cfg.get("horas_extras", {})
-    
-    # Si se especificó máquina, buscamos sus extras. Si no, asumimos que no hay extras (o lógica global si existiera)
-    if maquina:
-        extras_maquina = horas_extras_general.get(maquina, {})
-        if fecha_obj in extras_maquina and extras_maquina[fecha_obj] > 0:
-            return True
-
-    # 1. Chequea fin de semana (5 = Sábado, 6 = Domingo)
-    if fecha_obj.weekday() >= 5:
-        return False
-        
-    # 2. Chequea feriados
-    if es_feriado(fecha_obj, cfg):
-        return False
-        
-    return True
+    """
+    'd' debe ser un objeto date o datetime. Hábil = no finde ni feriado, salvo
+    que la máquina tenga horas extras ese día (prioridad suprema).
+    """
+    return _calendario(cfg).es_habil(d, maquina)
 
 def get_horas_totales_dia(d, cfg, maquina=None):
     """
     Devuelve la cantidad total de horas disponibles para trabajar en la fecha 'd'.
     Total = Base (si es día hábil normal) + Extras (si las hay).
     """
-    fecha_obj = d.date() if isinstance(d, datetime) else d
-    
-    # 1. Horas Base
-    es_finde = fecha_obj.weekday() >= 5
-    es_feriado_dia = es_feriado(fecha_obj, cfg)
-    
-    if es_finde or es_feriado_dia:
-        horas_base = 0.0
-    else:
-        # Es un día de semana normal
-        horas_base = horas_por_dia(cfg)
-    
-    # 2. Horas Extra (inyectadas por el usuario específicamente para ESTE día)
-    horas_extra_usuario = 0.0
-    
-    if maquina:
-        horas_extras_general = cfg.get("horas_extras", {})
-        extras_maquina = horas_extras_general.get(maquina, {})
-        horas_extra_usuario = extras_maquina.get(fecha_obj, 0.0)
-    
-    return horas_base + horas_extra_usuario
+    return _calendario(cfg).horas(d, maquina)
 
 def proximo_dia_habil(d, cfg, maquina=None):
-    while not es_dia_habil(d, cfg, maquina=maquina):
-        d += timedelta(days=1)
-    return d
+    return _calendario(cfg).proximo_habil(d, maquina)
 
 def construir_calendario(cfg, start=None, start_time=None):
     # 1. Establecer la fecha y hora base
@@ -1,5 +1,62 @@
 import pandas as pd
-import streamlit as st # Potentially needed for caching parsing if we wanted, but mainly for display if we print warnings? Actually better to return issues.
+import io
+import logging
+import time
+from functools import lru_cache
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+
+# Parser interno de openpyxl (versión fijada en requirements.txt). Si una versión
+# nueva lo cambia, leer_excel_ordenes cae a pd.read_excel con la misma proyección.
+try:
+    from openpyxl.worksheet._reader import WorkSheetParser
+except ImportError:
+    WorkSheetParser = None
+
+logger = logging.getLogger(__name__)
+
+# Nombres del export de Access -> nombres internos
+RENOMBRES_EXCEL = {
+    "ORDEN": "CodigoProducto",
+    "Ped.": "Subcodigo",
+    "CLIENTE": "Cliente",
+    "ART/DDP": "Cliente-articulo",
+    "Razon Social": "RazonSocial",
+    "CANT/DDP": "CantidadPliegos",
+    "FECH/ENT.": "FechaEntrega",
+    "Mat/Prim1": "MateriaPrima",
+    "MPPlanta": "MateriaPrimaPlanta",
+    "CodTroTapa": "CodigoTroquelTapa",
+    "CodTroCuerpo": "CodigoTroquelCuerpo",
+    "FechaChaDpv": "FechaLlegadaChapas", # Corrección aplicada en paso anterior
+    "FechaTroDpv": "FechaLlegadaTroquel",
+    "Pli Anc": "PliAnc",
+    "Pli Lar": "PliLar",
+}
+
+# Columnas del export que se leen (el resto se descarta al leer el Excel):
+# las que se renombran, las fuentes de los flags de process_uploaded_dataframe
+# y las que el scheduler / la UI leen tal cual. Más las que empiezan con "Color".
+COLUMNAS_EXCEL = set(RENOMBRES_EXCEL) | set(RENOMBRES_EXCEL.values()) | {
+    # flags (to_bool_series)
+    "CorteSNDdp", "GuillotinadoSNDpd", "Barniz", "Barnizado", "Encapa", "EncapadoSND", "Encapado",
+    "Cuño", "CuñoSND", "Plastifica", "PlastificadoSND", "Plastificado", "StampSNDdp", "StampingSND",
+    "Stamping", "OPPSNDpd", "OPPSND", "TroqueladoSNDpd", "TroqueladoSND", "DescartonadoSNDpd",
+    "DescartonadoSND", "PegadoVSNDpd", "PegadoVSND", "PegadoSNDpd", "PegadoSND", "Dorso", "FreyDorDpd",
+    "TienePrensado", "TroqAntes", "TroquelAntes", "TroqueladoAntes", "ImpresionSNDpd", "ImpresionSND",
+    "Urgencia", "UrgePed", "Urgente", "EsUrgente", "PeliculaArt", "Pelicula", "TroquelArt", "TroquelNuevo",
+    # usadas tal cual
+    "OT_id", "CodigoTroquel", "FechaImDdp", "FechaTroDdp", "Poses", "Bocas", "BocasTroquel", "Boca1_ddp",
+    "CantidadProductos", "CantidadPliegosNetos", "CantDesPlanDdp", "Grs./Nº", "Gramaje", "OpeDes1", "ProcesoDpd",
+    "TroqueladoraDdp", "PegadoTipo", "PrioriTr", "PrioriImp", "PrioriDesc", "PrioVenDdp", "PrioPegDdp",
+    "Descripcion",
+}
+_PREFIJOS_EXCEL = ("Color",)
+
+# Columnas con fechas en texto español ("12-dic-25"): se parsean al leer
+_FECHAS_EXCEL = {"FechaChaDpv", "FechaTroDpv", "FechaImDdp", "FechaLlegadaChapas", "FechaLlegadaTroquel"}
+
 
 def parse_spanish_date(date_str):
     if pd.isna(date_str) or str(date_str).strip() == "":
@@ -33,6 +90,256 @@ def parse_spanish_date(date_str):
     except:
         return pd.NaT
 
+# --- PARSEO VECTORIZADO DE FECHAS EN ESPAÑOL ---
+_MESES_ES = {
+    "ene": "01", "feb": "02", "mar": "03", "abr": "04", "may": "05", "jun": "06",
+    "jul": "07", "ago": "08", "sep": "09", "oct": "10", "nov": "11", "dic": "12"
+}
+_RE_MES = "|".join(_MESES_ES)
+# Formas que se resuelven con un formato fijo; el resto va a parse_spanish_date
+_FORMATOS_FECHA = (
+    (r"\d{1,2}/\d{1,2}/\d{4}", "%d/%m/%Y"),
+    # %y pasa 69-99 a 19xx y dateutil usa una ventana alrededor del año actual:
+    # solo 00-68, donde coinciden
+    (r"\d{1,2}/\d{1,2}/(?:[0-5]\d|6[0-8])", "%d/%m/%y"),
+)
+
+# Texto crudo -> fecha. Las mismas pocas centenas de fechas se repiten en
+# miles de filas y entre cargas del Excel.
+_CACHE_FECHAS = {}
+_MAX_CACHE_FECHAS = 50000
+
+
+def _parsear_textos(textos):
+    """Textos únicos -> {texto: Timestamp/NaT}, con el mismo resultado que parse_spanish_date."""
+    crudos = pd.Series(textos, dtype=object)
+    s = crudos.str.lower().str.strip()
+    # parse_spanish_date reemplaza solo el primer mes de la lista: si hay más
+    # de un mes distinto en el texto, se resuelve por el camino escalar
+    varios_meses = s.str.findall(_RE_MES).map(lambda m: len(set(m)) > 1)
+    s = s.str.replace(_RE_MES, lambda m: _MESES_ES[m.group(0)], regex=True)
+    s = s.str.replace(r"[-.]", "/", regex=True)
+
+    fechas = pd.Series(pd.NaT, index=s.index, dtype="datetime64[us]")
+    resueltas = pd.Series(False, index=s.index)
+    for patron, formato in _FORMATOS_FECHA:
+        mask = s.str.fullmatch(patron) & ~resueltas
+        if mask.any():
+            fechas[mask] = pd.to_datetime(s[mask], format=formato, errors="coerce")
+            resueltas |= mask
+    pendientes = ~resueltas | fechas.isna() | varios_meses
+
+    resultado = dict(zip(textos, fechas))
+    for i in pendientes[pendientes].index:
+        resultado[textos[i]] = parse_spanish_date(textos[i])
+    return resultado
+
+
+def parsear_fechas_es(serie):
+    """
+    Versión vectorizada de `serie.apply(parse_spanish_date)`.
+
+    Solo se parsean los valores únicos no cacheados: un reemplazo de meses
+    "ene".."dic" por regex, un pd.to_datetime con formato fijo por forma
+    (dd/mm/aaaa, dd/mm/aa) y parse_spanish_date para lo que no encaja.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.copy()
+
+    valores = serie.astype(object)
+    unicos = pd.unique(valores[valores.notna()])
+    nuevos = [v for v in unicos if isinstance(v, str) and v not in _CACHE_FECHAS]
+    if nuevos:
+        if len(_CACHE_FECHAS) + len(nuevos) > _MAX_CACHE_FECHAS:
+            _CACHE_FECHAS.clear()
+        _CACHE_FECHAS.update(_parsear_textos(nuevos))
+
+    mapa = {}
+    for v in unicos:
+        if isinstance(v, str):
+            mapa[v] = _CACHE_FECHAS[v]
+        else:
+            mapa[v] = parse_spanish_date(v)
+    return valores.map(lambda v: pd.NaT if _es_nulo(v) else mapa[v])
+
+
+def _es_nulo(v):
+    try:
+        return bool(pd.isna(v))
+    except (TypeError, ValueError):
+        return False
+
+
+def _valor_celda(v, tipo):
+    """Igual que el lector openpyxl de pandas: vacío -> "", enteros sin decimales, errores -> NaN."""
+    if v is None:
+        return ""
+    if tipo == "e":
+        return float("nan")
+    if type(v) is float:
+        return int(v) if v.is_integer() else v
+    return v
+
+
+@lru_cache(maxsize=None)
+def _indice_columna(letras):
+    return column_index_from_string(letras)
+
+
+def _columna_de(coordenada):
+    """'AB12' -> 28 (índice de columna 1-based)."""
+    return _indice_columna(coordenada.rstrip("0123456789"))
+
+
+if WorkSheetParser is not None:
+    class _ParserProyectado(WorkSheetParser):
+        """
+        Parser de hoja de openpyxl que solo convierte las celdas de las columnas
+        pedidas (el XML se recorre igual, pero el resto no se decodifica).
+        `columnas` = None convierte todas (para el encabezado).
+        """
+
+        columnas = None
+
+        def parse_row(self, row):
+            if self.columnas is None:
+                return super().parse_row(row)
+            r = row.get("r")
+            self.row_counter = int(float(r)) if r else self.row_counter + 1
+            celdas = []
+            col = 0
+            for el in row:
+                coordenada = el.get("r")
+                col = _columna_de(coordenada) if coordenada else col + 1
+                if col in self.columnas:
+                    self.col_counter = col - 1
+                    celdas.append(self.parse_cell(el))
+            self.con_datos = celdas or any(len(el) for el in row)
+            return self.row_counter, celdas
+
+
+def _se_lee(nombre, columnas):
+    return columnas is None or nombre in columnas or nombre.startswith(_PREFIJOS_EXCEL)
+
+
+def leer_excel_ordenes(origen, columnas=COLUMNAS_EXCEL, reporte_cada=None):
+    """
+    Lee la primera hoja del Excel de órdenes en streaming (openpyxl en modo
+    solo lectura) decodificando solo las columnas de `columnas` (y las que
+    empiezan con "Color"); columnas=None las lee todas.
+
+    Las celdas llegan tipadas (fechas como datetime, booleanos como bool) y las
+    fechas en texto español de _FECHAS_EXCEL se parsean al leer con
+    parsear_fechas_es. El tipo de cada columna se infiere como en pd.read_excel.
+    Si el parser interno de openpyxl no está disponible (otra versión), se lee
+    con pd.read_excel y la misma proyección.
+
+    origen: bytes, ruta o archivo abierto.
+    reporte_cada: cada cuántas filas loguear el avance (None: solo al final).
+    En df.attrs["lectura"] quedan filas, columnas, segundos y filas_por_seg.
+    """
+    t0 = time.perf_counter()
+    if isinstance(origen, (bytes, bytearray)):
+        origen = io.BytesIO(origen)
+    df = None
+    if WorkSheetParser is not None:
+        try:
+            df, columnas_hoja = _leer_streaming(origen, columnas, reporte_cada, t0)
+        except (AttributeError, TypeError) as e:
+            # Internos de openpyxl distintos a los de la versión fijada
+            logger.warning(f"Excel: lector en streaming no disponible ({e!r}), se usa pd.read_excel")
+            if hasattr(origen, "seek"):
+                origen.seek(0)
+    if df is None:
+        df, columnas_hoja = _leer_pandas(origen, columnas)
+
+    for col in _FECHAS_EXCEL.intersection(df.columns):
+        df[col] = parsear_fechas_es(df[col])
+
+    segundos = time.perf_counter() - t0
+    df.attrs["lectura"] = {
+        "filas": len(df),
+        "columnas": len(df.columns),
+        "columnas_hoja": columnas_hoja,
+        "segundos": round(segundos, 3),
+        "filas_por_seg": round(len(df) / segundos, 1) if segundos > 0 else 0.0,
+    }
+    logger.info(
+        f"Excel: {len(df)} filas, {len(df.columns)}/{columnas_hoja} columnas en {segundos:.2f}s "
+        f"({df.attrs['lectura']['filas_por_seg']:.0f} filas/s)"
+    )
+    return df
+
+
+def _leer_pandas(origen, columnas):
+    """pd.read_excel de la primera hoja con la proyección de `columnas`. Devuelve (df, columnas de la hoja)."""
+    nombres = []
+
+    def usar(nombre):
+        nombres.append(nombre)
+        return _se_lee(str(nombre).strip(), columnas)
+
+    df = pd.read_excel(origen, usecols=usar)
+    df.columns = df.columns.astype(str).str.strip()
+    return df, len(nombres)
+
+
+def _leer_streaming(origen, columnas, reporte_cada, t0):
+    """Lectura con _ParserProyectado. Devuelve (df, columnas de la hoja)."""
+    libro = load_workbook(origen, read_only=True, data_only=True, keep_links=False)
+    try:
+        hoja = libro.worksheets[0]
+        with hoja._get_source() as fuente:
+            parser = _ParserProyectado(
+                fuente, hoja._shared_strings, data_only=True, epoch=libro.epoch,
+                date_formats=libro._date_formats, timedelta_formats=libro._timedelta_formats,
+            )
+            filas_xml = parser.parse()
+
+            nombres, indices = [], []
+            datos = []
+            ultima_con_datos = 0
+            siguiente = 1
+            for n_fila, celdas in filas_xml:
+                if not datos:
+                    # Encabezado: define las columnas a leer
+                    encabezado = {c["column"]: c["value"] for c in celdas}
+                    ancho = max(encabezado, default=0)
+                    nombres = ["" if encabezado.get(i) is None else str(encabezado[i]).strip() for i in range(1, ancho + 1)]
+                    indices = [i for i, nombre in enumerate(nombres, start=1) if _se_lee(nombre, columnas)]
+                    posicion = {col: pos for pos, col in enumerate(indices)}
+                    parser.columnas = set(indices)
+                    datos.append([nombres[col - 1] for col in indices])
+                    siguiente = n_fila + 1
+                    continue
+
+                # Filas que faltan en el XML: vacías, como en pd.read_excel
+                vacia = [""] * len(indices)
+                while siguiente < n_fila:
+                    datos.append(list(vacia))
+                    siguiente += 1
+                siguiente = n_fila + 1
+
+                valores = list(vacia)
+                for c in celdas:
+                    valores[posicion[c["column"]]] = _valor_celda(c["value"], c["data_type"])
+                datos.append(valores)
+                if parser.con_datos:
+                    ultima_con_datos = len(datos) - 1
+                if reporte_cada and (len(datos) - 1) % reporte_cada == 0:
+                    leidas = len(datos) - 1
+                    logger.info(f"Excel: {leidas} filas leídas ({leidas / (time.perf_counter() - t0):.0f} filas/s)")
+    finally:
+        libro.close()
+
+    # Como pd.read_excel: sin filas vacías al final, tipos inferidos por columna
+    datos = datos[:ultima_con_datos + 1]
+    if len(datos) > 1:
+        df = TextParser(datos, header=0, skip_blank_lines=False).read()
+    else:
+        df = pd.DataFrame(columns=datos[0] if datos else [])
+    return df, len(nombres)
+
 def process_uploaded_dataframe(df):
     """
     Applies all transformations, renames, and calculated columns to the raw dataframe.
@@ -41,23 +348,7 @@ def process_uploaded_dataframe(df):
     df.columns = df.columns.astype(str).str.strip()
 
     # --- RENOMBRADO ---
-    df.rename(columns={
-        "ORDEN": "CodigoProducto",
-        "Ped.": "Subcodigo",
-        "CLIENTE": "Cliente",
-        "ART/DDP": "Cliente-articulo",
-        "Razon Social": "RazonSocial",
-        "CANT/DDP": "CantidadPliegos",
-        "FECH/ENT.": "FechaEntrega",
-        "Mat/Prim1": "MateriaPrima",
-        "MPPlanta": "MateriaPrimaPlanta",
-        "CodTroTapa": "CodigoTroquelTapa",
-        "CodTroCuerpo": "CodigoTroquelCuerpo",
-        "FechaChaDpv": "FechaLlegadaChapas", # Corrección aplicada en paso anterior
-        "FechaTroDpv": "FechaLlegadaTroquel",
-        "Pli Anc": "PliAnc",
-        "Pli Lar": "PliLar",
-    }, inplace=True)
+    df.rename(columns=RENOMBRES_EXCEL, inplace=True)
 
     # --- COLORES COMBINADOS ---
     color_cols = [c for c in df.columns if str(c).startswith("Color")]
@@ -65,13 +356,13 @@ def process_uploaded_dataframe(df):
 
     # --- PARSEO DE FECHAS (CUSTOM ESPAÑOL) ---
     if "FechaLlegadaChapas" in df.columns:
-        df["FechaLlegadaChapas"] = df["FechaLlegadaChapas"].apply(parse_spanish_date)
+        df["FechaLlegadaChapas"] = parsear_fechas_es(df["FechaLlegadaChapas"])
     
     if "FechaLlegadaTroquel" in df.columns:
-        df["FechaLlegadaTroquel"] = df["FechaLlegadaTroquel"].apply(parse_spanish_date)
+        df["FechaLlegadaTroquel"] = parsear_fechas_es(df["FechaLlegadaTroquel"])
 
     if "FechaImDdp" in df.columns:
-        df["FechaImDdp"] = df["FechaImDdp"].apply(parse_spanish_date)
+        df["FechaImDdp"] = parsear_fechas_es(df["FechaImDdp"])
 
     # --- FLAGS SOLO PENDIENTES ---
     def to_bool_series(names):
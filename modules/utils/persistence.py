@@ -1,6 +1,6 @@
-import streamlit as st
 import pandas as pd
 import json
+import os
 from datetime import date, datetime
 import sqlalchemy
 from sqlalchemy import create_engine, text
@@ -10,44 +10,70 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Variable de entorno con la URL de la base (corridas sin Streamlit)
+DB_URL_ENV = "THEILER_DB_URL"
+
+
+def _url_desde_secrets():
+    """URL de PostgreSQL desde st.secrets (.streamlit/secrets.toml), si Streamlit está instalado."""
+    try:
+        import streamlit as st
+        if "postgres" not in st.secrets:
+            return None
+        # Expected format in secrets.toml:
+        # [postgres]
+        # host = "..."
+        # port = 5432
+        # dbname = "..."
+        # user = "..."
+        # password = "..."
+        secrets = st.secrets["postgres"]
+    except Exception:
+        return None
+
+    # Check if it's a URL string or dict
+    if isinstance(secrets, str): # URL string
+        return secrets
+    if "url" in secrets:
+        return secrets["url"]
+    return f"postgresql://{secrets['user']}:{secrets['password']}@{secrets['host']}:{secrets['port']}/{secrets['dbname']}"
+
+
 class PersistenceManager:
-    def __init__(self):
+    """
+    Historial y configuraciones persistidas en PostgreSQL.
+
+    db_url: URL de conexión; si no se pasa, se toma de la variable de entorno
+            THEILER_DB_URL o de st.secrets["postgres"].
+    notificar: callable(nivel, mensaje) para mostrar errores al usuario
+               (la app pasa st.error / st.warning); siempre se loguean.
+    """
+
+    def __init__(self, db_url=None, notificar=None):
         self.engine = None
         self.connected = False
+        self.db_url = db_url
+        self.notificar = notificar
         self._connect()
 
+    def _avisar(self, nivel, mensaje):
+        if self.notificar is not None:
+            self.notificar(nivel, mensaje)
+
     def _connect(self):
-        """Attempts to connect to PostgreSQL using st.secrets."""
+        """Attempts to connect to PostgreSQL (db_url, THEILER_DB_URL or st.secrets)."""
         try:
-            if "postgres" in st.secrets:
-                # Construct connection string from secrets
-                # Expected format in secrets.toml:
-                # [postgres]
-                # host = "..."
-                # port = 5432
-                # dbname = "..."
-                # user = "..."
-                # password = "..."
-                
-                # Check if it's a URL string or dict
-                secrets = st.secrets["postgres"]
-                if isinstance(secrets, str): # URL string
-                    db_url = secrets
-                elif "url" in secrets:
-                    db_url = secrets["url"]
-                else:
-                    # Construct URL
-                    db_url = f"postgresql://{secrets['user']}:{secrets['password']}@{secrets['host']}:{secrets['port']}/{secrets['dbname']}"
-                
+            db_url = self.db_url or os.environ.get(DB_URL_ENV) or _url_desde_secrets()
+            if db_url:
                 self.engine = create_engine(db_url)
                 self.connected = True
                 logger.info("Connected to PostgreSQL successfully.")
                 self.init_db()
             else:
-                logger.warning("No 'postgres' secrets found. Persistence disabled.")
+                logger.warning("No database URL ('postgres' secrets / THEILER_DB_URL) found. Persistence disabled.")
         except Exception as e:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
-            st.error(f"Error de conexión a Base de Datos de Historial: {e}")
+            self._avisar("error", f"Error de conexión a Base de Datos de Historial: {e}")
             self.connected = False
 
     def init_db(self):
@@ -81,7 +107,7 @@ class PersistenceManager:
                 conn.commit()
         except Exception as e:
             logger.error(f"Failed to init DB: {e}")
-            st.error(f"Error inicializando tabla de historial: {e}")
+            self._avisar("error", f"Error inicializando tabla de historial: {e}")
 
     def save_schedule(self, df_schedule):
         """
@@ -137,7 +163,7 @@ class PersistenceManager:
             
         except Exception as e:
             logger.error(f"Failed to save schedule: {e}")
-            st.warning(f"No se pudo guardar el historial: {e}")
+            self._avisar("warning", f"No se pudo guardar el historial: {e}")
 
     def save_manual_overrides(self, overrides):
         """
@@ -253,7 +279,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save overrides: {e}")
-            st.warning(f"No se pudieron guardar las configuraciones manuales: {e}")
+            self._avisar("warning", f"No se pudieron guardar las configuraciones manuales: {e}")
 
     def load_manual_overrides(self):
         """
@@ -468,7 +494,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save die preferences: {e}")
-            st.warning(f"Error guardando preferencias en BD: {e}")
+            self._avisar("warning", f"Error guardando preferencias en BD: {e}")
             return False
 
     def load_die_preferences(self):
@@ -523,7 +549,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save holidays: {e}")
-            st.warning(f"Error guardando feriados en BD: {e}")
+            self._avisar("warning", f"Error guardando feriados en BD: {e}")
             return False
 
     def load_holidays(self):
@@ -587,7 +613,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save downtimes: {e}")
-            st.warning(f"Error guardando paros en BD: {e}")
+            self._avisar("warning", f"Error guardando paros en BD: {e}")
             return False
 
     def save_overtime(self, overtime_dict):
@@ -624,7 +650,7 @@ class PersistenceManager:
                 
         except Exception as e:
             logger.error(f"Failed to save overtime: {e}")
-            st.error(f"Error guardando horas extras en BD: {e}")
+            self._avisar("error", f"Error guardando horas extras en BD: {e}")
             return False
 
     def load_overtime(self):
@@ -717,7 +743,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save pending processes: {e}")
-            st.warning(f"Error guardando procesos pendientes en BD: {e}")
+            self._avisar("warning", f"Error guardando procesos pendientes en BD: {e}")
             return False
 
     def load_pending_processes(self):
@@ -770,7 +796,7 @@ class PersistenceManager:
 
         except Exception as e:
             logger.error(f"Failed to save custom machines: {e}")
-            st.warning(f"Error guardando máquinas personalizadas en BD: {e}")
+            self._avisar("warning", f"Error guardando máquinas personalizadas en BD: {e}")
             return False
 
     def load_custom_machines(self):
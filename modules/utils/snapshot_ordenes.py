@@ -0,0 +1,150 @@
+"""
+Snapshots binarios de la tabla de órdenes procesada.
+
+Después de leer el Excel y pasar por process_uploaded_dataframe, la tabla se
+guarda en disco con clave = digest del archivo (+ huella de data_processor,
+para que un cambio en el procesamiento no reuse snapshots viejos). Un reinicio
+del servidor, otro planificador que abre la app, la página del Galpón 2 o una
+corrida por línea de comandos leen el snapshot en vez de re-parsear el .xlsx.
+
+Formato: Feather (Arrow) con memory-map si pyarrow está instalado; si no, o si
+la tabla no se puede representar en Arrow sin cambios (columnas object con
+tipos mezclados), pickle.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow es opcional
+    feather = None
+
+
+_DATA_PROCESSOR = Path(__file__).resolve().parent / "data_processor.py"
+_EXTENSIONES = (".feather", ".pkl")
+
+
+def clave_archivo(file_bytes):
+    """Digest del Excel subido y del código que lo procesa."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(_DATA_PROCESSOR.read_bytes())
+    h.update(bytes(file_bytes))
+    return h.hexdigest()
+
+
+def _escribir_atomico(ruta, escribir):
+    """Escribe en un temporal del mismo directorio y lo renombra (nunca queda un archivo a medias)."""
+    fd, tmp = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        escribir(tmp)
+        os.replace(tmp, ruta)
+    except Exception:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class SnapshotOrdenes:
+    """
+    Almacén de snapshots de órdenes procesadas.
+
+    Uso:
+        snapshots = SnapshotOrdenes(".cache/ordenes")
+        df = snapshots.cargar_o_procesar(file_bytes, lambda b: process_uploaded_dataframe(leer_excel_ordenes(b)))
+
+    max_snapshots: cuántos archivos distintos se conservan (se borran los de uso más viejo).
+    """
+
+    def __init__(self, directorio=".cache/ordenes", max_snapshots=10, usar_feather=True):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.max_snapshots = max_snapshots
+        self.usar_feather = usar_feather and feather is not None
+
+    def _rutas(self, clave):
+        return [self.directorio / f"{clave}{ext}" for ext in _EXTENSIONES]
+
+    def __contains__(self, clave):
+        return any(r.exists() for r in self._rutas(clave))
+
+    # ------------------------------------------------------------------
+    def leer(self, clave):
+        """DataFrame del snapshot, o None si no hay (o está dañado)."""
+        for ruta in self._rutas(clave):
+            if not ruta.exists():
+                continue
+            t0 = time.perf_counter()
+            try:
+                if ruta.suffix == ".feather":
+                    if feather is None:
+                        continue
+                    df = feather.read_table(ruta, memory_map=True).to_pandas()
+                else:
+                    with open(ruta, "rb") as f:
+                        df = pickle.load(f)
+            except Exception:
+                ruta.unlink(missing_ok=True)
+                continue
+            os.utime(ruta)  # marca de uso para el desalojo
+            df.attrs.pop("lectura", None)  # describe la lectura original del Excel, no esta
+            df.attrs["snapshot"] = {
+                "clave": clave,
+                "formato": ruta.suffix.lstrip("."),
+                "segundos": round(time.perf_counter() - t0, 3),
+            }
+            return df
+        return None
+
+    def guardar(self, clave, df):
+        """Guarda el snapshot; devuelve el formato usado ("feather" o "pkl")."""
+        formato = "pkl"
+        if self.usar_feather and self._guardar_feather(clave, df):
+            formato = "feather"
+        else:
+            ruta = self.directorio / f"{clave}.pkl"
+            def escribir(tmp):
+                with open(tmp, "wb") as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            _escribir_atomico(ruta, escribir)
+        self._desalojar()
+        return formato
+
+    def cargar_o_procesar(self, file_bytes, procesar):
+        """Snapshot del archivo si existe; si no, `procesar(file_bytes)` y se guarda."""
+        clave = clave_archivo(file_bytes)
+        df = self.leer(clave)
+        if df is None:
+            df = procesar(file_bytes)
+            self.guardar(clave, df)
+        return df
+
+    # ------------------------------------------------------------------
+    def _guardar_feather(self, clave, df):
+        """
+        Feather solo si la tabla vuelve idéntica (Arrow no guarda el índice
+        ni columnas object con tipos mezclados tal cual).
+        """
+        ruta = self.directorio / f"{clave}.feather"
+        try:
+            _escribir_atomico(ruta, lambda tmp: df.reset_index(drop=True).to_feather(tmp))
+            leido = feather.read_table(ruta, memory_map=True).to_pandas()
+        except Exception:
+            ruta.unlink(missing_ok=True)
+            return False
+        if not (df.index.equals(pd.RangeIndex(len(df))) and leido.equals(df) and (leido.dtypes == df.dtypes).all()):
+            ruta.unlink(missing_ok=True)
+            return False
+        return True
+
+    def _desalojar(self):
+        archivos = [r for ext in _EXTENSIONES for r in self.directorio.glob(f"*{ext}")]
+        archivos.sort(key=lambda r: r.stat().st_mtime)
+        for ruta in archivos[:max(0, len(archivos) - self.max_snapshots)]:
+            ruta.unlink(missing_ok=True)
@@ -1,3 +1,5 @@
+import math
+
 import pandas as pd
 from .config_loader import cargar_config, es_si
 
@@ -118,6 +120,60 @@ def usa_setup_menor(prev, curr, proceso):
 
     return False
 
+def _texto_setup(t, campo):
+    return str(t.get(campo, "")).strip().lower()
+
+
+def claves_setup_menor(tarea, proceso, previa=False):
+    """
+    Claves de familia de setup de `tarea` para `proceso` (tuplas hasheables).
+
+    Si usa_setup_menor(prev, curr, proceso) es True, las claves de `prev` con
+    previa=True y las de `curr` comparten al menos una:
+      troquelado / ventana -> código de troquel
+      impresión            -> (cliente, colores) y (cliente, celda de tamaño)
+      pegado               -> (tipo, materia prima)
+      bobina               -> materia prima
+    El tamaño se compara con tolerancia de 0.1, así que se indexa en celdas de
+    0.2 y la previa devuelve también las vecinas: las claves acotan candidatas
+    y la confirmación sigue siendo usa_setup_menor.
+    """
+    proceso_lower = proceso.lower().strip()
+    claves = []
+
+    if "troquel" in proceso_lower or "ventana" in proceso_lower:
+        troquel = _texto_setup(tarea, "CodigoTroquel")
+        if troquel:
+            claves.append(("troquel", troquel))
+
+    if "impres" in proceso_lower:
+        cliente = _texto_setup(tarea, "Cliente")
+        if cliente:
+            colores = _texto_setup(tarea, "Colores")
+            if colores:
+                claves.append(("colores", cliente, colores))
+            try:
+                anc = float(tarea.get("PliAnc", 0) or 0)
+                lar = float(tarea.get("PliLar", 0) or 0)
+                celda = (math.floor(anc * 5), math.floor(lar * 5))
+            except (ValueError, TypeError, OverflowError):
+                celda = None
+            if celda is not None and not (previa and (anc == 0 or lar == 0)):
+                vecinas = (-1, 0, 1) if previa else (0,)
+                claves.extend(("tamano", cliente, celda[0] + da, celda[1] + dl) for da in vecinas for dl in vecinas)
+
+    if "peg" in proceso_lower and "ventana" not in proceso_lower:
+        tipo = _texto_setup(tarea, "PegadoTipo")
+        if tipo:
+            claves.append(("pegado", tipo, _texto_setup(tarea, "MateriaPrima")))
+
+    if "bobina" in proceso_lower:
+        mp = _texto_setup(tarea, "MateriaPrima")
+        if mp:
+            claves.append(("mp", mp))
+
+    return claves
+
 # =========================================================
 # Tiempo de operación
 # =========================================================
@@ -0,0 +1,70 @@
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.generador_planta import generar_ordenes
+from benchmarks.bench_scheduler import cfg_planta, medir, comparar, guardar_linea_base, leer_linea_base
+import modules.scheduler as scheduler
+
+
+def test_benchmark():
+    print("=== Testing Benchmark del Planificador ===")
+
+    cfg = cfg_planta()
+
+    # 1. Generador: determinista por semilla y atado a la hoja de máquinas
+    a = generar_ordenes(80, cfg["maquinas"], semilla=3)
+    b = generar_ordenes(80, cfg["maquinas"], semilla=3)
+    pd.testing.assert_frame_equal(a, b)
+    assert not a.equals(generar_ordenes(80, cfg["maquinas"], semilla=4))
+    assert a["_PEN_Troquelado"].any() and a["_PEN_ImpresionOffset"].any()
+
+    sin_barniz = cfg["maquinas"][cfg["maquinas"]["Proceso"] != "Barnizado"]
+    assert not generar_ordenes(80, sin_barniz, semilla=3)["_PEN_Barnizado"].any()
+
+    # 2. Medición: total, etapas y memoria; las funciones originales quedan restauradas
+    reservar = scheduler._reservar_en_agenda
+    resultado = medir(60, semilla=1, cfg=cfg)
+    assert scheduler._reservar_en_agenda is reservar
+    assert resultado["filas"] > 0 and resultado["segundos"] > 0
+    assert resultado["tareas"] >= resultado["filas"]
+    assert resultado["sin_agendar"] == resultado["tareas"] - resultado["filas"]
+    assert resultado["etapas"]["reservas"]["llamadas"] > 0
+    assert resultado["etapas"]["expansion"]["llamadas"] == 1
+    assert resultado["memoria_pico_mb"] > 0
+    print({k: v["segundos"] for k, v in resultado["etapas"].items()})
+
+    # 3. Puerta de regresión contra la línea base
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "linea_base.json")
+        guardar_linea_base({"60": resultado}, ruta)
+        base = leer_linea_base(ruta)
+        assert comparar({"60": resultado}, base) == []
+
+        lento = dict(resultado, segundos=resultado["segundos"] * 2)
+        pesado = dict(resultado, memoria_pico_mb=resultado["memoria_pico_mb"] * 2)
+        menos = dict(resultado, filas=resultado["filas"] - 1, sin_agendar=resultado["sin_agendar"] + 1)
+        mas = dict(resultado, filas=resultado["filas"] + 1, sin_agendar=max(0, resultado["sin_agendar"] - 1))
+        assert len(comparar({"60": lento}, base)) == 1
+        assert len(comparar({"60": pesado}, base)) == 1
+        assert len(comparar({"60": menos}, base)) == 1
+        # Agendar más tareas que la línea base no es una regresión
+        assert comparar({"60": mas}, base) == []
+        assert comparar({"60": lento}, base, tolerancia_tiempo=1.5) == []
+
+        # Otra cartera no se compara
+        assert comparar({"60": dict(lento, semilla=2)}, base) == []
+
+    print("SUCCESS: Benchmark con generador sintético y línea base.")
+
+
+if __name__ == "__main__":
+    try:
+        test_benchmark()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
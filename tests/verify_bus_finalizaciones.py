@@ -0,0 +1,85 @@
+import sys
+import os
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.eventos import MotorEventos, BusFinalizaciones
+
+
+class _Dependencias:
+    """Rastreador mínimo: (ot, proceso) -> sucesoras y su disponibilidad."""
+    def __init__(self, esperan, disponibilidad):
+        self.esperan = esperan
+        self.estado = disponibilidad
+
+    def registrar_fin(self, ot, proceso):
+        return self.esperan.get((ot, proceso), [])
+
+    def disponibilidad(self, t):
+        return self.estado[t["OT_id"]]
+
+
+def test_bus_finalizaciones():
+    print("=== Testing Bus de Finalizaciones y Despertadores ===")
+
+    h = lambda hora: datetime(2026, 3, 2, hora)
+    reloj = {"Impresora": h(7), "Troqueladora": h(8), "Pegadora": h(9)}
+    motor = MotorEventos(list(reloj), lambda m: (reloj[m], 0, m))
+
+    # 1. La troqueladora (08:00) espera predecesores y su mejor futura es a las 15:00:
+    #    duerme sin mover el reloj y vuelve cuando el recorrido llega a las 15:00
+    assert motor.siguiente() == "Impresora"
+    assert motor.siguiente() == "Troqueladora" and motor.despertador_vencido() is None
+    motor.dormir("Troqueladora", h(15))
+    assert reloj["Troqueladora"] == h(8)
+    assert motor.siguiente() == "Pegadora"
+    assert motor.siguiente() == "Troqueladora" and motor.despertador_vencido() == h(15)
+    assert motor.siguiente() is None
+
+    # 2. Un fin publicado antes del despertador lo adelanta a la hora exacta
+    motor.nueva_pasada()
+    reloj["Impresora"] = h(10)
+    motor.activar("Impresora")
+    motor.dormir("Troqueladora", h(15))
+    motor.nueva_pasada()
+    assert motor.siguiente() == "Impresora"
+    motor.notificar("Troqueladora", h(11))
+    assert motor.siguiente() == "Troqueladora" and motor.despertador_vencido() == h(11)
+
+    # 3. Un cambio en lo que lee (despertar) cancela el despertador: vuelve a su reloj
+    motor.nueva_pasada()
+    motor.dormir("Troqueladora", h(15))
+    motor.despertar("Troqueladora")
+    motor.nueva_pasada()
+    assert motor.siguiente() == "Troqueladora" and motor.despertador_vencido() is None
+
+    # 4. El bus avisa solo a las colas de sucesoras liberadas, con su hora de disponibilidad
+    troq, pegado, otra = {"OT_id": "A"}, {"OT_id": "B"}, {"OT_id": "C"}
+    deps = _Dependencias(
+        {("A", "Impresión Offset"): [troq], ("B", "Troquelado"): [pegado], ("C", "Troquelado"): [otra]},
+        {"A": (True, h(12)), "B": (True, None), "C": (False, None)},
+    )
+    bus = BusFinalizaciones(deps)
+    bus.suscribir("Troqueladora", [troq, otra])
+    bus.suscribir("Pegadora", [pegado])
+
+    assert bus.publicar("A", "Impresión Offset", h(11)) == [troq]
+    bus.publicar("B", "Troquelado", h(13))
+    bus.publicar("C", "Troquelado", h(9))       # a C todavía le falta otro predecesor
+    bus.publicar("Z", "Troquelado", h(9))       # nadie la espera
+    avisos = bus.entregar()
+    print(f"Avisos: {avisos}")
+    assert avisos == {"Troqueladora": h(12), "Pegadora": h(13)}
+    assert bus.entregar() == {}
+
+    print("SUCCESS: Despertadores precisos por fin de predecesor.")
+
+
+if __name__ == "__main__":
+    try:
+        test_bus_finalizaciones()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
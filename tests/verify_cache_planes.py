@@ -0,0 +1,78 @@
+import sys
+import os
+import copy
+import tempfile
+from datetime import date, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.utils.cache_planes import CachePlanes, clave_plan
+
+
+def test_cache_planes():
+    print("=== Testing Caché de Planes por Contenido ===")
+
+    df = pd.DataFrame([{
+        "CodigoProducto": 800 + i, "Subcodigo": 1, "Cliente": "Arcor", "Cliente-articulo": f"Arcor art {i}",
+        "FechaEntrega": pd.Timestamp("2026-03-10"), "CantidadPliegos": 3000, "CantidadProductos": 6000,
+        "Poses": 2, "BocasTroquel": 2, "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina",
+        "CodigoTroquel": f"T{i}", "_PEN_ImpresionOffset": True, "_PEN_Troquelado": True,
+    } for i in range(4)])
+
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [])
+    cfg["manual_overrides"] = {"blacklist_ots": set(), "skipped_processes": set(), "manual_priorities": {}}
+    inicio = (date(2026, 3, 2), time(7, 0))
+
+    # 1. Misma clave para el mismo contenido, otra si cambia algo anidado
+    clave = clave_plan(df, cfg, *inicio)
+    assert clave_plan(df.copy(), copy.deepcopy(cfg), *inicio) == clave
+    otro = copy.deepcopy(cfg)
+    otro["manual_overrides"]["skipped_processes"].add(("800-1", "Troquelado"))
+    assert clave_plan(df, otro, *inicio) != clave
+    otro = copy.deepcopy(cfg)
+    otro["maquinas"].loc[otro["maquinas"].index[0], "Capacidad_pliegos_hora"] += 1
+    assert clave_plan(df, otro, *inicio) != clave
+    assert clave_plan(df, cfg, date(2026, 3, 3), time(7, 0)) != clave
+    assert clave_plan(df.iloc[::-1], cfg, *inicio) != clave
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        llamadas = []
+
+        def planificador(df_in, cfg_in, start, start_time):
+            llamadas.append(start)
+            from modules.scheduler import programar
+            return programar(df_in, cfg_in, start=start, start_time=start_time)
+
+        # 2. Memoria: el segundo pedido no re-planifica y devuelve copias
+        cache = CachePlanes(max_entradas=1, directorio=carpeta)
+        plan = cache.planificar(df, copy.deepcopy(cfg), *inicio, planificador=planificador)
+        plan[0].drop(plan[0].index, inplace=True)
+        repetido = cache.planificar(df, copy.deepcopy(cfg), *inicio, planificador=planificador)
+        assert len(llamadas) == 1 and cache.aciertos == 1
+        assert not repetido[0].empty
+        assert "OT_id" not in df.columns  # las órdenes del llamador no se tocan
+
+        # 3. LRU: con una sola entrada, otro plan desaloja al primero (queda en disco)
+        cache.planificar(df, cfg, date(2026, 3, 3), time(7, 0), planificador=planificador)
+        assert len(cache) == 1 and len(llamadas) == 2
+
+        # 4. Disco: una caché nueva (reinicio del servidor) encuentra los planes
+        reiniciada = CachePlanes(directorio=carpeta)
+        desde_disco = reiniciada.planificar(df, cfg, *inicio, planificador=planificador)
+        assert len(llamadas) == 2 and reiniciada.aciertos_disco == 1
+        pd.testing.assert_frame_equal(desde_disco[0], repetido[0])
+
+    print("SUCCESS: Planes reutilizados por contenido, en memoria y en disco.")
+
+
+if __name__ == "__main__":
+    try:
+        test_cache_planes()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
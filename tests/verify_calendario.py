@@ -0,0 +1,72 @@
+import sys
+import os
+from datetime import datetime, date
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import (
+    obtener_calendario, es_dia_habil, es_feriado, get_horas_totales_dia, proximo_dia_habil
+)
+
+
+def test_calendario():
+    print("=== Testing Calendario de Días Hábiles ===")
+
+    cfg = {
+        "jornada": pd.DataFrame({"Parametro": ["Horas_base_por_dia"], "Valor": [9.0]}),
+        "feriados": {date(2026, 3, 4)},
+        "horas_extras": {"Duyan": {date(2026, 3, 7): 4.0}},
+        "downtimes": [],
+    }
+
+    # 1. Helpers de config_loader servidos por el calendario
+    assert es_feriado(datetime(2026, 3, 4, 10, 0), cfg)
+    assert not es_dia_habil(date(2026, 3, 4), cfg)
+    assert get_horas_totales_dia(date(2026, 3, 4), cfg) == 0.0
+    assert get_horas_totales_dia(date(2026, 3, 5), cfg, maquina="Duyan") == 9.0
+    assert proximo_dia_habil(date(2026, 3, 4), cfg) == date(2026, 3, 5)
+
+    # 2. Horas extras: el sábado es hábil solo para la máquina que las tiene
+    assert es_dia_habil(date(2026, 3, 7), cfg, maquina="Duyan")
+    assert not es_dia_habil(date(2026, 3, 7), cfg, maquina="Otra")
+    assert get_horas_totales_dia(date(2026, 3, 7), cfg, maquina="Duyan") == 4.0
+    assert proximo_dia_habil(date(2026, 3, 7), cfg) == date(2026, 3, 9)
+    # Conserva el tipo de la fecha recibida
+    assert proximo_dia_habil(datetime(2026, 3, 7, 7, 0), cfg) == datetime(2026, 3, 9, 7, 0)
+
+    # 3. Capacidad vectorizada por rango
+    horas = obtener_calendario(cfg).horas_rango(date(2026, 3, 2), date(2026, 3, 8), maquina="Duyan")
+    assert list(horas) == [9.0, 9.0, 0.0, 9.0, 9.0, 4.0, 0.0]
+
+    # 4. Se invalida al cambiar feriados / horas extras (reasignación o edición)
+    cal = obtener_calendario(cfg)
+    cfg["feriados"] = {date(2026, 3, 5)}
+    assert es_dia_habil(date(2026, 3, 4), cfg) and not es_dia_habil(date(2026, 3, 5), cfg)
+    cfg["horas_extras"]["Duyan"][date(2026, 3, 7)] = 0.0
+    assert obtener_calendario(cfg) is not cal
+    assert not es_dia_habil(date(2026, 3, 7), cfg, maquina="Duyan")
+
+    # 4b. Edición en el lugar de las horas de un día (como la UI): los helpers
+    # ven el cambio sin volver a llamar a obtener_calendario
+    cfg["horas_extras"]["Duyan"][date(2026, 3, 7)] = 5.0
+    assert es_dia_habil(date(2026, 3, 7), cfg, maquina="Duyan")
+    assert get_horas_totales_dia(date(2026, 3, 7), cfg, maquina="Duyan") == 5.0
+    cfg["horas_extras"]["Duyan"][date(2026, 3, 7)] = 3.0
+    assert get_horas_totales_dia(date(2026, 3, 7), cfg, maquina="Duyan") == 3.0
+    cfg["horas_extras"]["Duyan"][date(2026, 3, 14)] = 2.0
+    assert proximo_dia_habil(date(2026, 3, 14), cfg, maquina="Duyan") == date(2026, 3, 14)
+
+    # 5. Sin cambios se reutiliza la misma instancia
+    assert obtener_calendario(cfg) is obtener_calendario(cfg)
+
+    print("SUCCESS: Calendario memoizado equivalente a los helpers.")
+
+
+if __name__ == "__main__":
+    try:
+        test_calendario()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,64 @@
+import sys
+import os
+from datetime import datetime, date, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.agenda import _reservar_en_agenda, CalendarioMaquina
+
+
+def test_calendario_maquina():
+    print("=== Testing Calendario de Máquina ===")
+
+    cfg = {
+        "jornada": pd.DataFrame({"Parametro": ["Horas_base_por_dia"], "Valor": [9.0]}),
+        "feriados": {date(2026, 3, 4)},
+        "horas_extras": {"Duyan": {date(2026, 3, 7): 4.0}},
+        "downtimes": [
+            {"maquina": "Duyan", "start": datetime(2026, 3, 2, 9, 0), "end": datetime(2026, 3, 2, 10, 0)},
+            {"maquina": "Otra", "start": datetime(2026, 3, 2, 7, 0), "end": datetime(2026, 3, 2, 16, 0)},
+        ],
+    }
+
+    # 1. Índice por día: horas, fin de turno (con almuerzo) y paros + almuerzo
+    cal = CalendarioMaquina("Duyan", cfg)
+    h_dia, fin_turno, paros = cal.dia(date(2026, 3, 2))
+    assert h_dia == 9.0 and fin_turno == datetime(2026, 3, 2, 16, 30)
+    assert paros.fin_si_contiene(datetime(2026, 3, 2, 9, 30)) == datetime(2026, 3, 2, 10, 0)
+    assert paros.fin_si_contiene(datetime(2026, 3, 2, 13, 45)) == datetime(2026, 3, 2, 14, 0)
+    assert paros.fin_si_contiene(datetime(2026, 3, 2, 10, 0)) is None
+    assert paros.proximo_inicio(datetime(2026, 3, 2, 10, 0), fin_turno) == datetime(2026, 3, 2, 13, 30)
+
+    # 2. Feriado salteado; el sábado con horas extras es hábil para la máquina
+    assert cal.proximo_habil(date(2026, 3, 4)) == date(2026, 3, 5)
+    assert cal.proximo_habil(date(2026, 3, 7)) == date(2026, 3, 7)
+
+    # 3. Reserva: corta antes del paro y del almuerzo, y cruza al día siguiente
+    agenda_m = {"nombre": "Duyan", "fecha": date(2026, 3, 2), "hora": time(7, 0), "resto_horas": 9.0}
+    bloques = _reservar_en_agenda(agenda_m, 10.0, cfg)
+    print(f"Bloques: {bloques}")
+    assert bloques == [
+        (datetime(2026, 3, 2, 7, 0), datetime(2026, 3, 2, 9, 0)),
+        (datetime(2026, 3, 2, 10, 0), datetime(2026, 3, 2, 13, 30)),
+        (datetime(2026, 3, 2, 14, 0), datetime(2026, 3, 2, 16, 30)),
+        (datetime(2026, 3, 3, 7, 0), datetime(2026, 3, 3, 9, 0)),
+    ]
+    assert agenda_m["fecha"] == date(2026, 3, 3) and agenda_m["hora"] == time(9, 0)
+    assert agenda_m["resto_horas"] == 7.0
+
+    # 4. Terminar justo al fin de turno deja la agenda en el próximo hábil (salta el feriado)
+    bloques = _reservar_en_agenda(agenda_m, 7.0, cfg)
+    assert bloques[-1][1] == datetime(2026, 3, 3, 16, 30)
+    assert agenda_m["fecha"] == date(2026, 3, 5) and agenda_m["hora"] == time(7, 0)
+
+    print("SUCCESS: Reservas sobre el calendario indexado correctas.")
+
+
+if __name__ == "__main__":
+    try:
+        test_calendario_maquina()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,82 @@
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.tiempos_y_setup import usa_setup_menor, claves_setup_menor
+from modules.schedulers.colas_indexadas import IndiceColas
+
+
+class _Tarea(dict):
+    def __init__(self, **campos):
+        super().__init__(**campos)
+        self.mp_ok = True
+        self.prio_man = 9999
+        self.tiene_prioridad = False
+
+
+def test_claves_setup():
+    print("=== Testing Claves de Familia de Setup ===")
+
+    rng = random.Random(11)
+    procesos = ["Troquelado", "Impresión Offset", "Impresión Flexo", "Pegado", "Ventana", "Cortadora Bobina"]
+
+    def tarea_al_azar():
+        return _Tarea(
+            CodigoTroquel=rng.choice(["T1", " t1 ", "T2", "", None]),
+            Cliente=rng.choice(["Arcor", "arcor ", "Bagley", ""]),
+            Colores=rng.choice(["C-M", "c-m", "K", ""]),
+            PliAnc=rng.choice([60, 60.0, 60.05, 59.95, 60.15, 0, None, "x"]),
+            PliLar=rng.choice([80, 80.08, 79.92, 0, None]),
+            PegadoTipo=rng.choice(["Recto", "recto", "Fondo", ""]),
+            MateriaPrima=rng.choice(["Cartulina", "cartulina ", "Micro", ""]),
+        )
+
+    # 1. usa_setup_menor True => las familias se cruzan (las claves no pierden candidatas)
+    coinciden = 0
+    for _ in range(4000):
+        prev, curr, proceso = tarea_al_azar(), tarea_al_azar(), rng.choice(procesos)
+        if usa_setup_menor(prev, curr, proceso):
+            coinciden += 1
+            claves_prev = set(claves_setup_menor(prev, proceso, previa=True))
+            assert claves_prev & set(claves_setup_menor(curr, proceso)), (prev, curr, proceso)
+    assert coinciden > 100
+
+    # Tamaño con tolerancia de 0.1: celdas vecinas
+    a = _Tarea(Cliente="Arcor", Colores="", PliAnc=60.0, PliLar=80.0)
+    b = _Tarea(Cliente="Arcor", Colores="", PliAnc=59.95, PliLar=80.08)
+    assert usa_setup_menor(a, b, "Impresión Offset")
+    assert set(claves_setup_menor(a, "Impresión Offset", previa=True)) & set(claves_setup_menor(b, "Impresión Offset"))
+    assert claves_setup_menor(_Tarea(CodigoTroquel=""), "Troquelado") == []
+
+    # 2. La cola indexada encuentra la de setup menor con un lookup por familia
+    t0 = datetime(2026, 3, 2, 7, 0)
+    disponible = {}
+    indice = IndiceColas(lambda t, maquina: (True, disponible[id(t)]))
+    tareas = [_Tarea(OT_id=f"OT{n}", Proceso="Troquelado", CodigoTroquel=f"T{n % 10}") for n in range(200)]
+    for n, t in enumerate(tareas):
+        disponible[id(t)] = t0 + timedelta(hours=1 + n % 7)
+    cola = indice.cola(tareas, "Duyan")
+
+    ultima = _Tarea(Proceso="Troquelado", CodigoTroquel="t3")
+    examinadas, idx, futura, setup, _ = cola.buscar_candidata(t0, ultima)
+    esperado = min((disponible[id(t)], i) for i, t in enumerate(tareas) if t["CodigoTroquel"] == "T3")
+    assert setup == (esperado[1], esperado[0]) and idx == -1 and futura == (0, disponible[id(tareas[0])])
+    assert examinadas <= 21  # solo la familia T3 (20 tareas) y la futura
+    print(f"familia T3: {examinadas} examinadas de {len(cola)}")
+
+    cola.remove(tareas[esperado[1]])
+    assert cola.buscar_candidata(t0, ultima)[3][0] != esperado[1]
+
+    print("SUCCESS: Familias de setup consistentes con usa_setup_menor.")
+
+
+if __name__ == "__main__":
+    try:
+        test_claves_setup()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,113 @@
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.colas_indexadas import ColaIndexada, IndiceColas
+from modules.utils.tiempos_y_setup import usa_setup_menor
+
+
+class _Tarea(dict):
+    """Tarea mínima: lo que leen la cola indexada y usa_setup_menor."""
+    def __init__(self, n, troquel, mp_ok=True):
+        super().__init__(OT_id=f"OT{n}", Proceso="Troquelado", CodigoTroquel=troquel)
+        self.mp_ok = mp_ok
+        self.prio_man = 9999
+        self.tiene_prioridad = False
+
+
+def _recorrido(cola, estado, reloj, ultima, tolerancia):
+    """PASO 1 original para una máquina sin prioridades ni scoring de preparación."""
+    idx_cand, futura, setup, bloqueadas = -1, None, None, False
+    for i, t in enumerate(cola):
+        if not t.mp_ok:
+            continue
+        runnable, disp = estado[id(t)]
+        if not runnable:
+            bloqueadas = True
+            continue
+        if not disp or disp <= reloj:
+            idx_cand = i
+            futura = None
+            break
+        if futura is None or disp < futura[1]:
+            futura = (i, disp)
+        if ultima is not None and usa_setup_menor(ultima, t, t["Proceso"]):
+            if setup is None or disp < setup[1]:
+                setup = (i, disp)
+    if idx_cand != -1 and setup and setup[1] - reloj > tolerancia:
+        setup = None
+    return idx_cand, futura, setup, bloqueadas
+
+
+def test_colas_indexadas():
+    print("=== Testing Colas Indexadas (PASO 1) ===")
+
+    rng = random.Random(7)
+    t0 = datetime(2026, 3, 2, 7, 0)
+    tolerancia = timedelta(minutes=90)
+    estado = {}
+    indice = IndiceColas(lambda t, maquina: estado[id(t)])
+
+    tareas = [_Tarea(n, rng.choice(["T1", "T2", "T3"]), mp_ok=rng.random() > 0.1) for n in range(60)]
+    for t in tareas:
+        r = rng.random()
+        estado[id(t)] = (False, None) if r < 0.3 else (True, None if r < 0.4 else t0 + timedelta(minutes=30 * rng.randint(0, 40)))
+
+    cola = indice.cola(tareas, "Duyan")
+    assert isinstance(cola, ColaIndexada) and list(cola) == tareas
+
+    reloj = t0
+    externas = []
+    for paso in range(300):
+        ultima = rng.choice(tareas)
+        esperado = _recorrido(cola, estado, reloj, ultima, tolerancia)
+        _, idx, futura, setup, bloqueadas = cola.buscar_candidata(reloj, ultima, tolerancia)
+        assert (idx, futura, setup) == esperado[:3], (paso, (idx, futura, setup), esperado)
+        if idx == -1:
+            assert bloqueadas == esperado[3]
+
+        # Mutaciones del núcleo: agendar (del / popleft), robar (appendleft),
+        # fin de predecesor (reclasificar) y avance del reloj
+        accion = rng.random()
+        if idx != -1 and accion < 0.4:
+            if idx == 0:
+                externas.append(cola.popleft())
+            else:
+                externas.append(cola[idx])
+                del cola[idx]
+        elif externas and accion < 0.55:
+            cola.appendleft(externas.pop(rng.randrange(len(externas))))
+        elif accion < 0.8:
+            bloqueada = [t for t in cola if not estado[id(t)][0]]
+            if bloqueada:
+                t = rng.choice(bloqueada)
+                estado[id(t)] = (True, reloj + timedelta(minutes=30 * rng.randint(-2, 6)))
+                indice.actualizar([t])
+        reloj += timedelta(minutes=15 * rng.randint(0, 3))
+
+    # Con la cola vacía no hay candidatas
+    cola.clear()
+    assert cola.buscar_candidata(reloj, None, tolerancia) == (0, -1, None, None, False)
+
+    # Prioridades: las cuenta para que el núcleo use el recorrido completo
+    t_prio = _Tarea(99, "T9")
+    t_prio.tiene_prioridad = True
+    estado[id(t_prio)] = (True, None)
+    cola.appendleft(t_prio)
+    assert cola.con_prioridad == 1
+    cola.remove(t_prio)
+    assert cola.con_prioridad == 0 and len(cola) == 0
+
+    print("SUCCESS: La cola indexada resuelve el PASO 1 igual que el recorrido.")
+
+
+if __name__ == "__main__":
+    try:
+        test_colas_indexadas()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
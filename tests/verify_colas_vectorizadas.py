@@ -0,0 +1,91 @@
+import sys
+import os
+import random
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.priorities import (
+    orden_troquelada, orden_cortadora_bobina, orden_impresora, _cola_troquelada,
+)
+from modules.schedulers.tasks import TablaTareas
+
+
+def _troquelada_por_grupos(q):
+    """Armado anterior: un sort por grupo y un sort de tuplas de grupo."""
+    q = q.copy()
+    q["_prio_humana"] = pd.concat([pd.to_numeric(q["PrioriTr"], errors="coerce").fillna(9999),
+                                   q["ManualPriority"]], axis=1).min(axis=1)
+    q["_fecha_tro"] = pd.to_datetime(q["FechaTroDdp"], errors="coerce").fillna(pd.Timestamp.max)
+    q["_troq_key"] = q["CodigoTroquel"].fillna("").astype(str).str.strip().str.lower()
+    grupos = []
+    for (troq, prio), g in q.groupby(["_troq_key", "_prio_humana"], dropna=False):
+        g_sorted = g.sort_values(["_prio_humana", "Urgente", "DueDate", "CantidadPliegos"],
+                                 ascending=[True, False, True, False])
+        grupos.append((prio, not g["Urgente"].any(), g["_fecha_tro"].min(), g["DueDate"].min(), troq,
+                       list(g_sorted["OT_id"])))
+    grupos.sort()
+    return [ot for *_, ots in grupos for ot in ots]
+
+
+def _cartera(n, rng):
+    return pd.DataFrame([{
+        "OT_id": f"OT{i}", "Proceso": rng.choice(["Troquelado", "Impresión Offset", "Barnizado"]),
+        "Cliente": rng.choice(["Arcor", "Bagley", " arcor"]), "CodigoTroquel": rng.choice(["T1", "t1 ", "T2", "T3", ""]),
+        "Colores": rng.choice(["C-M-Y-K", "C-M", "Pantone 185", "K-Oro"]),
+        "MateriaPrima": rng.choice(["Cartulina", "Micro"]), "PliAnc": float(rng.choice([60, 70])), "PliLar": 80.0,
+        "Gramaje": rng.choice([230, 350]),
+        "DueDate": pd.Timestamp("2026-03-02") + pd.Timedelta(days=rng.randint(0, 9)),
+        "Urgente": rng.random() < 0.2, "CantidadPliegos": float(rng.choice([500, 1000, 2000])),
+        "ManualPriority": rng.choice([9999] * 8 + [3]),
+        "PrioriTr": rng.choice([None] * 6 + [1, 2, "4"]), "PrioriImp": rng.choice([None] * 6 + [1, 5]),
+        "FechaTroDdp": rng.choice([pd.NaT, pd.Timestamp("2026-03-03")]), "FechaImDdp": pd.NaT,
+        "MateriaPrimaPlanta": rng.choice([False, "No", True]), "_PEN_Pegado": rng.choice(["Si", "No"]),
+    } for i in range(n)])
+
+
+def test_colas_vectorizadas():
+    print("=== Testing Builders de Cola Vectorizados ===")
+
+    rng = random.Random(5)
+    for _ in range(20):
+        q = _cartera(rng.randint(1, 80), rng)
+        # 1. Un solo sort == grupos ordenados por tupla y concatenados
+        assert list(orden_troquelada(q)["OT_id"]) == _troquelada_por_grupos(q)
+        # Los builders no cambian las filas, solo el orden
+        for orden in (orden_troquelada(q), orden_cortadora_bobina(q), orden_impresora(q)):
+            assert sorted(orden["OT_id"]) == sorted(q["OT_id"])
+
+    # 2. Impresión: prioridad unificada primero y cada grupo contiguo en la cola
+    q = _cartera(60, rng)
+    orden = orden_impresora(q)
+    assert orden["_prio_humana"].is_monotonic_increasing
+    claves = list(zip(orden["_tipo_proc"], orden["_cliente_key"], orden["_clave2"], orden["_prio_humana"]))
+    vistos = set()
+    for i, clave in enumerate(claves):
+        if i and clave != claves[i - 1]:
+            assert clave not in vistos, f"grupo partido: {clave}"
+        vistos.add(clave)
+
+    # 3. La tabla carga el DataFrame ordenado igual que los registros
+    tabla_df, tabla_reg = TablaTareas(q.columns), TablaTareas(q.columns)
+    cola_df = tabla_df.cola(orden_troquelada(q), "Troq Nº 2 Ema")
+    cola_reg = tabla_reg.cola(_cola_troquelada(q), "Troq Nº 2 Ema")
+    atributos = ["prio_man", "prio_imp", "prio_tro", "prioritaria", "prio_efectiva", "tiene_prioridad",
+                 "mp_ok", "mp_no", "cantidad", "ancho", "largo", "tiene_sucesor"]
+    assert len(cola_df) == len(cola_reg) == len(q)
+    for a, b in zip(cola_df, cola_reg):
+        assert pd.Series(dict(a.items())).equals(pd.Series(dict(b.items())))
+        assert [getattr(a, x) for x in atributos] == [getattr(b, x) for x in atributos]
+    assert any(t.tiene_sucesor for t in cola_df) and not all(t.mp_ok for t in cola_df)
+
+    print("SUCCESS: Colas en un solo sort, mismo orden que por grupos.")
+
+
+if __name__ == "__main__":
+    try:
+        test_colas_vectorizadas()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,67 @@
+import sys
+import os
+import random
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.schedulers.machines import (
+    validar_medidas_troquel, matriz_compatibilidad_troquel, CompatibilidadTroquel
+)
+
+
+def test_compatibilidad_troquel():
+    print("=== Testing Matriz de Compatibilidad de Troquelado ===")
+
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [
+        {"nombre": "Troq Chica", "proceso": "Troquelado", "velocidad": 1500, "setup_base": 30, "setup_menor": 10,
+         "es_troqueladora": True, "tipo_troquel": "manual", "pli_max_anc": 50, "pli_max_lar": 70},
+        {"nombre": "Troq Grande", "proceso": "Troquelado", "velocidad": 4000, "setup_base": 40, "setup_menor": 15,
+         "es_troqueladora": True, "tipo_troquel": "automatica", "pli_min_anc": 60, "pli_min_lar": 45},
+    ])
+
+    # Galpón 1, Galpón 2 y custom (con límites de la UI)
+    maquinas = ["Duyan", "Troq Nº 2 Ema", "Troq Nº 1 Gus", "Manual 3", "Iberica",
+                "Y-TroqNº2", "Z-TroqNº1", "Iberica G2", "Duyan 2", "Troq Chica", "Troq Grande"]
+
+    rng = random.Random(5)
+    anchos = [rng.choice([0.0, 35.0, 36.0, 40.0, 50.0, 66.0, 80.0, 90.0, float("nan")]) if rng.random() < 0.3
+              else rng.uniform(20, 120) for _ in range(500)]
+    largos = [rng.uniform(20, 120) for _ in range(500)]
+
+    # 1. Cada celda es lo que devuelve validar_medidas_troquel con el mismo cfg
+    matriz = matriz_compatibilidad_troquel(maquinas, anchos, largos, cfg)
+    assert matriz.shape == (500, len(maquinas)) and matriz.dtype == bool
+    for j, m in enumerate(maquinas):
+        esperado = [validar_medidas_troquel(m, a, l, cfg) for a, l in zip(anchos, largos)]
+        assert matriz[:, j].tolist() == esperado, m
+
+    # 2. Límites conocidos (rotación permitida) y custom desde la UI
+    casos = [("Duyan", 38, 45, True), ("Duyan", 35, 45, False),
+             ("Troq Nº 2 Ema", 105, 80, True), ("Troq Nº 1 Gus", 70, 80, False),
+             ("Iberica", 30, 60, False), ("Troq Chica", 70, 50, True), ("Troq Chica", 55, 60, False),
+             ("Troq Grande", 50, 60, True), ("Troq Grande", 40, 90, False), ("Sin Reglas", 500, 500, True)]
+    for m, a, l, ok in casos:
+        assert validar_medidas_troquel(m, a, l, cfg) == ok, (m, a, l)
+        assert bool(matriz_compatibilidad_troquel([m], [a], [l], cfg)[0, 0]) == ok, (m, a, l)
+
+    # 3. Por tarea: una máquina no prevista agrega su columna al consultarse
+    compat = CompatibilidadTroquel(anchos, largos, maquinas[:5], cfg)
+    assert all(compat.admite(i, "Duyan 2") == validar_medidas_troquel("Duyan 2", anchos[i], largos[i], cfg)
+               for i in range(500))
+    assert compat.matriz.shape == (500, 6)
+    assert np.array_equal(compat.matriz[:, :5], matriz[:, :5])
+
+    print("SUCCESS: Matriz de compatibilidad igual a validar_medidas_troquel.")
+
+
+if __name__ == "__main__":
+    try:
+        test_compatibilidad_troquel()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
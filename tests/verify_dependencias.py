@@ -0,0 +1,61 @@
+import sys
+import os
+from datetime import datetime
+from collections import defaultdict
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.dependencias import RastreadorDependencias, reordenar_flujo
+
+
+def test_dependencias():
+    print("=== Testing Rastreador de Dependencias ===")
+
+    flujo = ["Guillotina", "Impresión Offset", "Troquelado", "Descartonado"]
+    pendientes = defaultdict(set, {"A-1": {"Guillotina", "Impresión Offset", "Troquelado", "Descartonado"}})
+    completado = defaultdict(set)
+    fin_proceso = defaultdict(dict)
+    skipped = {("A-1", "guillotina")}
+
+    deps = RastreadorDependencias(flujo, pendientes, skipped, completado, fin_proceso, {})
+
+    imp = {"OT_id": "A-1", "Proceso": "Impresión Offset", "PeliculaArt": True,
+           "FechaLlegadaChapas": pd.Timestamp("2026-03-04")}
+    troq = {"OT_id": "A-1", "Proceso": "Troquelado"}
+    desc_tid = {"OT_id": "A-1", "Proceso": "Descartonado", "ProcesoDpd": "TDI"}
+
+    # 1. Guillotina saltada: la impresión no tiene predecesores (la llegada de chapas no aplica)
+    assert deps.disponibilidad(imp) == (True, None)
+
+    # 2. Troquelado espera a la impresión
+    assert deps.disponibilidad(troq) == (False, None)
+    fin_imp = datetime(2026, 3, 2, 12, 0)
+    fin_proceso["A-1"]["Impresión Offset"] = fin_imp
+    completado["A-1"].add("Impresión Offset")
+    deps.registrar_fin("A-1", "Impresión Offset")
+    assert deps.disponibilidad(troq) == (True, fin_imp)
+
+    # 3. ProcesoDpd "TDI": el descartonado va antes que la impresión, solo espera al troquelado
+    assert reordenar_flujo(["guillotina", "impresion offset", "troquelado", "descartonado"], "TDI") == \
+        ["guillotina", "troquelado", "descartonado", "impresion offset"]
+    assert deps.disponibilidad(desc_tid) == (False, None)
+    fin_troq = datetime(2026, 3, 2, 15, 0)
+    fin_proceso["A-1"]["Troquelado"] = fin_troq
+    completado["A-1"].add("Troquelado")
+    deps.registrar_fin("A-1", "Troquelado")
+    assert deps.disponibilidad(desc_tid) == (True, fin_troq)
+
+    # 4. ForzarInicio ignora todo
+    assert deps.disponibilidad({"OT_id": "A-1", "Proceso": "Descartonado", "ForzarInicio": True}) == (True, None)
+
+    print("SUCCESS: Dependencias resueltas correctamente.")
+
+
+if __name__ == "__main__":
+    try:
+        test_dependencias()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
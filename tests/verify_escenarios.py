@@ -0,0 +1,80 @@
+import sys
+import os
+from datetime import date, datetime, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.escenarios import aplicar_delta, comparar_escenarios
+
+
+def test_escenarios():
+    print("=== Testing Escenarios Qué-pasa-si ===")
+
+    df = pd.DataFrame([{
+        "CodigoProducto": 600 + i, "Subcodigo": 1, "Cliente": "Arcor", "Cliente-articulo": f"Arcor art {i}",
+        "FechaEntrega": pd.Timestamp("2026-03-03"), "CantidadPliegos": 6000, "CantidadProductos": 12000,
+        "Poses": 2, "BocasTroquel": 2, "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina",
+        "CodigoTroquel": f"T{i}", "_PEN_ImpresionOffset": True, "_PEN_Troquelado": True,
+    } for i in range(6)])
+
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [])
+    cfg["horas_extras"] = {"Heidelberg": {date(2026, 3, 7): 2.0}}
+
+    deltas = [
+        {"nombre": "Sábado Heidelberg", "horas_extras": {"Heidelberg": {date(2026, 3, 7): 6.0}}},
+        {"nombre": "Heidelberg parada", "downtimes": [{"maquina": "Heidelberg",
+                                                       "start": datetime(2026, 3, 2, 7, 0),
+                                                       "end": datetime(2026, 3, 3, 17, 0)}]},
+        {"nombre": "Heidelberg lenta", "velocidades": {"Heidelberg": 1000}},
+        {"nombre": "Lenta con extras", "velocidades": {"Heidelberg": 1000},
+         "horas_extras": {"Heidelberg": {date(2026, 3, 5): 4.0}}},
+    ]
+
+    # 1. Los deltas no tocan el cfg base
+    cfg_esc = aplicar_delta(cfg, deltas[0])
+    assert cfg_esc["horas_extras"]["Heidelberg"][date(2026, 3, 7)] == 6.0
+    assert cfg["horas_extras"]["Heidelberg"][date(2026, 3, 7)] == 2.0
+    cfg_esc = aplicar_delta(cfg, deltas[2])
+    # (Heidelberg tiene dos filas: offset y barnizado, como en la UI se cambian ambas)
+    heid = cfg_esc["maquinas"]["Maquina"] == "Heidelberg"
+    assert (cfg_esc["maquinas"].loc[heid, "Capacidad_pliegos_hora"] == 1000).all()
+    assert not (cfg["maquinas"].loc[heid, "Capacidad_pliegos_hora"] == 1000).any()
+
+    # 2. Tabla comparativa: en paralelo igual que en serie
+    kwargs = dict(start=date(2026, 3, 2), start_time=time(7, 0))
+    columnas = list(df.columns)
+    tabla = comparar_escenarios(df, cfg, deltas, max_workers=2, **kwargs)
+    serie = comparar_escenarios(df, cfg, deltas, en_paralelo=False, **kwargs)
+    pd.testing.assert_frame_equal(tabla, serie)
+    assert list(df.columns) == columnas  # programar corre sobre una copia por escenario
+    print(tabla.to_string())
+
+    # 3. Métricas contra el base
+    por_nombre = tabla.set_index("Escenario")
+    assert list(tabla["Escenario"]) == ["Base", "Sábado Heidelberg", "Heidelberg parada",
+                                       "Heidelberg lenta", "Lenta con extras"]
+    assert por_nombre.loc["Base", "HorasExtraConfig"] == 2.0
+    assert por_nombre.loc["Sábado Heidelberg", "HorasExtraConfig"] == 6.0
+    # Horas extra usadas: el plan base termina antes del sábado; el lento sigue
+    # el jueves después de la jornada base, sin pasarse de lo configurado
+    assert por_nombre.loc["Sábado Heidelberg", "HorasExtra"] == 0.0
+    assert 0 < por_nombre.loc["Lenta con extras", "HorasExtra"] <= 4.0
+    assert por_nombre.loc["Lenta con extras", "FinPlan"] <= por_nombre.loc["Heidelberg lenta", "FinPlan"]
+    assert por_nombre.loc["Heidelberg parada", "DifAtraso_h"] > 0
+    assert por_nombre.loc["Heidelberg lenta", "DifAtraso_h"] > 0
+    assert por_nombre.loc["Heidelberg parada", "FinPlan"] > por_nombre.loc["Base", "FinPlan"]
+
+    print("SUCCESS: Escenarios comparados contra el plan base.")
+
+
+if __name__ == "__main__":
+    try:
+        test_escenarios()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
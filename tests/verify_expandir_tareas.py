@@ -0,0 +1,75 @@
+import sys
+import os
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.tasks import _expandir_tareas, _procesos_pendientes_de_orden
+
+
+def test_expandir_tareas():
+    print("=== Testing Expansión Vectorizada de Tareas ===")
+
+    maquinas = pd.DataFrame({
+        "Maquina": ["Heidelberg", "Troq Nº 2 Ema", "Duyan", "Descartonadora 1", "Descartonadora 2", "Encapadora X"],
+        "Proceso": ["Impresión Offset", "Troquelado", "Troquelado", "Descartonado", "Descartonado", "Encapado"],
+        "_IsCustom": [False, False, False, False, False, True],
+    })
+    df = pd.DataFrame({
+        "CodigoProducto": [100, 200, 300, 400],
+        "Subcodigo": [1, 1, 2, 1],
+        "Cliente": ["A", "B", "C", "D"],
+        "FechaEntrega": ["10/03/2026"] * 4,
+        "CantidadProductos": [4000, 3000, 2000, 1000],
+        "CantidadPliegos": [2000, 1500, 1000, 500],
+        "Poses": [2, 1, 1, 1], "BocasTroquel": [2, 1, 1, 1],
+        "PliAnc": [70, 50, 60, 40], "PliLar": [100, 70, 80, 50],
+        "MateriaPrima": ["Cartulina", "Cartulina", "Papel", "Cartulina"],
+        "PeliculaArt": ["No", "Si", "No", "No"],
+        "FechaLlegadaChapas": [None, None, None, None],
+        "_PEN_ImpresionOffset": [True, True, False, "Si"],
+        "_PEN_Troquelado": [True, True, True, True],
+        "_PEN_Descartonado": [True, True, False, False],
+        "_PEN_Encapado": [False, False, True, False],
+        "_TroqAntes": [False, False, False, "Si"],
+        "OpeDes1": [194, None, None, None],
+    })
+    cfg = {
+        "maquinas": maquinas,
+        "manual_overrides": {"manual_priorities": {("300-2", "Troq N° 2 Ema"): 5}},
+    }
+
+    # 1. Formato largo equivalente a la función fila a fila
+    tasks = _expandir_tareas(df, cfg)
+    esperado = [(f"{r['CodigoProducto']}-{r['Subcodigo']}", p)
+                for _, r in df.iterrows() for p in _procesos_pendientes_de_orden(r)]
+    assert list(zip(tasks["OT_id"], tasks["Proceso"])) == esperado
+    print(f"Tareas: {esperado}")
+
+    # 2. Bloqueo por película sin fecha: la OT 200 no tiene tareas
+    assert "200-1" not in set(tasks["OT_id"])
+
+    # 3. _TroqAntes: troquelado antes que la impresión
+    assert list(tasks[tasks["OT_id"] == "400-1"]["Proceso"]) == ["Troquelado", "Impresión Offset"]
+
+    por_clave = tasks.set_index(["OT_id", "Proceso"])
+    # 4. Máquinas: descartonadora del Excel, prioridad manual con alias de "°", custom para encapado
+    assert por_clave.loc[("100-1", "Descartonado"), "Maquina"] == "Descartonadora 2"
+    assert por_clave.loc[("300-2", "Troquelado"), "Maquina"] == "Troq Nº 2 Ema"
+    assert por_clave.loc[("300-2", "Troquelado"), "ManualPriority"] == 5
+    assert por_clave.loc[("300-2", "Encapado"), "Maquina"] == "Encapadora X"
+
+    # 5. Pliegos: impresión usa poses, troquelado usa bocas
+    assert por_clave.loc[("100-1", "Impresión Offset"), "CantidadPliegos"] == 2000.0
+    assert por_clave.loc[("100-1", "Troquelado"), "CantidadPliegos"] == 2000.0
+
+    print("SUCCESS: Expansión por columnas equivalente a la de iterrows.")
+
+
+if __name__ == "__main__":
+    try:
+        test_expandir_tareas()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
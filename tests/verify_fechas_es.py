@@ -0,0 +1,50 @@
+import sys
+import os
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.data_processor import parse_spanish_date, parsear_fechas_es
+
+
+def test_fechas_es():
+    print("=== Testing Parseo Vectorizado de Fechas en Español ===")
+
+    valores = [
+        "12-dic-25", "3-ENE-2026", " 05.mar.26 ", "05/03/2026", "5/3/26", "31/02/26",  # formas con formato fijo
+        "07-07-69", "1/1/80", "12-dic-25 10:30", "2026-03-05", "dic-ene-26",           # van al parser escalar
+        "septiembre", "xx", "", "   ", "nan", None, np.nan, pd.NaT,
+        datetime(2026, 3, 2, 14, 30), pd.Timestamp("2026-03-04"), date(2026, 2, 1), 45000,
+    ]
+    serie = pd.Series(valores * 50, dtype=object)
+
+    # 1. Mismo resultado (valores y dtype) que aplicar parse_spanish_date celda por celda
+    esperado = serie.apply(parse_spanish_date)
+    obtenido = parsear_fechas_es(serie)
+    pd.testing.assert_series_equal(obtenido, esperado)
+
+    # 2. Algunos casos puntuales
+    por_valor = dict(zip(valores[:6], obtenido[:6]))
+    assert por_valor["12-dic-25"] == pd.Timestamp(2025, 12, 12)
+    assert por_valor["3-ENE-2026"] == pd.Timestamp(2026, 1, 3)
+    assert por_valor[" 05.mar.26 "] == pd.Timestamp(2026, 3, 5)
+    assert por_valor["5/3/26"] == pd.Timestamp(2026, 3, 5)
+    assert pd.isna(por_valor["31/02/26"])
+
+    # 3. Columnas ya en datetime pasan sin cambios; la segunda pasada usa la caché
+    fechas = pd.Series(pd.to_datetime(["2026-03-02", None]))
+    pd.testing.assert_series_equal(parsear_fechas_es(fechas), fechas)
+    pd.testing.assert_series_equal(parsear_fechas_es(serie), esperado)
+
+    print("SUCCESS: Fechas en español parseadas igual que parse_spanish_date.")
+
+
+if __name__ == "__main__":
+    try:
+        test_fechas_es()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
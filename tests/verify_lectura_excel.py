@@ -0,0 +1,123 @@
+import sys
+import os
+import io
+import re
+from datetime import datetime
+import pandas as pd
+from openpyxl import Workbook
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import modules.utils.data_processor as data_processor
+from modules.utils.data_processor import COLUMNAS_EXCEL, leer_excel_ordenes, process_uploaded_dataframe
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _excel(filas):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ORDEN", "Ped.", " CLIENTE", "CANT/DDP", "FECH/ENT.", "Mat/Prim1", "FechaChaDpv", "FechaTroDpv",
+               "ImpresionSNDpd", "TroqueladoSNDpd", "Color1", "Color2", "Notas", "Vendedor", "PrioriImp"])
+    for fila in filas:
+        ws.append(fila)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_lectura_excel():
+    print("=== Testing Lectura de Excel en Streaming ===")
+
+    datos = _excel([
+        [101, 1, "Arcor", 3000, datetime(2026, 3, 10), "Cartulina", "12-dic-25", datetime(2026, 3, 5),
+         True, "Verdadero", "Cyan", None, "urgente", "Juan", 1],
+        [102, 2, "Bagley", 2500.0, datetime(2026, 3, 11), "Micro", None, "05/03/2026",
+         False, None, "Negro", "Pantone 300", None, "Ana", None],
+        [103, 1, None, 1200.5, None, "#N/A", "3-ene-26", None,
+         None, True, None, None, "x", None, "NA"],
+        [None] * 15,
+    ])
+
+    # 1. Solo se leen las columnas que se usan
+    df = leer_excel_ordenes(datos)
+    assert "Notas" not in df.columns and "Vendedor" not in df.columns
+    assert {"ORDEN", "CLIENTE", "Color1", "Color2", "PrioriImp"} <= set(df.columns)
+
+    # 2. Mismo resultado que pd.read_excel + process_uploaded_dataframe sobre esas columnas
+    ref = pd.read_excel(io.BytesIO(datos))
+    ref.columns = ref.columns.astype(str).str.strip()
+    ref = ref[[c for c in ref.columns if c in COLUMNAS_EXCEL or c.startswith("Color")]]
+    esperado = process_uploaded_dataframe(ref.copy())
+    obtenido = process_uploaded_dataframe(df.copy())
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+    # 3. Fechas en español ya parseadas al leer; flags y orden de filas intactos
+    assert df.loc[0, "FechaChaDpv"] == pd.Timestamp(2025, 12, 12)
+    assert df.loc[2, "FechaChaDpv"] == pd.Timestamp(2026, 1, 3)
+    assert list(obtenido["OT_id"]) == ["101-1", "102-2", "103-1"]
+    assert list(obtenido["_PEN_Troquelado"]) == [True, False, True]
+
+    # 4. Métricas de lectura
+    lectura = df.attrs["lectura"]
+    print(lectura)
+    assert lectura["filas"] == 3 and lectura["columnas_hoja"] == 15
+    assert lectura["columnas"] == len(df.columns)
+
+    # 5. columnas=None lee la hoja completa
+    completo = leer_excel_ordenes(datos, columnas=None)
+    assert len(completo.columns) == 15
+
+    # 6. Sin el parser interno de openpyxl: pd.read_excel con la misma proyección
+    parser = data_processor.WorkSheetParser
+    data_processor.WorkSheetParser = None
+    try:
+        respaldo = leer_excel_ordenes(datos)
+    finally:
+        data_processor.WorkSheetParser = parser
+    assert respaldo.attrs["lectura"]["columnas_hoja"] == 15
+    pd.testing.assert_frame_equal(process_uploaded_dataframe(respaldo.copy()), esperado)
+
+    print("SUCCESS: Excel leído en streaming con proyección de columnas.")
+
+
+def _columnas_de_orden():
+    """Columnas de la orden que leen tasks.py (col_orden) y los builders de priorities.py (q.get / q[...])."""
+    with open(os.path.join(RAIZ, "modules", "schedulers", "tasks.py"), encoding="utf-8") as f:
+        nombres = set(re.findall(r'col_orden\("([^"]+)"', f.read()))
+    with open(os.path.join(RAIZ, "modules", "schedulers", "priorities.py"), encoding="utf-8") as f:
+        nombres |= set(re.findall(r'q(?:\.get\(|\[)"([^"_][^"]*)"', f.read()))
+    # Las arma la expansión de tareas, no vienen del Excel
+    return nombres - {"DueDate", "Proceso", "ManualPriority", "Gramaje", "Maquina"}
+
+
+def test_proyeccion_cubre_columnas_usadas():
+    print("=== Testing Proyección del Excel vs columnas usadas por el scheduler ===")
+
+    usadas = _columnas_de_orden()
+    assert "Grs./Nº" in usadas
+    # Las derivadas (Colores, _PEN_*) las arma process_uploaded_dataframe desde sus fuentes
+    encabezado = sorted(c for c in usadas if c != "Colores" and not c.startswith("_PEN_")) + ["Color1"]
+    wb = Workbook()
+    ws = wb.active
+    ws.append(encabezado)
+    ws.append([1] * len(encabezado))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    df = process_uploaded_dataframe(leer_excel_ordenes(buffer.getvalue()))
+    faltan = sorted(usadas - set(df.columns))
+    print(f"Columnas usadas: {len(usadas)}, faltan: {faltan}")
+    assert not faltan
+
+    print("SUCCESS: Todas las columnas que lee el scheduler sobreviven a la proyección.")
+
+
+if __name__ == "__main__":
+    try:
+        test_lectura_excel()
+        test_proyeccion_cubre_columnas_usadas()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,53 @@
+import sys
+import os
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.eventos import MotorEventos
+
+
+def test_motor_eventos():
+    print("=== Testing Motor de Eventos ===")
+
+    reloj = {"A": datetime(2026, 3, 2, 7), "B": datetime(2026, 3, 2, 9), "C": datetime(2026, 3, 2, 8)}
+    clave = lambda m: (reloj[m], 0, m)
+    motor = MotorEventos(list(reloj), clave)
+
+    # 1. Primera pasada: todas las máquinas en orden de reloj
+    orden = list(iter(motor.siguiente, None))
+    print(f"Pasada 1: {orden}")
+    assert orden == ["A", "C", "B"]
+
+    # 2. Sin cambios, nadie se reintenta (todas dormidas)
+    motor.nueva_pasada()
+    assert motor.siguiente() is None
+
+    # 3. A avanza su reloj -> se reintenta en la próxima pasada con su nueva clave
+    reloj["A"] = datetime(2026, 3, 2, 10)
+    motor.activar("A")
+    motor.nueva_pasada()
+    assert motor.siguiente() == "A"
+
+    # 4. Despertar durante la pasada: C (08:00) ya quedó atrás respecto de A (10:00),
+    #    así que entra en la pasada siguiente y no en la actual.
+    motor.despertar("C")
+    assert motor.siguiente() is None
+    motor.nueva_pasada()
+    assert motor.siguiente() == "C"
+
+    # 5. Despertar de una máquina que todavía no le tocaba: entra en la pasada actual
+    motor.despertar("B")
+    assert motor.siguiente() == "B"
+    assert motor.siguiente() is None
+
+    print("SUCCESS: Orden de pasadas y máquinas dormidas correctos.")
+
+
+if __name__ == "__main__":
+    try:
+        test_motor_eventos()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
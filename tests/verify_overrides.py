@@ -0,0 +1,58 @@
+import sys
+import os
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.overrides import aplicar_overrides, aplicar_bloqueos
+
+
+def test_overrides():
+    print("=== Testing Overrides por (OT, Proceso) ===")
+
+    tasks = pd.DataFrame({
+        "OT_id": ["100-1", "100-1", "200-1", "300-1"],
+        "Proceso": ["Impresión Offset", "Troquelado", "Troquelado", "Troquelado"],
+        "Maquina": ["Heidelberg", "Duyan", "Duyan", "TERCERIZADO"],
+        "Urgente": [False, False, False, False],
+        "MateriaPrimaPlanta": [False, False, True, True],
+        "FechaLlegadaChapas": pd.to_datetime([None, None, None, None]),
+    }, index=[10, 11, 12, 13])
+
+    overrides = {
+        "urgency_overrides": {("100-1", "Troquelado"): True, ("999-1", "Troquelado"): True},
+        "forzar_inicio_overrides": {("200-1", "Troquelado"): True},
+        "mp_overrides": {("100-1", "Impresión Offset"): True, ("200-1", "Troquelado"): False},
+        "fecha_chapas_overrides": {("100-1", "Impresión Offset"): pd.Timestamp("2026-03-05")},
+    }
+
+    # 1. Cada familia pisa solo la tarea de su clave; claves inexistentes se ignoran
+    aplicar_overrides(tasks, overrides)
+    assert list(tasks["Urgente"]) == [False, True, False, False]
+    assert list(tasks["ForzarInicio"]) == [False, False, True, False]
+    assert list(tasks["MateriaPrimaPlanta"]) == [True, False, False, True]
+    assert tasks.loc[10, "FechaLlegadaChapas"] == pd.Timestamp("2026-03-05")
+    assert tasks["FechaLlegadaChapas"].isna().sum() == 3
+
+    # 2. Locks: máquina vigente se aplica y marca ManualAssignment
+    #    (máquina fuera de config o tarea tercerizada no se tocan)
+    locks = {
+        ("100-1", "Troquelado"): "Troq Nº 2 Ema",
+        ("200-1", "Troquelado"): "Máquina Vieja",
+        ("300-1", "Troquelado"): "Duyan",
+    }
+    aplicar_bloqueos(tasks, locks, ["Heidelberg", "Duyan", "Troq Nº 2 Ema"])
+    assert list(tasks["Maquina"]) == ["Heidelberg", "Troq Nº 2 Ema", "Duyan", "TERCERIZADO"]
+    assert list(tasks["ManualAssignment"]) == [False, True, False, False]
+    print(tasks[["OT_id", "Proceso", "Maquina", "Urgente", "ManualAssignment"]])
+
+    print("SUCCESS: Overrides aplicados en una pasada por familia.")
+
+
+if __name__ == "__main__":
+    try:
+        test_overrides()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
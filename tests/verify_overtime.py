@@ -8,7 +8,7 @@ from datetime import datetime, time, date, timedelta
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from modules.schedulers.agenda import _reservar_en_agenda
-from modules.utils.config_loader import get_horas_totales_dia, es_dia_habil
+from modules.utils.config_loader import get_horas_totales_dia, es_dia_habil, obtener_calendario
 
 
 def log(msg):
@@ -30,13 +30,13 @@ def test_overtime_logic():
         "jornada": pd.DataFrame({"Parametro": ["Horas_base_por_dia"], "Valor": [8.5]}),
         "feriados": set(),
         "horas_extras": {
-            sabado: 4.0 
+            "Maquina Test": {sabado: 4.0}
         },
         "downtimes": []
     }
     
     log(f"Es hábil Viernes? {es_dia_habil(viernes, cfg)}")
-    log(f"Es hábil Sábado (con extras)? {es_dia_habil(sabado, cfg)}")
+    log(f"Es hábil Sábado (con extras)? {es_dia_habil(sabado, cfg, maquina='Maquina Test')}")
     log(f"Es hábil Domingo? {es_dia_habil(domingo, cfg)}")
     
     agenda_m = {
@@ -73,6 +73,12 @@ def test_overtime_logic():
         log(f"Duracion Lunes: {dur_lun}")
         assert abs(dur_lun - 4.0) < 0.1
         
+        # Formato plano {fecha: horas} (sin máquina): no rompe el calendario y no aplica a ninguna máquina
+        cfg_plano = dict(cfg, horas_extras={sabado: 4.0})
+        obtener_calendario(cfg_plano)
+        assert not es_dia_habil(sabado, cfg_plano, maquina="Maquina Test")
+        assert get_horas_totales_dia(sabado, cfg_plano, maquina="Maquina Test") == 0.0
+
         log("\n¡Test Pasado Exitosamente!")
     except AssertionError as e:
         log(f"FALLO ASSERTION: {e}")
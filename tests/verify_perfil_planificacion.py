@@ -0,0 +1,73 @@
+import sys
+import os
+import pickle
+from datetime import date, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.scheduler import programar
+from modules.schedulers.perfil import PerfilPlanificacion, tabla_etapas, tabla_maquinas
+
+
+def test_perfil_planificacion():
+    print("=== Testing Informe de Rendimiento de programar ===")
+
+    df = pd.DataFrame([{
+        "CodigoProducto": 800 + i, "Subcodigo": 1, "Cliente": "Arcor", "Cliente-articulo": f"Arcor art {i}",
+        "FechaEntrega": pd.Timestamp("2026-03-10"), "CantidadPliegos": 3000, "CantidadProductos": 6000,
+        "Poses": 2, "BocasTroquel": 2, "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina",
+        "CodigoTroquel": f"T{i % 2}", "_PEN_ImpresionOffset": True, "_PEN_Troquelado": True,
+        "_PEN_Descartonado": i % 2 == 0,
+    } for i in range(8)])
+
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [])
+
+    schedule = programar(df, cfg, start=date(2026, 3, 2), start_time=time(7, 0))[0]
+    reporte = schedule.attrs["rendimiento"]
+
+    # 1. Etapas en orden de ejecución, sumando (casi) el total
+    etapas = list(reporte["etapas"])
+    for etapa in ["1. Expansión de tareas", "3. Reasignación troquelado", "4. Armado de colas", "5. Núcleo", "6. Salidas"]:
+        assert etapa in etapas, etapa
+    assert etapas.index("4. Armado de colas") < etapas.index("5. Núcleo") < etapas.index("6. Salidas")
+    assert sum(reporte["etapas"].values()) <= reporte["total_s"] + 1e-3
+
+    # 2. Contadores por máquina coherentes con el plan
+    maquinas = reporte["maquinas"]
+    por_maquina = schedule["Maquina"].value_counts()
+    for maquina, n in por_maquina.items():
+        assert maquinas[maquina]["agendadas"] == n, maquina
+        assert maquinas[maquina]["intentos"] >= n
+    assert sum(m["disponibilidad"] for m in maquinas.values()) > 0
+    # Cada fila salió del PASO 1 (candidata) o de un robo del PASO 2
+    assert sum(m["candidatas"] + m["robos"] for m in maquinas.values()) >= len(schedule)
+
+    # 3. Serializable (caché en disco, procesos de planificar_galpones) y tablas para la UI
+    assert pickle.loads(pickle.dumps(schedule)).attrs["rendimiento"] == reporte
+    print(tabla_etapas(reporte).to_string(index=False))
+    print(tabla_maquinas(reporte).head().to_string(index=False))
+
+    # 4. Cronómetro por vueltas y por bloque
+    perfil = PerfilPlanificacion()
+    perfil.marcar("a")
+    with perfil.etapa("b"):
+        pass
+    perfil.marcar("a")
+    perfil.contadores["M"]["robos"] += 2
+    rep = perfil.reporte()
+    assert list(rep["etapas"]) == ["b", "a"] and rep["maquinas"]["M"]["robos"] == 2
+
+    print("SUCCESS: Informe de rendimiento por etapa y por máquina.")
+
+
+if __name__ == "__main__":
+    try:
+        test_perfil_planificacion()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,101 @@
+import sys
+import os
+import io
+import tempfile
+from datetime import date, datetime, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.planificacion_batch import Cronometro, armar_cfg_g1, armar_cfg_g2, escribir_exports, overrides_vacios
+from modules.planificacion_galpones import PLANIFICADORES, planificar_galpones
+
+
+class _BaseFalsa:
+    """Lo mínimo de PersistenceManager que usa armar_cfg_g1."""
+    connected = True
+
+    def get_locked_assignments(self):
+        return {}
+
+    def load_manual_overrides(self):
+        overrides = overrides_vacios()
+        overrides["blacklist_ots"] = {"705-1"}
+        return overrides
+
+    def load_die_preferences(self):
+        return {}
+
+    def load_holidays(self):
+        return [date(2026, 3, 3)]
+
+    def load_downtimes(self):
+        return []
+
+    def load_overtime(self):
+        return {"Troqueladora Manual 1": {date(2026, 3, 2): 2, date(2026, 3, 4): 0}}
+
+    def load_pending_processes(self):
+        return []
+
+    def load_custom_machines(self):
+        return []
+
+
+def test_planificacion_batch():
+    print("=== Testing Planificación por Lotes (sin Streamlit) ===")
+
+    df = pd.DataFrame([{
+        "CodigoProducto": 700 + i, "Subcodigo": 1, "Cliente": "Arcor", "Cliente-articulo": f"Arcor art {i}",
+        "FechaEntrega": pd.Timestamp("2026-03-10"), "CantidadPliegos": 4000, "CantidadProductos": 8000,
+        "Poses": 2, "BocasTroquel": 2, "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina",
+        "CodigoTroquel": f"T{i}", "_PEN_ImpresionOffset": True, "_PEN_Troquelado": True,
+    } for i in range(6)])
+
+    # 1. Sin base: valores por defecto de la app
+    cfg = armar_cfg_g1()
+    assert cfg["manual_overrides"] == overrides_vacios()
+    assert len(cfg["maquinas"]) > 0 and "_maquinas_base" in cfg
+
+    # 2. Con base: se aplica lo persistido, como con "Usar historial"
+    cfg_hist = armar_cfg_g1(pm=_BaseFalsa())
+    assert cfg_hist["manual_overrides"]["blacklist_ots"] == {"705-1"}
+    assert date(2026, 3, 3) in cfg_hist["feriados"]
+    assert cfg_hist["horas_extras"] == {"Troqueladora Manual 1": {date(2026, 3, 2): 2}}
+
+    cfg_g2 = armar_cfg_g2(cfg_g1=cfg_hist)
+    assert cfg_g2["feriados"] == cfg_hist["feriados"]
+
+    # 3. Planificación de ambos galpones y exports a disco, con tiempos por etapa
+    salida = io.StringIO()
+    crono = Cronometro(salida=salida)
+    with crono.etapa("Planificación"):
+        plantas = {"G1": (PLANIFICADORES["G1"], cfg_hist), "G2": (PLANIFICADORES["G2"], cfg_g2)}
+        resultados = planificar_galpones(df, plantas, start=date(2026, 3, 2), start_time=time(7, 0), en_paralelo=False)
+
+    schedule = resultados["G1"][0]
+    assert not schedule.empty
+    assert "705-1" not in set(schedule["OT_id"])
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        with crono.etapa("Exportación"):
+            archivos = escribir_exports(resultados["G1"], carpeta)
+        nombres = sorted(p.name for p in archivos)
+        assert nombres == ["Plan_Produccion_Por_OT.csv", "Plan_Produccion_Por_OT.xls",
+                           "Plan_Produccion_Theiler.csv", "Plan_Produccion_Theiler.xlsx"]
+        assert all(p.stat().st_size > 0 for p in archivos)
+
+    tiempos = crono.resumen()
+    assert set(tiempos) == {"Planificación", "Exportación", "total"}
+    print(salida.getvalue().strip())
+
+    print("SUCCESS: Plan generado y exportado sin la interfaz.")
+
+
+if __name__ == "__main__":
+    try:
+        test_planificacion_batch()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,73 @@
+import sys
+import os
+from datetime import date, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.galpon2.config_g2 import cargar_config_galpon2
+from modules.planificacion_galpones import PLANIFICADORES, planificar_galpones, combinar_planes
+
+
+def test_planificacion_galpones():
+    print("=== Testing Planificación G1 + G2 en paralelo ===")
+
+    filas = []
+    for i, cliente in enumerate(["Arcor", "Bagley", "Cartonaje Sur", "Cartonaje Norte"]):
+        cartonaje = "Cartonaje" in cliente
+        filas.append({
+            "CodigoProducto": 500 + i, "Subcodigo": 1, "Cliente": cliente,
+            "Cliente-articulo": f"{cliente} art", "FechaEntrega": pd.Timestamp("2026-03-13"),
+            "CantidadPliegos": 2000, "CantidadProductos": 4000, "Poses": 2, "BocasTroquel": 2,
+            "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina", "CodigoTroquel": f"T{i}",
+            "_PEN_Guillotina": cartonaje, "_PEN_ImpresionOffset": not cartonaje,
+            "_PEN_Troquelado": True, "_PEN_Prensado": cartonaje,
+            "TienePrensado": "CARTONAJE - BANDEJA Nº1" if cartonaje else "",
+        })
+    df = pd.DataFrame(filas)
+
+    cfg_g1 = cargar_config()
+    cfg_g1["_maquinas_base"] = cfg_g1["maquinas"].copy()
+    apply_custom_machines(cfg_g1, [])
+    plantas = {
+        "G1": (PLANIFICADORES["G1"], cfg_g1),
+        "G2": (PLANIFICADORES["G2"], cargar_config_galpon2()),
+    }
+    kwargs = dict(start=date(2026, 3, 2), start_time=time(7, 0))
+
+    # 1. En paralelo da lo mismo que en serie
+    paralelo = planificar_galpones(df, plantas, max_workers=2, **kwargs)
+    serie = planificar_galpones(df, plantas, en_paralelo=False, **kwargs)
+    for nombre in plantas:
+        for a, b in zip(paralelo[nombre], serie[nombre]):
+            pd.testing.assert_frame_equal(a, b)
+
+    # 2. Cada galpón planifica sus clientes; el cfg del llamador no se toca
+    assert set(paralelo["G1"][0]["OT_id"]) == {"500-1", "501-1"}
+    assert set(paralelo["G2"][0]["OT_id"]) == {"502-1", "503-1"}
+    assert "_calendario" not in cfg_g1 and "locked_assignments" not in plantas["G2"][1]
+
+    # 3. Resumen combinado con el galpón de cada OT
+    schedule, carga_md, resumen_ot, detalle_maquina = combinar_planes(paralelo)
+    print(resumen_ot[["OT_id", "Fin_OT", "Galpones", "CruzaGalpones"]])
+    assert set(schedule["Galpon"]) == {"G1", "G2"}
+    assert dict(zip(resumen_ot["OT_id"], resumen_ot["Galpones"]))["502-1"] == "G2"
+    assert not resumen_ot["CruzaGalpones"].any()
+
+    # 4. Una OT con tareas en ambos galpones queda marcada
+    cruzado = {"G1": paralelo["G1"], "G2": tuple(r.replace({"502-1": "500-1"}) for r in paralelo["G2"])}
+    resumen_cruzado = combinar_planes(cruzado)[2].set_index("OT_id")
+    assert resumen_cruzado.loc["500-1", "CruzaGalpones"]
+    assert resumen_cruzado.loc["500-1", "Galpones"] == "G1, G2"
+
+    print("SUCCESS: Galpones planificados en paralelo y combinados.")
+
+
+if __name__ == "__main__":
+    try:
+        test_planificacion_galpones()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,113 @@
+import sys
+import os
+from datetime import date, datetime, time
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.config_loader import cargar_config, apply_custom_machines
+from modules.scheduler import programar
+from modules.planificacion_incremental import PlanificadorIncremental
+from modules.utils.cache_planes import CachePlanes, clave_plan
+
+
+def _sin_solapes(schedule):
+    for maq, g in schedule.groupby("Maquina"):
+        if maq in ("TERCERIZADO", "SALTADO", "POOL_DESCARTONADO"):
+            continue
+        g = g.sort_values("Inicio")
+        assert (g["Inicio"].iloc[1:].values >= g["Fin"].iloc[:-1].values).all(), f"Solape en {maq}"
+
+
+def test_planificacion_incremental():
+    print("=== Testing Re-planificación Incremental ===")
+
+    df = pd.DataFrame([{
+        "CodigoProducto": 700 + i, "Subcodigo": 1, "Cliente": "Arcor", "Cliente-articulo": f"Arcor art {i}",
+        "FechaEntrega": pd.Timestamp("2026-03-10"), "CantidadPliegos": 4000, "CantidadProductos": 8000,
+        "Poses": 2, "BocasTroquel": 2, "PliAnc": 60, "PliLar": 80, "MateriaPrima": "Cartulina",
+        "CodigoTroquel": f"T{i}", "_PEN_ImpresionOffset": True, "_PEN_Troquelado": True,
+    } for i in range(6)])
+
+    cfg = cargar_config()
+    cfg["_maquinas_base"] = cfg["maquinas"].copy()
+    apply_custom_machines(cfg, [])
+    kwargs = dict(start=date(2026, 3, 2), start_time=time(7, 0))
+
+    planificador = PlanificadorIncremental(df, **kwargs)
+    base = planificador.planificar(cfg)[0]
+    assert planificador.ultimo_modo == "completo"
+
+    # 1. Sin cambios no se vuelve a planificar
+    assert planificador.replanificar(cfg)[0] is base
+    assert planificador.ultimo_modo == "sin_cambios"
+
+    # 2. Un paro en una máquina libera solo lo que corre desde el paro en adelante
+    impresora = base.loc[base["Proceso"].str.contains("Impresi"), "Maquina"].iloc[0]
+    tareas = base[base["Maquina"] == impresora].sort_values("Inicio")
+    inicio_paro = tareas["Fin"].iloc[0].to_pydatetime()
+    cfg["downtimes"] = [{"maquina": impresora, "start": inicio_paro, "end": inicio_paro.replace(hour=17)}]
+
+    nuevo = planificador.replanificar(cfg)[0]
+    assert planificador.ultimo_modo == "incremental"
+    assert 0 < planificador.liberadas < len(base)
+    _sin_solapes(nuevo)
+
+    # Lo que terminaba antes del paro queda exactamente igual
+    antes = base[(base["Maquina"] == impresora) & (base["Fin"] <= inicio_paro)]
+    congeladas = nuevo.merge(antes[["OT_id", "Proceso", "Inicio", "Fin"]], on=["OT_id", "Proceso", "Inicio", "Fin"])
+    assert len(congeladas) == len(antes)
+
+    # Nada corre en la impresora durante el paro
+    en_paro = nuevo[(nuevo["Maquina"] == impresora) & (nuevo["Inicio"] < inicio_paro.replace(hour=17)) & (nuevo["Fin"] > inicio_paro)]
+    assert en_paro.empty
+
+    # Mismas tareas que una planificación completa
+    completo = programar(df.copy(), cfg, **kwargs)[0]
+    assert sorted(zip(nuevo["OT_id"], nuevo["Proceso"])) == sorted(zip(completo["OT_id"], completo["Proceso"]))
+    print(f"Liberadas {planificador.liberadas} de {len(base)} tareas")
+
+    # 3. Un cambio que no se puede acotar planifica todo
+    cfg["ignore_constraints"] = not cfg.get("ignore_constraints", False)
+    planificador.replanificar(cfg)
+    assert planificador.ultimo_modo == "completo"
+
+    # 4. Las órdenes del llamador no se modifican (programar recibe copias)
+    assert "OT_id" not in df.columns
+
+    # 5. Como en app.py: detrás de CachePlanes, el planificador solo corre si las entradas
+    # son nuevas y solo se guardan los planes completos
+    cache = CachePlanes(max_entradas=4)
+    planificador = PlanificadorIncremental(df, **kwargs)
+    replanificar = lambda _df, cfg_run, **_: planificador.replanificar(cfg_run)
+    en_cache = dict(planificador=replanificar, guardar_si=lambda: planificador.plan_completo)
+    cache.planificar(df, cfg, kwargs["start"], kwargs["start_time"], **en_cache)
+    assert planificador.ultimo_modo == "completo" and len(cache) == 1
+    cfg["downtimes"] = []
+    cache.planificar(df, cfg, kwargs["start"], kwargs["start_time"], **en_cache)
+    assert planificador.ultimo_modo == "incremental" and cache.fallos == 2
+    # El plan incremental no queda guardado: otra sesión con las mismas entradas no lo recibe
+    assert len(cache) == 1 and clave_plan(df, cfg, kwargs["start"], kwargs["start_time"]) not in cache
+    cache.planificar(df, cfg, kwargs["start"], kwargs["start_time"], **en_cache)
+    assert planificador.ultimo_modo == "sin_cambios" and len(cache) == 1
+    # Forzar el plan completo (botón de la app) lo guarda
+    forzar = lambda _df, cfg_run, **_: planificador.planificar(cfg_run)
+    cache.planificar(df, cfg, kwargs["start"], kwargs["start_time"], planificador=forzar,
+                     guardar_si=lambda: planificador.plan_completo)
+    assert planificador.ultimo_modo == "completo" and len(cache) == 2
+    # Volver a entradas ya vistas sale de la caché sin llamar al planificador
+    planificador.ultimo_modo = None
+    cfg["downtimes"] = [{"maquina": impresora, "start": inicio_paro, "end": inicio_paro.replace(hour=17)}]
+    cache.planificar(df, cfg, kwargs["start"], kwargs["start_time"], **en_cache)
+    assert cache.aciertos == 1 and planificador.ultimo_modo is None
+
+    print("SUCCESS: Re-planificación incremental sobre el plan congelado.")
+
+
+if __name__ == "__main__":
+    try:
+        test_planificacion_incremental()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
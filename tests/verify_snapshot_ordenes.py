@@ -0,0 +1,68 @@
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.utils.snapshot_ordenes import SnapshotOrdenes, clave_archivo
+
+
+def test_snapshot_ordenes():
+    print("=== Testing Snapshot de Órdenes Procesadas ===")
+
+    df = pd.DataFrame({
+        "OT_id": ["101-1", "102-1", "103-2"],
+        "Cliente": ["Arcor", "Bagley", None],
+        "CantidadPliegos": [3000, 2500, 1200],
+        "FechaLlegadaChapas": pd.to_datetime(["2026-03-02", None, "2026-03-05"]),
+        "_PEN_Troquelado": [True, False, True],
+        "CodigoTroquel": ["T1", 55, None],  # object con tipos mezclados
+    })
+    procesados = []
+
+    def procesar(file_bytes):
+        procesados.append(file_bytes)
+        return df.copy()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        snapshots = SnapshotOrdenes(carpeta, max_snapshots=2)
+        archivo = b"excel de prueba"
+
+        # 1. Primera carga procesa y guarda; la segunda (otra instancia = reinicio) lee el snapshot
+        primero = snapshots.cargar_o_procesar(archivo, procesar)
+        segundo = SnapshotOrdenes(carpeta).cargar_o_procesar(archivo, procesar)
+        assert len(procesados) == 1
+        pd.testing.assert_frame_equal(segundo, primero)
+        print(segundo.attrs["snapshot"])
+
+        # 2. Otro contenido es otra clave
+        assert clave_archivo(archivo) in snapshots
+        assert clave_archivo(b"otro excel") != clave_archivo(archivo)
+
+        # 3. Se conservan solo los últimos max_snapshots
+        snapshots.cargar_o_procesar(b"excel 2", procesar)
+        snapshots.cargar_o_procesar(b"excel 3", procesar)
+        assert clave_archivo(archivo) not in snapshots
+        assert len(procesados) == 3
+
+        # 4. Un snapshot dañado se descarta y se vuelve a procesar
+        clave = clave_archivo(b"excel 3")
+        for ruta in os.listdir(carpeta):
+            if ruta.startswith(clave):
+                with open(os.path.join(carpeta, ruta), "wb") as f:
+                    f.write(b"basura")
+        assert snapshots.leer(clave) is None
+        snapshots.cargar_o_procesar(b"excel 3", procesar)
+        assert len(procesados) == 4
+
+    print("SUCCESS: Órdenes procesadas reutilizadas desde el snapshot.")
+
+
+if __name__ == "__main__":
+    try:
+        test_snapshot_ordenes()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
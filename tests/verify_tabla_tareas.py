@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.tasks import TablaTareas
+
+
+def test_tabla_tareas():
+    print("=== Testing Tabla de Tareas ===")
+
+    registros = [
+        {"OT_id": "A-1", "Proceso": "Descartonado", "ManualPriority": 9999, "PrioriImp": "", "PrioriDesc": 2.0,
+         "MateriaPrimaPlanta": None, "CantidadPliegos": 3000.0, "PliAnc": 70, "PliLar": None,
+         "_PEN_Pegado": "Si", "_aux_builder": 1},
+        {"OT_id": "B-1", "Proceso": "Troquelado", "ManualPriority": 3, "PrioriImp": float("nan"), "PrioriDesc": None,
+         "MateriaPrimaPlanta": "No", "CantidadPliegos": 1500.0, "PliAnc": 50, "PliLar": 60,
+         "_PEN_Pegado": "No"},
+    ]
+    columnas = ["OT_id", "Proceso", "ManualPriority", "PrioriImp", "PrioriDesc", "MateriaPrimaPlanta",
+                "CantidadPliegos", "PliAnc", "PliLar", "_PEN_Pegado"]
+    tabla = TablaTareas(columnas)
+    cola = tabla.cola(registros)
+    a, b = cola
+
+    # 1. Acceso tipo dict: columnas de tasks sí, auxiliares del builder no
+    assert a["OT_id"] == "A-1" and a.get("Proceso") == "Descartonado"
+    assert a.get("_aux_builder") is None and "_aux_builder" not in a
+    assert a.get("NoExiste", 9999) == 9999
+
+    # 2. Prioridades ya convertidas (vacío/NaN -> 9999)
+    assert a.prio_imp == 9999 and a.prio_desc == 2.0 and a.prio_man == 9999
+    assert b.prio_imp == 9999 and b.prio_desc == 9999 and b.prio_man == 3
+
+    # 3. Materia prima y medidas
+    assert a.mp_ok and not a.mp_no
+    assert b.mp_ok and b.mp_no
+    assert a.cantidad == 3000.0 and a.ancho == 70.0 and a.largo == 0.0
+
+    # 4. Sucesores después del descartonado
+    assert a.tiene_sucesor and not b.tiene_sucesor
+
+    # 5. Escritura (robo: cambia la máquina) y prioridad efectiva según la máquina
+    b.asignar_maquina("Duyan")
+    assert b["Maquina"] == "Duyan" and a.get("Maquina") is None
+    assert b.prio_efectiva == 3 and b.tiene_prioridad
+
+    cola_desc = TablaTareas(columnas).cola(registros[:1], "Descartonadora 1")
+    assert cola_desc[0].prio_efectiva == 2.0 and cola_desc[0].tiene_prioridad
+    cola_peg = TablaTareas(columnas).cola(registros[:1], "Pegadora")
+    assert cola_peg[0].prio_efectiva == 9999 and not cola_peg[0].tiene_prioridad
+
+    print("SUCCESS: Registros compactos equivalentes a los dicts.")
+
+
+if __name__ == "__main__":
+    try:
+        test_tabla_tareas()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
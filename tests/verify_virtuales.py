@@ -0,0 +1,73 @@
+import sys
+import os
+from collections import deque
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.virtuales import ResolutorVirtuales, duracion_virtual_h
+
+
+def test_virtuales():
+    print("=== Testing Resolutor de Máquinas Virtuales ===")
+
+    inicio = datetime(2026, 3, 2, 7, 0)
+    imp = {"OT_id": "A", "Proceso": "Impresión Offset"}
+    troq = {"OT_id": "A", "Proceso": "Troquelado"}
+    desc = {"OT_id": "A", "Proceso": "Descartonado"}
+    saltada = {"OT_id": "B", "Proceso": "Guillotina"}
+    colas = {"TERCERIZADO": deque([desc, troq]), "SALTADO": deque([saltada])}
+
+    # Cadena A: Impresión (real) -> Troquelado (tercerizado) -> Descartonado (tercerizado)
+    previo = {id(troq): "Impresión Offset", id(desc): "Troquelado"}
+    fines = {}
+    sucesoras = {"Impresión Offset": [troq], "Troquelado": [desc]}
+
+    def disponibilidad(t, maquina):
+        p = previo.get(id(t))
+        if p is None:
+            return (True, None)
+        return (p in fines, fines.get(p))
+
+    agendadas = []
+
+    def agendar(t, maquina, ini, fin, duracion):
+        agendadas.append((t["Proceso"], maquina, ini, fin))
+        fines[t["Proceso"]] = fin
+        virtuales.resolver(sucesoras.get(t["Proceso"], []))
+
+    virtuales = ResolutorVirtuales(colas, disponibilidad, inicio, agendar)
+    assert len(virtuales) == 3
+
+    # 1. Al arrancar solo la saltada es ejecutable: inicio del plan, duración 0
+    virtuales.resolver()
+    assert agendadas == [("Guillotina", "SALTADO", inicio, inicio)]
+
+    # 2. Fin de la impresión: el troquelado tercerizado (72 hs) y su descartonado
+    #    (incluido en esas 72 hs) se propagan en el mismo aviso
+    fin_imp = datetime(2026, 3, 2, 15, 30)
+    fines["Impresión Offset"] = fin_imp
+    virtuales.resolver([imp, troq])
+    assert agendadas[1] == ("Troquelado", "TERCERIZADO", fin_imp, datetime(2026, 3, 5, 15, 30))
+    assert agendadas[2] == ("Descartonado", "TERCERIZADO", datetime(2026, 3, 5, 15, 30), datetime(2026, 3, 5, 15, 30))
+    assert len(virtuales) == 0
+
+    # 3. Una tarea ya agendada no se vuelve a agendar
+    virtuales.resolver([troq, desc])
+    virtuales.resolver()
+    assert len(agendadas) == 3
+
+    assert duracion_virtual_h(troq, "TERCERIZADO") == 72.0
+    assert duracion_virtual_h(desc, "TERCERIZADO") == 0.0
+    assert duracion_virtual_h(troq, "SALTADO") == 0.0
+
+    print("SUCCESS: Virtuales agendadas al liberarse, con cadenas propagadas.")
+
+
+if __name__ == "__main__":
+    try:
+        test_virtuales()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
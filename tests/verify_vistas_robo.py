@@ -0,0 +1,111 @@
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.schedulers.colas_indexadas import IndiceColas
+from modules.schedulers.priorities import prioridad_robo_pool
+
+
+class _Tarea(dict):
+    """Tarea mínima: lo que leen la cola indexada, los filtros de robo y el orden del POOL."""
+    def __init__(self, n, rng):
+        super().__init__(OT_id=f"OT{n}", Proceso="Troquelado",
+                         PrioriDesc=rng.choice([None, 3, 5, 9999]),
+                         Urgente=rng.choice(["Si", "No"]))
+        self.cantidad = rng.choice([1000, 2500, 3000, 8000])
+        self.mp_ok = rng.random() > 0.2
+        self.prio_man = rng.choice([9999, 9999, 4])
+        self.tiene_prioridad = False
+        self.tiene_sucesor = rng.random() < 0.5
+
+
+def _primera_lista(cola, estado, reloj, filtro, clave=None):
+    """Recorrido original: primera lista en orden de cola (o la de menor `clave`, la primera a igualdad)."""
+    mejor = None
+    for t in cola:
+        if not filtro(t):
+            continue
+        runnable, disp = estado[id(t)]
+        if runnable and (not disp or disp <= reloj):
+            if clave is None:
+                return t
+            if mejor is None or clave(t) < clave(mejor):
+                mejor = t
+    return mejor
+
+
+def _futura(cola, estado, reloj, filtro):
+    mejor = None
+    for t in cola:
+        runnable, disp = estado[id(t)]
+        if filtro(t) and runnable and disp and disp > reloj and (mejor is None or disp < estado[id(mejor)][1]):
+            mejor = t
+    return mejor
+
+
+def test_vistas_robo():
+    print("=== Testing Vistas de Robo (PASO 2) ===")
+
+    rng = random.Random(11)
+    t0 = datetime(2026, 3, 2, 7, 0)
+    estado = {}
+    indice = IndiceColas(lambda t, maquina: estado[id(t)])
+
+    def _estado_azar():
+        r = rng.random()
+        return (False, None) if r < 0.25 else (True, None if r < 0.35 else t0 + timedelta(minutes=30 * rng.randint(0, 40)))
+
+    tareas = [_Tarea(n, rng) for n in range(80)]
+    for t in tareas:
+        estado[id(t)] = _estado_azar()
+
+    manual = indice.cola(tareas[:40], "Manual 1")
+    pool = indice.cola(tareas[40:], "POOL_DESCARTONADO")
+
+    # Caso A (automática roba a manual): tiradas grandes con materia prima en planta
+    filtro_a = lambda t: t.cantidad >= 3000 and t.mp_ok
+    vista_a = manual.vista(filtro_a)
+    filtro_pool = lambda t: t.mp_ok
+    vista_pool = pool.vista(filtro_pool, (prioridad_robo_pool, lambda t: prioridad_robo_pool(t, degradar_urgentes=True)))
+    degradada = lambda t: prioridad_robo_pool(t, degradar_urgentes=True)
+
+    reloj = t0
+    afuera = []
+    for paso in range(400):
+        assert vista_a.primera(reloj) is _primera_lista(manual, estado, reloj, filtro_a), paso
+        assert vista_pool.primera(reloj) is _primera_lista(pool, estado, reloj, filtro_pool, prioridad_robo_pool), paso
+        assert vista_pool.primera(reloj, 1) is _primera_lista(pool, estado, reloj, filtro_pool, degradada), paso
+        assert vista_pool.futura() is _futura(pool, estado, reloj, filtro_pool), paso
+
+        # Mutaciones del núcleo: robo (remove + appendleft en otra cola), agendar
+        # (popleft), fin de predecesor (actualizar) y reloj de otra ladrona
+        accion = rng.random()
+        cola = rng.choice([manual, pool])
+        if accion < 0.25 and cola:
+            t = rng.choice(list(cola))
+            cola.remove(t)
+            afuera.append(t)
+        elif accion < 0.4 and afuera:
+            cola.appendleft(afuera.pop(rng.randrange(len(afuera))))
+        elif accion < 0.5 and cola:
+            afuera.append(cola.popleft())
+        elif accion < 0.75:
+            t = rng.choice(tareas)
+            estado[id(t)] = _estado_azar()
+            indice.actualizar([t])
+        else:
+            reloj = t0 + timedelta(minutes=30 * rng.randint(0, 40))
+
+    print("SUCCESS: Vistas de robo iguales al recorrido de las colas.")
+
+
+if __name__ == "__main__":
+    try:
+        test_vistas_robo()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()